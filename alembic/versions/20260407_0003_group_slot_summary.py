@@ -0,0 +1,50 @@
+"""Add denormalised group slot summaries and schedule lookup indexes.
+
+Revision ID: 20260407_0003_group_slots
+Revises: 20260406_0002_vk_att_msg_ids
+Create Date: 2026-04-07
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260407_0003_group_slots"
+down_revision = "20260406_0002_vk_att_msg_ids"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(bind, table_name: str) -> bool:
+    return table_name in sa.inspect(bind).get_table_names()
+
+
+def _has_index(bind, table_name: str, index_name: str) -> bool:
+    return index_name in {index["name"] for index in sa.inspect(bind).get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_table(bind, "group_slot_summaries"):
+        op.create_table(
+            "group_slot_summaries",
+            sa.Column("group_id", sa.Integer(), sa.ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("slots_json", sa.Text(), nullable=False, server_default="[]"),
+            sa.Column("next_session_date", sa.Date(), nullable=True),
+            sa.Column("computed_on", sa.Date(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+    if not _has_index(bind, "schedule", "ix_schedule_group_id_date"):
+        op.create_index("ix_schedule_group_id_date", "schedule", ["group_id", "date"])
+    if not _has_index(bind, "schedule", "ix_schedule_object_date"):
+        op.create_index("ix_schedule_object_date", "schedule", ["object_type", "object_id", "date"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_index(bind, "schedule", "ix_schedule_object_date"):
+        op.drop_index("ix_schedule_object_date", table_name="schedule")
+    if _has_index(bind, "schedule", "ix_schedule_group_id_date"):
+        op.drop_index("ix_schedule_group_id_date", table_name="schedule")
+    if _has_table(bind, "group_slot_summaries"):
+        op.drop_table("group_slot_summaries")
@@ -0,0 +1,38 @@
+"""Add shared token buckets for auth rate limits.
+
+Revision ID: 20260408_0004_auth_rate_limits
+Revises: 20260407_0003_group_slots
+Create Date: 2026-04-08
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260408_0004_auth_rate_limits"
+down_revision = "20260407_0003_group_slots"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(bind, table_name: str) -> bool:
+    return table_name in sa.inspect(bind).get_table_names()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_table(bind, "auth_rate_limit_buckets"):
+        op.create_table(
+            "auth_rate_limit_buckets",
+            sa.Column("key", sa.String(length=255), primary_key=True),
+            sa.Column("tokens", sa.Float(), nullable=False),
+            sa.Column("refilled_at", sa.Float(), nullable=False),
+        )
+        op.create_index("ix_auth_rate_limit_buckets_refilled_at", "auth_rate_limit_buckets", ["refilled_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_table(bind, "auth_rate_limit_buckets"):
+        op.drop_index("ix_auth_rate_limit_buckets_refilled_at", table_name="auth_rate_limit_buckets")
+        op.drop_table("auth_rate_limit_buckets")
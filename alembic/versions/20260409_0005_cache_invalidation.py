@@ -0,0 +1,39 @@
+"""Add the cache invalidation event log.
+
+Revision ID: 20260409_0005_cache_invalidation
+Revises: 20260408_0004_auth_rate_limits
+Create Date: 2026-04-09
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260409_0005_cache_invalidation"
+down_revision = "20260408_0004_auth_rate_limits"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(bind, table_name: str) -> bool:
+    return table_name in sa.inspect(bind).get_table_names()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_table(bind, "cache_invalidation_events"):
+        op.create_table(
+            "cache_invalidation_events",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("topic", sa.String(length=64), nullable=False),
+            sa.Column("origin", sa.String(length=64), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_cache_invalidation_events_created_at", "cache_invalidation_events", ["created_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_table(bind, "cache_invalidation_events"):
+        op.drop_index("ix_cache_invalidation_events_created_at", table_name="cache_invalidation_events")
+        op.drop_table("cache_invalidation_events")
@@ -0,0 +1,39 @@
+"""Add the admin change feed behind the SSE stream.
+
+Revision ID: 20260410_0006_admin_feed_events
+Revises: 20260409_0005_cache_invalidation
+Create Date: 2026-04-10
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260410_0006_admin_feed_events"
+down_revision = "20260409_0005_cache_invalidation"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(bind, table_name: str) -> bool:
+    return table_name in sa.inspect(bind).get_table_names()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_table(bind, "admin_feed_events"):
+        op.create_table(
+            "admin_feed_events",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("kind", sa.String(length=32), nullable=False),
+            sa.Column("entity_id", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_admin_feed_events_created_at", "admin_feed_events", ["created_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_table(bind, "admin_feed_events"):
+        op.drop_index("ix_admin_feed_events_created_at", table_name="admin_feed_events")
+        op.drop_table("admin_feed_events")
@@ -0,0 +1,53 @@
+"""Add notification batches delivered after the commit that queued them.
+
+Revision ID: 20260411_0007_notify_batches
+Revises: 20260410_0006_admin_feed_events
+Create Date: 2026-04-11
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20260411_0007_notify_batches"
+down_revision = "20260410_0006_admin_feed_events"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(bind, table_name: str) -> bool:
+    return table_name in sa.inspect(bind).get_table_names()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _has_table(bind, "notification_batches"):
+        op.create_table(
+            "notification_batches",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("event_type", sa.String(length=64), nullable=False),
+            sa.Column("title", sa.String(length=255), nullable=False),
+            sa.Column("body", sa.Text(), nullable=False),
+            sa.Column("payload_json", sa.Text(), nullable=True),
+            sa.Column("recipients_json", sa.Text(), nullable=False),
+            sa.Column("status", sa.String(length=16), nullable=False, server_default="queued"),
+            sa.Column("recipient_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("processed_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("sent_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("failed_user_ids_json", sa.Text(), nullable=True),
+            sa.Column("error", sa.String(length=64), nullable=True),
+            sa.Column("created_by_staff_id", sa.Integer(), sa.ForeignKey("staff.id"), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_notification_batches_status", "notification_batches", ["status"])
+        op.create_index("ix_notification_batches_finished_at", "notification_batches", ["finished_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _has_table(bind, "notification_batches"):
+        op.drop_index("ix_notification_batches_finished_at", table_name="notification_batches")
+        op.drop_index("ix_notification_batches_status", table_name="notification_batches")
+        op.drop_table("notification_batches")
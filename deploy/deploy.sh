@@ -56,6 +56,9 @@ git fetch origin
 git checkout "${BRANCH}"
 git pull --ff-only origin "${BRANCH}"
 
+echo "==> Build frontend assets"
+"${PYTHON_BIN:-${APP_DIR}/.venv/bin/python}" scripts/build_frontend_assets.py
+
 echo "==> Start services: ${SERVICE_NAMES[*]}"
 for service in "${SERVICE_NAMES[@]}"; do
   sudo systemctl start "${service}"
@@ -1,65 +1,143 @@
-const CACHE_NAME = 'dance-studio-shell-v4';
-const API_CACHE = 'dance-studio-api-v1';
-const SHELL = ['/', '/assets/logo.png', '/assets/manifest.json'];
+// Replaced with the hashed asset list and build version by scripts/build_frontend_assets.py.
+const PRECACHE = { version: 'dev', urls: [] };
+
+const CACHE_PREFIX = 'dance-studio-';
+const SHELL_CACHE = `${CACHE_PREFIX}shell-${PRECACHE.version}`;
+const API_CACHE = `${CACHE_PREFIX}api-v2`;
+const MEDIA_CACHE = `${CACHE_PREFIX}media-v1`;
+const CACHE_LIMITS = { [API_CACHE]: 60, [MEDIA_CACHE]: 150 };
+const CURRENT_CACHES = new Set([SHELL_CACHE, API_CACHE, MEDIA_CACHE]);
+const PRECACHED_PATHS = new Set(PRECACHE.urls);
+const IS_BUILT = PRECACHE.version !== 'dev';
+
+// Public catalog data is the same for every user. Everything else (authenticated screens,
+// /schedule/public which depends on the session, all non-GET requests) stays network-only.
+const SWR_API_PATTERNS = [
+  /^\/api\/directions$/,
+  /^\/api\/directions\/\d+\/groups$/,
+  /^\/api\/teachers$/,
+  /^\/api\/teachers\/\d+$/,
+  /^\/news$/,
+];
 
 self.addEventListener('install', (event) => {
-  event.waitUntil(caches.open(CACHE_NAME).then((cache) => cache.addAll(SHELL)));
-  self.skipWaiting();
+  event.waitUntil(
+    caches.open(SHELL_CACHE)
+      .then((cache) => cache.addAll(PRECACHE.urls))
+      .then(() => self.skipWaiting())
+  );
 });
 
 self.addEventListener('activate', (event) => {
-  event.waitUntil(self.clients.claim());
+  event.waitUntil(
+    caches.keys()
+      .then((names) => Promise.all(
+        names
+          .filter((name) => name.startsWith(CACHE_PREFIX) && !CURRENT_CACHES.has(name))
+          .map((name) => caches.delete(name))
+      ))
+      .then(() => self.clients.claim())
+  );
 });
 
 self.addEventListener('fetch', (event) => {
-  const url = new URL(event.request.url);
-  if (event.request.method !== 'GET') return;
-  const isHtmlNavigation =
-    event.request.mode === 'navigate' ||
-    url.pathname === '/' ||
-    url.pathname.endsWith('.html');
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) return;
 
-  // Prevent stale app shell in Telegram WebView after deploys.
-  if (isHtmlNavigation) {
-    event.respondWith(
-      fetch(event.request)
-        .then((response) => {
-          const copy = response.clone();
-          caches.open(CACHE_NAME).then((cache) => cache.put(event.request, copy));
-          return response;
-        })
-        .catch(() => caches.match(event.request))
-    );
+  if (request.mode === 'navigate') {
+    if (url.pathname === '/' || url.pathname === '/index.html') {
+      event.respondWith(handleShell(request));
+    }
     return;
   }
-
-  if (url.pathname.startsWith('/api/') || url.pathname.startsWith('/news')) {
-    event.respondWith(
-      fetch(event.request)
-        .then((response) => {
-          const copy = response.clone();
-          caches.open(API_CACHE).then((cache) => cache.put(event.request, copy));
-          return response;
-        })
-        .catch(() => caches.match(event.request))
-    );
+  if (url.pathname.startsWith('/assets/dist/') || PRECACHED_PATHS.has(url.pathname + url.search)) {
+    event.respondWith(cacheFirst(request));
     return;
   }
-
-  event.respondWith(
-    caches.match(event.request).then((cached) => {
-      const fetchPromise = fetch(event.request)
-        .then((response) => {
-          const copy = response.clone();
-          caches.open(CACHE_NAME).then((cache) => cache.put(event.request, copy));
-          return response;
-        })
-        .catch(() => cached);
-      return cached || fetchPromise;
-    })
-  );
+  if (SWR_API_PATTERNS.some((pattern) => pattern.test(url.pathname))) {
+    event.respondWith(staleWhileRevalidate(event, API_CACHE));
+    return;
+  }
+  if (url.pathname.startsWith('/media/')) {
+    event.respondWith(staleWhileRevalidate(event, MEDIA_CACHE));
+  }
 });
 
+async function handleShell(request) {
+  const cache = await caches.open(SHELL_CACHE);
+  if (IS_BUILT) {
+    // The precached shell only references assets of this same build, so it is always consistent;
+    // a new deploy ships a new sw.js, which installs in the background and serves the next open.
+    const cached = await cache.match('/');
+    if (cached) return cached;
+    return fetch(request);
+  }
+  try {
+    const response = await fetch(request);
+    if (response.ok) await cache.put('/', response.clone());
+    return response;
+  } catch (error) {
+    const cached = await cache.match('/');
+    if (cached) return cached;
+    throw error;
+  }
+}
+
+async function cacheFirst(request) {
+  const cache = await caches.open(SHELL_CACHE);
+  const cached = await cache.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok && new URL(request.url).pathname.startsWith('/assets/dist/')) {
+    await cache.put(request, response.clone());
+  }
+  return response;
+}
+
+async function staleWhileRevalidate(event, cacheName) {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(event.request);
+  const revalidation = revalidate(cache, cacheName, event.request, cached ? cached.clone() : null);
+  if (cached) {
+    event.waitUntil(revalidation.catch(() => {}));
+    return cached;
+  }
+  return revalidation;
+}
+
+async function revalidate(cache, cacheName, request, cached) {
+  const headers = new Headers(request.headers);
+  const etag = cached && cached.headers.get('ETag');
+  if (etag) headers.set('If-None-Match', etag);
+  // no-store keeps the HTTP cache out of the way, so a 304 reaches us instead of being resolved there.
+  const response = await fetch(new Request(request, { headers, cache: 'no-store' }));
+
+  if (response.status === 304 && cached) {
+    await putLru(cache, cacheName, request, cached);
+    return response;
+  }
+  const cacheControl = response.headers.get('Cache-Control') || '';
+  if (response.ok && response.type === 'basic' && !cacheControl.includes('no-store')) {
+    await putLru(cache, cacheName, request, response.clone());
+  } else if (response.ok) {
+    await cache.delete(request);
+  }
+  return response;
+}
+
+// Cache.keys() lists entries in insertion order, so re-inserting on every use keeps
+// the least recently used entries at the front, where trimming removes them.
+async function putLru(cache, cacheName, request, response) {
+  await cache.delete(request);
+  await cache.put(request, response);
+  const limit = CACHE_LIMITS[cacheName];
+  if (!limit) return;
+  const keys = await cache.keys();
+  await Promise.all(keys.slice(0, Math.max(0, keys.length - limit)).map((key) => cache.delete(key)));
+}
+
 self.addEventListener('push', (event) => {
   let payload = { title: 'Dance Studio', body: 'Новое уведомление' };
   try { payload = event.data.json(); } catch (e) {}
@@ -0,0 +1,38 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from dance_studio.core.image_variants import backfill_image_variants
+from dance_studio.core.media_manager import MEDIA_DIR
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate WebP thumbnail/medium variants for existing media.")
+    parser.add_argument("--media-dir", default=str(MEDIA_DIR), help="Media root to scan (default: var/media).")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel image workers.")
+    parser.add_argument("--force", action="store_true", help="Rebuild variants even if they are up to date.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    result = backfill_image_variants(Path(args.media_dir), force=args.force, workers=args.workers)
+    logger.info(
+        "image variants backfill completed, generated=%s skipped=%s failed=%s",
+        result.generated,
+        result.skipped,
+        result.failed,
+    )
+
+
+if __name__ == "__main__":
+    main()
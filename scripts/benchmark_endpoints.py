@@ -0,0 +1,260 @@
+"""
+Benchmark the hottest web routes and the bot's due-work jobs against synthetic datasets.
+
+Usage:
+    python scripts/benchmark_endpoints.py --sizes 100,1000,5000 --repeat 10
+    python scripts/benchmark_endpoints.py --sizes 1000 --with-bot --json var/bench/$(git rev-parse --short HEAD).json
+
+Optional args:
+    --sizes 100,1000         : dataset sizes (students) to generate, one fresh database each
+    --repeat 10              : timed requests per route after one warm-up request
+    --with-bot               : also run the bot's due-work jobs once (outbound sends are no-ops)
+    --database-url-template  : e.g. postgresql://localhost/bench_{size}; each database must exist and be empty
+                               (default: a temporary SQLite file per size)
+    --json PATH              : also write the raw results, to compare runs across commits
+
+Every size runs in its own interpreter, because the app binds its engine to DATABASE_URL at import time.
+Requests are made as the synthetic owner through the Flask test client; latency is wall time of the
+whole request and the query count comes from dance_studio.core.profiling.count_queries().
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+ROUTES = {
+    "public_schedule": lambda ids: "/schedule/public",
+    "attendance_sheet": lambda ids: f"/api/attendance/{ids.today_schedule_id}",
+    "directions": lambda ids: "/api/directions",
+    "direction_groups": lambda ids: f"/api/directions/{ids.direction_id}/groups",
+    "group_detail": lambda ids: f"/api/groups/{ids.group_id}",
+    "teachers": lambda ids: "/api/teachers",
+    "teacher_profile": lambda ids: f"/api/teachers/{ids.teacher_id}",
+    "admin_booking_list": lambda ids: "/api/admin/booking-requests",
+    "admin_group_abonements": lambda ids: "/api/admin/groups/abonements",
+    "admin_payments": lambda ids: "/api/admin/payments",
+    "client_attendance_calendar": lambda ids: f"/api/admin/clients/{ids.student_user_id}/attendance-calendar",
+    "studio_stats": lambda ids: "/api/stats/studio",
+    "teacher_stats": lambda ids: f"/api/stats/teacher?teacher_id={ids.teacher_id}",
+    "app_bootstrap": lambda ids: "/api/app/bootstrap",
+}
+
+BOT_JOBS = (
+    "send_due_attendance_reminders",
+    "send_due_teacher_attendance_summaries",
+    "send_due_abonement_notifications",
+    "send_due_booking_payment_deadline_alerts",
+    "refresh_group_slot_summaries",
+)
+
+# aiogram validates the token format at import; nothing is ever sent with it.
+OFFLINE_BOT_TOKEN = "123456:offline-benchmark"
+
+
+class _OfflineBot:
+    """Stands in for the aiogram Bot: every API call succeeds immediately without touching the network."""
+
+    async def _call(self, *args, **kwargs):
+        return SimpleNamespace(message_id=0, chat=SimpleNamespace(id=kwargs.get("chat_id")))
+
+    def __getattr__(self, name):
+        return self._call
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+def _bench_routes(summary, repeat: int) -> dict:
+    from flask import g
+
+    from dance_studio.core.profiling import count_queries
+    from dance_studio.db import engine
+    from dance_studio.web.app import create_app
+
+    app = create_app()
+
+    @app.before_request
+    def _as_owner():
+        g.telegram_id = summary.owner_telegram_id
+        g.user_id = summary.owner_user_id
+
+    client = app.test_client()
+    results = {}
+    for name, build_path in ROUTES.items():
+        path = build_path(summary)
+        status = client.get(path).status_code
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with count_queries(engine, name=name) as profile:
+                started = time.perf_counter()
+                status = client.get(path).status_code
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = profile.queries
+        results[name] = {
+            "path": path,
+            "status": status,
+            "p50_ms": _percentile(timings, 0.5),
+            "p95_ms": _percentile(timings, 0.95),
+            "mean_ms": round(statistics.fmean(timings), 2),
+            "queries": queries,
+        }
+    return results
+
+
+def _bench_bot_jobs() -> dict:
+    from dance_studio.core.profiling import count_queries
+    from dance_studio.db import engine
+    import dance_studio.bot.bot as bot_module
+
+    async def _delivered(*args, **kwargs):
+        return True
+
+    bot_module.bot = _OfflineBot()
+    bot_module.send_user_notification_async = _delivered
+
+    results = {}
+    for name in BOT_JOBS:
+        # Jobs record what they sent, so only the first run over a dataset does the full work.
+        with count_queries(engine, name=name) as profile:
+            started = time.perf_counter()
+            asyncio.run(getattr(bot_module, name)())
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        results[name] = {"ms": round(elapsed_ms, 2), "queries": profile.queries}
+    return results
+
+
+def run_size(size: int, database_url: str, repeat: int, with_bot: bool, seed: int) -> dict:
+    """Generates one dataset and benchmarks it; expects a fresh interpreter (see the module docstring)."""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("APP_SECRET_KEY", "benchmark-secret")
+    # The report already has every timing; per-request slow logs would only bury it.
+    os.environ.setdefault("SLOW_REQUEST_LOG_MS", "0")
+    os.environ.setdefault("SLOW_JOB_LOG_MS", "0")
+    if with_bot:
+        os.environ.setdefault("BOT_TOKEN", OFFLINE_BOT_TOKEN)
+
+    from generate_synthetic_data import DatasetSpec, generate_dataset
+
+    from dance_studio.core.system_settings_service import ensure_default_settings
+    from dance_studio.db import Session, engine
+    from dance_studio.db.models import Base
+
+    Base.metadata.create_all(engine)
+    db = Session()
+    try:
+        ensure_default_settings(db)
+        summary = generate_dataset(db, DatasetSpec(users=size, seed=seed, anchor=dt.date.today()))
+    finally:
+        db.close()
+
+    result = {
+        "size": size,
+        "dialect": engine.dialect.name,
+        "counts": summary.counts,
+        "generate_seconds": round(summary.seconds, 2),
+        "routes": _bench_routes(summary, repeat),
+    }
+    if with_bot:
+        result["bot_jobs"] = _bench_bot_jobs()
+    return result
+
+
+def _print_report(results: list[dict]) -> None:
+    for result in results:
+        counts = result["counts"]
+        print(
+            f"\n== {result['size']} students ({result['dialect']}): {counts['schedule']} lessons, "
+            f"{counts['attendance']} attendance rows, generated in {result['generate_seconds']}s"
+        )
+        print(f"{'route':<46} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}")
+        for name, row in result["routes"].items():
+            print(f"{name:<46} {row['status']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['queries']:>8}")
+        for name, row in result.get("bot_jobs", {}).items():
+            print(f"{'bot:' + name:<46} {'':>6} {row['ms']:>9} {'':>9} {row['queries']:>8}")
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark hot routes and bot jobs on synthetic data")
+    parser.add_argument("--sizes", default="100,1000")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--with-bot", action="store_true")
+    parser.add_argument("--database-url-template", default=None)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--json", default=None, help="Write raw results to this file")
+    # Internal: run a single size in this process and write its result to --result-file.
+    parser.add_argument("--run-size", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--database-url", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.run_size is not None:
+        result = run_size(args.run_size, args.database_url, args.repeat, args.with_bot, args.random_seed)
+        Path(args.result_file).write_text(json.dumps(result), encoding="utf-8")
+        return
+
+    sizes = [int(item) for item in args.sizes.split(",") if item.strip()]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="dance-bench-") as workdir:
+        for size in sizes:
+            if args.database_url_template:
+                database_url = args.database_url_template.format(size=size)
+            else:
+                database_url = f"sqlite:///{Path(workdir) / f'bench_{size}.db'}"
+            result_file = Path(workdir) / f"result_{size}.json"
+            command = [
+                sys.executable, __file__,
+                "--run-size", str(size),
+                "--database-url", database_url,
+                "--repeat", str(args.repeat),
+                "--random-seed", str(args.random_seed),
+                "--result-file", str(result_file),
+            ]
+            if args.with_bot:
+                command.append("--with-bot")
+            print(f"⏳ {size} students...", flush=True)
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            results.append(json.loads(result_file.read_text(encoding="utf-8")))
+
+    _print_report(results)
+    if args.json:
+        payload = {"revision": _git_revision(), "created_at": dt.datetime.now().isoformat(), "results": results}
+        path = Path(args.json)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from dance_studio.web.constants import FRONTEND_DIR
+from dance_studio.core.frontend_assets import build_frontend_assets
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Split frontend/index.html into a small shell plus hashed, precompressed assets in frontend/dist."
+    )
+    parser.add_argument("--frontend-dir", default=FRONTEND_DIR, help="Frontend root (default: frontend).")
+    parser.add_argument("--brotli-quality", type=int, default=11, help="Brotli quality, 0-11.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    built = build_frontend_assets(Path(args.frontend_dir), brotli_quality=args.brotli_quality)
+    for path in built.files:
+        logger.info("%-40s %8d bytes", path.name, path.stat().st_size)
+    logger.info("frontend build completed, shell=%s", built.shell_path)
+
+
+if __name__ == "__main__":
+    main()
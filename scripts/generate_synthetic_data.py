@@ -0,0 +1,474 @@
+"""
+Generate a deterministic, production-sized synthetic dataset for load and benchmark runs.
+
+Usage:
+    python scripts/generate_synthetic_data.py --database-url sqlite:///var/bench.db --create-schema --users 2000
+
+Optional args:
+    --database-url URL     : target database (defaults to DATABASE_URL from the environment)
+    --create-schema        : create missing tables from the models (fresh SQLite files)
+    --users 2000           : number of students; staff, groups and everything else scale from it
+    --anchor-date ISO      : "today" of the dataset (defaults to the real today)
+    --random-seed 42       : same seed + anchor date + users = the same rows
+
+The same N always produces the same rows: a year of group lessons around the anchor date
+(~10 months back, ~2 months ahead) with attendance, abonements, bookings, payments and notifications.
+Everything is written with bulk INSERTs, so SQLite and a local PostgreSQL both load 100k+ rows in seconds.
+Synthetic users live in a reserved telegram_id range; the script refuses to run twice into the same database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+
+STUDENT_TG_BASE = 770_000_000
+STAFF_TG_BASE = 760_000_000
+SYNTHETIC_TG_RANGE = (STAFF_TG_BASE, STUDENT_TG_BASE + 10_000_000)
+INSERT_CHUNK = 5000
+
+FIRST_NAMES = [
+    "Алексей", "Мария", "Дмитрий", "Ольга", "Иван", "Анна", "Сергей", "Екатерина",
+    "Никита", "Юлия", "Павел", "Наталья", "Виктор", "Ксения", "Михаил", "София",
+]
+DIRECTION_TITLES = [
+    ("Хип-хоп", "dance"), ("Джаз фанк", "dance"), ("Контемпорари", "dance"), ("Классическая хореография", "dance"),
+    ("Стретчинг", "sport"), ("Пилатес", "sport"), ("Здоровая спина", "sport"), ("Хилс", "dance"),
+    ("Вог", "dance"), ("Брейк-данс", "dance"), ("Йога", "sport"), ("Функциональный тренинг", "sport"),
+]
+
+
+@dataclass(slots=True)
+class DatasetSpec:
+    users: int
+    seed: int = 42
+    anchor: dt.date = field(default_factory=dt.date.today)
+    days_back: int = 300
+    days_ahead: int = 65
+    group_size: int = 12
+    lesson_price_rub: int = 600
+
+    @property
+    def teachers(self) -> int:
+        return max(2, self.users // 60)
+
+    @property
+    def directions(self) -> int:
+        return max(2, min(len(DIRECTION_TITLES), self.users // 80))
+
+    @property
+    def groups(self) -> int:
+        return max(2, self.users // self.group_size)
+
+
+@dataclass(slots=True)
+class DatasetSummary:
+    """Row counts plus a few well-known ids the benchmark harness needs to build URLs."""
+
+    counts: dict[str, int] = field(default_factory=dict)
+    owner_telegram_id: int | None = None
+    owner_user_id: int | None = None
+    teacher_id: int | None = None
+    direction_id: int | None = None
+    group_id: int | None = None
+    today_schedule_id: int | None = None
+    student_user_id: int | None = None
+    student_telegram_id: int | None = None
+    seconds: float = 0.0
+
+
+def _chunks(rows: list[dict], size: int = INSERT_CHUNK):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _bulk_insert(db, model, rows: list[dict], *returning) -> list:
+    """insert(model) in chunks; with returning columns gives back those columns of the new rows (in any order)."""
+    from sqlalchemy import insert
+
+    result = []
+    for chunk in _chunks(rows):
+        if returning:
+            result.extend(db.execute(insert(model).returning(*returning), chunk).all())
+        else:
+            db.execute(insert(model), chunk)
+    return result
+
+
+def _lesson_days(group_index: int) -> tuple[int, int]:
+    first = group_index % 5
+    return first, (first + 2) % 7
+
+
+def generate_dataset(db, spec: DatasetSpec) -> DatasetSummary:
+    from dance_studio.core.statuses import (
+        ABONEMENT_STATUS_ACTIVE,
+        ABONEMENT_STATUS_EXPIRED,
+        BOOKING_STATUS_CANCELLED,
+        BOOKING_STATUS_CONFIRMED,
+        BOOKING_STATUS_CREATED,
+        BOOKING_STATUS_WAITING_PAYMENT,
+    )
+    from dance_studio.db.models import (
+        Attendance,
+        BookingRequest,
+        Direction,
+        Group,
+        GroupAbonement,
+        Notification,
+        NotificationDelivery,
+        PaymentTransaction,
+        Schedule,
+        Staff,
+        User,
+    )
+
+    started = time.perf_counter()
+    rng = random.Random(spec.seed)
+    anchor = spec.anchor
+    anchor_dt = dt.datetime.combine(anchor, dt.time(9, 0))
+    summary = DatasetSummary()
+
+    existing = db.query(User.id).filter(User.telegram_id.between(*SYNTHETIC_TG_RANGE)).first()
+    if existing:
+        raise RuntimeError("synthetic users already exist in this database; generate into a fresh one")
+
+    # --- users and staff ---------------------------------------------------
+    staff_specs = [("Владелец", "владелец"), ("Администратор", "администратор")]
+    staff_specs += [(f"Преподаватель {index + 1}", "учитель") for index in range(spec.teachers)]
+    user_rows = [
+        {
+            "telegram_id": STAFF_TG_BASE + index,
+            "username": f"synthetic_staff_{index}",
+            "name": name,
+            "status": "active",
+            "registered_at": anchor_dt - dt.timedelta(days=spec.days_back + 30),
+        }
+        for index, (name, _) in enumerate(staff_specs)
+    ]
+    user_rows += [
+        {
+            "telegram_id": STUDENT_TG_BASE + index,
+            "username": f"synthetic_{index}",
+            "name": f"{rng.choice(FIRST_NAMES)} {index}",
+            "phone": f"+7900{index:07d}",
+            "status": "active",
+            "registered_at": anchor_dt - dt.timedelta(days=rng.randint(0, spec.days_back)),
+        }
+        for index in range(spec.users)
+    ]
+    user_ids = {tg: user_id for user_id, tg in _bulk_insert(db, User, user_rows, User.id, User.telegram_id)}
+
+    staff_rows = [
+        {
+            "name": name,
+            "telegram_id": STAFF_TG_BASE + index,
+            "user_id": user_ids[STAFF_TG_BASE + index],
+            "position": position,
+            "teaches": 1 if position == "учитель" else 0,
+            "status": "active",
+            "created_at": anchor_dt - dt.timedelta(days=spec.days_back + 30),
+        }
+        for index, (name, position) in enumerate(staff_specs)
+    ]
+    staff_ids = {tg: staff_id for staff_id, tg in _bulk_insert(db, Staff, staff_rows, Staff.id, Staff.telegram_id)}
+    admin_staff_id = staff_ids[STAFF_TG_BASE + 1]
+    teacher_ids = [staff_ids[STAFF_TG_BASE + 2 + index] for index in range(spec.teachers)]
+    student_ids = [user_ids[STUDENT_TG_BASE + index] for index in range(spec.users)]
+
+    # --- catalog -------------------------------------------------------------
+    direction_rows = [
+        {
+            "title": DIRECTION_TITLES[index][0],
+            "direction_type": DIRECTION_TITLES[index][1],
+            "description": "Синтетическое направление",
+            "base_price": 4000 + 500 * (index % 4),
+            "status": "active",
+            "is_popular": int(index < 3),
+        }
+        for index in range(spec.directions)
+    ]
+    direction_ids = {
+        title: direction_id
+        for direction_id, title in _bulk_insert(db, Direction, direction_rows, Direction.direction_id, Direction.title)
+    }
+    direction_id_list = [direction_ids[row["title"]] for row in direction_rows]
+
+    group_rows = [
+        {
+            "direction_id": direction_id_list[index % len(direction_id_list)],
+            "teacher_id": teacher_ids[index % len(teacher_ids)],
+            "name": f"{direction_rows[index % len(direction_rows)]['title']} {index // len(direction_rows) + 1}",
+            "age_group": rng.choice(["7-10", "11-15", "16+", "18+"]),
+            "max_students": spec.group_size + 4,
+            "duration_minutes": 60,
+            "lessons_per_week": 2,
+            "created_at": anchor_dt - dt.timedelta(days=spec.days_back + 30),
+        }
+        for index in range(spec.groups)
+    ]
+    group_ids_by_name = {name: group_id for group_id, name in _bulk_insert(db, Group, group_rows, Group.id, Group.name)}
+    group_ids = [group_ids_by_name[row["name"]] for row in group_rows]
+    db.commit()
+
+    # --- a year of lessons -----------------------------------------------------
+    first_day = anchor - dt.timedelta(days=spec.days_back)
+    days = [first_day + dt.timedelta(days=offset) for offset in range(spec.days_back + spec.days_ahead + 1)]
+    schedule_rows = []
+    for index, group_id in enumerate(group_ids):
+        weekdays = _lesson_days(index)
+        time_from = dt.time(10 + index % 11, 0)
+        time_to = dt.time(11 + index % 11, 0)
+        for day in days:
+            if day.weekday() not in weekdays:
+                continue
+            schedule_rows.append({
+                "object_type": "group",
+                "object_id": group_id,
+                "group_id": group_id,
+                "teacher_id": group_rows[index]["teacher_id"],
+                "title": group_rows[index]["name"],
+                "date": day,
+                "time_from": time_from,
+                "time_to": time_to,
+                "status": "cancelled" if rng.random() < 0.03 else "scheduled",
+                "updated_at": anchor_dt,
+            })
+    # Every group also meets on the anchor day, so "today" views have data at every size.
+    for index, group_id in enumerate(group_ids):
+        if anchor.weekday() not in _lesson_days(index):
+            schedule_rows.append({
+                "object_type": "group",
+                "object_id": group_id,
+                "group_id": group_id,
+                "teacher_id": group_rows[index]["teacher_id"],
+                "title": group_rows[index]["name"],
+                "date": anchor,
+                "time_from": dt.time(20, 0),
+                "time_to": dt.time(21, 0),
+                "status": "scheduled",
+                "updated_at": anchor_dt,
+            })
+    schedule_ids = {
+        (group_id, day, time_from): schedule_id
+        for schedule_id, group_id, day, time_from in _bulk_insert(
+            db, Schedule, schedule_rows, Schedule.id, Schedule.group_id, Schedule.date, Schedule.time_from
+        )
+    }
+    db.commit()
+
+    # --- memberships and abonements ---------------------------------------------
+    memberships: dict[int, list[int]] = {group_id: [] for group_id in group_ids}
+    for index, user_id in enumerate(student_ids):
+        memberships[group_ids[index % len(group_ids)]].append(user_id)
+        if rng.random() < 0.2:
+            memberships[group_ids[rng.randrange(len(group_ids))]].append(user_id)
+
+    current_from = dt.datetime.combine(anchor - dt.timedelta(days=20), dt.time.min)
+    current_to = dt.datetime.combine(anchor + dt.timedelta(days=40), dt.time.min)
+    past_from = dt.datetime.combine(first_day, dt.time.min)
+    abonement_rows = []
+    for group_id, members in memberships.items():
+        for user_id in dict.fromkeys(members):
+            common = {
+                "user_id": user_id,
+                "group_id": group_id,
+                "abonement_type": "multi",
+                "lessons_total": 8,
+                "price_total_rub": 8 * spec.lesson_price_rub,
+                "price_per_lesson_rub": spec.lesson_price_rub,
+            }
+            abonement_rows.append({
+                **common,
+                "balance_credits": 0,
+                "status": ABONEMENT_STATUS_EXPIRED,
+                "valid_from": past_from,
+                "valid_to": current_from,
+                "created_at": past_from,
+                "updated_at": current_from,
+            })
+            abonement_rows.append({
+                **common,
+                "balance_credits": rng.randint(1, 8),
+                "status": ABONEMENT_STATUS_ACTIVE,
+                "valid_from": current_from,
+                "valid_to": current_to,
+                "created_at": current_from,
+                "updated_at": current_from,
+            })
+    abonement_ids = {
+        (user_id, group_id, status): abonement_id
+        for abonement_id, user_id, group_id, status in _bulk_insert(
+            db, GroupAbonement, abonement_rows,
+            GroupAbonement.id, GroupAbonement.user_id, GroupAbonement.group_id, GroupAbonement.status,
+        )
+    }
+
+    # --- attendance for past lessons ---------------------------------------------
+    attendance_rows = []
+    for (group_id, day, _), schedule_id in schedule_ids.items():
+        if day >= anchor:
+            continue
+        abonement_status = ABONEMENT_STATUS_ACTIVE if day >= current_from.date() else ABONEMENT_STATUS_EXPIRED
+        marked_at = dt.datetime.combine(day, dt.time(22, 0))
+        for user_id in dict.fromkeys(memberships[group_id]):
+            roll = rng.random()
+            status = "present" if roll < 0.8 else "absent" if roll < 0.93 else "sick"
+            attendance_rows.append({
+                "schedule_id": schedule_id,
+                "user_id": user_id,
+                "status": status,
+                "abonement_id": abonement_ids[(user_id, group_id, abonement_status)],
+                "lesson_price_rub": spec.lesson_price_rub if status == "present" else None,
+                "marked_at": marked_at,
+                "created_at": marked_at,
+            })
+    _bulk_insert(db, Attendance, attendance_rows)
+
+    # --- bookings and payments ------------------------------------------------------
+    booking_statuses = [BOOKING_STATUS_CONFIRMED] * 6 + [BOOKING_STATUS_CANCELLED] * 2 + [
+        BOOKING_STATUS_CREATED,
+        BOOKING_STATUS_WAITING_PAYMENT,
+    ]
+    booking_rows = []
+    for index, user_id in enumerate(student_ids):
+        for _ in range(rng.randint(1, 3)):
+            created_at = anchor_dt - dt.timedelta(days=rng.randint(0, spec.days_back), minutes=rng.randint(0, 600))
+            status = rng.choice(booking_statuses)
+            booking_rows.append({
+                "user_id": user_id,
+                "user_telegram_id": STUDENT_TG_BASE + index,
+                "user_name": user_rows[len(staff_specs) + index]["name"],
+                "object_type": "group",
+                "group_id": group_ids[rng.randrange(len(group_ids))],
+                "abonement_type": "multi",
+                "lessons_count": 8,
+                "requested_amount": 8 * spec.lesson_price_rub,
+                "status": status,
+                "reserved_until": created_at + dt.timedelta(days=1) if status == BOOKING_STATUS_WAITING_PAYMENT else None,
+                "created_at": created_at,
+            })
+    _bulk_insert(db, BookingRequest, booking_rows)
+
+    payment_rows = [
+        {
+            "user_id": user_id,
+            "amount": 8 * spec.lesson_price_rub,
+            "status": "confirmed",
+            "payment_type": "abonement",
+            "object_id": abonement_id,
+            "confirmed_by_admin": admin_staff_id,
+            "confirmed_at": anchor_dt,
+            "created_at": anchor_dt,
+        }
+        for (user_id, _, _), abonement_id in abonement_ids.items()
+    ]
+    _bulk_insert(db, PaymentTransaction, payment_rows)
+
+    # --- notifications ------------------------------------------------------------
+    notification_rows = []
+    for user_id in student_ids:
+        for number in range(rng.randint(2, 6)):
+            created_at = anchor_dt - dt.timedelta(days=rng.randint(0, spec.days_back))
+            notification_rows.append({
+                "user_id": user_id,
+                "event_type": rng.choice(["attendance_reminder", "abonement_one_left", "booking_status"]),
+                "title": f"Уведомление {user_id}-{number}",
+                "body": "Синтетическое уведомление",
+                "status": "sent",
+                "created_at": created_at,
+                "processed_at": created_at,
+            })
+    notification_ids = _bulk_insert(db, Notification, notification_rows, Notification.id, Notification.processed_at)
+    delivery_rows = [
+        {
+            "notification_id": notification_id,
+            "channel_type": "telegram",
+            "target_ref": "synthetic",
+            "status": "sent",
+            "attempted_at": processed_at,
+            "delivered_at": processed_at,
+        }
+        for notification_id, processed_at in notification_ids
+    ]
+    _bulk_insert(db, NotificationDelivery, delivery_rows)
+    db.commit()
+
+    summary.counts = {
+        "users": len(user_rows),
+        "staff": len(staff_rows),
+        "directions": len(direction_rows),
+        "groups": len(group_rows),
+        "schedule": len(schedule_rows),
+        "attendance": len(attendance_rows),
+        "abonements": len(abonement_rows),
+        "bookings": len(booking_rows),
+        "payments": len(payment_rows),
+        "notifications": len(notification_rows),
+        "notification_deliveries": len(delivery_rows),
+    }
+    summary.owner_telegram_id = STAFF_TG_BASE
+    summary.owner_user_id = user_ids[STAFF_TG_BASE]
+    summary.teacher_id = teacher_ids[0]
+    summary.direction_id = direction_id_list[0]
+    summary.group_id = group_ids[0]
+    summary.today_schedule_id = min(
+        schedule_id for (group_id, day, _), schedule_id in schedule_ids.items() if group_id == group_ids[0] and day == anchor
+    )
+    summary.student_user_id = student_ids[0]
+    summary.student_telegram_id = STUDENT_TG_BASE
+    summary.seconds = time.perf_counter() - started
+    return summary
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset")
+    parser.add_argument("--database-url", default=None, help="Target database (default: DATABASE_URL)")
+    parser.add_argument("--create-schema", action="store_true", help="Create missing tables from the models")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--anchor-date", default=None, help="ISO date treated as today (default: today)")
+    parser.add_argument("--random-seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from dance_studio.db import Session, engine  # noqa: E402
+    from dance_studio.db.models import Base  # noqa: E402
+
+    if args.create_schema:
+        Base.metadata.create_all(engine)
+    anchor = dt.date.fromisoformat(args.anchor_date) if args.anchor_date else dt.date.today()
+    spec = DatasetSpec(users=args.users, seed=args.random_seed, anchor=anchor)
+
+    db = Session()
+    try:
+        summary = generate_dataset(db, spec)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"✅ Synthetic dataset generated in {summary.seconds:.1f}s (anchor {anchor.isoformat()}, seed {spec.seed})")
+    for name, count in summary.counts.items():
+        print(f"- {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
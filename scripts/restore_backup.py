@@ -1,4 +1,6 @@
 import argparse
+import hashlib
+import json
 import os
 import shutil
 import subprocess
@@ -16,6 +18,7 @@ DEFAULT_MEDIA_TARGET = ROOT / "var" / "media"
 DEFAULT_AGE_KEY_REL = Path("scripts") / "keys" / "backup-prod.agekey"
 DEFAULT_BACKUP_DIR_REL = Path("scripts") / "backup"
 DEFAULT_AGE_BIN_REL = Path("scripts") / "tools" / ("age.exe" if os.name == "nt" else "age")
+MEDIA_ARCHIVE_MANIFEST_NAME = ".backup/manifest.json"
 
 
 def _load_dotenv(dotenv_path: Path) -> None:
@@ -140,6 +143,89 @@ def _safe_extract_zip(zip_path: Path, target_dir: Path) -> None:
         zf.extractall(target_dir)
 
 
+def _read_media_archive_manifest(zip_path: Path) -> dict | None:
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        try:
+            raw = zf.read(MEDIA_ARCHIVE_MANIFEST_NAME)
+        except KeyError:
+            return None
+    payload = json.loads(raw.decode("utf-8"))
+    return payload if isinstance(payload, dict) else None
+
+
+def _safe_target_path(target_dir: Path, relpath: str) -> Path:
+    target_resolved = target_dir.resolve()
+    destination = (target_dir / relpath).resolve()
+    if not str(destination).startswith(str(target_resolved)):
+        raise RuntimeError(f"Unsafe path in media archive: {relpath}")
+    return destination
+
+
+def _restore_media_chain(zip_paths: list[Path], target_dir: Path) -> None:
+    """Rebuild the media tree from a full snapshot followed by its deltas (oldest first)."""
+    manifests = [_read_media_archive_manifest(path) for path in zip_paths]
+    if manifests[-1] is None:
+        if len(zip_paths) > 1:
+            raise RuntimeError(f"Media archive has no backup manifest: {zip_paths[-1].name}")
+        _safe_extract_zip(zip_paths[-1], target_dir)
+        return
+    if manifests[0] is None or manifests[0].get("mode") != "full":
+        raise RuntimeError(f"Media chain must start with a full snapshot: {zip_paths[0].name}")
+
+    sources: dict[str, tuple[Path, str]] = {}
+    for zip_path, manifest in reversed(list(zip(zip_paths, manifests))):
+        if manifest is None:
+            raise RuntimeError(f"Media archive has no backup manifest: {zip_path.name}")
+        files = manifest.get("files") or {}
+        for relpath in manifest.get("included") or []:
+            sha256 = files.get(relpath)
+            if sha256 and sha256 not in sources:
+                sources[sha256] = (zip_path, relpath)
+
+    open_archives: dict[Path, zipfile.ZipFile] = {}
+    try:
+        for relpath, sha256 in (manifests[-1].get("files") or {}).items():
+            source = sources.get(sha256)
+            if source is None:
+                raise RuntimeError(f"Media chain is missing content for {relpath} ({sha256})")
+            zip_path, member = source
+            archive = open_archives.get(zip_path)
+            if archive is None:
+                archive = zipfile.ZipFile(zip_path, "r")
+                open_archives[zip_path] = archive
+            data = archive.read(member)
+            if hashlib.sha256(data).hexdigest() != sha256:
+                raise RuntimeError(f"Checksum mismatch for {relpath} in {zip_path.name}")
+            destination = _safe_target_path(target_dir, relpath)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            destination.write_bytes(data)
+    finally:
+        for archive in open_archives.values():
+            archive.close()
+
+
+def _artifact_timestamp(path: Path) -> str:
+    parts = path.name.split("_")
+    return "_".join(parts[2:4]) if len(parts) >= 4 else path.name
+
+
+def _resolve_media_chain(latest_path: Path, latest_manifest: dict | None) -> list[Path]:
+    if not latest_manifest or latest_manifest.get("mode") != "delta":
+        return [latest_path]
+    base_name = str(latest_manifest.get("base_name") or "")
+    base_path = latest_path.parent / base_name
+    if not base_name or not base_path.exists():
+        raise RuntimeError(f"Full media snapshot {base_name or '?'} for {latest_path.name} not found")
+    lower = _artifact_timestamp(base_path)
+    upper = _artifact_timestamp(latest_path)
+    deltas = sorted(
+        path
+        for path in latest_path.parent.glob(f"media_backup_*_delta{''.join(latest_path.suffixes)}")
+        if path != latest_path and lower < _artifact_timestamp(path) < upper
+    )
+    return [base_path, *deltas, latest_path]
+
+
 def _decrypted_name(encrypted_path: Path, fallback_suffix: str) -> str:
     if encrypted_path.name.endswith(".age"):
         return encrypted_path.name[:-4]
@@ -177,7 +263,12 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--encrypted-media",
-        help="Path to encrypted media archive (.zip.age).",
+        nargs="+",
+        help=(
+            "Path(s) to encrypted media archive(s) (.zip.age). A single delta archive is resolved "
+            "to its full snapshot and intermediate deltas in the same directory; several paths are "
+            "applied as a chain, oldest first."
+        ),
     )
     parser.add_argument(
         "--backup-dir",
@@ -216,10 +307,11 @@ def main() -> int:
         backup_dir,
         ["db_backup_*.dump.age", "*.dump.age"],
     )
-    encrypted_media_path = _resolve_project_path(args.encrypted_media) if args.encrypted_media else _latest_backup_file(
-        backup_dir,
-        ["media_backup_*.zip.age", "*.zip.age"],
-    )
+    encrypted_media_paths = [_resolve_project_path(path) for path in args.encrypted_media or []]
+    if not encrypted_media_paths:
+        latest_media = _latest_backup_file(backup_dir, ["media_backup_*.zip.age", "*.zip.age"])
+        encrypted_media_paths = [latest_media] if latest_media else []
+    encrypted_media_path = encrypted_media_paths[-1] if encrypted_media_paths else None
     key_path = _resolve_project_path(args.age_key)
     media_target = _resolve_project_path(args.media_target)
     database_url = (args.database_url or "").strip()
@@ -243,9 +335,10 @@ def main() -> int:
     if encrypted_db_path and not encrypted_db_path.exists():
         print(f"Encrypted DB dump not found: {encrypted_db_path}", file=sys.stderr)
         return 1
-    if encrypted_media_path and not encrypted_media_path.exists():
-        print(f"Encrypted media archive not found: {encrypted_media_path}", file=sys.stderr)
-        return 1
+    for media_path in encrypted_media_paths:
+        if not media_path.exists():
+            print(f"Encrypted media archive not found: {media_path}", file=sys.stderr)
+            return 1
 
     try:
         age_path = _resolve_age_binary_path(args.age_bin)
@@ -282,9 +375,26 @@ def main() -> int:
             media_target.mkdir(parents=True, exist_ok=True)
             if args.clear_media_target:
                 _clear_directory_contents(media_target)
-            decrypted_media = staging_dir / _decrypted_name(encrypted_media_path, ".zip")
-            _decrypt_age_file(age_path, key_path, encrypted_media_path, decrypted_media)
-            _safe_extract_zip(decrypted_media, media_target)
+            decrypted: dict[Path, Path] = {}
+
+            def _decrypt_media(path: Path) -> Path:
+                if path not in decrypted:
+                    decrypted[path] = staging_dir / _decrypted_name(path, ".zip")
+                    _decrypt_age_file(age_path, key_path, path, decrypted[path])
+                return decrypted[path]
+
+            media_chain = encrypted_media_paths
+            if len(media_chain) == 1:
+                latest_manifest = _read_media_archive_manifest(_decrypt_media(media_chain[0]))
+                media_chain = _resolve_media_chain(media_chain[0], latest_manifest)
+                base_name = (latest_manifest or {}).get("base_name")
+                media_chain = [
+                    path
+                    for path in media_chain
+                    if path in (media_chain[0], media_chain[-1])
+                    or (_read_media_archive_manifest(_decrypt_media(path)) or {}).get("base_name") == base_name
+                ]
+            _restore_media_chain([_decrypt_media(path) for path in media_chain], media_target)
     except Exception as exc:
         print(str(exc), file=sys.stderr)
         return 1
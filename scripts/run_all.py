@@ -1,8 +1,28 @@
+"""
+Combined web + bot service (deploy/systemd/dance-studio.service).
+
+The web app runs under gunicorn in its own process group: several workers, recycled after
+COMBINED_WEB_MAX_REQUESTS requests, so a slow request never holds up the bot's event loop and the
+other way round. This process runs the bot, waits for /health before starting it and supervises
+gunicorn: if either side stops, the other is shut down gracefully and systemd restarts the unit.
+The workers' /metrics cannot see the bot's jobs, mailing queue or backups, so the bot serves its own
+on 127.0.0.1:COMBINED_BOT_METRICS_PORT (BOT_METRICS_PORT wins when set).
+
+COMBINED_WEB_SERVER=werkzeug keeps the old single-process dev server thread (e.g. on Windows).
+"""
+
 import asyncio
-import threading
 import logging
+import os
+import signal
+import subprocess
 import sys
+import threading
+import time
+import urllib.error
+import urllib.request
 from pathlib import Path
+
 from aiogram.exceptions import TelegramNetworkError
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -10,36 +30,101 @@ SRC_PATH = ROOT / "src"
 if str(SRC_PATH) not in sys.path:
     sys.path.insert(0, str(SRC_PATH))
 
-from dance_studio.web.app import app
 from dance_studio.bot.bot import run_bot
 from dance_studio.db import ensure_db_schema, bootstrap_data
-from dance_studio.core.config import BOOTSTRAP_ON_START
+from dance_studio.core.config import (
+    BOOTSTRAP_ON_START,
+    BOT_METRICS_PORT,
+    COMBINED_BOT_METRICS_PORT,
+    COMBINED_WEB_MAX_REQUESTS,
+    COMBINED_WEB_SERVER,
+    COMBINED_WEB_THREADS,
+    COMBINED_WEB_WORKERS,
+)
 
 logging.basicConfig(level=logging.INFO)
 
+WEB_HOST = "127.0.0.1"
+WEB_PORT = 3000
+HEALTH_URL = f"http://{WEB_HOST}:{WEB_PORT}/health"
+HEALTH_WAIT_SECONDS = 30
+WEB_TIMEOUT_SECONDS = 30
+# Stays under the unit's TimeoutStopSec=20 so in-flight requests finish before systemd kills anything.
+WEB_GRACEFUL_TIMEOUT_SECONDS = 15
+
+
+def gunicorn_command() -> list[str]:
+    command = [
+        sys.executable, "-m", "gunicorn", "dance_studio.web.wsgi:app",
+        "--bind", f"{WEB_HOST}:{WEB_PORT}",
+        "--workers", str(COMBINED_WEB_WORKERS),
+        "--threads", str(COMBINED_WEB_THREADS),
+        "--timeout", str(WEB_TIMEOUT_SECONDS),
+        "--graceful-timeout", str(WEB_GRACEFUL_TIMEOUT_SECONDS),
+        "--chdir", str(ROOT),
+    ]
+    if COMBINED_WEB_MAX_REQUESTS:
+        # Jitter keeps the workers from all restarting at the same moment.
+        command += [
+            "--max-requests", str(COMBINED_WEB_MAX_REQUESTS),
+            "--max-requests-jitter", str(max(1, COMBINED_WEB_MAX_REQUESTS // 10)),
+        ]
+    return command
+
+
+def start_web_server() -> subprocess.Popen:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_PATH), env.get("PYTHONPATH")]))
+    # A session of its own: terminal Ctrl+C reaches only this supervisor, which then stops gunicorn in order.
+    return subprocess.Popen(gunicorn_command(), env=env, start_new_session=True)
+
+
+def stop_web_server(process: subprocess.Popen) -> None:
+    if process.poll() is not None:
+        return
+    logging.info("Stopping gunicorn (pid %s)", process.pid)
+    # SIGTERM to the master: workers finish their current requests within --graceful-timeout.
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=WEB_GRACEFUL_TIMEOUT_SECONDS + 3)
+    except subprocess.TimeoutExpired:
+        logging.warning("gunicorn did not stop in time, killing its process group")
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def wait_until_healthy(process: subprocess.Popen, url: str = HEALTH_URL, timeout: float = HEALTH_WAIT_SECONDS) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
 
 def run_flask():
+    from dance_studio.web.app import app
+
     try:
-        app.run(host="127.0.0.1",
-                port=3000,
+        app.run(host=WEB_HOST,
+                port=WEB_PORT,
                 debug=False,
                 use_reloader=False)
 
     except Exception:
         logging.exception("Flask crashed")
 
-    
-async def main():
-    ensure_db_schema()
-    if BOOTSTRAP_ON_START:
-        bootstrap_data()
-
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start() 
 
+async def run_bot_forever(metrics_port: int = BOT_METRICS_PORT):
     while True:
         try:
-            await run_bot()
+            await run_bot(metrics_port=metrics_port)
             break
         except TelegramNetworkError:
             logging.exception("Bot crashed due to Telegram network error, restarting")
@@ -49,5 +134,58 @@ async def main():
             raise
 
 
+async def run_with_gunicorn() -> int:
+    web = start_web_server()
+    try:
+        if not await asyncio.to_thread(wait_until_healthy, web):
+            if web.poll() is not None:
+                logging.error("gunicorn exited during startup with code %s", web.returncode)
+                return 1
+            logging.warning("%s did not answer within %ss, starting the bot anyway", HEALTH_URL, HEALTH_WAIT_SECONDS)
+        else:
+            logging.info("Web is up at %s (%s workers x %s threads)", HEALTH_URL, COMBINED_WEB_WORKERS, COMBINED_WEB_THREADS)
+
+        # Covers startup only: once polling starts, aiogram takes over SIGTERM/SIGINT and run_bot() returns.
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        bot_task = asyncio.create_task(run_bot_forever(BOT_METRICS_PORT or COMBINED_BOT_METRICS_PORT))
+        web_task = asyncio.create_task(asyncio.to_thread(web.wait))
+        stop_task = asyncio.create_task(stop.wait())
+        done, _ = await asyncio.wait({bot_task, web_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+
+        exit_code = 0
+        if web_task in done:
+            logging.error("gunicorn exited with code %s, stopping the bot", web.returncode)
+            exit_code = 1
+        if not bot_task.done():
+            bot_task.cancel()
+        stop_task.cancel()
+        results = await asyncio.gather(bot_task, return_exceptions=True)
+        if isinstance(results[0], Exception):
+            exit_code = 1
+        return exit_code
+    finally:
+        await asyncio.to_thread(stop_web_server, web)
+
+
+async def main():
+    ensure_db_schema()
+    if BOOTSTRAP_ON_START:
+        bootstrap_data()
+
+    if COMBINED_WEB_SERVER == "werkzeug":
+        flask_thread = threading.Thread(target=run_flask, daemon=True)
+        flask_thread.start()
+        await run_bot_forever()
+        return 0
+
+    if COMBINED_WEB_SERVER != "gunicorn":
+        logging.warning("unknown COMBINED_WEB_SERVER=%r, using gunicorn", COMBINED_WEB_SERVER)
+    return await run_with_gunicorn()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(asyncio.run(main()))
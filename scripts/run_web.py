@@ -8,6 +8,7 @@ if str(SRC_PATH) not in sys.path:
 
 from dance_studio.db import ensure_db_schema, bootstrap_data
 from dance_studio.core.config import BOOTSTRAP_ON_START
+from dance_studio.core.invalidation import invalidation_bus
 from dance_studio.web.app import app
 
 
@@ -15,6 +16,7 @@ def main():
     ensure_db_schema()
     if BOOTSTRAP_ON_START:
         bootstrap_data()
+    invalidation_bus.start()
     app.run(host="127.0.0.1", port=3000, debug=False, use_reloader=False)
 
 
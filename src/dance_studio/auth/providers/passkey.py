@@ -78,11 +78,6 @@ def _resolve_rp_id(origin: str | None, rp_id: str | None = None) -> str | None:
     return urlparse(normalized_origin).hostname
 
 
-def _cleanup_expired_challenges(db) -> None:
-    now = utcnow()
-    db.query(PasskeyChallenge).filter(PasskeyChallenge.expires_at < now).delete(synchronize_session=False)
-
-
 def _coerce_mapping(value: Any) -> dict[str, Any] | None:
     if isinstance(value, dict):
         return value
@@ -310,7 +305,6 @@ class PasskeyAuthProvider:
         payload: dict | None = None,
         challenge_value: str | None = None,
     ) -> PasskeyChallenge:
-        _cleanup_expired_challenges(db)
         challenge = PasskeyChallenge(
             challenge=(challenge_value or _b64url_encode(secrets.token_bytes(32))),
             flow_type=flow_type,
@@ -333,7 +327,6 @@ class PasskeyAuthProvider:
         challenge_value: str,
         user_id: int | None = None,
     ) -> PasskeyChallenge | None:
-        _cleanup_expired_challenges(db)
         query = db.query(PasskeyChallenge).filter(
             PasskeyChallenge.flow_type == flow_type,
             PasskeyChallenge.challenge == challenge_value,
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, Callable
+
+from sqlalchemy import delete, select
+
+from dance_studio.auth.services.rate_limit import longest_refill_seconds
+from dance_studio.core.metrics import metrics
+from dance_studio.core.time import utcnow
+from dance_studio.db.models import (
+    AdminFeedEvent,
+    AuthRateLimitBucket,
+    CacheInvalidationEvent,
+    NotificationBatch,
+    PasskeyChallenge,
+    PhoneVerificationCode,
+    SessionRecord,
+    UsedInitData,
+)
+
+logger = logging.getLogger(__name__)
+
+JANITOR_BATCH_SIZE = 1000
+# Per table and run; whatever is left over goes with the next run instead of holding the job.
+JANITOR_MAX_BATCHES = 50
+
+# Listeners poll every few seconds; an hour of history is plenty for one that was briefly stuck.
+INVALIDATION_EVENT_RETENTION = timedelta(hours=1)
+# Dashboards that were offline longer than this reload the full list instead of replaying.
+ADMIN_FEED_RETENTION = timedelta(days=1)
+# Finished notification batches are only polled right after the admin action that queued them.
+NOTIFICATION_BATCH_RETENTION = timedelta(days=30)
+
+JANITOR_DELETED_ROWS = metrics.counter(
+    "auth_janitor_deleted_rows",
+    "Expired auth rows purged by the janitor job.",
+    ("table",),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class TtlTable:
+    name: str
+    key: Any
+    expiry: Any
+    cutoff: Callable[[datetime], Any]
+
+
+def _expired_at(now: datetime) -> datetime:
+    return now
+
+
+def _idle_rate_limit_bucket_cutoff(now: datetime) -> float:
+    # A bucket untouched for the longest refill period is full again, i.e. the same as no bucket.
+    return now.replace(tzinfo=UTC).timestamp() - longest_refill_seconds()
+
+
+def _stale_invalidation_event_cutoff(now: datetime) -> datetime:
+    return now - INVALIDATION_EVENT_RETENTION
+
+
+def _stale_admin_feed_cutoff(now: datetime) -> datetime:
+    return now - ADMIN_FEED_RETENTION
+
+
+def _finished_notification_batch_cutoff(now: datetime) -> datetime:
+    return now - NOTIFICATION_BATCH_RETENTION
+
+
+TTL_TABLES = (
+    TtlTable("sessions", SessionRecord.id, SessionRecord.expires_at, _expired_at),
+    TtlTable("used_init_data", UsedInitData.id, UsedInitData.expires_at, _expired_at),
+    TtlTable("passkey_challenges", PasskeyChallenge.id, PasskeyChallenge.expires_at, _expired_at),
+    TtlTable("phone_verification_codes", PhoneVerificationCode.id, PhoneVerificationCode.expires_at, _expired_at),
+    TtlTable(
+        "auth_rate_limit_buckets",
+        AuthRateLimitBucket.key,
+        AuthRateLimitBucket.refilled_at,
+        _idle_rate_limit_bucket_cutoff,
+    ),
+    TtlTable(
+        "cache_invalidation_events",
+        CacheInvalidationEvent.id,
+        CacheInvalidationEvent.created_at,
+        _stale_invalidation_event_cutoff,
+    ),
+    TtlTable("admin_feed_events", AdminFeedEvent.id, AdminFeedEvent.created_at, _stale_admin_feed_cutoff),
+    # finished_at stays NULL until delivery ends, so queued and running batches are never purged.
+    TtlTable(
+        "notification_batches",
+        NotificationBatch.id,
+        NotificationBatch.finished_at,
+        _finished_notification_batch_cutoff,
+    ),
+)
+
+
+def purge_expired_batch(db, table: TtlTable, *, now: datetime, batch_size: int = JANITOR_BATCH_SIZE) -> int:
+    """DELETE ... WHERE key IN (SELECT key ... WHERE expiry < cutoff LIMIT n); the subquery walks the TTL index."""
+    expired_keys = (
+        select(table.key)
+        .where(table.expiry < table.cutoff(now))
+        .order_by(table.expiry)
+        .limit(batch_size)
+    )
+    result = db.execute(
+        delete(table.key.class_)
+        .where(table.key.in_(expired_keys))
+        .execution_options(synchronize_session=False)
+    )
+    return int(result.rowcount or 0)
+
+
+def purge_expired_auth_rows(
+    session_factory,
+    *,
+    now: datetime | None = None,
+    batch_size: int = JANITOR_BATCH_SIZE,
+    max_batches: int = JANITOR_MAX_BATCHES,
+) -> dict[str, int]:
+    """
+    Purges every TTL table in short transactions of at most `batch_size` rows, so a backlog
+    never holds locks for long. Returns deleted row counts per table.
+    """
+    current_time = now or utcnow()
+    counts: dict[str, int] = {}
+    for table in TTL_TABLES:
+        deleted_total = 0
+        db = session_factory()
+        try:
+            for _ in range(max_batches):
+                deleted = purge_expired_batch(db, table, now=current_time, batch_size=batch_size)
+                db.commit()
+                deleted_total += deleted
+                if deleted < batch_size:
+                    break
+        except Exception:
+            db.rollback()
+            logger.exception("auth janitor failed on %s", table.name)
+        finally:
+            db.close()
+        counts[table.name] = deleted_total
+        if deleted_total:
+            JANITOR_DELETED_ROWS.inc(deleted_total, table=table.name)
+    if any(counts.values()):
+        logger.info("auth janitor purged %s", ", ".join(f"{name}={count}" for name, count in counts.items() if count))
+    return counts
+
+
+__all__ = [
+    "JANITOR_BATCH_SIZE",
+    "TTL_TABLES",
+    "TtlTable",
+    "purge_expired_auth_rows",
+    "purge_expired_batch",
+]
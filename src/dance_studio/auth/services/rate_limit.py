@@ -1,36 +1,177 @@
-﻿from __future__ import annotations
+from __future__ import annotations
 
-from collections import defaultdict, deque
-from datetime import datetime, timedelta
-from dance_studio.core.time import utcnow
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from threading import Lock
+from typing import Callable, Protocol
+
+from sqlalchemy import case, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from dance_studio.core.config import AUTH_RATE_LIMIT_BACKEND
+from dance_studio.db.models import AuthRateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitRule:
+    """Token bucket: up to `capacity` hits at once, refilled evenly over `period_seconds`."""
+
+    capacity: int
+    period_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
 
 
 _LIMITS = {
-    "otp_request": (3, timedelta(minutes=5)),
-    "otp_verify": (6, timedelta(minutes=10)),
-    "vk_login": (20, timedelta(minutes=5)),
-    "telegram_login": (20, timedelta(minutes=5)),
-    "passkey_login": (20, timedelta(minutes=5)),
+    "otp_request": RateLimitRule(3, 5 * 60),
+    "otp_verify": RateLimitRule(6, 10 * 60),
+    "vk_login": RateLimitRule(20, 5 * 60),
+    "telegram_login": RateLimitRule(20, 5 * 60),
+    "passkey_login": RateLimitRule(20, 5 * 60),
 }
-_BUCKETS: dict[str, deque[datetime]] = defaultdict(deque)
-_LOCK = Lock()
 
 
 class RateLimitExceededError(RuntimeError):
     pass
 
 
+class RateLimitBackend(Protocol):
+    def consume(self, key: str, rule: RateLimitRule) -> bool:
+        """Takes one token from the bucket `key`; False when it is empty."""
 
-def hit_rate_limit(action: str, subject: str) -> None:
-    limit, period = _LIMITS[action]
-    now = utcnow()
-    bucket_key = f"{action}:{subject}"
-    with _LOCK:
-        bucket = _BUCKETS[bucket_key]
-        while bucket and now - bucket[0] > period:
-            bucket.popleft()
-        if len(bucket) >= limit:
-            raise RateLimitExceededError(action)
-        bucket.append(now)
 
+class MemoryRateLimitBackend:
+    """
+    Per-process buckets for a single worker or dev server. Buckets are kept in least-recently-used
+    order and dropped once they have refilled completely, since a full bucket is the same as none.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = Lock()
+        # key -> [tokens, refilled_at, full_at]
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def consume(self, key: str, rule: RateLimitRule) -> bool:
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens = float(rule.capacity)
+            else:
+                tokens = min(float(rule.capacity), bucket[0] + (now - bucket[1]) * rule.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            full_at = now + (rule.capacity - tokens) / rule.refill_per_second
+            self._buckets[key] = [tokens, now, full_at]
+            self._evict_full(now)
+            return allowed
+
+    def _evict_full(self, now: float) -> None:
+        # Oldest first; stops at the first bucket still refilling, so each call does O(1) amortized work.
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[2] > now:
+                return
+            del self._buckets[key]
+
+
+class DatabaseRateLimitBackend:
+    """
+    Buckets in `auth_rate_limit_buckets`, shared by every gunicorn worker and the bot.
+
+    A check is one conditional UPDATE that refills and takes a token in a single statement, so
+    concurrent workers cannot both spend the last token; an INSERT creates the bucket on first use.
+    Falls back to per-process limiting while the database is unavailable; idle rows go with the auth janitor.
+    """
+
+    def __init__(self, session_factory=None, clock: Callable[[], float] = time.time) -> None:
+        self._session_factory = session_factory
+        self._clock = clock
+        self._fallback = MemoryRateLimitBackend()
+
+    def _session(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        import dance_studio.db as db_module
+
+        return db_module.get_session()
+
+    def consume(self, key: str, rule: RateLimitRule) -> bool:
+        try:
+            return self._consume(key, rule)
+        except SQLAlchemyError:
+            logger.warning("shared rate limit store unavailable, limiting %s in-process", key, exc_info=True)
+            return self._fallback.consume(key, rule)
+
+    def _consume(self, key: str, rule: RateLimitRule) -> bool:
+        now = self._clock()
+        refilled = AuthRateLimitBucket.tokens + (now - AuthRateLimitBucket.refilled_at) * rule.refill_per_second
+        available = case((refilled > rule.capacity, float(rule.capacity)), else_=refilled)
+        take_token = (
+            update(AuthRateLimitBucket)
+            .where(AuthRateLimitBucket.key == key, available >= 1)
+            .values(tokens=available - 1, refilled_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db = self._session()
+        try:
+            for _ in range(2):
+                if db.execute(take_token).rowcount:
+                    db.commit()
+                    return True
+                if db.get(AuthRateLimitBucket, key) is not None:
+                    db.rollback()
+                    return False
+                db.add(AuthRateLimitBucket(key=key, tokens=float(rule.capacity - 1), refilled_at=now))
+                try:
+                    db.commit()
+                    return True
+                except IntegrityError:
+                    # Another worker created the bucket first; spend from theirs.
+                    db.rollback()
+            return False
+        finally:
+            db.close()
+
+
+def _default_backend() -> RateLimitBackend:
+    if AUTH_RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend()
+    if AUTH_RATE_LIMIT_BACKEND != "database":
+        logger.warning("unknown AUTH_RATE_LIMIT_BACKEND=%r, using database", AUTH_RATE_LIMIT_BACKEND)
+    return DatabaseRateLimitBackend()
+
+
+_backend: RateLimitBackend = _default_backend()
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    return _backend
+
+
+def set_rate_limit_backend(backend: RateLimitBackend) -> RateLimitBackend:
+    """Swaps the process-wide backend and returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+def longest_refill_seconds() -> float:
+    return max(rule.period_seconds for rule in _LIMITS.values())
+
+
+def hit_rate_limit(action: str, subject: str) -> None:
+    rule = _LIMITS[action]
+    if not _backend.consume(f"{action}:{subject}", rule):
+        raise RateLimitExceededError(action)
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+_logger = logging.getLogger(__name__)
+
+BACKUP_STREAM_CHUNK_SIZE = 1024 * 1024
+PRECOMPRESSED_MEDIA_SUFFIXES = frozenset({
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".webp",
+    ".gif",
+    ".heic",
+    ".avif",
+    ".mp4",
+    ".mov",
+    ".webm",
+    ".zip",
+    ".gz",
+})
+MEDIA_MANIFEST_VERSION = 1
+MEDIA_ARCHIVE_MANIFEST_NAME = ".backup/manifest.json"
+MEDIA_BACKUP_MODE_FULL = "full"
+MEDIA_BACKUP_MODE_DELTA = "delta"
+
+
+def read_process_stderr(stderr_file) -> str:
+    stderr_file.seek(0)
+    return stderr_file.read().decode("utf-8", errors="replace").strip()
+
+
+def _safe_unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        return
+    except Exception:
+        _logger.exception("Failed to delete backup file: %s", path)
+
+
+class HashingFileWriter:
+    def __init__(self, path: Path):
+        self._file = path.open("wb")
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._file.write(data)
+        self._digest.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+class BackupArtifactSink:
+    """Writable stream that lands as one (optionally age-encrypted) artifact, hashed on the fly."""
+
+    def __init__(self, output_path: Path, recipients: list[str], *, age_binary: str | None = None):
+        if recipients and not age_binary:
+            raise RuntimeError("age binary is required to encrypt backup artifacts")
+        self.output_path = output_path
+        self.recipients = list(recipients)
+        self.age_binary = age_binary
+        self.sha256: str | None = None
+        self.size = 0
+        self._writer: HashingFileWriter | None = None
+        self._age_process: subprocess.Popen | None = None
+        self._age_stderr = None
+        self._pump: threading.Thread | None = None
+        self._pump_errors: list[Exception] = []
+
+    def __enter__(self):
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = HashingFileWriter(self.output_path)
+        if not self.recipients:
+            return self._writer
+
+        cmd = [self.age_binary, "--encrypt"]
+        for recipient in self.recipients:
+            cmd.extend(["--recipient", recipient])
+        self._age_stderr = tempfile.TemporaryFile()
+        try:
+            self._age_process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=self._age_stderr,
+            )
+        except Exception:
+            self._abort()
+            raise
+        self._pump = threading.Thread(target=self._pump_encrypted_output, daemon=True)
+        self._pump.start()
+        return self._age_process.stdin
+
+    def _pump_encrypted_output(self) -> None:
+        try:
+            shutil.copyfileobj(self._age_process.stdout, self._writer, BACKUP_STREAM_CHUNK_SIZE)
+        except Exception as exc:
+            self._pump_errors.append(exc)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._abort()
+            return
+        try:
+            if self._age_process is not None:
+                self._finish_encryption()
+        except Exception:
+            self._abort()
+            raise
+        self._writer.close()
+        self.sha256 = self._writer.hexdigest()
+        self.size = self._writer.size
+        if self._age_stderr is not None:
+            self._age_stderr.close()
+
+    def _finish_encryption(self) -> None:
+        self._age_process.stdin.close()
+        self._pump.join()
+        returncode = self._age_process.wait()
+        if returncode != 0:
+            stderr = read_process_stderr(self._age_stderr)
+            raise RuntimeError(
+                f"age encryption failed for {self.output_path.name}: {stderr or 'unknown error'}"
+            )
+        if self._pump_errors:
+            raise self._pump_errors[0]
+
+    def _abort(self) -> None:
+        if self._age_process is not None:
+            try:
+                self._age_process.stdin.close()
+            except Exception:
+                pass
+            if self._age_process.poll() is None:
+                self._age_process.kill()
+            self._age_process.wait()
+        if self._pump is not None:
+            self._pump.join()
+        if self._writer is not None:
+            self._writer.close()
+        if self._age_stderr is not None:
+            self._age_stderr.close()
+        _safe_unlink(self.output_path)
+
+
+def media_compress_type(path: Path) -> int:
+    if path.suffix.lower() in PRECOMPRESSED_MEDIA_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _iter_media_files(media_dir: Path, exclude_dir: Path | None = None):
+    if not media_dir.exists():
+        return
+    excluded = str(exclude_dir.resolve()) if exclude_dir is not None else None
+    for root, _, files in os.walk(media_dir):
+        root_path = Path(root)
+        if excluded and str(root_path.resolve()).startswith(excluded):
+            continue
+        for filename in files:
+            file_path = root_path / filename
+            yield file_path, file_path.relative_to(media_dir).as_posix()
+
+
+def write_media_archive(stream, media_dir: Path, *, exclude_dir: Path | None = None) -> None:
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zf:
+        for file_path, arcname in _iter_media_files(media_dir, exclude_dir):
+            zf.write(file_path, arcname, compress_type=media_compress_type(file_path))
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(BACKUP_STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_media_files(
+    media_dir: Path,
+    previous_files: dict[str, dict] | None = None,
+    *,
+    exclude_dir: Path | None = None,
+) -> dict[str, dict]:
+    """Index media by path; files whose size and mtime match the previous index are not re-read."""
+    previous_files = previous_files or {}
+    result: dict[str, dict] = {}
+    for file_path, relpath in _iter_media_files(media_dir, exclude_dir):
+        stat = file_path.stat()
+        previous = previous_files.get(relpath)
+        if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+            sha256 = previous["sha256"]
+        else:
+            sha256 = _file_sha256(file_path)
+        result[relpath] = {"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return result
+
+
+def load_media_manifest(path: Path) -> dict | None:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        _logger.warning("Media backup manifest is unreadable, next backup will be full: %s", path)
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != MEDIA_MANIFEST_VERSION:
+        return None
+    if not isinstance(payload.get("files"), dict):
+        return None
+    return payload
+
+
+@dataclass(slots=True)
+class MediaBackupPlan:
+    mode: str
+    created_at: datetime
+    files: dict[str, dict]
+    included: list[str]
+    deleted: list[str] = field(default_factory=list)
+    base_name: str | None = None
+    base_created_at: str | None = None
+
+    @property
+    def is_full(self) -> bool:
+        return self.mode == MEDIA_BACKUP_MODE_FULL
+
+
+def plan_media_backup(
+    media_dir: Path,
+    manifest: dict | None,
+    *,
+    now: datetime,
+    full_interval: timedelta,
+    base_exists: Callable[[str], bool],
+    exclude_dir: Path | None = None,
+) -> MediaBackupPlan:
+    previous_files = (manifest or {}).get("files") or {}
+    files = scan_media_files(media_dir, previous_files, exclude_dir=exclude_dir)
+
+    base_name = (manifest or {}).get("base_name")
+    base_created_at = (manifest or {}).get("base_created_at")
+    needs_full = not manifest or not base_name or not base_created_at or not base_exists(base_name)
+    if not needs_full:
+        try:
+            needs_full = now - datetime.fromisoformat(base_created_at) >= full_interval
+        except ValueError:
+            needs_full = True
+
+    if needs_full:
+        return MediaBackupPlan(
+            mode=MEDIA_BACKUP_MODE_FULL,
+            created_at=now,
+            files=files,
+            included=sorted(files),
+        )
+
+    # Content already present in the chain is referenced by hash instead of re-uploaded,
+    # so renames and copies cost nothing.
+    known_hashes = {item["sha256"] for item in previous_files.values()}
+    included: list[str] = []
+    for relpath in sorted(files):
+        sha256 = files[relpath]["sha256"]
+        if sha256 in known_hashes:
+            continue
+        known_hashes.add(sha256)
+        included.append(relpath)
+    return MediaBackupPlan(
+        mode=MEDIA_BACKUP_MODE_DELTA,
+        created_at=now,
+        files=files,
+        included=included,
+        deleted=sorted(set(previous_files) - set(files)),
+        base_name=base_name,
+        base_created_at=base_created_at,
+    )
+
+
+def _archive_manifest_payload(plan: MediaBackupPlan) -> dict:
+    return {
+        "version": MEDIA_MANIFEST_VERSION,
+        "mode": plan.mode,
+        "created_at": plan.created_at.isoformat(),
+        "base_name": plan.base_name,
+        "included": plan.included,
+        "deleted": plan.deleted,
+        "files": {relpath: item["sha256"] for relpath, item in plan.files.items()},
+    }
+
+
+def write_incremental_media_archive(stream, media_dir: Path, plan: MediaBackupPlan) -> None:
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zf:
+        for relpath in plan.included:
+            file_path = media_dir / relpath
+            zf.write(file_path, relpath, compress_type=media_compress_type(file_path))
+        zf.writestr(
+            MEDIA_ARCHIVE_MANIFEST_NAME,
+            json.dumps(_archive_manifest_payload(plan), ensure_ascii=False),
+        )
+
+
+def save_media_manifest(path: Path, plan: MediaBackupPlan, artifact_name: str) -> None:
+    base_name = artifact_name if plan.is_full else plan.base_name
+    base_created_at = plan.created_at.isoformat() if plan.is_full else plan.base_created_at
+    payload = {
+        "version": MEDIA_MANIFEST_VERSION,
+        "base_name": base_name,
+        "base_created_at": base_created_at,
+        "last_artifact": artifact_name,
+        "updated_at": plan.created_at.isoformat(),
+        "files": plan.files,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
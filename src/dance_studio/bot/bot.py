@@ -9,6 +9,7 @@ import subprocess
 import shutil
 import hashlib
 from contextlib import asynccontextmanager
+from aiohttp import web as aiohttp_web
 from aiogram import Bot, Dispatcher, F
 from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.types import MenuButtonWebApp, WebAppInfo, FSInputFile, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, InputMediaDocument
@@ -23,6 +24,8 @@ from dance_studio.core.config import (
     BACKUP_AGE_BINARY,
     BACKUP_AGE_RECIPIENTS,
     BACKUP_ENCRYPTION_REQUIRED,
+    BACKUP_MEDIA_FULL_INTERVAL_DAYS,
+    BACKUP_MEDIA_INCREMENTAL,
     BACKUP_TELEGRAM_PROXY,
     BOT_TOKEN,
     TELEGRAM_PROXY,
@@ -39,6 +42,8 @@ from dance_studio.core.config import (
     OWNER_IDS,
     TECH_ADMIN_ID,
     BOOKINGS_ADMIN_CHAT_ID,
+    SLOW_JOB_LOG_MS,
+    BOT_METRICS_PORT,
 )
 from dance_studio.db.session import get_session
 from dance_studio.core.permissions import has_permission
@@ -64,7 +69,13 @@ from dance_studio.db.models import (
     PaymentTransaction,
 )
 from dance_studio.core.booking_utils import format_booking_message, build_booking_keyboard_data
-from dance_studio.core.tg_replay import cleanup_expired_init_data
+from dance_studio.auth.services.janitor import purge_expired_auth_rows
+from dance_studio.core.group_slot_summaries import refresh_stale_group_slot_summaries
+from dance_studio.core.notification_batches import deliver_pending_notification_batches
+# Registers the admin feed listeners: bookings and payments confirmed from the bot reach the admin stream too.
+import dance_studio.core.admin_feed  # noqa: F401
+from dance_studio.core.invalidation import SETTINGS_CHANGED, invalidation_bus
+from dance_studio.core.metrics import TEXT_CONTENT_TYPE, MetricFamily, metrics
 from dance_studio.core.abonement_pricing import (
     is_free_trial_booking,
 )
@@ -104,6 +115,18 @@ from dance_studio.core.statuses import (
 )
 from dance_studio.bot.upload_sessions import direction_upload_session_validation_error
 from dance_studio.bot.startup_status import build_startup_status_text, describe_userbot_runtime_status
+from dance_studio.bot.scheduler import JobScheduler, build_job_metrics_text
+from dance_studio.bot.backup_artifacts import (
+    BACKUP_STREAM_CHUNK_SIZE,
+    BackupArtifactSink,
+    MediaBackupPlan,
+    load_media_manifest,
+    plan_media_backup,
+    read_process_stderr,
+    save_media_manifest,
+    write_incremental_media_archive,
+    write_media_archive,
+)
 from dance_studio.bot.telegram_userbot import (
     UserbotPasswordInvalidError,
     UserbotPasswordRequiredError,
@@ -150,10 +173,19 @@ PROJECT_ROOT = Path(__file__).resolve().parents[3]
 VAR_ROOT = PROJECT_ROOT / "var"
 MEDIA_SOURCE_DIR = VAR_ROOT / "media"
 BACKUP_DIR = VAR_ROOT / "backups"
+MEDIA_BACKUP_MANIFEST_PATH = BACKUP_DIR / "media_manifest.json"
 
 _logger = logging.getLogger(__name__)
 ATTENDANCE_REMINDER_WINDOW_HOURS = 24
 ATTENDANCE_REMINDER_POLL_SECONDS = 60
+MAILING_QUEUE_POLL_SECONDS = 5
+BACKGROUND_JOB_JITTER_SECONDS = 5
+BACKGROUND_JOB_TIMEOUT_SECONDS = 10 * 60
+BACKUP_JOB_TIMEOUT_SECONDS = 60 * 60
+BOT_STATUS_REFRESH_SECONDS = 15 * 60
+GROUP_SLOT_SUMMARY_REFRESH_SECONDS = 60 * 60
+AUTH_JANITOR_INTERVAL_SECONDS = 15 * 60
+NOTIFICATION_BATCH_SWEEP_SECONDS = 60
 PAYMENT_DEADLINE_ALERT_WINDOW_HOURS = 12
 PAYMENT_DEADLINE_ALERT_BATCH_SIZE = 100
 BOOKING_RESERVE_MINUTES = 48 * 60
@@ -169,6 +201,16 @@ ABONEMENT_ONE_LEFT_NOTIFICATION_KEY = "abonement_one_left"
 ABONEMENT_BUNDLE_EXPIRY_NOTIFICATION_KEY = "abonement_bundle_expiring_7d"
 TEACHER_ATTENDANCE_SUMMARY_NOTIFICATION_KEY = "teacher_attendance_summary_2h"
 BOT_USERNAME_GLOBAL: str | None = None
+BOT_STATUS_BASE_TEXT: str | None = None
+BACKGROUND_JOBS = JobScheduler(slow_job_ms=SLOW_JOB_LOG_MS)
+MAILING_MESSAGES = metrics.counter("mailing_messages", "Mailing messages by outcome.", ("result",))
+BACKUP_SECONDS = metrics.histogram(
+    "backup_duration_seconds",
+    "Backup build and delivery time.",
+    ("reason", "result"),
+    buckets=(5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+metrics.register_collector("background_jobs", BACKGROUND_JOBS.metric_families)
 BOT_PROXY_ENABLED = False
 
 
@@ -315,6 +357,14 @@ def _load_runtime_chat_targets() -> None:
         db.close()
 
 
+def _reload_runtime_chat_targets(topic: str) -> None:
+    _load_runtime_chat_targets()
+
+
+# Chats/topics changed from the web admin reach the running bot without a restart.
+invalidation_bus.subscribe(SETTINGS_CHANGED, _reload_runtime_chat_targets)
+
+
 def _sync_bot_username_setting(bot_username: str) -> None:
     normalized = (bot_username or "").strip().lstrip("@")
     if not normalized:
@@ -626,7 +676,7 @@ def _backup_timestamp() -> str:
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
 
-def _create_db_backup_dump() -> Path:
+def _build_pg_dump_command() -> tuple[list[str], dict[str, str]]:
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL is empty")
 
@@ -640,16 +690,11 @@ def _create_db_backup_dump() -> Path:
     if not url.database:
         raise RuntimeError("DATABASE_URL has no database name")
 
-    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
-    dump_path = BACKUP_DIR / f"db_backup_{_backup_timestamp()}.dump"
-
     cmd = [
         pg_dump_path,
         "--format=custom",
         "--no-owner",
         "--no-privileges",
-        "--file",
-        str(dump_path),
         "--dbname",
         str(url.database),
     ]
@@ -666,36 +711,7 @@ def _create_db_backup_dump() -> Path:
     env = os.environ.copy()
     if url.password:
         env["PGPASSWORD"] = str(url.password)
-
-    result = subprocess.run(
-        cmd,
-        env=env,
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if result.returncode != 0:
-        stderr = (result.stderr or "").strip()
-        raise RuntimeError(f"pg_dump failed: {stderr or 'unknown error'}")
-    return dump_path
-
-
-def _create_media_backup_archive() -> Path:
-    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
-    archive_path = BACKUP_DIR / f"media_backup_{_backup_timestamp()}.zip"
-
-    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        if not MEDIA_SOURCE_DIR.exists():
-            return archive_path
-        for root, _, files in os.walk(MEDIA_SOURCE_DIR):
-            root_path = Path(root)
-            if str(root_path.resolve()).startswith(str(BACKUP_DIR.resolve())):
-                continue
-            for filename in files:
-                file_path = root_path / filename
-                arcname = file_path.relative_to(MEDIA_SOURCE_DIR)
-                zf.write(file_path, arcname.as_posix())
-    return archive_path
+    return cmd, env
 
 
 def _safe_unlink(path: Path) -> None:
@@ -716,6 +732,18 @@ def _normalized_backup_recipients() -> list[str]:
     return recipients
 
 
+def _resolve_backup_recipients() -> list[str]:
+    if not BACKUP_ENCRYPTION_REQUIRED:
+        return []
+
+    recipients = _normalized_backup_recipients()
+    if not recipients:
+        raise RuntimeError(
+            "BACKUP_ENCRYPTION_REQUIRED=1 but BACKUP_AGE_RECIPIENT(S) is not configured"
+        )
+    return recipients
+
+
 def _resolve_age_binary_path() -> str:
     configured = str(BACKUP_AGE_BINARY or "").strip()
     if configured:
@@ -744,57 +772,94 @@ def _resolve_age_binary_path() -> str:
     )
 
 
-def _encrypt_backup_file_with_age(source_path: Path, recipients: list[str]) -> Path:
-    age_path = _resolve_age_binary_path()
-    if not recipients:
-        raise RuntimeError("No public backup recipients configured (.env: BACKUP_AGE_RECIPIENTS / BACKUP_AGE_RECIPIENT)")
-
-    encrypted_path = source_path.with_name(f"{source_path.name}.age")
-    cmd = [age_path, "--encrypt", "--output", str(encrypted_path)]
-    for recipient in recipients:
-        cmd.extend(["--recipient", recipient])
-    cmd.append(str(source_path))
-
-    result = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
-        check=False,
+def _artifact_path(prefix: str, suffix: str, recipients: list[str]) -> Path:
+    encrypted_suffix = ".age" if recipients else ""
+    return BACKUP_DIR / f"{prefix}_{_backup_timestamp()}{suffix}{encrypted_suffix}"
+
+
+def _stream_db_backup(recipients: list[str]) -> tuple[Path, str, int]:
+    cmd, env = _build_pg_dump_command()
+    age_binary = _resolve_age_binary_path() if recipients else None
+    sink = BackupArtifactSink(_artifact_path("db_backup", ".dump", recipients), recipients, age_binary=age_binary)
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=stderr_file)
+        try:
+            with sink as stream:
+                shutil.copyfileobj(process.stdout, stream, BACKUP_STREAM_CHUNK_SIZE)
+                if process.wait() != 0:
+                    stderr = read_process_stderr(stderr_file)
+                    raise RuntimeError(f"pg_dump failed: {stderr or 'unknown error'}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+    return sink.output_path, sink.sha256, sink.size
+
+
+def _media_backup_base_exists(artifact_name: str) -> bool:
+    return (BACKUP_DIR / artifact_name).exists()
+
+
+def _stream_media_backup(recipients: list[str]) -> tuple[Path, str, int, MediaBackupPlan | None]:
+    age_binary = _resolve_age_binary_path() if recipients else None
+    if not BACKUP_MEDIA_INCREMENTAL:
+        sink = BackupArtifactSink(_artifact_path("media_backup", ".zip", recipients), recipients, age_binary=age_binary)
+        with sink as stream:
+            write_media_archive(stream, MEDIA_SOURCE_DIR, exclude_dir=BACKUP_DIR)
+        return sink.output_path, sink.sha256, sink.size, None
+
+    plan = plan_media_backup(
+        MEDIA_SOURCE_DIR,
+        load_media_manifest(MEDIA_BACKUP_MANIFEST_PATH),
+        now=datetime.now(),
+        full_interval=timedelta(days=BACKUP_MEDIA_FULL_INTERVAL_DAYS),
+        base_exists=_media_backup_base_exists,
+        exclude_dir=BACKUP_DIR,
     )
-    if result.returncode != 0:
-        stderr = (result.stderr or "").strip()
-        raise RuntimeError(
-            f"age encryption failed for {source_path.name}: {stderr or 'unknown error'}"
-        )
-    if not encrypted_path.exists():
-        raise RuntimeError(f"Encrypted file is missing: {encrypted_path.name}")
-    return encrypted_path
+    sink = BackupArtifactSink(
+        _artifact_path("media_backup", f"_{plan.mode}.zip", recipients),
+        recipients,
+        age_binary=age_binary,
+    )
+    with sink as stream:
+        write_incremental_media_archive(stream, MEDIA_SOURCE_DIR, plan)
+    return sink.output_path, sink.sha256, sink.size, plan
 
 
-def _prepare_backup_artifacts_for_send(db_dump_path: Path, media_archive_path: Path) -> tuple[Path, Path]:
-    if not BACKUP_ENCRYPTION_REQUIRED:
-        return db_dump_path, media_archive_path
+def _commit_media_backup_manifest(artifact_path: Path, plan: MediaBackupPlan | None) -> None:
+    if plan is None:
+        return
+    save_media_manifest(MEDIA_BACKUP_MANIFEST_PATH, plan, artifact_path.name)
 
-    recipients = _normalized_backup_recipients()
-    if not recipients:
-        raise RuntimeError(
-            "BACKUP_ENCRYPTION_REQUIRED=1 but BACKUP_AGE_RECIPIENT(S) is not configured"
-        )
 
-    encrypted_paths: list[Path] = []
-    try:
-        encrypted_db = _encrypt_backup_file_with_age(db_dump_path, recipients)
-        encrypted_paths.append(encrypted_db)
-        encrypted_media = _encrypt_backup_file_with_age(media_archive_path, recipients)
-        encrypted_paths.append(encrypted_media)
-    except Exception:
-        for encrypted_path in encrypted_paths:
-            _safe_unlink(encrypted_path)
-        raise
+def _describe_media_backup(plan: MediaBackupPlan | None) -> str:
+    if plan is None:
+        return "full"
+    if plan.is_full:
+        return f"full, {len(plan.files)} files"
+    return f"delta, +{len(plan.included)}/-{len(plan.deleted)} files, base {plan.base_name}"
+
 
-    _safe_unlink(db_dump_path)
-    _safe_unlink(media_archive_path)
-    return encrypted_db, encrypted_media
+async def _prepare_backup_artifacts_for_send() -> tuple[tuple[Path, str, int], tuple[Path, str, int, MediaBackupPlan | None]]:
+    recipients = _resolve_backup_recipients()
+    results = await asyncio.gather(
+        asyncio.to_thread(_stream_db_backup, recipients),
+        asyncio.to_thread(_stream_media_backup, recipients),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        for result in results:
+            if not isinstance(result, BaseException):
+                _safe_unlink(result[0])
+        raise errors[0]
+    db_artifact, media_artifact = results
+    return db_artifact, media_artifact
+
+
+def _is_media_delta_artifact(path: Path) -> bool:
+    return "_delta.zip" in path.name
 
 
 def _cleanup_old_backups() -> None:
@@ -802,9 +867,7 @@ def _cleanup_old_backups() -> None:
         return
     patterns = [
         "db_backup_*.dump",
-        "media_backup_*.zip",
         "db_backup_*.dump.age",
-        "media_backup_*.zip.age",
     ]
     for pattern in patterns:
         backups = sorted(
@@ -818,16 +881,24 @@ def _cleanup_old_backups() -> None:
             except Exception:
                 pass
 
-
-def _file_sha256(path: Path) -> str:
-    digest = hashlib.sha256()
-    with path.open("rb") as f:
-        while True:
-            chunk = f.read(1024 * 1024)
-            if not chunk:
-                break
-            digest.update(chunk)
-    return digest.hexdigest()
+    # Media deltas are only restorable together with their full snapshot, so retention
+    # counts full snapshots and drops whole chains older than the last BACKUP_KEEP_COUNT.
+    for pattern in ("media_backup_*.zip", "media_backup_*.zip.age"):
+        backups = sorted(
+            BACKUP_DIR.glob(pattern),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+        full_snapshots_seen = 0
+        for backup in backups:
+            if full_snapshots_seen >= BACKUP_KEEP_COUNT:
+                try:
+                    backup.unlink()
+                except Exception:
+                    pass
+                continue
+            if not _is_media_delta_artifact(backup):
+                full_snapshots_seen += 1
 
 
 def _format_size(size_bytes: int) -> str:
@@ -875,30 +946,27 @@ async def _backup_delivery_bot():
 
 async def create_and_send_backup(reason: str, notify_user_id: int | None = None) -> None:
     async with BACKUP_LOCK:
+        started = time.perf_counter()
+        backup_result = "ok"
         try:
-            db_dump_path = await asyncio.to_thread(_create_db_backup_dump)
-            media_archive_path = await asyncio.to_thread(_create_media_backup_archive)
-            db_artifact_path, media_artifact_path = await asyncio.to_thread(
-                _prepare_backup_artifacts_for_send,
-                db_dump_path,
-                media_archive_path,
-            )
+            db_artifact, media_artifact = await _prepare_backup_artifacts_for_send()
+            db_artifact_path, db_sha, db_size_bytes = db_artifact
+            media_artifact_path, media_sha, media_size_bytes, media_plan = media_artifact
             _cleanup_old_backups()
             backup_sent = False
+            topic_id = None
             async with _backup_delivery_bot() as backup_bot:
                 topic_id = await _ensure_backup_topic_with_bot(backup_bot)
                 if topic_id:
                     now_human = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-                    db_sha = await asyncio.to_thread(_file_sha256, db_artifact_path)
-                    media_sha = await asyncio.to_thread(_file_sha256, media_artifact_path)
-                    db_size = _format_size(db_artifact_path.stat().st_size)
-                    media_size = _format_size(media_artifact_path.stat().st_size)
+                    db_size = _format_size(db_size_bytes)
+                    media_size = _format_size(media_size_bytes)
                     caption = (
                         f"📦 Backup ({reason})\n"
                         f"🗓 Date/time: {now_human}\n"
                         f"🗄 DB: {db_artifact_path.name} ({db_size})\n"
                         f"🔐 DB SHA256: {db_sha}\n"
-                        f"🖼 Media: {media_artifact_path.name} ({media_size})\n"
+                        f"🖼 Media: {media_artifact_path.name} ({media_size}; {_describe_media_backup(media_plan)})\n"
                         f"🔐 Media SHA256: {media_sha}"
                     )
                     try:
@@ -954,26 +1022,9 @@ async def create_and_send_backup(reason: str, notify_user_id: int | None = None)
                             except Exception:
                                 raise
 
-            if backup_sent and reason == "scheduled" and datetime.now().hour == 12:
-                def _run_cleanup_sync() -> None:
-                    db = get_session()
-                    try:
-                        deleted = cleanup_expired_init_data(db)
-                        db.commit()
-                        _logger.info("used_init_data cleanup completed, deleted=%d", deleted)
-                    except Exception:
-                        try:
-                            db.rollback()
-                        except Exception:
-                            _logger.exception("used_init_data cleanup rollback failed")
-                        _logger.exception("used_init_data cleanup failed")
-                    finally:
-                        db.close()
-
-                try:
-                    await asyncio.to_thread(_run_cleanup_sync)
-                except Exception:
-                    _logger.exception("Cleanup after backup encountered an error")
+            # A delta that never reached the tech chat must not become the next base.
+            if backup_sent or not topic_id:
+                _commit_media_backup_manifest(media_artifact_path, media_plan)
 
             if notify_user_id:
                 await bot.send_message(
@@ -981,6 +1032,7 @@ async def create_and_send_backup(reason: str, notify_user_id: int | None = None)
                     text="Backup (DB + media) created and sent."
                 )
         except Exception as e:
+            backup_result = "failed"
             try:
                 await send_tech_critical(f"Backup failed: {type(e).__name__}: {e}")
             except Exception:
@@ -990,22 +1042,21 @@ async def create_and_send_backup(reason: str, notify_user_id: int | None = None)
                     chat_id=notify_user_id,
                     text="Backup failed."
                 )
+        finally:
+            BACKUP_SECONDS.observe(time.perf_counter() - started, reason=reason, result=backup_result)
 
 
-async def _backup_scheduler() -> None:
-    while True:
-        now = datetime.now()
-        today = now.date()
-        candidate_midnight = datetime.combine(today, dt_time(0, 0))
-        candidate_noon = datetime.combine(today, dt_time(12, 0))
-        if now < candidate_noon:
-            next_run = candidate_midnight if now < candidate_midnight else candidate_noon
-        else:
-            next_run = datetime.combine(today + timedelta(days=1), dt_time(0, 0))
+def _next_backup_run(now: datetime) -> datetime:
+    today = now.date()
+    candidate_midnight = datetime.combine(today, dt_time(0, 0))
+    candidate_noon = datetime.combine(today, dt_time(12, 0))
+    if now < candidate_noon:
+        return candidate_midnight if now < candidate_midnight else candidate_noon
+    return datetime.combine(today + timedelta(days=1), dt_time(0, 0))
+
 
-        sleep_seconds = max((next_run - now).total_seconds(), 1)
-        await asyncio.sleep(sleep_seconds)
-        await create_and_send_backup("scheduled")
+async def _run_scheduled_backup() -> None:
+    await create_and_send_backup("scheduled")
 
 
 async def _can_run_backup(user_id: int) -> bool:
@@ -1671,6 +1722,8 @@ async def handle_news_confirmation(message, state: FSMContext):
                     file_path = os.path.join(news_dir, "photo.jpg")
                     with open(file_path, 'wb') as f:
                         f.write(photo_bytes)
+                    from dance_studio.core.image_variants import schedule_image_variants
+                    schedule_image_variants(file_path)
                     
                     # Сохраняем путь в БД
                     photo_path = f"var/media/news/{news.id}/photo.jpg"
@@ -1732,16 +1785,19 @@ async def check_scheduled_mailings():
     finally:
         db.close()
 
+def _mailing_queue_metrics():
+    return [MetricFamily("mailing_queue_depth", "gauge", "Mailings waiting to be sent.").add(len(mailing_queue))]
+
+
+metrics.register_collector("mailing_queue", _mailing_queue_metrics)
+
+
 async def process_mailing_queue():
-    """Обрабатывает очередь рассылок"""
-    while True:
-        # Проверяем запланированные рассылки каждую итерацию
-        await check_scheduled_mailings()
-        
-        if mailing_queue:
-            mailing_id = mailing_queue.pop(0)
-            await send_mailing_async(mailing_id)
-        await asyncio.sleep(1)  # Проверяем очередь каждую секунду
+    """Обрабатывает очередь рассылок до опустошения"""
+    await check_scheduled_mailings()
+    while mailing_queue:
+        mailing_id = mailing_queue.pop(0)
+        await send_mailing_async(mailing_id)
 
 async def send_mailing_async(mailing_id):
     """
@@ -1796,12 +1852,14 @@ async def send_mailing_async(mailing_id):
                     text=f"<b>{mailing.name}</b>\n\n{mailing.description or mailing.purpose}",
                     parse_mode=ParseMode.HTML
                 )
+                MAILING_MESSAGES.inc(result="sent")
                 #print(f"✅ Сообщение отправлено в чат {chat_id}")
                 mailing.status = "sent"
                 mailing.sent_at = datetime.now()
                 db.commit()
                 return True
             except Exception as e:
+                MAILING_MESSAGES.inc(result="failed")
                 #print(f"❌ Ошибка при отправке в чат {chat_id}: {e}")
                 mailing.status = "failed"
                 db.commit()
@@ -1818,6 +1876,7 @@ async def send_mailing_async(mailing_id):
         for user in target_users:
             if not user.telegram_id:
                 #print(f"⚠️ У пользователя {user.name} нет telegram_id")
+                MAILING_MESSAGES.inc(result="no_telegram")
                 failed_count += 1
                 continue
             
@@ -1833,10 +1892,12 @@ async def send_mailing_async(mailing_id):
                     parse_mode=ParseMode.HTML
                 )
                 success_count += 1
+                MAILING_MESSAGES.inc(result="sent")
                 #print(f"✅ Отправлено пользователю {user.name} (@{user.username})")
                 
             except Exception as e:
                 #print(f"❌ Ошибка при отправке пользователю {user.name}: {e}")
+                MAILING_MESSAGES.inc(result="failed")
                 failed_count += 1
                 await asyncio.sleep(0.1)  # Маленькая задержка между попытками
         
@@ -2796,20 +2857,125 @@ async def send_due_booking_payment_deadline_alerts() -> None:
         db.close()
 
 
-async def process_attendance_reminders() -> None:
-    while True:
-        await close_locked_attendance_reminders()
-        await finalize_closed_attendance_windows()
-        await send_due_attendance_reminders()
-        await send_due_teacher_attendance_summaries()
-        await send_due_abonement_notifications()
-        await send_due_booking_payment_deadline_alerts()
-        await asyncio.sleep(ATTENDANCE_REMINDER_POLL_SECONDS)
+async def refresh_bot_status_with_job_metrics() -> None:
+    if not BOT_STATUS_BASE_TEXT:
+        return
+    await update_bot_status(
+        f"{BOT_STATUS_BASE_TEXT}\n\n{build_job_metrics_text(BACKGROUND_JOBS.snapshot())}"
+    )
+
+
+def _refresh_group_slot_summaries_sync() -> int:
+    db = get_session()
+    try:
+        refreshed = refresh_stale_group_slot_summaries(db)
+        db.commit()
+        return refreshed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
 
-async def run_bot():
-    global BOT_USERNAME_GLOBAL
+async def purge_expired_auth_rows_job() -> None:
+    await asyncio.to_thread(purge_expired_auth_rows, get_session)
+
+
+async def deliver_pending_notification_batches_job() -> None:
+    resumed = await asyncio.to_thread(deliver_pending_notification_batches, get_session)
+    if resumed:
+        _logger.info("notification batches picked up by the sweep: %d", resumed)
+
+
+async def refresh_group_slot_summaries() -> None:
+    refreshed = await asyncio.to_thread(_refresh_group_slot_summaries_sync)
+    if refreshed:
+        _logger.info("group slot summaries refreshed: %d", refreshed)
+
+
+def _register_background_jobs(scheduler: JobScheduler) -> None:
+    reminder_jobs = (
+        ("attendance_close_locked", close_locked_attendance_reminders),
+        ("attendance_finalize", finalize_closed_attendance_windows),
+        ("attendance_reminders", send_due_attendance_reminders),
+        ("teacher_attendance_summaries", send_due_teacher_attendance_summaries),
+        ("abonement_notifications", send_due_abonement_notifications),
+        ("payment_deadline_alerts", send_due_booking_payment_deadline_alerts),
+    )
+    for name, func in reminder_jobs:
+        scheduler.add_job(
+            name,
+            func,
+            interval_seconds=ATTENDANCE_REMINDER_POLL_SECONDS,
+            jitter_seconds=BACKGROUND_JOB_JITTER_SECONDS,
+            timeout_seconds=BACKGROUND_JOB_TIMEOUT_SECONDS,
+        )
+    scheduler.add_job(
+        "mailings",
+        process_mailing_queue,
+        interval_seconds=MAILING_QUEUE_POLL_SECONDS,
+    )
+    scheduler.add_job(
+        "backup",
+        _run_scheduled_backup,
+        interval_seconds=0,
+        next_run=_next_backup_run,
+        timeout_seconds=BACKUP_JOB_TIMEOUT_SECONDS,
+    )
+    scheduler.add_job(
+        "group_slot_summaries",
+        refresh_group_slot_summaries,
+        interval_seconds=GROUP_SLOT_SUMMARY_REFRESH_SECONDS,
+        jitter_seconds=BACKGROUND_JOB_JITTER_SECONDS,
+        timeout_seconds=BACKGROUND_JOB_TIMEOUT_SECONDS,
+    )
+    scheduler.add_job(
+        "notification_batches",
+        deliver_pending_notification_batches_job,
+        interval_seconds=NOTIFICATION_BATCH_SWEEP_SECONDS,
+        jitter_seconds=BACKGROUND_JOB_JITTER_SECONDS,
+    )
+    scheduler.add_job(
+        "auth_janitor",
+        purge_expired_auth_rows_job,
+        interval_seconds=AUTH_JANITOR_INTERVAL_SECONDS,
+        jitter_seconds=BACKGROUND_JOB_JITTER_SECONDS,
+        timeout_seconds=BACKGROUND_JOB_TIMEOUT_SECONDS,
+    )
+    scheduler.add_job(
+        "bot_status",
+        refresh_bot_status_with_job_metrics,
+        interval_seconds=BOT_STATUS_REFRESH_SECONDS,
+        run_immediately=False,
+        timeout_seconds=60,
+    )
+
+
+async def _serve_metrics(request):
+    return aiohttp_web.Response(body=metrics.render().encode("utf-8"), headers={"Content-Type": TEXT_CONTENT_TYPE})
+
+
+async def _start_metrics_server(port: int) -> aiohttp_web.AppRunner | None:
+    """
+    Loopback-only /metrics for the bot process: the standalone bot service (BOT_METRICS_PORT) and
+    run_all.py, whose gunicorn workers are separate processes (COMBINED_BOT_METRICS_PORT).
+    """
+    if not port:
+        return None
+    app = aiohttp_web.Application()
+    app.router.add_get("/metrics", _serve_metrics)
+    runner = aiohttp_web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await aiohttp_web.TCPSite(runner, "127.0.0.1", port).start()
+    _logger.info("bot metrics listening on 127.0.0.1:%s", port)
+    return runner
+
+
+async def run_bot(*, metrics_port: int = BOT_METRICS_PORT):
+    global BOT_USERNAME_GLOBAL, BOT_STATUS_BASE_TEXT
     _load_runtime_chat_targets()
+    invalidation_bus.start()
 
     # Получаем информацию о боте при старте
     try:
@@ -2836,26 +3002,27 @@ async def run_bot():
     except Exception as e:
         print(f"[bot] failed to get bot info: {e}")
     
-    # Запускаем обработку очереди рассылок в фоне
-    backup_task = None
-    queue_task = None
-    reminder_task = None
+    # Фоновые задачи (напоминания, рассылки, бэкапы) запускает планировщик
     await ensure_tech_topics()
     await update_bot_status(f"✅ Бот запущен {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
-    await update_bot_status(
-        build_startup_status_text(
-            started_at=datetime.now(),
-            bot_username=BOT_USERNAME_GLOBAL,
-            tech_chat_id=TECH_LOGS_CHAT_ID_RUNTIME,
-            tech_status_topic_id=TECH_STATUS_TOPIC_ID_RUNTIME,
-            userbot_status_line=await describe_userbot_runtime_status(),
-        )
+    BOT_STATUS_BASE_TEXT = build_startup_status_text(
+        started_at=datetime.now(),
+        bot_username=BOT_USERNAME_GLOBAL,
+        tech_chat_id=TECH_LOGS_CHAT_ID_RUNTIME,
+        tech_status_topic_id=TECH_STATUS_TOPIC_ID_RUNTIME,
+        userbot_status_line=await describe_userbot_runtime_status(),
     )
+    await update_bot_status(BOT_STATUS_BASE_TEXT)
+    if not BACKGROUND_JOBS.jobs:
+        _register_background_jobs(BACKGROUND_JOBS)
+    scheduler_task = asyncio.create_task(BACKGROUND_JOBS.run())
+    try:
+        metrics_runner = await _start_metrics_server(metrics_port)
+    except OSError:
+        _logger.exception("bot metrics server failed to start")
+        metrics_runner = None
     await create_and_send_backup("startup")
-    backup_task = asyncio.create_task(_backup_scheduler())
-    queue_task = asyncio.create_task(process_mailing_queue())
-    reminder_task = asyncio.create_task(process_attendance_reminders())
-    
+
     try:
         await dp.start_polling(bot)
     except Exception as e:
@@ -2869,12 +3036,10 @@ async def run_bot():
             await update_bot_status(f"⛔ Бот остановлен {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
         except Exception:
             pass
-        if backup_task:
-            backup_task.cancel()
-        if queue_task:
-            queue_task.cancel()
-        if reminder_task:
-            reminder_task.cancel()
+        await BACKGROUND_JOBS.stop()
+        scheduler_task.cancel()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 
 def _build_booking_keyboard_markup(
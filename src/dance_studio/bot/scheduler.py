@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from dance_studio.core.metrics import MetricFamily
+from dance_studio.core.profiling import finish_profile, record_profile, start_profile
+
+_logger = logging.getLogger(__name__)
+
+JobCallable = Callable[[], Awaitable[object]]
+NextRunResolver = Callable[[datetime], datetime]
+
+
+@dataclass(slots=True)
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    skipped: int = 0
+    running: int = 0
+    last_started_at: datetime | None = None
+    last_finished_at: datetime | None = None
+    last_duration_seconds: float | None = None
+    max_duration_seconds: float = 0.0
+    total_duration_seconds: float = 0.0
+    last_lag_seconds: float | None = None
+    max_lag_seconds: float = 0.0
+    last_error: str | None = None
+
+    @property
+    def avg_duration_seconds(self) -> float | None:
+        if self.runs <= 0:
+            return None
+        return self.total_duration_seconds / self.runs
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "running": self.running,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_duration_seconds": self.last_duration_seconds,
+            "avg_duration_seconds": self.avg_duration_seconds,
+            "max_duration_seconds": self.max_duration_seconds,
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_error": self.last_error,
+        }
+
+
+@dataclass(slots=True)
+class ScheduledJob:
+    name: str
+    func: JobCallable
+    interval_seconds: float
+    jitter_seconds: float = 0.0
+    max_concurrency: int = 1
+    timeout_seconds: float | None = None
+    next_run: NextRunResolver | None = None
+    run_immediately: bool = True
+    metrics: JobMetrics = field(default_factory=JobMetrics)
+
+
+class JobScheduler:
+    """Runs background jobs as independent tasks ordered by a heap of due times."""
+
+    def __init__(
+        self,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], datetime] = datetime.now,
+        rng: random.Random | None = None,
+        slow_job_ms: int = 0,
+    ) -> None:
+        self._clock = clock
+        self._slow_job_ms = slow_job_ms
+        self._wall_clock = wall_clock
+        self._rng = rng or random.Random()
+        self._jobs: dict[str, ScheduledJob] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._tasks: set[asyncio.Task] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._running = False
+
+    @property
+    def jobs(self) -> dict[str, ScheduledJob]:
+        return dict(self._jobs)
+
+    def add_job(
+        self,
+        name: str,
+        func: JobCallable,
+        *,
+        interval_seconds: float,
+        jitter_seconds: float = 0.0,
+        max_concurrency: int = 1,
+        timeout_seconds: float | None = None,
+        next_run: NextRunResolver | None = None,
+        run_immediately: bool = True,
+    ) -> ScheduledJob:
+        if name in self._jobs:
+            raise ValueError(f"job already registered: {name}")
+        if interval_seconds <= 0 and next_run is None:
+            raise ValueError("interval_seconds must be positive")
+        job = ScheduledJob(
+            name=name,
+            func=func,
+            interval_seconds=float(interval_seconds),
+            jitter_seconds=max(0.0, float(jitter_seconds)),
+            max_concurrency=max(1, int(max_concurrency)),
+            timeout_seconds=timeout_seconds,
+            next_run=next_run,
+            run_immediately=run_immediately,
+        )
+        self._jobs[name] = job
+        now = self._clock()
+        due = now if run_immediately and next_run is None else self._next_due(job, now)
+        self._push(due, name)
+        return job
+
+    def trigger(self, name: str) -> None:
+        if name not in self._jobs:
+            raise KeyError(name)
+        self._push(self._clock(), name)
+
+    def _push(self, due: float, name: str) -> None:
+        heapq.heappush(self._heap, (due, next(self._seq), name))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_due(self, job: ScheduledJob, now: float) -> float:
+        if job.next_run is not None:
+            wall_now = self._wall_clock()
+            delay = max((job.next_run(wall_now) - wall_now).total_seconds(), 1.0)
+        else:
+            delay = job.interval_seconds
+        if job.jitter_seconds:
+            delay += self._rng.uniform(0, job.jitter_seconds)
+        return now + delay
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._running = True
+        try:
+            while self._running:
+                if not self._heap:
+                    await self._wakeup.wait()
+                    self._wakeup.clear()
+                    continue
+
+                due, _, name = self._heap[0]
+                delay = due - self._clock()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    continue
+
+                heapq.heappop(self._heap)
+                job = self._jobs.get(name)
+                if job is None:
+                    continue
+                now = self._clock()
+                self._dispatch(job, lag_seconds=max(0.0, now - due))
+                # Keep a single pending entry per job: trigger() adds a one-off run
+                # on top of the cadence instead of forking a second schedule.
+                if self._is_periodic_entry(name):
+                    self._push(self._next_due(job, now), name)
+        finally:
+            self._running = False
+
+    def _is_periodic_entry(self, name: str) -> bool:
+        return not any(entry_name == name for _, _, entry_name in self._heap)
+
+    def _dispatch(self, job: ScheduledJob, *, lag_seconds: float) -> None:
+        metrics = job.metrics
+        if metrics.running >= job.max_concurrency:
+            metrics.skipped += 1
+            _logger.debug("job %s skipped: %s run(s) still active", job.name, metrics.running)
+            return
+        metrics.running += 1
+        metrics.last_lag_seconds = lag_seconds
+        metrics.max_lag_seconds = max(metrics.max_lag_seconds, lag_seconds)
+        task = asyncio.create_task(self._run_job(job), name=f"job:{job.name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_job(self, job: ScheduledJob) -> None:
+        metrics = job.metrics
+        metrics.last_started_at = self._wall_clock()
+        started = self._clock()
+        # The task runs in its own context copy, and asyncio.to_thread carries it into worker threads,
+        # so statements issued by the job (and only by it) land in this profile.
+        profile, profile_token = start_profile(f"job:{job.name}")
+        try:
+            if job.timeout_seconds:
+                await asyncio.wait_for(job.func(), timeout=job.timeout_seconds)
+            else:
+                await job.func()
+            metrics.last_error = None
+        except asyncio.TimeoutError:
+            metrics.timeouts += 1
+            metrics.failures += 1
+            metrics.last_error = f"timeout after {job.timeout_seconds:g}s"
+            _logger.warning("job %s timed out after %ss", job.name, job.timeout_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            metrics.failures += 1
+            metrics.last_error = f"{type(exc).__name__}: {exc}"[:300]
+            _logger.exception("job %s failed", job.name)
+        finally:
+            duration = self._clock() - started
+            finish_profile(profile_token)
+            record_profile(profile, seconds=duration, slow_threshold_ms=self._slow_job_ms, logger=_logger)
+            metrics.running -= 1
+            metrics.runs += 1
+            metrics.last_finished_at = self._wall_clock()
+            metrics.last_duration_seconds = duration
+            metrics.total_duration_seconds += duration
+            metrics.max_duration_seconds = max(metrics.max_duration_seconds, duration)
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self) -> dict[str, dict]:
+        return {name: job.metrics.as_dict() for name, job in self._jobs.items()}
+
+    def metric_families(self) -> list[MetricFamily]:
+        runs = MetricFamily("background_job_runs", "counter", "Finished background job runs.")
+        failures = MetricFamily("background_job_failures", "counter", "Failed or timed out background job runs.")
+        skipped = MetricFamily("background_job_skipped", "counter", "Runs skipped because the previous one was still active.")
+        running = MetricFamily("background_job_running", "gauge", "Background job runs in progress.")
+        duration = MetricFamily("background_job_last_duration_seconds", "gauge", "Duration of the last finished run.")
+        lag = MetricFamily("background_job_last_lag_seconds", "gauge", "How late the last run started against its due time.")
+        for name, job in self._jobs.items():
+            job_metrics = job.metrics
+            runs.add(job_metrics.runs, "_total", job=name)
+            failures.add(job_metrics.failures, "_total", job=name)
+            skipped.add(job_metrics.skipped, "_total", job=name)
+            running.add(job_metrics.running, job=name)
+            if job_metrics.last_duration_seconds is not None:
+                duration.add(job_metrics.last_duration_seconds, job=name)
+            if job_metrics.last_lag_seconds is not None:
+                lag.add(job_metrics.last_lag_seconds, job=name)
+        return [runs, failures, skipped, running, duration, lag]
+
+
+def _format_seconds(value: float | None) -> str:
+    if value is None:
+        return "—"
+    if value < 1:
+        return f"{value * 1000:.0f}ms"
+    return f"{value:.1f}s"
+
+
+def build_job_metrics_text(snapshot: dict[str, dict]) -> str:
+    lines = ["⏱ Фоновые задачи"]
+    if not snapshot:
+        lines.append("нет зарегистрированных задач")
+        return "\n".join(lines)
+    for name, metrics in snapshot.items():
+        parts = [
+            f"runs={metrics['runs']}",
+            f"avg={_format_seconds(metrics['avg_duration_seconds'])}",
+            f"max={_format_seconds(metrics['max_duration_seconds'])}",
+            f"lag={_format_seconds(metrics['last_lag_seconds'])}",
+        ]
+        if metrics["failures"]:
+            parts.append(f"fail={metrics['failures']}")
+        if metrics["timeouts"]:
+            parts.append(f"timeout={metrics['timeouts']}")
+        if metrics["skipped"]:
+            parts.append(f"skip={metrics['skipped']}")
+        lines.append(f"{name}: {', '.join(parts)}")
+    return "\n".join(lines)
@@ -1,5 +1,9 @@
 import asyncio
+import concurrent.futures
 import os
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any
 from urllib.parse import unquote, urlparse
@@ -7,6 +11,7 @@ from urllib.parse import unquote, urlparse
 import socks
 from telethon import TelegramClient
 from telethon.errors import (
+    FloodWaitError,
     PasswordHashInvalidError,
     PhoneCodeExpiredError,
     PhoneCodeInvalidError,
@@ -45,6 +50,11 @@ USERBOT_CONNECT_TIMEOUT_SECONDS = 10
 USERBOT_REQUEST_RETRIES = 1
 USERBOT_CONNECTION_RETRIES = 1
 USERBOT_RETRY_DELAY_SECONDS = 0
+USERBOT_SEND_TIMEOUT_SECONDS = 60
+USERBOT_MIN_SEND_INTERVAL_SECONDS = 1.0
+USERBOT_MAX_FLOOD_WAIT_SECONDS = 30
+USERBOT_ENTITY_CACHE_TTL_SECONDS = 6 * 60 * 60
+USERBOT_ENTITY_CACHE_MAX_SIZE = 1024
 
 _lock = asyncio.Lock()
 
@@ -73,6 +83,10 @@ class UserbotPasswordInvalidError(RuntimeError):
     pass
 
 
+class UserbotFloodWaitError(RuntimeError):
+    pass
+
+
 def _normalize_login_phone(phone: str | None) -> str | None:
     raw = str(phone or "").strip()
     if not raw:
@@ -267,22 +281,149 @@ async def _resolve_user_entity(client: TelegramClient, user: Any):
     )
 
 
-async def send_private_message(user: Any, text: str) -> dict:
-    async with _lock:
-        client = await _get_client()
+def _entity_cache_key(user: Any) -> tuple:
+    u = _normalize_user(user)
+    return (u.get("id"), str(u.get("username") or "").lower() or None, u.get("phone"))
+
+
+class UserbotWorker:
+    """Keeps one connected client on a dedicated loop thread and serializes sends through it."""
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._client: TelegramClient | None = None
+        self._send_lock: asyncio.Lock | None = None
+        self._entity_cache: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._next_send_at = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._loop is not None and self._thread is not None and self._thread.is_alive()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self.is_running:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=self._run_loop,
+                args=(loop, ready),
+                name="userbot-worker",
+                daemon=True,
+            )
+            thread.start()
+            ready.wait()
+            self._loop = loop
+            self._thread = thread
+            return loop
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        self._send_lock = asyncio.Lock()
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def submit(self, user: Any, text: str) -> concurrent.futures.Future:
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._send(user, text), loop)
+
+    def release_client(self, timeout: float = USERBOT_SEND_TIMEOUT_SECONDS) -> None:
+        if not self.is_running:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._release_client(), self._loop)
+        future.result(timeout=timeout)
+
+    async def _release_client(self) -> None:
+        async with self._send_lock:
+            await self._drop_client()
+
+    async def _drop_client(self) -> None:
+        client, self._client = self._client, None
+        if client is None:
+            return
         try:
-            entity = await _resolve_user_entity(client, user)
-            await client.send_message(entity=entity, message=text)
-            return {"ok": True}
-        except RPCError as exc:
-            raise RuntimeError(f"Telethon RPC error: {exc}") from exc
-        except Exception as exc:
-            raise RuntimeError(str(exc)) from exc
-        finally:
+            await client.disconnect()
+        except Exception:
+            pass
+
+    async def _ensure_client(self) -> TelegramClient:
+        client = self._client
+        if client is not None:
+            is_connected = getattr(client, "is_connected", None)
+            if is_connected is None or is_connected():
+                return client
+            await self._drop_client()
+        self._client = await _get_client()
+        return self._client
+
+    async def _resolve_entity_cached(self, client: TelegramClient, user: Any):
+        key = _entity_cache_key(user)
+        cached = self._entity_cache.get(key)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            self._entity_cache.move_to_end(key)
+            return cached[1]
+        entity = await _resolve_user_entity(client, user)
+        self._entity_cache[key] = (now + USERBOT_ENTITY_CACHE_TTL_SECONDS, entity)
+        self._entity_cache.move_to_end(key)
+        while len(self._entity_cache) > USERBOT_ENTITY_CACHE_MAX_SIZE:
+            self._entity_cache.popitem(last=False)
+        return entity
+
+    async def _wait_for_send_slot(self) -> None:
+        delay = self._next_send_at - time.monotonic()
+        if delay > USERBOT_MAX_FLOOD_WAIT_SECONDS:
+            raise UserbotFloodWaitError(f"Telegram flood wait: retry in {int(delay)}s")
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _send(self, user: Any, text: str) -> dict:
+        async with self._send_lock:
+            await self._wait_for_send_slot()
             try:
-                await client.disconnect()
-            except Exception:
-                pass
+                client = await self._ensure_client()
+                entity = await self._resolve_entity_cached(client, user)
+                try:
+                    await client.send_message(entity=entity, message=text)
+                except FloodWaitError as exc:
+                    self._next_send_at = time.monotonic() + int(exc.seconds or 0)
+                    await self._wait_for_send_slot()
+                    await client.send_message(entity=entity, message=text)
+                return {"ok": True}
+            except FloodWaitError as exc:
+                self._next_send_at = time.monotonic() + int(exc.seconds or 0)
+                raise UserbotFloodWaitError(f"Telegram flood wait: retry in {int(exc.seconds or 0)}s") from exc
+            except (UserbotFloodWaitError, UserbotSessionNotAuthorizedError):
+                raise
+            except RPCError as exc:
+                self._entity_cache.pop(_entity_cache_key(user), None)
+                raise RuntimeError(f"Telethon RPC error: {exc}") from exc
+            except Exception as exc:
+                self._entity_cache.pop(_entity_cache_key(user), None)
+                await self._drop_client()
+                raise RuntimeError(str(exc)) from exc
+            finally:
+                self._next_send_at = max(self._next_send_at, time.monotonic() + USERBOT_MIN_SEND_INTERVAL_SECONDS)
+
+
+_worker = UserbotWorker()
+
+
+def get_userbot_worker() -> UserbotWorker:
+    return _worker
+
+
+async def _release_worker_client() -> None:
+    # Login flows open their own client on the same session file.
+    if _worker.is_running:
+        await asyncio.to_thread(_worker.release_client)
+
+
+async def send_private_message(user: Any, text: str) -> dict:
+    return await asyncio.wrap_future(_worker.submit(user, text))
 
 
 async def request_login_code(phone: str) -> dict:
@@ -290,6 +431,7 @@ async def request_login_code(phone: str) -> dict:
     if not normalized_phone:
         raise UserbotPhoneNumberInvalidError("userbot_phone_invalid")
 
+    await _release_worker_client()
     async with _lock:
         client = await _connect_client()
         try:
@@ -331,6 +473,7 @@ async def complete_login_code(phone: str, code: str, phone_code_hash: str) -> di
     if not str(phone_code_hash or "").strip():
         raise RuntimeError("userbot_phone_code_hash_missing")
 
+    await _release_worker_client()
     async with _lock:
         client = await _connect_client()
         try:
@@ -371,6 +514,7 @@ async def complete_login_password(password: str) -> dict:
     if not normalized_password:
         raise UserbotPasswordInvalidError("userbot_password_invalid")
 
+    await _release_worker_client()
     async with _lock:
         client = await _connect_client()
         try:
@@ -398,7 +542,7 @@ async def complete_login_password(password: str) -> dict:
 
 def send_private_message_sync(user: Any, text: str) -> dict | None:
     try:
-        return asyncio.run(send_private_message(user, text))
+        return _worker.submit(user, text).result(timeout=USERBOT_SEND_TIMEOUT_SECONDS)
     except Exception as exc:
         reason = str(exc).strip() or repr(exc)
         print(f"Failed to send userbot message: {reason}")
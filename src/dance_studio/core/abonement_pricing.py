@@ -3,11 +3,10 @@ from dataclasses import dataclass
 from datetime import datetime, time, timedelta
 from typing import Any
 
-from sqlalchemy import or_
-
+from dance_studio.core.group_slot_summaries import get_group_next_session_date
 from dance_studio.core.personal_discounts import apply_best_discount_for_user, serialize_applied_discount
 from dance_studio.core.system_settings_service import get_setting_value
-from dance_studio.db.models import BookingRequest, Direction, Group, GroupAbonement, Schedule
+from dance_studio.db.models import BookingRequest, Direction, Group, GroupAbonement
 
 
 ABONEMENT_TYPE_SINGLE = "single"
@@ -21,16 +20,6 @@ ALLOWED_ABONEMENT_TYPES = {
 ALLOWED_DIRECTION_TYPES = {"dance", "sport"}
 ALLOWED_MULTI_SINGLE_LESSON_BUCKETS = {4, 8, 12, 16}
 ALLOWED_MULTI_BUNDLE_LESSON_BUCKETS = {2: {4, 8, 12}, 3: {4, 8, 12}, 4: {4, 8}}
-INACTIVE_GROUP_SCHEDULE_STATUSES = {
-    "cancelled",
-    "deleted",
-    "rejected",
-    "payment_failed",
-    "CANCELLED",
-    "DELETED",
-    "REJECTED",
-    "PAYMENT_FAILED",
-}
 DEFAULT_MULTI_SINGLE_PRICE_RUB = 400
 DEFAULT_MULTI_SINGLE_PRICES = {
     "dance": {"4": 3600, "8": 7200, "12": 10800, "16": 14400},
@@ -168,22 +157,7 @@ def _get_group_payloads(db, group_ids: list[int]) -> list[dict[str, Any]]:
 
 
 def get_next_group_date(db, group_id: int):
-    today = datetime.now().date()
-    item = (
-        db.query(Schedule)
-        .filter(
-            Schedule.object_type == "group",
-            Schedule.date.isnot(None),
-            Schedule.status.notin_(list(INACTIVE_GROUP_SCHEDULE_STATUSES)),
-            or_(Schedule.group_id == group_id, Schedule.object_id == group_id),
-            Schedule.date >= today,
-        )
-        .order_by(Schedule.date.asc())
-        .first()
-    )
-    if item and item.date:
-        return item.date
-    return today
+    return get_group_next_session_date(db, int(group_id)) or datetime.now().date()
 
 
 def _get_json_price(settings_payload: Any, *keys: str) -> int | None:
@@ -0,0 +1,122 @@
+"""
+Change log behind the admin SSE stream (/api/admin/stream).
+
+Every commit that creates, changes or deletes a booking request, payment or attendance mark appends
+one row per entity to `admin_feed_events` in the same transaction, whichever process made it
+(web worker or bot). Dashboards read it through an EventCursor whose token is the SSE event id, so
+a reconnecting dashboard resumes from its Last-Event-ID, including ids that were still uncommitted
+below it. Bulk statements cannot name their rows and log the kind only; clients reload it.
+"""
+
+from __future__ import annotations
+
+import itertools
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session as OrmSession
+
+from dance_studio.core.event_cursor import EventCursor, cursor_at_end
+from dance_studio.db.models import AdminFeedEvent, Attendance, BookingRequest, PaymentTransaction
+
+FEED_BOOKING = "booking"
+FEED_PAYMENT = "payment"
+FEED_ATTENDANCE = "attendance"
+
+_FEED_MODELS = {
+    BookingRequest: FEED_BOOKING,
+    PaymentTransaction: FEED_PAYMENT,
+    Attendance: FEED_ATTENDANCE,
+}
+_PENDING_KEY = "admin_feed_pending"
+
+
+def record_admin_feed(session, kind: str, entity_ids=None) -> None:
+    """
+    Logs changes the session tracking cannot see; no ids means "reload this kind". A set-based write
+    that names its rows here should carry execution_options(admin_feed_recorded=True), so it is not
+    logged a second time as an anonymous bulk write.
+    """
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    if entity_ids is None:
+        pending.add((kind, None))
+    else:
+        pending.update((kind, int(entity_id)) for entity_id in entity_ids)
+
+
+def current_feed_cursor(db) -> EventCursor:
+    return cursor_at_end(db, AdminFeedEvent.id)
+
+
+def read_feed(db, cursor: EventCursor, *, limit: int) -> list[AdminFeedEvent] | None:
+    """
+    Events the cursor has not read yet, oldest first; advances the cursor. None when the client has
+    to reload instead: its cursor is older than what the janitor kept, or more than `limit` changes
+    are waiting.
+    """
+    if cursor.last_id:
+        oldest = db.execute(select(func.min(AdminFeedEvent.id))).scalar()
+        if oldest is not None and cursor.last_id < oldest - 1:
+            return None
+    rows = (
+        db.query(AdminFeedEvent)
+        .filter(cursor.unseen(AdminFeedEvent.id))
+        .order_by(AdminFeedEvent.id)
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        return None
+    fresh = set(cursor.advance(row.id for row in rows))
+    return [row for row in rows if row.id in fresh]
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _track_feed_changes(session, flush_context):
+    # after_flush still sees the pre-flush new/dirty/deleted sets, with primary keys assigned.
+    pending = None
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        kind = _FEED_MODELS.get(type(obj))
+        if kind is None or obj.id is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if pending is None:
+            pending = session.info.setdefault(_PENDING_KEY, set())
+        pending.add((kind, int(obj.id)))
+
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _track_feed_bulk_writes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    kind = _FEED_MODELS.get(mapper.class_) if mapper is not None else None
+    if kind is not None and not orm_execute_state.execution_options.get("admin_feed_recorded"):
+        record_admin_feed(orm_execute_state.session, kind)
+
+
+@event.listens_for(OrmSession, "before_commit")
+def _write_feed_events(session):
+    session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    session.execute(
+        insert(AdminFeedEvent),
+        [{"kind": kind, "entity_id": entity_id} for kind, entity_id in sorted(pending, key=lambda item: (item[0], item[1] or 0))],
+    )
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_feed_events(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+__all__ = [
+    "FEED_ATTENDANCE",
+    "FEED_BOOKING",
+    "FEED_PAYMENT",
+    "current_feed_cursor",
+    "read_feed",
+    "record_admin_feed",
+]
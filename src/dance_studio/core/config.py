@@ -2,7 +2,24 @@ from dance_studio.core.settings import (
     BACKUP_AGE_RECIPIENTS,
     BACKUP_AGE_BINARY,
     BACKUP_ENCRYPTION_REQUIRED,
+    BACKUP_MEDIA_FULL_INTERVAL_DAYS,
+    BACKUP_MEDIA_INCREMENTAL,
     BACKUP_TELEGRAM_PROXY,
+    IMAGE_VARIANT_WORKERS,
+    RESPONSE_COMPRESSION_ENABLED,
+    RESPONSE_COMPRESSION_MIN_BYTES,
+    REQUEST_PROFILING_ENABLED,
+    METRICS_ALLOW_LOCAL,
+    BOT_METRICS_PORT,
+    AUTH_RATE_LIMIT_BACKEND,
+    CACHE_INVALIDATION_POLL_SECONDS,
+    COMBINED_BOT_METRICS_PORT,
+    COMBINED_WEB_MAX_REQUESTS,
+    COMBINED_WEB_SERVER,
+    COMBINED_WEB_THREADS,
+    COMBINED_WEB_WORKERS,
+    SLOW_JOB_LOG_MS,
+    SLOW_REQUEST_LOG_MS,
     TELEGRAM_PROXY,
     VK_COMMUNITY_ID,
     VK_MINI_APP_SERVICE_KEY,
@@ -31,6 +48,8 @@ from dance_studio.core.settings import (
     INITIAL_STAFF_CONFIG_PATH,
     BOT_TOKEN,
     DATABASE_URL,
+    DATABASE_REPLICA_MAX_LAG_SECONDS,
+    DATABASE_REPLICA_URL,
     ENV,
     MIGRATE_ON_START,
     MAX_SESSIONS_PER_USER,
@@ -73,6 +92,8 @@ __all__ = [
     'INITIAL_STAFF_CONFIG_PATH',
     'BOT_TOKEN',
     'DATABASE_URL',
+    'DATABASE_REPLICA_MAX_LAG_SECONDS',
+    'DATABASE_REPLICA_URL',
     'ENV',
     'MIGRATE_ON_START',
     'MAX_SESSIONS_PER_USER',
@@ -93,6 +114,23 @@ __all__ = [
     'BACKUP_ENCRYPTION_REQUIRED',
     'BACKUP_AGE_RECIPIENTS',
     'BACKUP_AGE_BINARY',
+    'BACKUP_MEDIA_FULL_INTERVAL_DAYS',
+    'BACKUP_MEDIA_INCREMENTAL',
+    'IMAGE_VARIANT_WORKERS',
+    'RESPONSE_COMPRESSION_ENABLED',
+    'RESPONSE_COMPRESSION_MIN_BYTES',
+    'REQUEST_PROFILING_ENABLED',
+    'METRICS_ALLOW_LOCAL',
+    'BOT_METRICS_PORT',
+    'AUTH_RATE_LIMIT_BACKEND',
+    'CACHE_INVALIDATION_POLL_SECONDS',
+    'COMBINED_BOT_METRICS_PORT',
+    'COMBINED_WEB_MAX_REQUESTS',
+    'COMBINED_WEB_SERVER',
+    'COMBINED_WEB_THREADS',
+    'COMBINED_WEB_WORKERS',
+    'SLOW_JOB_LOG_MS',
+    'SLOW_REQUEST_LOG_MS',
     'BACKUP_TELEGRAM_PROXY',
     'TELEGRAM_PROXY',
     'WEB_PUSH_SUBJECT',
@@ -0,0 +1,101 @@
+"""
+Reading append-only event tables (cache invalidation, admin feed) by id without losing late commits.
+
+Ids come from a sequence and are handed out at insert, not at commit: on Postgres a transaction
+holding id 41 can commit after id 42 is already visible and a reader has moved past it. A cursor
+therefore remembers the ids it skipped below its high-water mark and asks for them again on every
+read until they show up or expire (a rolled-back transaction never fills its id).
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import or_, select
+
+# Far longer than any transaction that writes events; a gap still empty by then was rolled back.
+GAP_WAIT_SECONDS = 120.0
+# Bounds the IN list sent with every read and the ids scanned when a cursor is taken.
+MAX_GAPS = 256
+
+
+class EventCursor:
+    def __init__(
+        self,
+        last_id: int = 0,
+        gaps: Iterable[int] = (),
+        *,
+        gap_seconds: float = GAP_WAIT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.last_id = int(last_id)
+        self.gap_seconds = gap_seconds
+        self._clock = clock
+        self._gaps: dict[int, float] = {}
+        self._add_gaps(int(gap) for gap in gaps if 0 < int(gap) < self.last_id)
+
+    @property
+    def gaps(self) -> list[int]:
+        return sorted(self._gaps)
+
+    def unseen(self, column):
+        """SQL condition for the rows this cursor has not read yet."""
+        now = self._clock()
+        for gap in [gap for gap, deadline in self._gaps.items() if deadline <= now]:
+            del self._gaps[gap]
+        if not self._gaps:
+            return column > self.last_id
+        return or_(column > self.last_id, column.in_(self.gaps))
+
+    def advance(self, ids: Iterable[int]) -> list[int]:
+        """Records ids as read and returns the ones not read before, oldest first."""
+        fresh = []
+        for event_id in sorted(set(ids)):
+            if event_id > self.last_id or self._gaps.pop(event_id, None) is not None:
+                fresh.append(event_id)
+        if fresh and fresh[-1] > self.last_id:
+            high = fresh[-1]
+            self._add_gaps(set(range(max(self.last_id + 1, high - MAX_GAPS), high)).difference(fresh))
+            self.last_id = high
+        return fresh
+
+    def _add_gaps(self, gaps: Iterable[int]) -> None:
+        deadline = self._clock() + self.gap_seconds
+        for gap in gaps:
+            self._gaps.setdefault(gap, deadline)
+        for gap in self.gaps[: max(len(self._gaps) - MAX_GAPS, 0)]:
+            del self._gaps[gap]
+
+    def token(self) -> str:
+        """Serialized form for clients (an SSE event id): "42", or "42:39,40" while ids are missing."""
+        if not self._gaps:
+            return str(self.last_id)
+        return f"{self.last_id}:" + ",".join(str(gap) for gap in self.gaps)
+
+    @classmethod
+    def from_token(cls, raw, **kwargs) -> EventCursor | None:
+        text = str(raw if raw is not None else "").strip()
+        head, _, tail = text.partition(":")
+        try:
+            last_id = int(head)
+            gaps = [int(part) for part in tail.split(",") if part.strip()]
+        except ValueError:
+            return None
+        if last_id < 0:
+            return None
+        return cls(last_id, gaps[:MAX_GAPS], **kwargs)
+
+
+def cursor_at_end(db, column, **kwargs) -> EventCursor:
+    """
+    A cursor after the newest committed event that still waits for the missing ids just below it:
+    they belong to transactions that may commit after this snapshot was read.
+    """
+    recent = db.execute(select(column).order_by(column.desc()).limit(MAX_GAPS)).scalars().all()
+    if not recent:
+        return EventCursor(0, **kwargs)
+    return EventCursor(recent[0], set(range(recent[-1], recent[0])).difference(recent), **kwargs)
+
+
+__all__ = ["GAP_WAIT_SECONDS", "MAX_GAPS", "EventCursor", "cursor_at_end"]
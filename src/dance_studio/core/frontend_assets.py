@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+_logger = logging.getLogger(__name__)
+
+FRONTEND_SOURCE_NAME = "index.html"
+SERVICE_WORKER_NAME = "sw.js"
+FRONTEND_DIST_DIRNAME = "dist"
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+ASSET_MANIFEST_VERSION = 1
+ASSET_URL_PREFIX = "/assets/"
+ASSET_HASH_LENGTH = 12
+# Encodings in server preference order, with the file suffix of the precompressed sibling.
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_INLINE_STYLE_RE = re.compile(r"<style>(.*?)</style>\s*", re.DOTALL | re.IGNORECASE)
+_INLINE_SCRIPT_RE = re.compile(r"<script>(.*?)</script>", re.DOTALL | re.IGNORECASE)
+_HEAD_CLOSE_RE = re.compile(r"</head>", re.IGNORECASE)
+_BODY_RE = re.compile(r"(<body[^>]*>)(.*)(</body>)", re.DOTALL | re.IGNORECASE)
+_LOCAL_ASSET_URL_RE = re.compile(r'(?:src|href)="(/assets/[^"]+)"')
+_PRECACHE_LINE_RE = re.compile(r"^const PRECACHE = .*;$", re.MULTILINE)
+
+# Inserts the page markup in front of the loader script. Scripts parsed through a template never run,
+# so external ones (the map widget) are recreated to keep their original behaviour.
+_MARKUP_LOADER_TEMPLATE = """(function () {
+  var anchor = document.currentScript;
+  var template = document.createElement('template');
+  template.innerHTML = %s;
+  template.content.querySelectorAll('script').forEach(function (stale) {
+    var live = document.createElement('script');
+    Array.prototype.forEach.call(stale.attributes, function (attr) { live.setAttribute(attr.name, attr.value); });
+    live.text = stale.text;
+    stale.replaceWith(live);
+  });
+  anchor.parentNode.insertBefore(template.content, anchor);
+})();
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class BuiltFrontend:
+    manifest: dict
+    shell_path: Path
+    files: list[Path]
+
+
+def dist_dir(frontend_dir: str | os.PathLike) -> Path:
+    return Path(frontend_dir) / FRONTEND_DIST_DIRNAME
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:ASSET_HASH_LENGTH]
+
+
+def _hashed_name(stem: str, suffix: str, data: bytes) -> str:
+    return f"{stem}.{_content_hash(data)}{suffix}"
+
+
+def _asset_url(name: str) -> str:
+    return f"{ASSET_URL_PREFIX}{FRONTEND_DIST_DIRNAME}/{name}"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _compress(data: bytes, encoding: str, *, brotli_quality: int) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == "br":
+        import brotli
+
+        return brotli.compress(data, quality=brotli_quality)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+def _split_source(source: str) -> tuple[str, str, str, list[str]]:
+    """Returns (shell head, page markup, css, inline scripts) of the monolithic index.html."""
+    styles = [match.group(1) for match in _INLINE_STYLE_RE.finditer(source)]
+    without_styles = _INLINE_STYLE_RE.sub("", source)
+
+    body_match = _BODY_RE.search(without_styles)
+    if body_match is None:
+        raise ValueError("index.html has no <body>")
+    head = without_styles[: body_match.start()]
+    body = body_match.group(2)
+
+    scripts = [match.group(1) for match in _INLINE_SCRIPT_RE.finditer(body)]
+    if not scripts:
+        raise ValueError("index.html has no inline <script> in <body>")
+    first_script = _INLINE_SCRIPT_RE.search(body)
+    markup = body[: first_script.start()]
+    between = _INLINE_SCRIPT_RE.sub("", body[first_script.start():])
+    if between.strip():
+        # Markup interleaved with the app scripts would change evaluation order once split.
+        raise ValueError("index.html has markup between inline <script> blocks")
+    return head, markup, "\n".join(styles), scripts
+
+
+def _precache_urls(page: str) -> list[str]:
+    urls = ["/"]
+    for match in _LOCAL_ASSET_URL_RE.finditer(page):
+        url = html.unescape(match.group(1))
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+def _render_service_worker(source: str, build_version: str, precache: list[str]) -> str:
+    if not _PRECACHE_LINE_RE.search(source):
+        raise ValueError("sw.js has no `const PRECACHE = ...;` line to fill in")
+    line = f"const PRECACHE = {json.dumps({'version': build_version, 'urls': precache})};"
+    return _PRECACHE_LINE_RE.sub(lambda _match: line, source, count=1)
+
+
+def build_frontend_assets(
+    frontend_dir: str | os.PathLike,
+    *,
+    brotli_quality: int = 11,
+) -> BuiltFrontend:
+    """
+    Splits frontend/index.html into content-hashed CSS, markup and JS files under frontend/dist,
+    writes precompressed siblings, the manifest, a small HTML shell referencing them and sw.js
+    with the precache list and build version filled in.
+    Files of the previous build are kept so clients holding the old shell can still load it.
+    """
+    frontend_dir = Path(frontend_dir)
+    source_path = frontend_dir / FRONTEND_SOURCE_NAME
+    source_bytes = source_path.read_bytes()
+    head, markup, css, scripts = _split_source(source_bytes.decode("utf-8"))
+
+    contents: dict[str, tuple[str, bytes]] = {}
+    contents["app.css"] = (".css", css.encode("utf-8"))
+    contents["markup.js"] = (".js", (_MARKUP_LOADER_TEMPLATE % json.dumps(markup, ensure_ascii=False)).encode("utf-8"))
+    for index, script in enumerate(scripts):
+        logical = "app.js" if len(scripts) == 1 else f"app-{index + 1}.js"
+        contents[logical] = (".js", script.encode("utf-8"))
+
+    target_dir = dist_dir(frontend_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    previous = load_asset_manifest(frontend_dir, check_source=False) or {}
+
+    assets: dict[str, str] = {}
+    written: list[Path] = []
+    for logical, (suffix, data) in contents.items():
+        name = _hashed_name(Path(logical).stem, suffix, data)
+        assets[logical] = name
+        target = target_dir / name
+        if not target.exists():
+            _write_atomic(target, data)
+        written.append(target)
+        for encoding, encoded_suffix in PRECOMPRESSED_ENCODINGS:
+            encoded = target.with_name(f"{name}{encoded_suffix}")
+            if not encoded.exists():
+                _write_atomic(encoded, _compress(data, encoding, brotli_quality=brotli_quality))
+            written.append(encoded)
+
+    script_tags = "\n".join(
+        f'<script src="{_asset_url(name)}"></script>'
+        for logical, name in assets.items()
+        if logical.endswith(".js")
+    )
+    stylesheet = f'<link rel="stylesheet" href="{_asset_url(assets["app.css"])}">\n'
+    head = _HEAD_CLOSE_RE.sub(lambda match: stylesheet + match.group(0), head, count=1)
+    shell = f"{head}<body>\n{script_tags}\n</body>\n</html>\n"
+    shell_path = target_dir / FRONTEND_SOURCE_NAME
+    _write_atomic(shell_path, shell.encode("utf-8"))
+    written.append(shell_path)
+
+    precache = _precache_urls(shell + markup)
+    build_version = _content_hash(shell.encode("utf-8") + json.dumps(precache).encode("utf-8"))
+    service_worker = None
+    sw_source_path = frontend_dir / SERVICE_WORKER_NAME
+    if sw_source_path.is_file():
+        sw_source = sw_source_path.read_text(encoding="utf-8")
+        build_version = _content_hash(f"{build_version}:{sw_source}".encode("utf-8"))
+        sw_path = target_dir / SERVICE_WORKER_NAME
+        _write_atomic(sw_path, _render_service_worker(sw_source, build_version, precache).encode("utf-8"))
+        written.append(sw_path)
+        service_worker = SERVICE_WORKER_NAME
+
+    source_stat = source_path.stat()
+    manifest = {
+        "version": ASSET_MANIFEST_VERSION,
+        "source": {
+            "sha256": hashlib.sha256(source_bytes).hexdigest(),
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+        },
+        "build_version": build_version,
+        "shell": FRONTEND_SOURCE_NAME,
+        "service_worker": service_worker,
+        "assets": assets,
+        "precache": precache,
+        "encodings": [encoding for encoding, _ in PRECOMPRESSED_ENCODINGS],
+    }
+    manifest_path = target_dir / ASSET_MANIFEST_NAME
+    _write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    written.append(manifest_path)
+
+    keep = {path.name for path in written}
+    for name in (previous.get("assets") or {}).values():
+        keep.add(name)
+        keep.update(f"{name}{suffix}" for _, suffix in PRECOMPRESSED_ENCODINGS)
+    for path in target_dir.iterdir():
+        if path.is_file() and path.name not in keep:
+            path.unlink()
+
+    _manifest_cache.clear()
+    _stale_warned.clear()
+    return BuiltFrontend(manifest=manifest, shell_path=shell_path, files=written)
+
+
+_manifest_cache: dict[Path, tuple[tuple[int, int], dict]] = {}
+_manifest_lock = threading.Lock()
+_stale_warned: set[Path] = set()
+
+
+def _read_manifest(manifest_path: Path) -> dict | None:
+    try:
+        stat = manifest_path.stat()
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _manifest_lock:
+        cached = _manifest_cache.get(manifest_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        _logger.warning("frontend asset manifest is unreadable: %s", manifest_path)
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != ASSET_MANIFEST_VERSION:
+        return None
+    with _manifest_lock:
+        _manifest_cache[manifest_path] = (key, manifest)
+    return manifest
+
+
+def load_asset_manifest(frontend_dir: str | os.PathLike, *, check_source: bool = True) -> dict | None:
+    """
+    The manifest of the last build, or None. With check_source the build must match the current
+    index.html (size and mtime), so a deploy that skipped the build falls back to the source file.
+    """
+    manifest_path = dist_dir(frontend_dir) / ASSET_MANIFEST_NAME
+    manifest = _read_manifest(manifest_path)
+    if manifest is None or not check_source:
+        return manifest
+    source = manifest.get("source") or {}
+    try:
+        stat = (Path(frontend_dir) / FRONTEND_SOURCE_NAME).stat()
+    except FileNotFoundError:
+        return None
+    if (stat.st_size, stat.st_mtime_ns) != (source.get("size"), source.get("mtime_ns")):
+        if manifest_path not in _stale_warned:
+            _stale_warned.add(manifest_path)
+            _logger.warning("frontend build is stale, serving %s as is; run scripts/build_frontend_assets.py", FRONTEND_SOURCE_NAME)
+        return None
+    return manifest
+
+
+def built_shell_path(frontend_dir: str | os.PathLike) -> Path | None:
+    manifest = load_asset_manifest(frontend_dir)
+    if manifest is None:
+        return None
+    shell_path = dist_dir(frontend_dir) / str(manifest.get("shell") or FRONTEND_SOURCE_NAME)
+    return shell_path if shell_path.is_file() else None
+
+
+def built_service_worker_path(frontend_dir: str | os.PathLike) -> Path | None:
+    manifest = load_asset_manifest(frontend_dir)
+    if manifest is None or not manifest.get("service_worker"):
+        return None
+    sw_path = dist_dir(frontend_dir) / str(manifest["service_worker"])
+    return sw_path if sw_path.is_file() else None
+
+
+def select_precompressed(asset_path: Path, accept_encodings) -> tuple[Path, str | None]:
+    """Picks the best precompressed sibling the client accepts (werkzeug MIMEAccept-like object)."""
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if not accept_encodings[encoding]:
+            continue
+        candidate = asset_path.with_name(f"{asset_path.name}{suffix}")
+        if candidate.is_file():
+            return candidate, encoding
+    return asset_path, None
+
+
+def has_precompressed_variants(asset_path: Path) -> bool:
+    return any(asset_path.with_name(f"{asset_path.name}{suffix}").is_file() for _, suffix in PRECOMPRESSED_ENCODINGS)
+
+
+__all__ = [
+    "ASSET_MANIFEST_NAME",
+    "BuiltFrontend",
+    "PRECOMPRESSED_ENCODINGS",
+    "build_frontend_assets",
+    "built_service_worker_path",
+    "built_shell_path",
+    "dist_dir",
+    "has_precompressed_variants",
+    "load_asset_manifest",
+    "select_precompressed",
+]
@@ -96,30 +96,3 @@ def send_group_notifications(
         "error": error,
     }
 
-
-def notify_group_participants(
-    db,
-    *,
-    group: Group | None,
-    event_type: str,
-    title: str,
-    body: str,
-    payload: dict | None = None,
-    attendance_rows: Iterable[Attendance] | None = None,
-    abonement_user_ids: Iterable[object] | None = None,
-    include_teacher: bool = True,
-) -> dict:
-    recipient_user_ids = collect_group_notification_recipient_ids(
-        group=group,
-        attendance_rows=attendance_rows,
-        abonement_user_ids=abonement_user_ids,
-        include_teacher=include_teacher,
-    )
-    return send_group_notifications(
-        db,
-        recipient_user_ids=recipient_user_ids,
-        event_type=event_type,
-        title=title,
-        body=body,
-        payload=payload,
-    )
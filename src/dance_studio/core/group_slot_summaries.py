@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import and_, event, func, inspect, or_, select, union_all
+from sqlalchemy.orm import Session as OrmSession
+
+from dance_studio.db.models import Group, GroupSlotSummary, Schedule
+
+GROUP_WEEKDAY_LABELS = [
+    "Понедельник",
+    "Вторник",
+    "Среда",
+    "Четверг",
+    "Пятница",
+    "Суббота",
+    "Воскресенье",
+]
+INACTIVE_GROUP_SCHEDULE_STATUSES = {
+    "cancelled",
+    "deleted",
+    "rejected",
+    "payment_failed",
+    "CANCELLED",
+    "DELETED",
+    "REJECTED",
+    "PAYMENT_FAILED",
+}
+GROUP_SLOT_SUMMARY_MAX_LABELS = 3
+# Labels come from the nearest sessions; weekly groups repeat well within this many rows.
+GROUP_SLOT_SUMMARY_SCAN_LIMIT = 40
+_SESSION_PENDING_KEY = "group_slot_summary_pending"
+
+
+@dataclass(slots=True)
+class GroupSlotInfo:
+    schedule_slots: list[str] = field(default_factory=list)
+    next_session_date: date | None = None
+
+    @property
+    def schedule_summary(self) -> str | None:
+        return ", ".join(self.schedule_slots) if self.schedule_slots else None
+
+
+def format_group_schedule_time_label(time_from, time_to) -> str:
+    start = time_from or None
+    end = time_to or None
+    if start and end:
+        return f"{start.strftime('%H:%M')}-{end.strftime('%H:%M')}"
+    if start:
+        return start.strftime("%H:%M")
+    if end:
+        return end.strftime("%H:%M")
+    return "Время не указано"
+
+
+def _slot_label(row) -> str:
+    weekday_index = row.date.weekday()
+    weekday_label = (
+        GROUP_WEEKDAY_LABELS[weekday_index]
+        if 0 <= weekday_index < len(GROUP_WEEKDAY_LABELS)
+        else row.date.strftime("%A")
+    )
+    time_label = format_group_schedule_time_label(row.time_from or row.start_time, row.time_to or row.end_time)
+    return f"{weekday_label} • {time_label}"
+
+
+def _keyed_group_rows(group_ids: list[int]):
+    """Active dated sessions of the given groups, keyed by group (a row names its group by group_id or object_id)."""
+    columns = (
+        Schedule.id,
+        Schedule.date,
+        Schedule.time_from,
+        Schedule.time_to,
+        Schedule.start_time,
+        Schedule.end_time,
+    )
+    active = and_(
+        Schedule.status.notin_(list(INACTIVE_GROUP_SCHEDULE_STATUSES)),
+        Schedule.date.isnot(None),
+    )
+    by_group_id = select(Schedule.group_id.label("group_key"), *columns).where(active, Schedule.group_id.in_(group_ids))
+    by_object_id = select(Schedule.object_id.label("group_key"), *columns).where(
+        active,
+        Schedule.object_type == "group",
+        Schedule.object_id.in_(group_ids),
+        or_(Schedule.group_id.is_(None), Schedule.group_id != Schedule.object_id),
+    )
+    return union_all(by_group_id, by_object_id).subquery()
+
+
+def _nearest_rows(db, group_ids: list[int], *, today: date, upcoming: bool) -> dict[int, list]:
+    """Up to GROUP_SLOT_SUMMARY_SCAN_LIMIT nearest sessions per group, on or after `today` or before it."""
+    keyed = _keyed_group_rows(group_ids)
+    position = func.row_number().over(
+        partition_by=keyed.c.group_key,
+        order_by=(
+            keyed.c.date.asc() if upcoming else keyed.c.date.desc(),
+            keyed.c.time_from.asc(),
+            keyed.c.start_time.asc(),
+            keyed.c.id.asc(),
+        ),
+    )
+    ranked = (
+        select(keyed, position.label("position"))
+        .where(keyed.c.date >= today if upcoming else keyed.c.date < today)
+        .subquery()
+    )
+    rows = db.execute(
+        select(ranked)
+        .where(ranked.c.position <= GROUP_SLOT_SUMMARY_SCAN_LIMIT)
+        .order_by(ranked.c.group_key, ranked.c.position)
+    ).all()
+    rows_by_group: dict[int, list] = {}
+    for row in rows:
+        rows_by_group.setdefault(int(row.group_key), []).append(row)
+    return rows_by_group
+
+
+def _collect_labels(rows, labels: list[str]) -> None:
+    for row in rows:
+        if len(labels) >= GROUP_SLOT_SUMMARY_MAX_LABELS:
+            return
+        label = _slot_label(row)
+        if label not in labels:
+            labels.append(label)
+
+
+def compute_group_slot_infos(db, group_ids: Iterable, *, today: date | None = None) -> dict[int, GroupSlotInfo]:
+    """
+    Weekday/time labels of the nearest upcoming sessions (or the latest past ones) and the next
+    session date, for all groups at once: one query, plus one for groups with nothing upcoming.
+    """
+    today = today or date.today()
+    normalized_group_ids = _normalize_group_ids(group_ids)
+    if not normalized_group_ids:
+        return {}
+    upcoming = _nearest_rows(db, normalized_group_ids, today=today, upcoming=True)
+    result: dict[int, GroupSlotInfo] = {}
+    for group_id in normalized_group_ids:
+        rows = upcoming.get(group_id, [])
+        result[group_id] = GroupSlotInfo(next_session_date=rows[0].date if rows else None)
+        _collect_labels(rows, result[group_id].schedule_slots)
+    without_upcoming = [group_id for group_id, info in result.items() if not info.schedule_slots]
+    if without_upcoming:
+        past = _nearest_rows(db, without_upcoming, today=today, upcoming=False)
+        for group_id in without_upcoming:
+            _collect_labels(past.get(group_id, []), result[group_id].schedule_slots)
+    return result
+
+
+def compute_group_slot_info(db, group_id: int, *, today: date | None = None) -> GroupSlotInfo:
+    return compute_group_slot_infos(db, [group_id], today=today).get(int(group_id), GroupSlotInfo())
+
+
+def _info_from_row(row: GroupSlotSummary) -> GroupSlotInfo:
+    try:
+        slots = json.loads(row.slots_json or "[]")
+    except ValueError:
+        slots = []
+    return GroupSlotInfo(schedule_slots=[str(item) for item in slots], next_session_date=row.next_session_date)
+
+
+def _normalize_group_ids(group_ids: Iterable) -> list[int]:
+    normalized: set[int] = set()
+    for raw_group_id in group_ids:
+        try:
+            group_id = int(raw_group_id)
+        except (TypeError, ValueError):
+            continue
+        if group_id > 0:
+            normalized.add(group_id)
+    return sorted(normalized)
+
+
+def get_group_slot_infos(db, group_ids: Iterable, *, today: date | None = None) -> dict[int, GroupSlotInfo]:
+    """
+    Reads stored summaries. Groups without one (created before the table existed) and summaries
+    computed on an earlier day, which may be out of date once their next session has passed, are
+    recomputed in memory together until the refresh job rewrites them.
+    """
+    today = today or date.today()
+    normalized_group_ids = _normalize_group_ids(group_ids)
+    if not normalized_group_ids:
+        return {}
+    rows = db.query(GroupSlotSummary).filter(GroupSlotSummary.group_id.in_(normalized_group_ids)).all()
+    rows_by_group = {int(row.group_id): row for row in rows}
+
+    result: dict[int, GroupSlotInfo] = {}
+    for group_id in normalized_group_ids:
+        row = rows_by_group.get(group_id)
+        if row is not None and row.computed_on == today:
+            result[group_id] = _info_from_row(row)
+    missing_group_ids = [group_id for group_id in normalized_group_ids if group_id not in result]
+    result.update(compute_group_slot_infos(db, missing_group_ids, today=today))
+    return result
+
+
+def get_group_next_session_date(db, group_id: int, *, today: date | None = None) -> date | None:
+    return get_group_slot_infos(db, [group_id], today=today).get(int(group_id), GroupSlotInfo()).next_session_date
+
+
+def refresh_group_slot_summaries(db, group_ids: Iterable, *, today: date | None = None) -> int:
+    """Recomputes and stores summaries for the given groups; the caller commits."""
+    today = today or date.today()
+    normalized_group_ids = _normalize_group_ids(group_ids)
+    if not normalized_group_ids:
+        return 0
+    existing_group_ids = {
+        int(group_id)
+        for (group_id,) in db.query(Group.id).filter(Group.id.in_(normalized_group_ids)).all()
+    }
+    rows_by_group = {
+        int(row.group_id): row
+        for row in db.query(GroupSlotSummary).filter(GroupSlotSummary.group_id.in_(normalized_group_ids)).all()
+    }
+    infos = compute_group_slot_infos(db, existing_group_ids, today=today)
+    for group_id in normalized_group_ids:
+        row = rows_by_group.get(group_id)
+        if group_id not in existing_group_ids:
+            if row is not None:
+                db.delete(row)
+            continue
+        info = infos[group_id]
+        if row is None:
+            row = GroupSlotSummary(group_id=group_id)
+            db.add(row)
+        row.slots_json = json.dumps(info.schedule_slots, ensure_ascii=False)
+        row.next_session_date = info.next_session_date
+        row.computed_on = today
+    return len(normalized_group_ids)
+
+
+def refresh_stale_group_slot_summaries(db, *, today: date | None = None) -> int:
+    """Rewrites summaries computed before today and creates missing ones; the caller commits."""
+    today = today or date.today()
+    fresh_group_ids = {
+        int(group_id)
+        for (group_id,) in db.query(GroupSlotSummary.group_id).filter(GroupSlotSummary.computed_on == today).all()
+    }
+    stale_group_ids = [int(group_id) for (group_id,) in db.query(Group.id).all() if int(group_id) not in fresh_group_ids]
+    return refresh_group_slot_summaries(db, stale_group_ids, today=today)
+
+
+def mark_group_schedules_changed(session, group_ids: Iterable) -> None:
+    """For set-based UPDATE/DELETE of Schedule rows, which the session listeners cannot attribute to groups."""
+    changed = _normalize_group_ids(group_ids)
+    if changed:
+        session.info.setdefault(_SESSION_PENDING_KEY, set()).update(changed)
+
+
+def _schedule_group_ids(schedule: Schedule) -> set[int]:
+    state = inspect(schedule)
+    previous_type = (state.attrs.object_type.history.deleted or [schedule.object_type])[0]
+    group_ids = set(state.attrs.group_id.history.deleted or ())
+    if previous_type == "group":
+        group_ids.update(state.attrs.object_id.history.deleted or ())
+    group_ids.add(schedule.group_id)
+    if schedule.object_type == "group":
+        group_ids.add(schedule.object_id)
+    return {int(group_id) for group_id in group_ids if group_id}
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Makes the old group of an expired Schedule show up in attribute history when it is reassigned.
+for _attribute in (Schedule.group_id, Schedule.object_id, Schedule.object_type):
+    event.listen(_attribute, "set", _keep_previous_value, active_history=True, retval=True)
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _collect_changed_group_schedules(session, flush_context, instances):
+    changed: set[int] = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Schedule):
+            changed.update(_schedule_group_ids(obj))
+    if changed:
+        session.info.setdefault(_SESSION_PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _collect_bulk_inserted_group_schedules(orm_execute_state):
+    # insert(Schedule) executed through the session skips flush events.
+    if not orm_execute_state.is_insert:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Schedule:
+        return
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, (list, tuple)) else [parameters or {}]
+    changed: set[int] = set()
+    for row in rows:
+        changed.add(row.get("group_id"))
+        if row.get("object_type") == "group":
+            changed.add(row.get("object_id"))
+    changed = {int(group_id) for group_id in changed if group_id}
+    if changed:
+        orm_execute_state.session.info.setdefault(_SESSION_PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(OrmSession, "before_commit")
+def _refresh_changed_group_summaries(session):
+    # Flush first so the schedule rows of this transaction are visible to the recount;
+    # the summaries written here go out with the commit's own flush.
+    session.flush()
+    pending = session.info.pop(_SESSION_PENDING_KEY, None)
+    if pending:
+        refresh_group_slot_summaries(session, pending)
+
+
+__all__ = [
+    "GROUP_WEEKDAY_LABELS",
+    "GroupSlotInfo",
+    "compute_group_slot_info",
+    "compute_group_slot_infos",
+    "format_group_schedule_time_label",
+    "get_group_next_session_date",
+    "get_group_slot_infos",
+    "mark_group_schedules_changed",
+    "refresh_group_slot_summaries",
+    "refresh_stale_group_slot_summaries",
+]
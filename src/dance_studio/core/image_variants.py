@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from dance_studio.core.config import IMAGE_VARIANT_WORKERS
+from dance_studio.core.media_manager import MEDIA_DIR, PROJECT_ROOT
+from dance_studio.core.metrics import metrics
+
+_logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; the image is never upscaled.
+IMAGE_VARIANT_SIZES = {
+    "thumb": 320,
+    "medium": 960,
+}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_SOURCE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+IMAGE_VARIANT_QUEUE = metrics.gauge("image_variant_queue_depth", "Uploaded images waiting for (or in) variant generation.")
+
+
+def variant_path(original: Path, variant: str) -> Path:
+    if variant not in IMAGE_VARIANT_SIZES:
+        raise ValueError(f"unknown image variant: {variant}")
+    return original.with_name(f"{original.stem}.{variant}.webp")
+
+
+def is_variant_file(path: Path) -> bool:
+    name = path.name
+    return any(name.endswith(f".{variant}.webp") for variant in IMAGE_VARIANT_SIZES)
+
+
+def resolve_media_file(stored_path: str | None) -> Path | None:
+    """Maps a stored relative path (var/media/..., media/..., database/media/...) to a file on disk."""
+    normalized = str(stored_path or "").strip().replace("\\", "/").lstrip("/")
+    if not normalized:
+        return None
+    if normalized.startswith("var/media/"):
+        candidate = MEDIA_DIR / normalized[len("var/media/"):]
+    elif normalized.startswith("media/"):
+        candidate = MEDIA_DIR / normalized[len("media/"):]
+    elif normalized.startswith("database/media/"):
+        candidate = PROJECT_ROOT / normalized
+    else:
+        return None
+    return candidate if candidate.is_file() else None
+
+
+def remove_image_variants(original: Path) -> None:
+    for variant in IMAGE_VARIANT_SIZES:
+        try:
+            variant_path(original, variant).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def generate_image_variants(original: Path) -> dict[str, Path]:
+    """Writes WebP variants next to the original. EXIF is applied to orientation and then dropped."""
+    # Pillow is only needed by the upload workers, not by every process that imports this module.
+    from PIL import Image, ImageOps
+
+    largest = max(IMAGE_VARIANT_SIZES.values())
+    result: dict[str, Path] = {}
+    with Image.open(original) as source:
+        # Lets the JPEG decoder downscale by a power of two instead of decoding full resolution.
+        source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    for variant, max_edge in sorted(IMAGE_VARIANT_SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        target = variant_path(original, variant)
+        tmp_path = target.with_name(f"{target.name}.tmp")
+        image.save(tmp_path, format="WEBP", quality=IMAGE_VARIANT_QUALITY, method=4)
+        os.replace(tmp_path, target)
+        result[variant] = target
+    return result
+
+
+def _generate_logged(original: Path) -> dict[str, Path]:
+    try:
+        return generate_image_variants(original)
+    except Exception:
+        _logger.exception("image variants failed for %s", original)
+        return {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_VARIANT_WORKERS, thread_name_prefix="image-variants")
+        return _executor
+
+
+def schedule_image_variants(original: str | os.PathLike) -> Future:
+    """
+    Drops stale variants of an uploaded image and queues generation of fresh ones.
+    Serializers fall back to the original until the variants exist.
+    """
+    original = Path(original)
+    remove_image_variants(original)
+    if IMAGE_VARIANT_WORKERS <= 0:
+        future: Future = Future()
+        future.set_result(_generate_logged(original))
+        return future
+    IMAGE_VARIANT_QUEUE.inc()
+    future = _get_executor().submit(_generate_logged, original)
+    future.add_done_callback(lambda _: IMAGE_VARIANT_QUEUE.dec())
+    return future
+
+
+@dataclass(slots=True)
+class BackfillResult:
+    generated: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+
+def _is_up_to_date(original: Path) -> bool:
+    source_mtime = original.stat().st_mtime
+    for variant in IMAGE_VARIANT_SIZES:
+        target = variant_path(original, variant)
+        if not target.exists() or target.stat().st_mtime < source_mtime:
+            return False
+    return True
+
+
+def backfill_image_variants(media_dir: Path = MEDIA_DIR, *, force: bool = False, workers: int = 1) -> BackfillResult:
+    result = BackfillResult()
+    pending: list[Path] = []
+    for path in sorted(media_dir.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in IMAGE_VARIANT_SOURCE_SUFFIXES or is_variant_file(path):
+            continue
+        if not force and _is_up_to_date(path):
+            result.skipped += 1
+            continue
+        pending.append(path)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-backfill") as pool:
+        for variants in pool.map(_generate_logged, pending):
+            if variants:
+                result.generated += 1
+            else:
+                result.failed += 1
+    return result
+
+
+__all__ = [
+    "BackfillResult",
+    "IMAGE_VARIANT_SIZES",
+    "backfill_image_variants",
+    "generate_image_variants",
+    "is_variant_file",
+    "remove_image_variants",
+    "resolve_media_file",
+    "schedule_image_variants",
+    "variant_path",
+]
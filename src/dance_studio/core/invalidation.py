@@ -0,0 +1,284 @@
+"""
+Cross-process cache invalidation.
+
+Commits that touch a watched model publish a typed topic: the topic is written to
+`cache_invalidation_events` inside the same transaction and, on Postgres, announced with NOTIFY.
+The committing process evicts its own caches right after the commit; every other process (web
+workers, the bot) runs a listener thread that picks the event up and calls its subscribers.
+The event table is the source of truth, NOTIFY only wakes listeners early, so SQLite (and a
+listener that missed a notification while reconnecting) simply polls. Listeners read the table
+through an EventCursor, so an event committed after a higher id was already read still arrives.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import threading
+import uuid
+from typing import Callable, Iterable
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session as OrmSession
+
+from dance_studio.core.config import CACHE_INVALIDATION_POLL_SECONDS
+from dance_studio.core.event_cursor import EventCursor, cursor_at_end
+from dance_studio.core.metrics import metrics
+from dance_studio.db.models import (
+    AppSetting,
+    AuthIdentity,
+    BookingRequest,
+    CacheInvalidationEvent,
+    Direction,
+    Group,
+    GroupAbonement,
+    Schedule,
+    Staff,
+)
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_CHANGED = "settings_changed"
+SCHEDULE_CHANGED = "schedule_changed"
+STAFF_CHANGED = "staff_changed"
+ENROLLMENT_CHANGED = "enrollment_changed"
+
+TOPIC_MODELS = {
+    SETTINGS_CHANGED: (AppSetting,),
+    SCHEDULE_CHANGED: (Direction, Group, Schedule),
+    # Public staff cards show the teacher's Telegram handle from their identity.
+    STAFF_CHANGED: (AuthIdentity, Staff),
+    ENROLLMENT_CHANGED: (BookingRequest, GroupAbonement),
+}
+_MODEL_TOPICS = {model: topic for topic, models in TOPIC_MODELS.items() for model in models}
+
+NOTIFY_CHANNEL = "dance_studio_invalidation"
+# Set during a transaction, moved to _COMMITTED_KEY once the events are written.
+_PENDING_KEY = "invalidation_topics"
+_COMMITTED_KEY = "invalidation_topics_committed"
+
+INVALIDATION_EVENTS_RECEIVED = metrics.counter(
+    "cache_invalidation_events_received",
+    "Invalidation events from other processes handled by this one.",
+    ("topic",),
+)
+
+Subscriber = Callable[[str], None]
+
+
+def _topic_for(obj) -> str | None:
+    return _MODEL_TOPICS.get(type(obj))
+
+
+def publish(session, *topics: str) -> None:
+    """Publishes topics with the session's next commit, for writes the model tracking cannot see (raw SQL)."""
+    session.info.setdefault(_PENDING_KEY, set()).update(topics)
+
+
+class InvalidationBus:
+    def __init__(self, session_factory=None, *, poll_seconds: float = CACHE_INVALIDATION_POLL_SECONDS) -> None:
+        self._session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.origin = f"{os.getpid()}:{uuid.uuid4().hex[:16]}"
+        self._subscribers: dict[str, list[Subscriber]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._thread_pid: int | None = None
+        self._stop = threading.Event()
+        self._cursor: EventCursor | None = None
+        self._listen_connection = None
+
+    def subscribe(self, topics: str | Iterable[str], callback: Subscriber) -> None:
+        for topic in [topics] if isinstance(topics, str) else topics:
+            if topic not in TOPIC_MODELS:
+                raise ValueError(f"unknown invalidation topic: {topic}")
+            with self._lock:
+                self._subscribers.setdefault(topic, []).append(callback)
+
+    def dispatch(self, topics: Iterable[str]) -> None:
+        for topic in sorted(set(topics)):
+            with self._lock:
+                callbacks = list(self._subscribers.get(topic, ()))
+            for callback in callbacks:
+                try:
+                    callback(topic)
+                except Exception:
+                    logger.exception("invalidation subscriber failed for %s", topic)
+
+    def _session(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        import dance_studio.db as db_module
+
+        return db_module.get_session()
+
+    def poll(self) -> set[str]:
+        """Dispatches topics published by other processes since the previous poll; returns them."""
+        db = self._session()
+        try:
+            if self._cursor is None:
+                # Start from now: caches are empty at startup, only commits still in flight matter.
+                self._cursor = cursor_at_end(db, CacheInvalidationEvent.id)
+                return set()
+            rows = db.execute(
+                select(CacheInvalidationEvent.id, CacheInvalidationEvent.topic, CacheInvalidationEvent.origin)
+                .where(self._cursor.unseen(CacheInvalidationEvent.id))
+                .order_by(CacheInvalidationEvent.id)
+            ).all()
+        finally:
+            db.close()
+        fresh = set(self._cursor.advance(row.id for row in rows))
+        rows = [row for row in rows if row.id in fresh]
+        if not rows:
+            return set()
+        topics = {row.topic for row in rows if row.origin != self.origin}
+        for topic in topics:
+            INVALIDATION_EVENTS_RECEIVED.inc(topic=topic)
+        self.dispatch(topics)
+        return topics
+
+    def start(self) -> None:
+        """Starts the listener thread once per process (a forked worker gets its own)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+                return
+            self._stop.clear()
+            self._cursor = None
+            self._listen_connection = None
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._close_listen_connection()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("cache invalidation poll failed")
+            self._wait()
+
+    def _wait(self) -> None:
+        connection = self._listen()
+        if connection is None:
+            self._stop.wait(self.poll_seconds)
+            return
+        try:
+            # Returns on the first NOTIFY or after poll_seconds, whichever comes first.
+            for _ in connection.notifies(timeout=self.poll_seconds, stop_after=1):
+                pass
+        except Exception:
+            logger.warning("LISTEN connection lost, polling until it is back", exc_info=True)
+            self._close_listen_connection()
+            self._stop.wait(self.poll_seconds)
+
+    def _listen(self):
+        if self._listen_connection is not None:
+            return self._listen_connection
+        db = self._session()
+        try:
+            url = db.get_bind().url
+        finally:
+            db.close()
+        if url.get_backend_name() != "postgresql" or url.get_driver_name() != "psycopg":
+            return None
+        try:
+            import psycopg
+
+            connection = psycopg.connect(
+                url.set(drivername="postgresql").render_as_string(hide_password=False),
+                autocommit=True,
+            )
+            connection.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        except Exception:
+            logger.warning("LISTEN %s failed, polling instead", NOTIFY_CHANNEL, exc_info=True)
+            return None
+        self._listen_connection = connection
+        return connection
+
+    def _close_listen_connection(self) -> None:
+        connection, self._listen_connection = self._listen_connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+invalidation_bus = InvalidationBus()
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _track_model_changes(session, flush_context, instances):
+    topics = set()
+    for obj in itertools.chain(session.new, session.deleted):
+        topic = _topic_for(obj)
+        if topic:
+            topics.add(topic)
+    for obj in session.dirty:
+        topic = _topic_for(obj)
+        if topic and topic not in topics and session.is_modified(obj, include_collections=False):
+            topics.add(topic)
+    if topics:
+        session.info.setdefault(_PENDING_KEY, set()).update(topics)
+
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    topic = _MODEL_TOPICS.get(mapper.class_) if mapper is not None else None
+    if topic:
+        orm_execute_state.session.info.setdefault(_PENDING_KEY, set()).add(topic)
+
+
+@event.listens_for(OrmSession, "before_commit")
+def _write_events(session):
+    # Flush first so the commit's own final flush cannot add topics after the events are written.
+    session.flush()
+    topics = session.info.pop(_PENDING_KEY, None)
+    if not topics:
+        return
+    session.execute(
+        insert(CacheInvalidationEvent),
+        [{"topic": topic, "origin": invalidation_bus.origin} for topic in sorted(topics)],
+    )
+    if session.get_bind().dialect.name == "postgresql":
+        for topic in sorted(topics):
+            # Delivered by Postgres only if and when this transaction commits.
+            session.execute(select(func.pg_notify(NOTIFY_CHANNEL, topic)))
+    session.info.setdefault(_COMMITTED_KEY, set()).update(topics)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _dispatch_locally(session):
+    topics = session.info.pop(_COMMITTED_KEY, None)
+    if topics:
+        invalidation_bus.dispatch(topics)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_topics(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_COMMITTED_KEY, None)
+
+
+__all__ = [
+    "ENROLLMENT_CHANGED",
+    "NOTIFY_CHANNEL",
+    "SCHEDULE_CHANGED",
+    "SETTINGS_CHANGED",
+    "STAFF_CHANGED",
+    "TOPIC_MODELS",
+    "InvalidationBus",
+    "invalidation_bus",
+    "publish",
+]
@@ -75,6 +75,9 @@ def save_user_photo(user_id, file_data, filename="profile.jpg"):
         
         with open(file_path, 'wb') as f:
             f.write(file_data)
+
+        from dance_studio.core.image_variants import schedule_image_variants
+        schedule_image_variants(file_path)
         
         # Возвращаем относительный путь от корня проекта
         relative_path = os.path.relpath(file_path, BASE_DIR)
@@ -98,6 +101,8 @@ def delete_user_photo(photo_path):
     try:
         full_path = os.path.join(BASE_DIR, photo_path)
         if os.path.exists(full_path):
+            from dance_studio.core.image_variants import remove_image_variants
+            remove_image_variants(Path(full_path))
             os.remove(full_path)
             print(f"✓ Фото удалено: {photo_path}")
             return True
@@ -0,0 +1,264 @@
+"""
+Notification fan-out that runs after the admin's request has returned.
+
+A route queues a batch in its own transaction (queue_notification_batch) and answers with the
+batch id; once that transaction commits, a background thread delivers it and the UI polls
+/api/admin/notification-batches/<id> for the outcome. A rolled back transaction sends nothing.
+Progress is committed after every recipient, so the bot's sweep resumes a batch whose worker died
+where it stopped: only the recipient being sent to at the moment of the crash can get the message
+twice.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime, timedelta
+from threading import Thread
+from typing import Iterable
+
+from sqlalchemy import and_, event, or_, update
+from sqlalchemy.orm import Session as OrmSession
+
+from dance_studio.core.time import utcnow
+from dance_studio.db.models import NotificationBatch
+from dance_studio.notifications.services.notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+BATCH_STATUS_QUEUED = "queued"
+BATCH_STATUS_RUNNING = "running"
+BATCH_STATUS_DONE = "done"
+# The committing process starts delivery at once; the sweep only picks up what it did not.
+NOTIFICATION_BATCH_SWEEP_AFTER = timedelta(minutes=2)
+# A running batch without progress for this long lost its worker and may be claimed again. Progress
+# is saved per recipient, and one send (a few provider calls with their timeouts) is far shorter.
+NOTIFICATION_BATCH_STALE_AFTER = timedelta(minutes=10)
+_PENDING_KEY = "notification_batches_pending"
+
+
+def _normalize_recipients(recipients: Iterable) -> list[dict]:
+    """Accepts user ids or (user_id, body) pairs; keeps the first entry per user."""
+    normalized: list[dict] = []
+    seen: set[int] = set()
+    for item in recipients or []:
+        user_id, body = item if isinstance(item, tuple) else (item, None)
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            continue
+        if user_id <= 0 or user_id in seen:
+            continue
+        seen.add(user_id)
+        normalized.append({"user_id": user_id, "body": body} if body else {"user_id": user_id})
+    return normalized
+
+
+def queue_notification_batch(
+    session,
+    *,
+    event_type: str,
+    title: str,
+    body: str,
+    recipients: Iterable,
+    payload: dict | None = None,
+    staff_id: int | None = None,
+) -> NotificationBatch | None:
+    """Adds a batch to the session's transaction; delivery starts after commit. None without recipients."""
+    normalized = _normalize_recipients(recipients)
+    if not normalized:
+        return None
+    batch = NotificationBatch(
+        event_type=event_type,
+        title=title,
+        body=body,
+        payload_json=json.dumps(payload, ensure_ascii=False) if payload else None,
+        recipients_json=json.dumps(normalized, ensure_ascii=False),
+        status=BATCH_STATUS_QUEUED,
+        recipient_count=len(normalized),
+        processed_count=0,
+        sent_count=0,
+        created_by_staff_id=staff_id,
+    )
+    session.add(batch)
+    session.flush()
+    session.info.setdefault(_PENDING_KEY, []).append(int(batch.id))
+    return batch
+
+
+def claim_notification_batch(db, batch_id: int, *, now: datetime | None = None) -> bool:
+    """Atomically takes a queued (or abandoned) batch; exactly one worker wins."""
+    now = now or utcnow()
+    result = db.execute(
+        update(NotificationBatch)
+        .where(
+            NotificationBatch.id == batch_id,
+            or_(
+                NotificationBatch.status == BATCH_STATUS_QUEUED,
+                and_(
+                    NotificationBatch.status == BATCH_STATUS_RUNNING,
+                    NotificationBatch.updated_at < now - NOTIFICATION_BATCH_STALE_AFTER,
+                ),
+            ),
+        )
+        .values(status=BATCH_STATUS_RUNNING, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def deliver_notification_batch(
+    db,
+    batch_id: int,
+    *,
+    service: NotificationService | None = None,
+) -> NotificationBatch | None:
+    """Sends a claimed batch from where it stopped; None when another worker has it or it is finished."""
+    if not claim_notification_batch(db, batch_id):
+        return None
+    batch = db.get(NotificationBatch, batch_id, populate_existing=True)
+    recipients = json.loads(batch.recipients_json or "[]")
+    payload = {"parse_mode": "HTML"}
+    payload.update(json.loads(batch.payload_json or "{}"))
+    failed_user_ids = json.loads(batch.failed_user_ids_json or "[]")
+    service = service or NotificationService()
+
+    for position in range(int(batch.processed_count or 0), len(recipients)):
+        recipient = recipients[position]
+        user_id = recipient["user_id"]
+        try:
+            notification = service.send(
+                db,
+                user_id=user_id,
+                event_type=batch.event_type,
+                title=batch.title,
+                body=recipient.get("body") or batch.body,
+                payload=payload,
+            )
+        except Exception:
+            logger.exception("Failed to send %s notification to user %s", batch.event_type, user_id)
+            # Drops whatever the failed send left half-flushed; the batch reloads its committed state.
+            db.rollback()
+            notification = None
+        if str(getattr(notification, "status", "") or "").strip().lower() == "sent":
+            batch.sent_count = int(batch.sent_count or 0) + 1
+        else:
+            failed_user_ids.append(user_id)
+            batch.failed_user_ids_json = json.dumps(failed_user_ids)
+        # Saved with the delivery rows, and keeps the batch from looking abandoned to the sweep.
+        batch.processed_count = position + 1
+        batch.updated_at = utcnow()
+        db.commit()
+
+    sent_count = int(batch.sent_count or 0)
+    if recipients and sent_count < len(recipients):
+        batch.error = "group_notification_delivery_failed" if sent_count == 0 else "group_notification_delivery_partial"
+    batch.status = BATCH_STATUS_DONE
+    batch.finished_at = batch.updated_at = utcnow()
+    db.commit()
+    return batch
+
+
+def serialize_notification_batch(batch: NotificationBatch) -> dict:
+    return {
+        "id": batch.id,
+        "event_type": batch.event_type,
+        "status": batch.status,
+        "finished": batch.status == BATCH_STATUS_DONE,
+        "recipient_count": int(batch.recipient_count or 0),
+        "processed_count": int(batch.processed_count or 0),
+        "sent_count": int(batch.sent_count or 0),
+        "failed_user_ids": json.loads(batch.failed_user_ids_json or "[]"),
+        "error": batch.error,
+        "created_at": batch.created_at.isoformat() if batch.created_at else None,
+        "finished_at": batch.finished_at.isoformat() if batch.finished_at else None,
+    }
+
+
+def _deliver_in_background(batch_ids: list[int], session_factory=None) -> None:
+    if session_factory is None:
+        import dance_studio.db as db_module
+
+        session_factory = db_module.get_session
+
+    for batch_id in batch_ids:
+        db = session_factory()
+        try:
+            batch = deliver_notification_batch(db, batch_id)
+            if batch is not None:
+                logger.info(
+                    "notification batch %s (%s): %s of %s sent",
+                    batch_id,
+                    batch.event_type,
+                    batch.sent_count,
+                    batch.recipient_count,
+                )
+        except Exception:
+            db.rollback()
+            logger.exception("notification batch %s failed; the sweep will resume it", batch_id)
+        finally:
+            db.close()
+
+
+def _start_delivery(batch_ids: list[int]) -> None:
+    Thread(
+        target=_deliver_in_background,
+        args=(batch_ids,),
+        name="notification-batches",
+        daemon=True,
+    ).start()
+
+
+def deliver_pending_notification_batches(session_factory, *, now: datetime | None = None) -> int:
+    """Bot job: delivers batches nobody started in time and resumes abandoned ones."""
+    now = now or utcnow()
+    db = session_factory()
+    try:
+        batch_ids = [
+            int(batch_id)
+            for (batch_id,) in db.query(NotificationBatch.id)
+            .filter(
+                or_(
+                    and_(
+                        NotificationBatch.status == BATCH_STATUS_QUEUED,
+                        NotificationBatch.created_at < now - NOTIFICATION_BATCH_SWEEP_AFTER,
+                    ),
+                    and_(
+                        NotificationBatch.status == BATCH_STATUS_RUNNING,
+                        NotificationBatch.updated_at < now - NOTIFICATION_BATCH_STALE_AFTER,
+                    ),
+                )
+            )
+            .order_by(NotificationBatch.id.asc())
+            .all()
+        ]
+    finally:
+        db.close()
+    if batch_ids:
+        _deliver_in_background(batch_ids, session_factory)
+    return len(batch_ids)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _start_queued_batches(session):
+    batch_ids = session.info.pop(_PENDING_KEY, None)
+    if batch_ids:
+        _start_delivery(batch_ids)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_queued_batches(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+__all__ = [
+    "BATCH_STATUS_DONE",
+    "BATCH_STATUS_QUEUED",
+    "BATCH_STATUS_RUNNING",
+    "claim_notification_batch",
+    "deliver_notification_batch",
+    "deliver_pending_notification_batches",
+    "queue_notification_batch",
+    "serialize_notification_batch",
+]
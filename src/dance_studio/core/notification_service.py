@@ -17,7 +17,11 @@ from dance_studio.core.telegram_http import telegram_api_post
 from dance_studio.db import get_session
 from dance_studio.db.models import User
 from dance_studio.notifications.providers.telegram import TelegramNotificationProvider
-from dance_studio.notifications.services.notification_service import NotificationService
+from dance_studio.notifications.services.notification_service import (
+    PROVIDER_DELIVERIES,
+    PROVIDER_SEND_SECONDS,
+    NotificationService,
+)
 
 _logger = logging.getLogger(__name__)
 _telegram_provider = TelegramNotificationProvider()
@@ -97,13 +101,16 @@ def _resolve_user_for_notification(db, user_or_telegram_id: int) -> User | None:
 
 
 def _send_direct_telegram(target_ref: int | str, text: str, payload: dict) -> tuple[bool, str | None]:
-    result = _telegram_provider.send(
-        str(target_ref),
-        "",
-        text,
-        payload=payload,
-    )
-    return bool(result.get("ok")), str(result.get("error") or "").strip() or None
+    with PROVIDER_SEND_SECONDS.time(provider="telegram_direct"):
+        result = _telegram_provider.send(
+            str(target_ref),
+            "",
+            text,
+            payload=payload,
+        )
+    ok = bool(result.get("ok"))
+    PROVIDER_DELIVERIES.inc(provider="telegram_direct", result="sent" if ok else "failed")
+    return ok, str(result.get("error") or "").strip() or None
 
 
 def _iter_direct_telegram_targets(db, original_user_id: int, resolved_user: User | None) -> list[int]:
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from dance_studio.core.metrics import MetricFamily, metrics
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+LATENCY_WINDOW = 1024
+TOP_STATEMENTS = 5
+_STATEMENT_PREVIEW_CHARS = 300
+_START_ATTR = "_profiling_started"
+
+_current_profile: ContextVar[QueryProfile | None] = ContextVar("query_profile", default=None)
+
+
+@dataclass(slots=True)
+class StatementStat:
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+@dataclass(slots=True)
+class QueryProfile:
+    """SQL statements issued inside one request or background job run."""
+
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    sql_seconds: float = 0.0
+    statements: dict[str, StatementStat] = field(default_factory=dict)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.sql_seconds += seconds
+        stat = self.statements.get(statement)
+        if stat is None:
+            stat = self.statements[statement] = StatementStat()
+        stat.count += 1
+        stat.total_seconds += seconds
+        stat.max_seconds = max(stat.max_seconds, seconds)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def top_statements(self, limit: int = TOP_STATEMENTS) -> list[dict]:
+        # Grouped by statement text, so an N+1 loop shows up as one entry with a high count.
+        ranked = sorted(self.statements.items(), key=lambda item: item[1].total_seconds, reverse=True)
+        return [
+            {
+                "statement": " ".join(statement.split())[:_STATEMENT_PREVIEW_CHARS],
+                "count": stat.count,
+                "total_ms": round(stat.total_seconds * 1000, 2),
+                "max_ms": round(stat.max_seconds * 1000, 2),
+            }
+            for statement, stat in ranked[:limit]
+        ]
+
+
+def current_profile() -> QueryProfile | None:
+    return _current_profile.get()
+
+
+def start_profile(name: str):
+    """Activates a new profile in the current context; pass the token to finish_profile()."""
+    profile = QueryProfile(name=name)
+    return profile, _current_profile.set(profile)
+
+
+def finish_profile(token) -> None:
+    try:
+        _current_profile.reset(token)
+    except ValueError:
+        # Reset from a different context (e.g. a teardown after a copied context); just detach.
+        _current_profile.set(None)
+
+
+@contextmanager
+def profile_scope(name: str):
+    profile, token = start_profile(name)
+    try:
+        yield profile
+    finally:
+        finish_profile(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_profile.get() is not None:
+        setattr(context, _START_ATTR, time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, _START_ATTR, None) if context is not None else None
+    if started is None:
+        return
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+
+@contextmanager
+def count_queries(engine, name: str = "count_queries"):
+    """
+    Counts every statement the engine runs while the block is active, from any thread or context.
+    Independent of the per-request profiles, so it also sees statements issued inside a profiled request.
+    """
+    profile = QueryProfile(name=name)
+    starts: dict[int, float] = {}
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        starts[id(cursor)] = time.perf_counter()
+
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = starts.pop(id(cursor), None)
+        profile.record(statement, time.perf_counter() - started if started is not None else 0.0)
+
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+    try:
+        yield profile
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+        event.remove(engine, "after_cursor_execute", _after)
+
+
+def install_query_profiler(engine) -> None:
+    """Counts and times statements of the engine into whichever profile is active in the caller's context."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@dataclass(slots=True)
+class _Series:
+    count: int = 0
+    total_seconds: float = 0.0
+    total_queries: int = 0
+    max_queries: int = 0
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    query_buckets: list[int] = field(default_factory=lambda: [0] * (len(QUERY_COUNT_BUCKETS) + 1))
+    recent_ms: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+
+def _percentile(ordered: list[float], fraction: float) -> float | None:
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+class ProfileStats:
+    """Per-endpoint (or per-job) latency and query-count aggregates since process start."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: dict[str, _Series] = {}
+
+    def record(self, name: str, *, seconds: float, queries: int) -> None:
+        duration_ms = seconds * 1000
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series()
+            series.count += 1
+            series.total_seconds += seconds
+            series.total_queries += queries
+            series.max_queries = max(series.max_queries, queries)
+            series.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+            series.query_buckets[bisect.bisect_left(QUERY_COUNT_BUCKETS, queries)] += 1
+            series.recent_ms.append(duration_ms)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            items = [(name, series, sorted(series.recent_ms)) for name, series in self._series.items()]
+        return {
+            name: {
+                "count": series.count,
+                "total_seconds": round(series.total_seconds, 6),
+                "p50_ms": _percentile(recent, 0.5),
+                "p95_ms": _percentile(recent, 0.95),
+                "avg_queries": round(series.total_queries / series.count, 2) if series.count else 0,
+                "max_queries": series.max_queries,
+                "total_queries": series.total_queries,
+                "latency_ms_buckets": _bucket_counts(LATENCY_BUCKETS_MS, series.latency_buckets),
+                "query_count_buckets": _bucket_counts(QUERY_COUNT_BUCKETS, series.query_buckets),
+            }
+            for name, series, recent in items
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def _bucket_counts(bounds, counts) -> dict[str, int]:
+    labels = [str(bound) for bound in bounds] + ["+Inf"]
+    return dict(zip(labels, counts))
+
+
+profile_stats = ProfileStats()
+
+
+def _query_count_metrics():
+    family = MetricFamily(
+        "profile_queries",
+        "histogram",
+        "SQL statements per request route or background job run.",
+    )
+    for name, stats in profile_stats.snapshot().items():
+        cumulative = 0
+        for bound, count in stats["query_count_buckets"].items():
+            cumulative += count
+            family.add(cumulative, "_bucket", name=name, le=bound)
+        family.add(stats["count"], "_count", name=name)
+        family.add(stats["total_queries"], "_sum", name=name)
+    return [family]
+
+
+metrics.register_collector("profile_queries", _query_count_metrics)
+
+
+def record_profile(
+    profile: QueryProfile,
+    *,
+    seconds: float,
+    slow_threshold_ms: int,
+    logger: logging.Logger,
+    context: str = "",
+) -> None:
+    """Adds a finished profile to profile_stats and logs it with its heaviest statements when slow."""
+    profile_stats.record(profile.name, seconds=seconds, queries=profile.queries)
+    if slow_threshold_ms <= 0 or seconds * 1000 < slow_threshold_ms:
+        return
+    logger.warning(
+        "slow %s%s: %.0fms, %s queries (%.0fms in SQL), top statements: %s",
+        profile.name,
+        f" {context}" if context else "",
+        seconds * 1000,
+        profile.queries,
+        profile.sql_seconds * 1000,
+        profile.top_statements(),
+    )
+
+
+__all__ = [
+    "LATENCY_BUCKETS_MS",
+    "QUERY_COUNT_BUCKETS",
+    "ProfileStats",
+    "QueryProfile",
+    "count_queries",
+    "current_profile",
+    "finish_profile",
+    "install_query_profiler",
+    "profile_scope",
+    "profile_stats",
+    "record_profile",
+    "start_profile",
+]
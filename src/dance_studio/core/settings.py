@@ -198,6 +198,8 @@ DATABASE_POOL_SIZE = max(1, _parse_int(os.getenv('DATABASE_POOL_SIZE', '3'), 3)
 DATABASE_MAX_OVERFLOW = max(0, _parse_int(os.getenv('DATABASE_MAX_OVERFLOW', '2'), 2) or 2)
 DATABASE_POOL_TIMEOUT_SECONDS = max(1, _parse_int(os.getenv('DATABASE_POOL_TIMEOUT_SECONDS', '30'), 30) or 30)
 DATABASE_POOL_RECYCLE_SECONDS = max(30, _parse_int(os.getenv('DATABASE_POOL_RECYCLE_SECONDS', '1800'), 1800) or 1800)
+DATABASE_REPLICA_URL = (os.getenv('DATABASE_REPLICA_URL', '') or '').strip()
+DATABASE_REPLICA_MAX_LAG_SECONDS = max(1, _parse_int(os.getenv('DATABASE_REPLICA_MAX_LAG_SECONDS', '5'), 5) or 5)
 ENV = os.getenv('ENV', 'dev').strip().lower()
 
 _migrate_default = '1' if ENV == 'dev' else '0'
@@ -215,6 +217,24 @@ BACKUP_AGE_RECIPIENTS = _parse_str_list(
 )
 BACKUP_AGE_BINARY = (os.getenv('BACKUP_AGE_BINARY', '') or '').strip()
 BACKUP_TELEGRAM_PROXY = (os.getenv('BACKUP_TELEGRAM_PROXY', '') or '').strip()
+BACKUP_MEDIA_INCREMENTAL = _parse_bool(os.getenv('BACKUP_MEDIA_INCREMENTAL', '1'), True)
+BACKUP_MEDIA_FULL_INTERVAL_DAYS = max(1, _parse_int(os.getenv('BACKUP_MEDIA_FULL_INTERVAL_DAYS', '7'), 7) or 7)
+IMAGE_VARIANT_WORKERS = max(0, _parse_int(os.getenv('IMAGE_VARIANT_WORKERS', '2'), 2) or 0)
+RESPONSE_COMPRESSION_ENABLED = _parse_bool(os.getenv('RESPONSE_COMPRESSION_ENABLED', '1'), True)
+RESPONSE_COMPRESSION_MIN_BYTES = max(0, _parse_int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'), 1024) or 0)
+REQUEST_PROFILING_ENABLED = _parse_bool(os.getenv('REQUEST_PROFILING_ENABLED', '1'), True)
+SLOW_REQUEST_LOG_MS = max(0, _parse_int(os.getenv('SLOW_REQUEST_LOG_MS', '1000'), 1000) or 0)
+SLOW_JOB_LOG_MS = max(0, _parse_int(os.getenv('SLOW_JOB_LOG_MS', '10000'), 10000) or 0)
+METRICS_ALLOW_LOCAL = _parse_bool(os.getenv('METRICS_ALLOW_LOCAL', '1'), True)
+BOT_METRICS_PORT = max(0, _parse_int(os.getenv('BOT_METRICS_PORT', '0'), 0) or 0)
+# run_all.py: the bot runs apart from the gunicorn workers and needs a /metrics of its own (0 turns it off).
+COMBINED_BOT_METRICS_PORT = max(0, _parse_int(os.getenv('COMBINED_BOT_METRICS_PORT', '9101'), 9101) or 0)
+AUTH_RATE_LIMIT_BACKEND = (os.getenv('AUTH_RATE_LIMIT_BACKEND', 'database') or 'database').strip().lower()
+CACHE_INVALIDATION_POLL_SECONDS = max(1, _parse_int(os.getenv('CACHE_INVALIDATION_POLL_SECONDS', '2'), 2) or 2)
+COMBINED_WEB_SERVER = (os.getenv('COMBINED_WEB_SERVER', 'gunicorn') or 'gunicorn').strip().lower()
+COMBINED_WEB_WORKERS = max(1, _parse_int(os.getenv('COMBINED_WEB_WORKERS', '2'), 2) or 1)
+COMBINED_WEB_THREADS = max(1, _parse_int(os.getenv('COMBINED_WEB_THREADS', '4'), 4) or 1)
+COMBINED_WEB_MAX_REQUESTS = max(0, _parse_int(os.getenv('COMBINED_WEB_MAX_REQUESTS', '1000'), 1000) or 0)
 TELEGRAM_PROXY = (os.getenv('TELEGRAM_PROXY', '') or '').strip()
 
 VK_MINI_APP_SERVICE_KEY = (os.getenv('VK_MINI_APP_SERVICE_KEY', '') or '').strip()
@@ -1,4 +1,4 @@
-﻿from sqlalchemy import Column, Integer, BigInteger, String, Date, Time, DateTime, Text, ForeignKey, Index, CheckConstraint, Boolean, UniqueConstraint, event, text
+﻿from sqlalchemy import Column, Integer, BigInteger, String, Date, Time, DateTime, Text, ForeignKey, Index, CheckConstraint, Boolean, Float, UniqueConstraint, event, text
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 from dance_studio.core.time import utcnow
@@ -90,6 +90,44 @@ class UsedInitData(Base):
     )
 
 
+class AuthRateLimitBucket(Base):
+    __tablename__ = "auth_rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True)  # "<action>:<subject>"
+    tokens = Column(Float, nullable=False)
+    refilled_at = Column(Float, nullable=False)  # unix time of the last refill, shared by all workers
+
+    __table_args__ = (
+        Index("ix_auth_rate_limit_buckets_refilled_at", "refilled_at"),
+    )
+
+
+class CacheInvalidationEvent(Base):
+    __tablename__ = "cache_invalidation_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    topic = Column(String(64), nullable=False)  # settings_changed, schedule_changed, ...
+    origin = Column(String(64), nullable=False)  # publishing process, which already evicted locally
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_cache_invalidation_events_created_at", "created_at"),
+    )
+
+
+class AdminFeedEvent(Base):
+    __tablename__ = "admin_feed_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # SSE event id / Last-Event-ID
+    kind = Column(String(32), nullable=False)  # booking | payment | attendance
+    entity_id = Column(Integer, nullable=True)  # NULL: a bulk write, clients reload that kind
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_admin_feed_events_created_at", "created_at"),
+    )
+
+
 class Staff(Base):
     __tablename__ = "staff"
 
@@ -143,6 +181,11 @@ class Schedule(Base):
     # Отношение к персоналу
     teacher_staff = relationship("Staff", back_populates="schedules", foreign_keys=[teacher_id])
 
+    __table_args__ = (
+        Index("ix_schedule_group_id_date", "group_id", "date"),
+        Index("ix_schedule_object_date", "object_type", "object_id", "date"),
+    )
+
 
 class News(Base):
     __tablename__ = "news"
@@ -194,6 +237,17 @@ class Group(Base):
     teacher = relationship("Staff", foreign_keys=[teacher_id])
 
 
+# Денормализованная сводка расписания группы, обновляется при изменениях Schedule
+class GroupSlotSummary(Base):
+    __tablename__ = "group_slot_summaries"
+
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    slots_json = Column(Text, nullable=False, default="[]")  # До трёх меток «день • время»
+    next_session_date = Column(Date, nullable=True)
+    computed_on = Column(Date, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+
 # ======================== СИСТЕМА ИНДИВИДУАЛЬНЫХ ЗАНЯТИЙ ========================
 class IndividualLesson(Base):
     __tablename__ = "individual_lessons"
@@ -888,6 +942,32 @@ class NotificationDelivery(Base):
     )
 
 
+class NotificationBatch(Base):
+    __tablename__ = "notification_batches"
+
+    id = Column(Integer, primary_key=True)  # job id polled by the admin UI
+    event_type = Column(String(64), nullable=False)
+    title = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    payload_json = Column(Text, nullable=True)
+    recipients_json = Column(Text, nullable=False)  # [{"user_id": 1, "body": "optional per-recipient text"}, ...]
+    status = Column(String(16), nullable=False, default="queued")  # queued | running | done
+    recipient_count = Column(Integer, nullable=False, default=0)
+    processed_count = Column(Integer, nullable=False, default=0)  # delivery resumes from here after a crash
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_user_ids_json = Column(Text, nullable=True)
+    error = Column(String(64), nullable=True)
+    created_by_staff_id = Column(Integer, ForeignKey("staff.id"), nullable=True)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    updated_at = Column(DateTime, default=utcnow, nullable=False)  # heartbeat of the running worker
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_batches_status", "status"),
+        Index("ix_notification_batches_finished_at", "finished_at"),
+    )
+
+
 class WebPushSubscription(Base):
     __tablename__ = "web_push_subscriptions"
 
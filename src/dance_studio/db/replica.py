@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import logging
+import time
+from threading import Lock
+from typing import Callable
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from dance_studio.core.config import DATABASE_REPLICA_MAX_LAG_SECONDS
+from dance_studio.db.session import ReplicaSession, replica_engine
+
+logger = logging.getLogger(__name__)
+
+# How long one lag measurement is trusted; keeps the probe at one query per worker every few seconds.
+LAG_CHECK_INTERVAL_SECONDS = 2.0
+
+# 0 while the standby has replayed everything it received, so an idle primary does not look like lag.
+# NULL (not a standby, e.g. a second local database) counts as no lag.
+_PG_LAG_SQL = text(
+    "SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)"
+)
+
+
+class ReplicaReadOnlyError(RuntimeError):
+    pass
+
+
+def measure_replica_lag(engine) -> float:
+    """Seconds the replica is behind the primary; other dialects (two SQLite files locally) report 0."""
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    with engine.connect() as connection:
+        return float(connection.execute(_PG_LAG_SQL).scalar() or 0.0)
+
+
+def _refuse_flush(session, flush_context, instances):
+    raise ReplicaReadOnlyError("read replica sessions are read-only; write through the primary session")
+
+
+class ReadReplica:
+    """
+    Hands out replica sessions while replication lag stays within `max_lag_seconds`. The lag is
+    measured at most every LAG_CHECK_INTERVAL_SECONDS; an unreachable replica counts as lagging.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        *,
+        max_lag_seconds: float = DATABASE_REPLICA_MAX_LAG_SECONDS,
+        lag_probe: Callable[[], float] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._session_factory = session_factory
+        self.max_lag_seconds = max_lag_seconds
+        self._lag_probe = lag_probe or (lambda: measure_replica_lag(session_factory.kw["bind"]))
+        self._clock = clock
+        self._lock = Lock()
+        self._checked_at: float | None = None
+        self._lag: float | None = None
+
+    def lag_seconds(self) -> float | None:
+        """Cached replica lag; None while the replica cannot be reached."""
+        now = self._clock()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < LAG_CHECK_INTERVAL_SECONDS:
+                return self._lag
+            self._checked_at = now
+        try:
+            lag = self._lag_probe()
+        except SQLAlchemyError:
+            logger.warning("read replica unreachable, reading from primary", exc_info=True)
+            lag = None
+        with self._lock:
+            self._lag = lag
+        return lag
+
+    def is_usable(self) -> bool:
+        lag = self.lag_seconds()
+        return lag is not None and lag <= self.max_lag_seconds
+
+    def session(self):
+        """A read-only replica session, or None when reads should stay on the primary."""
+        if not self.is_usable():
+            return None
+        db = self._session_factory()
+        event.listen(db, "before_flush", _refuse_flush)
+        return db
+
+
+_replica: ReadReplica | None = ReadReplica(ReplicaSession) if replica_engine is not None else None
+
+
+def get_read_replica() -> ReadReplica | None:
+    return _replica
+
+
+def set_read_replica(replica: ReadReplica | None) -> ReadReplica | None:
+    """Swaps the process-wide replica (None disables it) and returns the previous one."""
+    global _replica
+    previous, _replica = _replica, replica
+    return previous
+
+
+__all__ = [
+    "LAG_CHECK_INTERVAL_SECONDS",
+    "ReadReplica",
+    "ReplicaReadOnlyError",
+    "get_read_replica",
+    "measure_replica_lag",
+    "set_read_replica",
+]
@@ -1,5 +1,12 @@
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from dance_studio.core.metrics import MetricFamily, metrics
+from dance_studio.core.profiling import install_query_profiler
 
 # Pull DATABASE_URL from central settings to ensure the .env loader runs
 # before we touch the database configuration.
@@ -8,29 +15,85 @@ from dance_studio.core.settings import (
     DATABASE_POOL_RECYCLE_SECONDS,
     DATABASE_POOL_SIZE,
     DATABASE_POOL_TIMEOUT_SECONDS,
+    DATABASE_REPLICA_URL,
     DATABASE_URL,
 )
 
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL environment variable is required")
 
-_ENGINE_KWARGS = {
-    "pool_pre_ping": True,
-    "future": True,
-}
-if not DATABASE_URL.startswith("sqlite"):
-    _ENGINE_KWARGS.update(
-        {
-            "pool_size": DATABASE_POOL_SIZE,
-            "max_overflow": DATABASE_MAX_OVERFLOW,
-            "pool_timeout": DATABASE_POOL_TIMEOUT_SECONDS,
-            "pool_recycle": DATABASE_POOL_RECYCLE_SECONDS,
-        }
-    )
-
-engine = create_engine(DATABASE_URL, **_ENGINE_KWARGS)
+POOL_CHECKOUT_SECONDS = metrics.histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled database connection.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+POOL_CHECKOUT_TIMEOUTS = metrics.counter(
+    "db_pool_checkout_timeouts",
+    "Checkouts that gave up after DATABASE_POOL_TIMEOUT_SECONDS.",
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long callers wait for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+def _engine_kwargs(url: str) -> dict:
+    kwargs = {
+        "pool_pre_ping": True,
+        "future": True,
+    }
+    if not url.startswith("sqlite"):
+        kwargs.update(
+            {
+                "pool_size": DATABASE_POOL_SIZE,
+                "max_overflow": DATABASE_MAX_OVERFLOW,
+                "pool_timeout": DATABASE_POOL_TIMEOUT_SECONDS,
+                "pool_recycle": DATABASE_POOL_RECYCLE_SECONDS,
+                "poolclass": TimedQueuePool,
+            }
+        )
+    return kwargs
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+install_query_profiler(engine)
+
+# Optional read replica (see dance_studio.db.replica); None when DATABASE_REPLICA_URL is not set.
+replica_engine = create_engine(DATABASE_REPLICA_URL, **_engine_kwargs(DATABASE_REPLICA_URL)) if DATABASE_REPLICA_URL else None
+if replica_engine is not None:
+    install_query_profiler(replica_engine)
+
+
+def _pool_metrics():
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        MetricFamily("db_pool_size", "gauge", "Configured pool size (DATABASE_POOL_SIZE).").add(pool.size()),
+        MetricFamily("db_pool_checked_out", "gauge", "Connections currently in use.").add(pool.checkedout()),
+        MetricFamily("db_pool_checked_in", "gauge", "Idle connections kept in the pool.").add(pool.checkedin()),
+        MetricFamily("db_pool_overflow", "gauge", "Connections opened above the pool size (negative while the pool is not full).").add(pool.overflow()),
+    ]
+
+
+metrics.register_collector("db_pool", _pool_metrics)
 
 Session = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+ReplicaSession = (
+    sessionmaker(bind=replica_engine, autoflush=False, autocommit=False, future=True)
+    if replica_engine is not None
+    else None
+)
 
 
 def get_session():
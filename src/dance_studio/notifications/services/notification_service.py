@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import json
+import time
 
+from dance_studio.core.metrics import metrics
 from dance_studio.core.time import utcnow
 from dance_studio.db.models import (
     AuthIdentity,
@@ -15,6 +17,17 @@ from dance_studio.notifications.providers.telegram import TelegramNotificationPr
 from dance_studio.notifications.providers.vk import VkNotificationProvider
 from dance_studio.notifications.providers.web_push import WebPushNotificationProvider
 
+PROVIDER_SEND_SECONDS = metrics.histogram(
+    "notification_send_seconds",
+    "Latency of a single provider send call.",
+    ("provider",),
+)
+PROVIDER_DELIVERIES = metrics.counter(
+    "notification_deliveries",
+    "Provider delivery attempts by outcome.",
+    ("provider", "result"),
+)
+
 
 class NotificationService:
     def __init__(self):
@@ -206,8 +219,16 @@ class NotificationService:
             provider = self.providers.get(channel.channel_type)
             if not provider:
                 continue
-            result = provider.send(channel.target_ref, title, body, payload)
+            started = time.perf_counter()
+            try:
+                result = provider.send(channel.target_ref, title, body, payload)
+            except Exception:
+                PROVIDER_DELIVERIES.inc(provider=channel.channel_type, result="error")
+                raise
+            finally:
+                PROVIDER_SEND_SECONDS.observe(time.perf_counter() - started, provider=channel.channel_type)
             ok = bool(result.get("ok"))
+            PROVIDER_DELIVERIES.inc(provider=channel.channel_type, result="sent" if ok else "failed")
             if not ok:
                 self._apply_failed_delivery_side_effects(channel=channel, result=result)
             db.add(
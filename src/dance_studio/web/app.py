@@ -5,8 +5,12 @@ from dance_studio.core.config import APP_SECRET_KEY
 from dance_studio.web.constants import MAX_UPLOAD_MB
 from dance_studio.web.middleware import (
     register_auth_middleware,
+    register_compression_middleware,
     register_csrf_middleware,
     register_error_handlers,
+    register_metrics_middleware,
+    register_profiling_middleware,
+    register_replica_middleware,
     register_security_headers_middleware,
 )
 from dance_studio.web.routes import (
@@ -29,9 +33,14 @@ def create_app() -> Flask:
     app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
     app.config["MAX_FORM_MEMORY_SIZE"] = MAX_UPLOAD_MB * 1024 * 1024
 
+    # First in, last out: timings span the auth lookup and the final (compressed) response.
+    register_metrics_middleware(app)
+    register_profiling_middleware(app)
     register_auth_middleware(app)
+    register_replica_middleware(app)
     register_csrf_middleware(app)
     register_security_headers_middleware(app)
+    register_compression_middleware(app)
     register_error_handlers(app)
 
     app.register_blueprint(auth_bp)
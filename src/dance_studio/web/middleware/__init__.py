@@ -1,11 +1,22 @@
 from .auth import register_auth_middleware
+from .compression import compression_stats, register_compression_middleware, skip_compression
 from .csrf import register_csrf_middleware
 from .errors import register_error_handlers
+from .metrics import register_metrics_middleware
+from .profiling import register_profiling_middleware
+from .replica import read_replica, register_replica_middleware
 from .security import register_security_headers_middleware
 
 __all__ = [
+    "compression_stats",
+    "read_replica",
     "register_auth_middleware",
+    "register_compression_middleware",
     "register_csrf_middleware",
     "register_error_handlers",
+    "register_metrics_middleware",
+    "register_profiling_middleware",
+    "register_replica_middleware",
     "register_security_headers_middleware",
+    "skip_compression",
 ]
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import gzip
+import threading
+import zlib
+
+import brotli
+from flask import Flask, current_app, request
+
+from dance_studio.core.config import RESPONSE_COMPRESSION_ENABLED, RESPONSE_COMPRESSION_MIN_BYTES
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+}
+GZIP_LEVEL = 6
+# Dynamic responses: quality 5 is close to gzip -9 in size at a fraction of brotli's max-quality CPU cost.
+BROTLI_QUALITY = 5
+_SKIP_ATTR = "_skip_compression"
+
+
+class CompressionStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def record(self, encoding: str, *, bytes_in: int, bytes_out: int, responses: int = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0})
+            counters["responses"] += responses
+            counters["bytes_in"] += bytes_in
+            counters["bytes_out"] += bytes_out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            by_encoding = {encoding: dict(counters) for encoding, counters in self._counters.items()}
+        bytes_in = sum(item["bytes_in"] for item in by_encoding.values())
+        bytes_out = sum(item["bytes_out"] for item in by_encoding.values())
+        return {
+            "responses": sum(item["responses"] for item in by_encoding.values()),
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "bytes_saved": bytes_in - bytes_out,
+            "by_encoding": by_encoding,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+compression_stats = CompressionStats()
+
+
+def skip_compression(view):
+    """Marks a view whose responses must go out as is (already-compressed media, byte ranges)."""
+    setattr(view, _SKIP_ATTR, True)
+    return view
+
+
+def _view_opted_out() -> bool:
+    view = current_app.view_functions.get(request.endpoint or "")
+    return bool(view is not None and getattr(view, _SKIP_ATTR, False))
+
+
+def _negotiate_encoding() -> str | None:
+    accept = request.accept_encodings
+    br_quality = accept["br"]
+    gzip_quality = accept["gzip"]
+    if br_quality and br_quality >= gzip_quality:
+        return "br"
+    if gzip_quality:
+        return "gzip"
+    return None
+
+
+def _compress_body(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def _stream_compressor(encoding: str):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _compress_stream(chunks, encoding: str):
+    process, flush, finish = _stream_compressor(encoding)
+    bytes_in = bytes_out = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if not chunk:
+                continue
+            bytes_in += len(chunk)
+            # Flush per chunk so a streamed response still reaches the client incrementally.
+            out = process(chunk) + flush()
+            bytes_out += len(out)
+            if out:
+                yield out
+        tail = finish()
+        bytes_out += len(tail)
+        if tail:
+            yield tail
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+        compression_stats.record(encoding, bytes_in=bytes_in, bytes_out=bytes_out)
+
+
+def _is_compressible(response) -> bool:
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or "Content-Encoding" in response.headers:
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    if "no-transform" in (response.headers.get("Cache-Control") or ""):
+        return False
+    return not _view_opted_out()
+
+
+def _weaken_etag(response) -> None:
+    # The encoded bytes differ from the identity representation. Clients echo the weak tag back,
+    # so views must compare If-None-Match weakly (request.if_none_match.contains_weak) to answer 304.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def _compress_response(response):
+    if not RESPONSE_COMPRESSION_ENABLED or not _is_compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+        compressed = _compress_body(data, encoding)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+        compression_stats.record(encoding, bytes_in=len(data), bytes_out=len(compressed))
+
+    response.headers["Content-Encoding"] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def register_compression_middleware(app: Flask) -> None:
+    app.after_request(_compress_response)
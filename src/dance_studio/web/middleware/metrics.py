@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import time
+
+from flask import Flask, g, request
+
+from dance_studio.core.metrics import metrics
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds",
+    "Web request latency by route template.",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Requests being handled by this process.")
+
+
+def _route_label() -> str:
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+def _start_request_timer():
+    g.metrics_started = time.perf_counter()
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+
+
+def _observe_request(response):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=_route_label(),
+            status=f"{response.status_code // 100}xx",
+        )
+    return response
+
+
+def _release_in_flight(exception):
+    if g.pop("metrics_started", None) is not None:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+
+
+def register_metrics_middleware(app: Flask) -> None:
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+    app.teardown_request(_release_in_flight)
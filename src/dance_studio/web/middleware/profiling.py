@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+
+from flask import Flask, g, request
+
+from dance_studio.core.config import OWNER_IDS, REQUEST_PROFILING_ENABLED, SLOW_REQUEST_LOG_MS, TECH_ADMIN_ID
+from dance_studio.core.profiling import finish_profile, record_profile, start_profile
+from dance_studio.db.models import Staff
+
+_logger = logging.getLogger(__name__)
+# Staff ask for the Server-Timing breakdown per request (e.g. from devtools); nobody else pays for the check.
+SERVER_TIMING_REQUEST_HEADER = "X-Server-Timing"
+
+
+def _profile_name() -> str:
+    if request.url_rule is not None:
+        return f"{request.method} {request.url_rule.rule}"
+    return f"{request.method} <unmatched>"
+
+
+def _start_request_profile():
+    if not REQUEST_PROFILING_ENABLED:
+        return
+    g.query_profile, g.query_profile_token = start_profile(_profile_name())
+
+
+def _server_timing_requested() -> bool:
+    return request.headers.get(SERVER_TIMING_REQUEST_HEADER, "").strip().lower() in {"1", "true", "yes"}
+
+
+def _is_staff_request() -> bool:
+    user_id = getattr(g, "user_id", None)
+    telegram_id = getattr(g, "telegram_id", None)
+    if user_id is None and telegram_id is None:
+        return False
+    if TECH_ADMIN_ID and TECH_ADMIN_ID in (user_id, telegram_id):
+        return True
+    if user_id in OWNER_IDS or telegram_id in OWNER_IDS:
+        return True
+    db = getattr(g, "db", None)
+    if db is None or user_id is None:
+        return False
+    try:
+        return db.query(Staff.id).filter(Staff.user_id == user_id, Staff.status == "active").first() is not None
+    except Exception:
+        db.rollback()
+        return False
+
+
+def _server_timing(profile, seconds: float) -> str:
+    return (
+        f'db;dur={profile.sql_seconds * 1000:.1f};desc="{profile.queries} queries", '
+        f"app;dur={seconds * 1000:.1f}"
+    )
+
+
+def _finish_request_profile(response):
+    token = g.pop("query_profile_token", None)
+    profile = g.pop("query_profile", None)
+    if token is None or profile is None:
+        return response
+    seconds = profile.elapsed_seconds
+    finish_profile(token)
+    record_profile(
+        profile,
+        seconds=seconds,
+        slow_threshold_ms=SLOW_REQUEST_LOG_MS,
+        logger=_logger,
+        context=f"{request.full_path.rstrip('?')} -> {response.status_code}",
+    )
+    # Checked after the profile is closed so the lookup itself is not reported; the staff lookup
+    # runs only for requests that asked for the header.
+    if _server_timing_requested() and _is_staff_request():
+        response.headers["Server-Timing"] = _server_timing(profile, seconds)
+    return response
+
+
+def _discard_request_profile(exception):
+    token = g.pop("query_profile_token", None)
+    g.pop("query_profile", None)
+    if token is not None:
+        finish_profile(token)
+
+
+def register_profiling_middleware(app: Flask) -> None:
+    app.before_request(_start_request_profile)
+    app.after_request(_finish_request_profile)
+    app.teardown_request(_discard_request_profile)
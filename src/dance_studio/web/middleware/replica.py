@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+
+from flask import Flask, current_app, g, request
+
+from dance_studio.core.config import COOKIE_SAMESITE, COOKIE_SECURE
+from dance_studio.db.replica import get_read_replica
+
+_READ_REPLICA_ATTR = "_read_replica"
+# Set after a successful write; until it expires this browser reads from the primary (read-your-writes).
+PRIMARY_PIN_COOKIE = "db_primary_until"
+_READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def read_replica(view):
+    """Marks a read-only view that may run on the read replica; g.db is swapped before it runs."""
+    setattr(view, _READ_REPLICA_ATTR, True)
+    return view
+
+
+def _view_reads_replica() -> bool:
+    view = current_app.view_functions.get(request.endpoint or "")
+    return bool(view is not None and getattr(view, _READ_REPLICA_ATTR, False))
+
+
+def _pinned_to_primary() -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+def _route_to_replica():
+    if request.method not in _READ_METHODS or not _view_reads_replica() or _pinned_to_primary():
+        return
+    replica = get_read_replica()
+    if replica is None:
+        return
+    replica_db = replica.session()
+    if replica_db is None:
+        return
+    # The auth middleware has already validated the session on the primary; the view only reads.
+    g.primary_db = g.db
+    g.db = replica_db
+
+
+def _pin_after_write(response):
+    replica = get_read_replica()
+    if replica is None or request.method in _READ_METHODS or response.status_code >= 400:
+        return response
+    window = int(replica.max_lag_seconds) + 1
+    response.set_cookie(
+        PRIMARY_PIN_COOKIE,
+        str(int(time.time()) + window),
+        max_age=window,
+        httponly=True,
+        secure=COOKIE_SECURE,
+        samesite=COOKIE_SAMESITE,
+        path="/",
+    )
+    return response
+
+
+def _close_primary(exception):
+    primary_db = g.pop("primary_db", None)
+    if primary_db is not None:
+        primary_db.close()
+
+
+def register_replica_middleware(app: Flask) -> None:
+    """Must come after the auth middleware, whose before_request opens g.db on the primary."""
+    app.before_request(_route_to_replica)
+    app.after_request(_pin_after_write)
+    app.teardown_request(_close_primary)
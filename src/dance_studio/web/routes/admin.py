@@ -6,7 +6,7 @@ from datetime import date, datetime, time as dt_time, timedelta
 from dance_studio.core.time import utcnow
 
 import requests
-from flask import Blueprint, current_app, g, jsonify, make_response, request, send_from_directory
+from flask import Blueprint, current_app, g, jsonify, make_response, request, send_file, send_from_directory
 from sqlalchemy import String, and_, cast, func, or_
 from sqlalchemy.exc import IntegrityError
 from werkzeug.exceptions import NotFound
@@ -19,7 +19,8 @@ from dance_studio.core.abonement_notifications import (
     resolve_group_ids_for_abonement,
 )
 from dance_studio.core.booking_amounts import compute_non_group_booking_base_amount
-from dance_studio.core.group_notifications import notify_group_participants
+from dance_studio.core.group_notifications import collect_group_notification_recipient_ids
+from dance_studio.core.notification_batches import queue_notification_batch, serialize_notification_batch
 from dance_studio.core.notification_dispatch import (
     notification_dispatch_exists,
     record_notification_dispatch,
@@ -48,7 +49,16 @@ from dance_studio.auth.services.common import (
     resolve_user_id_by_telegram,
 )
 from dance_studio.auth.services.account_merge import AccountMergeService
-from dance_studio.core.config import BOT_TOKEN, OWNER_IDS, PROJECT_NAME_FULL, PROJECT_NAME_SHORT, TECH_ADMIN_ID
+from dance_studio.core.config import (
+    BOT_TOKEN,
+    METRICS_ALLOW_LOCAL,
+    OWNER_IDS,
+    PROJECT_NAME_FULL,
+    PROJECT_NAME_SHORT,
+    TECH_ADMIN_ID,
+)
+from dance_studio.core.group_slot_summaries import get_group_slot_infos
+from dance_studio.core.image_variants import schedule_image_variants
 from dance_studio.core.media_manager import delete_user_photo
 from dance_studio.core.system_settings_service import (
     SettingValidationError,
@@ -73,6 +83,7 @@ from dance_studio.db.models import (
     IndividualLesson,
     Mailing,
     Notification,
+    NotificationBatch,
     NotificationChannel,
     NotificationPreference,
     PasskeyChallenge,
@@ -105,8 +116,8 @@ from dance_studio.web.services.api_errors import (
 from dance_studio.web.services.upload_validation import validate_image_upload
 from dance_studio.web.services.access import _get_current_staff, get_current_user_from_request, require_permission
 from dance_studio.web.services.attendance import (
+    _absence_allowed_schedule_ids,
     _attendance_intention_lock_info,
-    _can_user_set_absence_for_schedule,
     _serialize_attendance_intention_with_lock,
 )
 from dance_studio.web.services.admin import (
@@ -128,6 +139,29 @@ from dance_studio.web.services.admin import (
     format_schedule_v2,
 )
 from dance_studio.web.services.bookings import get_group_occupancy_map
+from dance_studio.web.middleware.compression import compression_stats
+from dance_studio.web.middleware.replica import read_replica
+from dance_studio.core.metrics import TEXT_CONTENT_TYPE, metrics
+from dance_studio.core.profiling import profile_stats
+from dance_studio.web.services.catalog import catalog_cache, catalog_response
+from dance_studio.web.services.abonement_bulk import (
+    CLOSURE_EVENT_TYPE,
+    CLOSURE_NOTIFY_TITLE,
+    BulkAbonementError,
+    LessonCompensation,
+    apply_studio_closure,
+    build_closure_messages,
+    compensate_group_lesson,
+    parse_closure_request,
+    plan_studio_closure,
+)
+from dance_studio.web.services.schedule_bulk import (
+    BulkScheduleError,
+    insert_occurrences,
+    parse_term_request,
+    plan_term_schedule,
+)
+from dance_studio.core.frontend_assets import built_shell_path
 from dance_studio.web.services.media import _build_image_url, normalize_teaches, try_fetch_telegram_avatar
 from dance_studio.web.services.studio_rules import (
     SERVICE_BREAK_END,
@@ -188,7 +222,14 @@ def _sanitize_direction_description(value):
     return sanitize_plain_text(value) or ""
 
 
-def _serialize_direction_payload(direction, *, groups_count=None, include_status=False, include_updated_at=False):
+def _serialize_direction_payload(
+    direction,
+    *,
+    groups_count=None,
+    include_status=False,
+    include_updated_at=False,
+    image_variant=None,
+):
     payload = {
         "direction_id": direction.direction_id,
         "direction_type": direction.direction_type or "dance",
@@ -196,7 +237,7 @@ def _serialize_direction_payload(direction, *, groups_count=None, include_status
         "description": _sanitize_direction_description(direction.description),
         "base_price": direction.base_price,
         "is_popular": direction.is_popular,
-        "image_path": _build_image_url(direction.image_path),
+        "image_path": _build_image_url(direction.image_path, image_variant),
         "created_at": direction.created_at.isoformat(),
     }
     if groups_count is not None:
@@ -208,95 +249,14 @@ def _serialize_direction_payload(direction, *, groups_count=None, include_status
     return payload
 
 
-GROUP_WEEKDAY_LABELS = [
-    "Понедельник",
-    "Вторник",
-    "Среда",
-    "Четверг",
-    "Пятница",
-    "Суббота",
-    "Воскресенье",
-]
-
-
-def _format_group_schedule_time_label(time_from, time_to) -> str:
-    start = time_from or None
-    end = time_to or None
-    if start and end:
-        return f"{start.strftime('%H:%M')}-{end.strftime('%H:%M')}"
-    if start:
-        return start.strftime("%H:%M")
-    if end:
-        return end.strftime("%H:%M")
-    return "Время не указано"
-
-
 def _build_group_schedule_map(db, group_ids):
-    normalized_group_ids = sorted({int(group_id) for group_id in group_ids if group_id})
-    if not normalized_group_ids:
-        return {}
-
-    def _query_rows(target_group_ids, *, upcoming_only: bool):
-        if not target_group_ids:
-            return []
-        query = db.query(Schedule).filter(
-            Schedule.status.notin_(list(INACTIVE_SCHEDULE_STATUSES)),
-            Schedule.date.isnot(None),
-            or_(
-                Schedule.group_id.in_(target_group_ids),
-                and_(Schedule.object_type == "group", Schedule.object_id.in_(target_group_ids)),
-            ),
-        )
-        if upcoming_only:
-            query = query.filter(Schedule.date >= date.today()).order_by(
-                Schedule.date.asc(),
-                Schedule.time_from.asc(),
-                Schedule.start_time.asc(),
-                Schedule.id.asc(),
-            )
-        else:
-            query = query.filter(Schedule.date < date.today()).order_by(
-                Schedule.date.desc(),
-                Schedule.time_from.asc(),
-                Schedule.start_time.asc(),
-                Schedule.id.asc(),
-            )
-        return query.all()
-
-    slots_by_group = {group_id: [] for group_id in normalized_group_ids}
-
-    def _append_slots(rows):
-        for row in rows:
-            group_id = int(row.group_id or row.object_id or 0)
-            if group_id not in slots_by_group or not row.date:
-                continue
-            weekday_index = row.date.weekday()
-            weekday_label = (
-                GROUP_WEEKDAY_LABELS[weekday_index]
-                if 0 <= weekday_index < len(GROUP_WEEKDAY_LABELS)
-                else row.date.strftime("%A")
-            )
-            time_label = _format_group_schedule_time_label(
-                row.time_from or row.start_time,
-                row.time_to or row.end_time,
-            )
-            label = f"{weekday_label} • {time_label}"
-            if label in slots_by_group[group_id]:
-                continue
-            slots_by_group[group_id].append(label)
-
-    _append_slots(_query_rows(normalized_group_ids, upcoming_only=True))
-    missing_group_ids = [group_id for group_id, slots in slots_by_group.items() if not slots]
-    _append_slots(_query_rows(missing_group_ids, upcoming_only=False))
-
-    result = {}
-    for group_id, slots in slots_by_group.items():
-        visible_slots = slots[:3]
-        result[group_id] = {
-            "schedule_slots": visible_slots,
-            "schedule_summary": ", ".join(visible_slots) if visible_slots else None,
+    return {
+        group_id: {
+            "schedule_slots": info.schedule_slots,
+            "schedule_summary": info.schedule_summary,
         }
-    return result
+        for group_id, info in get_group_slot_infos(db, group_ids).items()
+    }
 
 
 SCHEDULE_PRESENT_STATUSES = {"present", "late"}
@@ -509,6 +469,12 @@ def _staff_editability_payload(db, staff: Staff) -> tuple[bool, str | None]:
 
 @bp.route("/")
 def index():
+    shell_path = built_shell_path(FRONTEND_DIR)
+    if shell_path is not None:
+        # The shell only points at content-hashed assets, so revalidating it on every open is cheap.
+        response = make_response(send_file(shell_path, mimetype="text/html", conditional=True))
+        response.headers["Cache-Control"] = "no-cache"
+        return response
     response = make_response(send_from_directory(FRONTEND_DIR, "index.html"))
     response.headers["Cache-Control"] = "public, max-age=300, must-revalidate"
     return response
@@ -617,95 +583,33 @@ def _collect_target_abonements(
     return rows if len(rows) > 1 else [abonement]
 
 
-def _extend_abonement_by_week(
+def _queue_group_lesson_notification(
     db,
     *,
-    abonement: GroupAbonement,
-    action_type: str,
-    reason: str,
+    group: Group,
+    attendance_rows,
+    abonement_user_ids,
     staff: Staff | None,
-    note: str,
+    event_type: str,
+    title: str,
+    body: str,
     payload: dict,
-) -> bool:
-    duplicate = db.query(GroupAbonementActionLog.id).filter_by(
-        abonement_id=abonement.id,
-        action_type=action_type,
-        reason=reason,
-    ).first()
-    if duplicate:
-        return False
-
-    now = utcnow()
-    if abonement.valid_to:
-        base = abonement.valid_to if abonement.valid_to > now else now
-    elif abonement.valid_from:
-        base = abonement.valid_from if abonement.valid_from > now else now
-    else:
-        base = now
-    abonement.valid_to = base + timedelta(days=7)
-
-    db.add(
-        GroupAbonementActionLog(
-            abonement_id=abonement.id,
-            action_type=action_type,
-            credits_delta=0,
-            reason=reason,
-            note=note,
-            actor_type="staff",
-            actor_id=staff.id if staff else None,
-            payload=json.dumps(payload, ensure_ascii=False),
-        )
+):
+    """Queued in the caller's transaction and sent after its commit; the UI polls the batch id."""
+    return queue_notification_batch(
+        db,
+        event_type=event_type,
+        title=title,
+        body=body,
+        payload=payload,
+        recipients=collect_group_notification_recipient_ids(
+            group=group,
+            attendance_rows=attendance_rows,
+            abonement_user_ids=abonement_user_ids,
+        ),
+        staff_id=staff.id if staff else None,
     )
-    return True
-
-
-def _refund_schedule_attendance_credit(
-    db,
-    *,
-    attendance: Attendance,
-    action_type: str,
-    reason: str,
-    staff: Staff | None,
-    note: str,
-    payload: dict,
-) -> bool:
-    if not attendance.abonement_id:
-        return False
-
-    debit_exists = db.query(GroupAbonementActionLog.id).filter_by(
-        attendance_id=attendance.id,
-        action_type="debit_attendance",
-    ).first()
-    if not debit_exists:
-        return False
-
-    duplicate_refund = db.query(GroupAbonementActionLog.id).filter_by(
-        attendance_id=attendance.id,
-        action_type=action_type,
-        reason=reason,
-    ).first()
-    if duplicate_refund:
-        return False
-
-    abonement = db.query(GroupAbonement).filter_by(id=attendance.abonement_id).first()
-    if not abonement:
-        return False
-    abonement.balance_credits = int(abonement.balance_credits or 0) + 1
 
-    db.add(
-        GroupAbonementActionLog(
-            abonement_id=abonement.id,
-            action_type=action_type,
-            credits_delta=1,
-            reason=reason,
-            note=note,
-            attendance_id=attendance.id,
-            actor_type="staff",
-            actor_id=staff.id if staff else None,
-            payload=json.dumps(payload, ensure_ascii=False),
-        )
-    )
-    return True
 
 def _has_group_schedule_conflict(
     db,
@@ -1115,6 +1019,7 @@ def schedule():
 
 
 @bp.route("/schedule/public")
+@read_replica
 def schedule_public():
     db = g.db
     mine_flag = request.args.get("mine")
@@ -1245,6 +1150,8 @@ def schedule_public():
             )
             intentions_by_schedule = {int(row.schedule_id): row for row in intention_rows if row and row.schedule_id}
 
+    absence_allowed_ids = _absence_allowed_schedule_ids(db, user, items) if user else set()
+
     result = []
     for s in items:
         time_from = s.time_from or s.start_time
@@ -1268,7 +1175,7 @@ def schedule_public():
                 "title": group.name if group and group.name else s.title,
                 "direction": _sanitize_direction_title(direction.title) if direction else None,
                 "direction_description": _sanitize_direction_description(direction.description) if direction else None,
-                "direction_image": _build_image_url(direction.image_path) if direction else None,
+                "direction_image": _build_image_url(direction.image_path, "thumb") if direction else None,
                 "direction_id": int(group.direction_id) if group and group.direction_id else None,
                 "teacher_name": teacher.name if teacher else None,
                 "lessons_per_week": group.lessons_per_week if group else None,
@@ -1301,7 +1208,7 @@ def schedule_public():
             entry["title"] = s.title
 
         if user:
-            can_set_absence = _can_user_set_absence_for_schedule(db, user, s)
+            can_set_absence = int(s.id) in absence_allowed_ids
             entry["attendance_intention_allowed"] = bool(can_set_absence)
             if can_set_absence:
                 lock_info = _attendance_intention_lock_info(s)
@@ -1515,6 +1422,64 @@ def create_schedule_v2():
     return jsonify([format_schedule_v2(s) for s in entries]), 201
 
 
+@bp.route("/schedule/v2/bulk", methods=["POST"])
+def create_schedule_v2_bulk():
+    """
+    Генерирует групповое расписание на период по недельным шаблонам.
+    Все занятия проверяются на пересечения (зал, преподаватель, группа) по одному снимку периода
+    и вставляются одной транзакцией; dry_run только возвращает план и отчет о конфликтах.
+    """
+    perm_error = require_permission("manage_schedule")
+    if perm_error:
+        return perm_error
+
+    db = g.db
+    try:
+        term = parse_term_request(request.json or {})
+        plan = plan_term_schedule(db, term)
+    except BulkScheduleError as exc:
+        return {"error": str(exc)}, exc.status_code
+
+    conflicts = [item.serialize() for item in plan.conflicting]
+    payload = {
+        "dry_run": term.dry_run,
+        "on_conflict": term.on_conflict,
+        "date_from": term.date_from.isoformat(),
+        "date_to": term.date_to.isoformat(),
+        "occurrences_total": len(plan.occurrences),
+        "created": 0,
+        "skipped": len(conflicts),
+        "conflicts": conflicts,
+        "items": [],
+    }
+    if term.dry_run:
+        payload["items"] = [item.serialize() for item in plan.accepted]
+        return jsonify(payload), 200
+    if conflicts and term.on_conflict == "abort":
+        payload["skipped"] = len(plan.occurrences)
+        return jsonify(payload), 409
+
+    accepted = plan.accepted
+    staff = _get_current_staff(db)
+    try:
+        schedule_ids = insert_occurrences(
+            db,
+            accepted,
+            status=term.status,
+            updated_by=staff.id if staff else None,
+        )
+        db.commit()
+    except Exception:
+        return internal_server_error_response(
+            context="Failed to create bulk schedule",
+            db=db,
+        )
+
+    payload["created"] = len(schedule_ids)
+    payload["items"] = [item.serialize(schedule_id) for item, schedule_id in zip(accepted, schedule_ids)]
+    return jsonify(payload), 201 if schedule_ids else 200
+
+
 @bp.route("/schedule/<int:schedule_id>", methods=["PUT"])
 def update_schedule(schedule_id):
     """
@@ -1764,62 +1729,36 @@ def cancel_schedule_v2(schedule_id):
     note = (payload.get("note") or "Отмена занятия с компенсацией группы").strip()
 
     abonements_by_user = _active_group_abonements_for_schedule_date(db, group_id, schedule.date)
-    extended_abonements = 0
-    for user_id, abonement in abonements_by_user.items():
-        changed = _extend_abonement_by_week(
-            db,
-            abonement=abonement,
-            action_type="schedule_cancel_extend",
-            reason=op_reason,
-            staff=staff,
-            note=note,
-            payload={
-                "schedule_id": schedule.id,
-                "group_id": group_id,
-                "user_id": user_id,
-                "mode": "cancel",
-            },
-        )
-        if changed:
-            extended_abonements += 1
-
-    refunded_credits = 0
     attendance_rows = db.query(Attendance).filter_by(schedule_id=schedule.id).all()
-    for attendance in attendance_rows:
-        refunded = _refund_schedule_attendance_credit(
-            db,
-            attendance=attendance,
-            action_type="schedule_cancel_refund",
+    extended_abonements, refunded_credits = compensate_group_lesson(
+        db,
+        LessonCompensation(
             reason=op_reason,
-            staff=staff,
-            note="Возврат списания из-за отмены занятия",
-            payload={
-                "schedule_id": schedule.id,
-                "group_id": group_id,
-                "user_id": attendance.user_id,
-                "mode": "cancel",
-            },
-        )
-        if refunded:
-            refunded_credits += 1
+            extend_action="schedule_cancel_extend",
+            refund_action="schedule_cancel_refund",
+            extend_note=note,
+            refund_note="Возврат списания из-за отмены занятия",
+            payload={"schedule_id": schedule.id, "group_id": group_id, "mode": "cancel"},
+        ),
+        extend_abonement_ids=[abonement.id for abonement in abonements_by_user.values()],
+        refund_attendance=attendance_rows,
+        staff_id=staff.id if staff else None,
+    )
 
     cancelled_slot = _format_schedule_slot_label(schedule)
     schedule.status = "cancelled"
     schedule.status_comment = (payload.get("status_comment") or f"Отменено: {note}").strip()
 
-    db.commit()
     notify_group_raw = payload.get("notify_group", True)
     notify_group = str(notify_group_raw).strip().lower() not in {"0", "false", "no", "off"}
-    group_notified = False
-    group_notification_total = 0
-    group_notification_sent = 0
-    group_notify_error = None
+    batch = None
     if notify_group:
-        notify_result = notify_group_participants(
+        batch = _queue_group_lesson_notification(
             db,
             group=group,
             attendance_rows=attendance_rows,
             abonement_user_ids=abonements_by_user.keys(),
+            staff=staff,
             event_type="group_schedule_cancelled",
             title="Отмена занятия",
             body=f"Занятие группы «{group.name}» на {cancelled_slot} отменено.",
@@ -1829,19 +1768,7 @@ def cancel_schedule_v2(schedule_id):
                 "reason": "cancel",
             },
         )
-        group_notified = bool(notify_result.get("sent_count"))
-        group_notification_total = int(notify_result.get("recipient_count") or 0)
-        group_notification_sent = int(notify_result.get("sent_count") or 0)
-        group_notify_error = notify_result.get("error")
-        try:
-            db.commit()
-        except Exception:
-            db.rollback()
-            current_app.logger.exception("Failed to commit group cancellation notification records")
-            group_notified = False
-            group_notification_total = 0
-            group_notification_sent = 0
-            group_notify_error = "group_notification_commit_failed"
+    db.commit()
     return jsonify(
         {
             "ok": True,
@@ -1849,10 +1776,8 @@ def cancel_schedule_v2(schedule_id):
             "status": schedule.status,
             "extended_abonements": extended_abonements,
             "refunded_credits": refunded_credits,
-            "group_notified": group_notified,
-            "group_notification_total": group_notification_total,
-            "group_notification_sent": group_notification_sent,
-            "group_notify_error": group_notify_error,
+            "notification_batch_id": batch.id if batch else None,
+            "group_notification_total": batch.recipient_count if batch else 0,
         }
     )
 
@@ -2098,47 +2023,20 @@ def move_schedule_v2(schedule_id):
 
     attendance_rows = db.query(Attendance).filter_by(schedule_id=schedule.id).all()
     abonements_by_user = _active_group_abonements_for_schedule_date(db, group_id, schedule.date)
+    compensation_payload = {"schedule_id": schedule.id, "group_id": group_id, "move_type": move_type}
 
-    extended_abonements = 0
-    refunded_credits = 0
     low_attendance_present_count = 0
-
     if move_type in {"studio_fault", "absence_people"}:
-        for user_id, abonement in abonements_by_user.items():
-            changed = _extend_abonement_by_week(
-                db,
-                abonement=abonement,
-                action_type="schedule_move_extend",
-                reason=op_reason,
-                staff=staff,
-                note=f"{move_label}: продление на 1 неделю",
-                payload={
-                    "schedule_id": schedule.id,
-                    "group_id": group_id,
-                    "user_id": user_id,
-                    "move_type": move_type,
-                },
-            )
-            if changed:
-                extended_abonements += 1
-
-        for attendance in attendance_rows:
-            refunded = _refund_schedule_attendance_credit(
-                db,
-                attendance=attendance,
-                action_type="schedule_move_refund",
-                reason=op_reason,
-                staff=staff,
-                note=f"{move_label}: возврат списания",
-                payload={
-                    "schedule_id": schedule.id,
-                    "group_id": group_id,
-                    "user_id": attendance.user_id,
-                    "move_type": move_type,
-                },
-            )
-            if refunded:
-                refunded_credits += 1
+        compensation = LessonCompensation(
+            reason=op_reason,
+            extend_action="schedule_move_extend",
+            refund_action="schedule_move_refund",
+            extend_note=f"{move_label}: продление на 1 неделю",
+            refund_note=f"{move_label}: возврат списания",
+            payload=compensation_payload,
+        )
+        extend_abonement_ids = [abonement.id for abonement in abonements_by_user.values()]
+        refund_attendance = attendance_rows
     else:
         present_rows = [
             row for row in attendance_rows
@@ -2151,49 +2049,31 @@ def move_schedule_v2(schedule_id):
                 "present_count": low_attendance_present_count,
             }, 400
 
+        compensation = LessonCompensation(
+            reason=op_reason,
+            extend_action="schedule_move_present_extend",
+            refund_action="schedule_move_present_refund",
+            extend_note="Нехватка людей: продление на 1 неделю пришедшему ученику",
+            refund_note="Нехватка людей: добавлено 1 занятие пришедшему ученику",
+            payload=compensation_payload,
+        )
+        extend_abonement_ids = []
         for attendance in present_rows:
-            abonement = None
-            if attendance.abonement_id:
-                abonement = db.query(GroupAbonement).filter_by(id=attendance.abonement_id).first()
-            if not abonement:
+            if not attendance.abonement_id:
                 abonement = abonements_by_user.get(attendance.user_id)
-                if abonement and not attendance.abonement_id:
+                if abonement:
                     attendance.abonement_id = abonement.id
+            if attendance.abonement_id:
+                extend_abonement_ids.append(attendance.abonement_id)
+        refund_attendance = present_rows
 
-            if abonement:
-                changed = _extend_abonement_by_week(
-                    db,
-                    abonement=abonement,
-                    action_type="schedule_move_present_extend",
-                    reason=op_reason,
-                    staff=staff,
-                    note="Нехватка людей: продление на 1 неделю пришедшему ученику",
-                    payload={
-                        "schedule_id": schedule.id,
-                        "group_id": group_id,
-                        "user_id": attendance.user_id,
-                        "move_type": move_type,
-                    },
-                )
-                if changed:
-                    extended_abonements += 1
-
-            refunded = _refund_schedule_attendance_credit(
-                db,
-                attendance=attendance,
-                action_type="schedule_move_present_refund",
-                reason=op_reason,
-                staff=staff,
-                note="Нехватка людей: добавлено 1 занятие пришедшему ученику",
-                payload={
-                    "schedule_id": schedule.id,
-                    "group_id": group_id,
-                    "user_id": attendance.user_id,
-                    "move_type": move_type,
-                },
-            )
-            if refunded:
-                refunded_credits += 1
+    extended_abonements, refunded_credits = compensate_group_lesson(
+        db,
+        compensation,
+        extend_abonement_ids=extend_abonement_ids,
+        refund_attendance=refund_attendance,
+        staff_id=staff.id if staff else None,
+    )
 
     schedule.date = target_date
     schedule.time_from = target_time_from
@@ -2203,19 +2083,16 @@ def move_schedule_v2(schedule_id):
     schedule.status = "scheduled"
     schedule.status_comment = f"{move_label}: {old_slot} -> {new_slot}"
 
-    db.commit()
     notify_group_raw = payload.get("notify_group", True)
     notify_group = str(notify_group_raw).strip().lower() not in {"0", "false", "no", "off"}
-    group_notified = False
-    group_notification_total = 0
-    group_notification_sent = 0
-    group_notify_error = None
+    batch = None
     if notify_group:
-        notify_result = notify_group_participants(
+        batch = _queue_group_lesson_notification(
             db,
             group=group,
             attendance_rows=attendance_rows,
             abonement_user_ids=abonements_by_user.keys(),
+            staff=staff,
             event_type="group_schedule_moved",
             title="Перенос занятия",
             body=f"Занятие группы «{group.name}» перенесено ({move_label}). Было: {old_slot}. Теперь: {new_slot}.",
@@ -2225,19 +2102,7 @@ def move_schedule_v2(schedule_id):
                 "move_type": move_type,
             },
         )
-        group_notified = bool(notify_result.get("sent_count"))
-        group_notification_total = int(notify_result.get("recipient_count") or 0)
-        group_notification_sent = int(notify_result.get("sent_count") or 0)
-        group_notify_error = notify_result.get("error")
-        try:
-            db.commit()
-        except Exception:
-            db.rollback()
-            current_app.logger.exception("Failed to commit group move notification records")
-            group_notified = False
-            group_notification_total = 0
-            group_notification_sent = 0
-            group_notify_error = "group_notification_commit_failed"
+    db.commit()
     return jsonify(
         {
             "ok": True,
@@ -2246,14 +2111,28 @@ def move_schedule_v2(schedule_id):
             "extended_abonements": extended_abonements,
             "refunded_credits": refunded_credits,
             "present_count": low_attendance_present_count if move_type == "low_attendance" else None,
-            "group_notified": group_notified,
-            "group_notification_total": group_notification_total,
-            "group_notification_sent": group_notification_sent,
-            "group_notify_error": group_notify_error,
+            "notification_batch_id": batch.id if batch else None,
+            "group_notification_total": batch.recipient_count if batch else 0,
             "attendance_rows_total": len(attendance_rows),
         }
     )
 
+
+@bp.route("/api/admin/notification-batches/<int:batch_id>", methods=["GET"])
+def admin_notification_batch_status(batch_id: int):
+    """Прогресс рассылки, поставленной отменой/переносом занятия или закрытием студии."""
+    db = g.db
+    batch = db.query(NotificationBatch).filter_by(id=batch_id).first()
+    perm_error = require_permission(
+        "manage_schedule",
+        allow_self_staff_id=batch.created_by_staff_id if batch else None,
+    )
+    if perm_error:
+        return perm_error
+    if not batch:
+        return {"error": "Рассылка не найдена"}, 404
+    return jsonify(serialize_notification_batch(batch))
+
 # -------------------- ATTENDANCE --------------------
 
 def _resolve_group_active_abonement(db, user_id: int, group_id: int, date_val):
@@ -2577,6 +2456,7 @@ def update_my_user():
 
 
 @bp.route("/users/list/all")
+@read_replica
 def list_all_users():
     perm_error = require_permission("view_all_users")
     if perm_error:
@@ -3251,6 +3131,7 @@ def get_teacher_working_hours(teacher_id):
 
 
 @bp.route("/api/stats/teacher", methods=["GET"])
+@read_replica
 def get_teacher_stats():
     perm_error = require_permission("view_stats")
     if perm_error:
@@ -3315,6 +3196,7 @@ def get_teacher_stats():
 
 
 @bp.route("/api/stats/studio", methods=["GET"])
+@read_replica
 def get_studio_stats():
     perm_error = require_permission("view_stats")
     if perm_error:
@@ -3655,6 +3537,7 @@ def upload_staff_photo(staff_id):
         file_path = os.path.join(staff_dir, filename)
         with open(file_path, 'wb') as f:
             f.write(file_data)
+        schedule_image_variants(file_path)
         
         photo_path = os.path.relpath(file_path, BASE_DIR)
         
@@ -3708,117 +3591,193 @@ def delete_staff_photo(staff_id):
         )
 
 
-@bp.route("/api/teachers", methods=["GET"])
-def list_public_teachers():
-    db = g.db
-    teachers = db.query(Staff).filter(
+def _public_teacher_filter():
+    return and_(
         Staff.status == "active",
         or_(
             Staff.teaches == 1,
             (Staff.position.in_(["учитель", "Учитель"]) & Staff.teaches.is_(None))
-        )
-    ).all()
-
-    return jsonify([
-        {
-            "id": t.id,
-            "name": t.name,
-            "position": t.position,
-            "specialization": t.specialization,
-            "bio": t.bio,
-            "photo": t.photo_path,
-        }
-        for t in teachers
-    ])
+        ),
+    )
 
 
-@bp.route("/api/teachers/<int:teacher_id>", methods=["GET"])
-def get_public_teacher(teacher_id):
-    db = g.db
-    teacher = (
-        db.query(Staff)
-        .filter(
-            Staff.id == teacher_id,
-            Staff.status == "active",
-            or_(
-                Staff.teaches == 1,
-                (Staff.position.in_(["учитель", "Учитель"]) & Staff.teaches.is_(None))
-            )
-        )
-        .first()
-    )
-    if not teacher:
-        return {"error": "Преподаватель не найден"}, 404
-    teacher_username = None
+def _telegram_contact(identity):
+    if not identity:
+        return None, None
+    teacher_username = (identity.provider_username or "").strip() or None
     contact_link = None
-    if teacher.user_id:
-        identity = (
+    if teacher_username:
+        normalized_username = teacher_username[1:] if teacher_username.startswith("@") else teacher_username
+        if normalized_username:
+            contact_link = f"https://t.me/{normalized_username}"
+    if not contact_link and identity.provider_user_id:
+        contact_link = f"tg://user?id={identity.provider_user_id}"
+    return teacher_username, contact_link
+
+
+def _build_public_catalog(db):
+    """
+    Read model behind the public catalog endpoints: directions with group counts,
+    groups with teacher/slots/free seats and teacher cards, built with a fixed
+    number of queries regardless of catalog size.
+    """
+    directions = db.query(Direction).order_by(Direction.created_at.desc()).all()
+    directions_by_id = {int(direction.direction_id): direction for direction in directions}
+    groups = db.query(Group).order_by(Group.created_at.desc()).all()
+    group_ids = [int(group.id) for group in groups if group and group.id]
+    occupancy_map = get_group_occupancy_map(db, group_ids)
+    schedule_map = _build_group_schedule_map(db, group_ids)
+
+    teachers = db.query(Staff).filter(_public_teacher_filter()).all()
+    group_teacher_ids = {int(group.teacher_id) for group in groups if group.teacher_id}
+    staff_by_id = {int(teacher.id): teacher for teacher in teachers}
+    missing_teacher_ids = group_teacher_ids - set(staff_by_id)
+    if missing_teacher_ids:
+        for staff in db.query(Staff).filter(Staff.id.in_(sorted(missing_teacher_ids))).all():
+            staff_by_id[int(staff.id)] = staff
+
+    teacher_user_ids = sorted({int(teacher.user_id) for teacher in teachers if teacher.user_id})
+    identity_by_user_id = {}
+    if teacher_user_ids:
+        identities = (
             db.query(AuthIdentity)
             .filter(
-                AuthIdentity.user_id == teacher.user_id,
+                AuthIdentity.user_id.in_(teacher_user_ids),
                 AuthIdentity.provider == "telegram",
             )
             .order_by(AuthIdentity.id.desc())
-            .first()
+            .all()
         )
-        if identity:
-            teacher_username = (identity.provider_username or "").strip() or None
-            if teacher_username:
-                normalized_username = teacher_username[1:] if teacher_username.startswith("@") else teacher_username
-                if normalized_username:
-                    contact_link = f"https://t.me/{normalized_username}"
-            if not contact_link and identity.provider_user_id:
-                contact_link = f"tg://user?id={identity.provider_user_id}"
-
-    groups = (
-        db.query(Group)
-        .filter(Group.teacher_id == teacher.id)
-        .order_by(Group.created_at.desc())
-        .all()
-    )
-    occupancy_map = get_group_occupancy_map(db, [group.id for group in groups if group and group.id])
-    schedule_map = _build_group_schedule_map(db, [group.id for group in groups if group and group.id])
-    group_items = []
-    for group in groups:
-        direction = db.query(Direction).filter(Direction.direction_id == group.direction_id).first()
-        occupied_students = int(occupancy_map.get(int(group.id), 0))
-        schedule_info = schedule_map.get(int(group.id), {})
+        for identity in identities:
+            identity_by_user_id.setdefault(int(identity.user_id), identity)
+
+    groups_by_direction = {direction_id: [] for direction_id in directions_by_id}
+    groups_by_teacher = {}
+    groups_count = {}
+    for gr in groups:
+        direction = directions_by_id.get(int(gr.direction_id)) if gr.direction_id else None
+        teacher = staff_by_id.get(int(gr.teacher_id)) if gr.teacher_id else None
+        occupied_students = int(occupancy_map.get(int(gr.id), 0))
+        schedule_info = schedule_map.get(int(gr.id), {})
         try:
-            max_students = int(group.max_students or 0)
+            max_students = int(gr.max_students or 0)
         except (TypeError, ValueError):
             max_students = 0
         free_seats = max(0, max_students - occupied_students) if max_students > 0 else None
-        group_items.append({
-            "id": group.id,
-            "name": group.name,
-            "description": group.description,
-            "age_group": group.age_group,
-            "duration_minutes": group.duration_minutes,
-            "lessons_per_week": group.lessons_per_week,
-            "max_students": group.max_students,
-            "occupied_students": occupied_students,
-            "free_seats": free_seats,
-            "schedule_summary": schedule_info.get("schedule_summary"),
-            "schedule_slots": schedule_info.get("schedule_slots", []),
-            "direction_id": direction.direction_id if direction else group.direction_id,
-            "direction_title": direction.title if direction else None,
-            "direction_type": direction.direction_type if direction else None,
-            "direction_status": direction.status if direction else None,
-            "direction_image": _build_image_url(direction.image_path) if direction else None,
-        })
+        if gr.direction_id:
+            groups_count[int(gr.direction_id)] = groups_count.get(int(gr.direction_id), 0) + 1
+
+        if direction is not None:
+            teacher_photo = None
+            if teacher and teacher.photo_path:
+                teacher_photo = "/" + teacher.photo_path.replace("\\", "/")
+            groups_by_direction[int(direction.direction_id)].append({
+                "id": gr.id,
+                "direction_id": gr.direction_id,
+                "direction_type": direction.direction_type,
+                "direction_title": _sanitize_direction_title(direction.title),
+                "teacher_id": gr.teacher_id,
+                "teacher_name": teacher.name if teacher else None,
+                "teacher_photo": teacher_photo,
+                "name": gr.name,
+                "description": gr.description,
+                "age_group": gr.age_group,
+                "max_students": gr.max_students,
+                "occupied_students": occupied_students,
+                "free_seats": free_seats,
+                "duration_minutes": gr.duration_minutes,
+                "lessons_per_week": gr.lessons_per_week,
+                "schedule_summary": schedule_info.get("schedule_summary"),
+                "schedule_slots": schedule_info.get("schedule_slots", []),
+                "created_at": gr.created_at.isoformat()
+            })
+
+        if gr.teacher_id:
+            groups_by_teacher.setdefault(int(gr.teacher_id), []).append({
+                "id": gr.id,
+                "name": gr.name,
+                "description": gr.description,
+                "age_group": gr.age_group,
+                "duration_minutes": gr.duration_minutes,
+                "lessons_per_week": gr.lessons_per_week,
+                "max_students": gr.max_students,
+                "occupied_students": occupied_students,
+                "free_seats": free_seats,
+                "schedule_summary": schedule_info.get("schedule_summary"),
+                "schedule_slots": schedule_info.get("schedule_slots", []),
+                "direction_id": direction.direction_id if direction else gr.direction_id,
+                "direction_title": direction.title if direction else None,
+                "direction_type": direction.direction_type if direction else None,
+                "direction_status": direction.status if direction else None,
+                "direction_image": _build_image_url(direction.image_path, "thumb") if direction else None,
+            })
+
+    teacher_cards = {}
+    for teacher in teachers:
+        teacher_username, contact_link = _telegram_contact(
+            identity_by_user_id.get(int(teacher.user_id)) if teacher.user_id else None
+        )
+        teacher_cards[int(teacher.id)] = {
+            "id": teacher.id,
+            "name": teacher.name,
+            "position": teacher.position,
+            "specialization": teacher.specialization,
+            "bio": teacher.bio,
+            "photo": _build_image_url(teacher.photo_path, "medium"),
+            "username": teacher_username,
+            "contact_link": contact_link,
+            "groups": groups_by_teacher.get(int(teacher.id), []),
+        }
+
     return {
-        "id": teacher.id,
-        "name": teacher.name,
-        "position": teacher.position,
-        "specialization": teacher.specialization,
-        "bio": teacher.bio,
-        "photo": teacher.photo_path,
-        "username": teacher_username,
-        "contact_link": contact_link,
-        "groups": group_items,
+        "directions": [
+            _serialize_direction_payload(
+                direction,
+                groups_count=groups_count.get(int(direction.direction_id), 0),
+                image_variant="medium",
+            )
+            for direction in directions
+            if direction.status == "active"
+        ],
+        "groups_by_direction": groups_by_direction,
+        "teachers": [
+            {
+                "id": t.id,
+                "name": t.name,
+                "position": t.position,
+                "specialization": t.specialization,
+                "bio": t.bio,
+                "photo": _build_image_url(t.photo_path, "thumb"),
+            }
+            for t in teachers
+        ],
+        "teacher_cards": teacher_cards,
     }
 
 
+def _public_catalog(db):
+    return catalog_cache.get_or_build("snapshot", lambda: _build_public_catalog(db), serialize=False).payload
+
+
+@bp.route("/api/teachers", methods=["GET"])
+def list_public_teachers():
+    db = g.db
+    entry = catalog_cache.get_or_build("teachers", lambda: _public_catalog(db)["teachers"])
+    return catalog_response(entry)
+
+
+@bp.route("/api/teachers/<int:teacher_id>", methods=["GET"])
+def get_public_teacher(teacher_id):
+    db = g.db
+    if int(teacher_id) not in _public_catalog(db)["teacher_cards"]:
+        return {"error": "Преподаватель не найден"}, 404
+    entry = catalog_cache.get_or_build(
+        f"teacher:{int(teacher_id)}",
+        lambda: _public_catalog(db)["teacher_cards"].get(int(teacher_id)),
+    )
+    return catalog_response(entry)
+
+
 @bp.route("/api/teachers/<int:teacher_id>/schedule", methods=["GET"])
 def get_public_teacher_schedule(teacher_id):
     db = g.db
@@ -4387,24 +4346,20 @@ def get_directions():
     """Получает все активные направления"""
     db = g.db
     direction_type = request.args.get("direction_type") or request.args.get("type")
-    query = db.query(Direction).filter_by(status="active")
     if direction_type:
         direction_type = direction_type.lower()
         if direction_type not in ALLOWED_DIRECTION_TYPES:
             return {"error": "direction_type должен быть 'dance' или 'sport'"}, 400
-        query = query.filter(Direction.direction_type == direction_type)
 
-    directions = query.order_by(Direction.created_at.desc()).all()
-
-    #print(f"✓ Найдено {len(directions)} активных направлений")
-    
-    result = []
-    for d in directions:
-        groups_count = db.query(Group).filter_by(direction_id=d.direction_id).count()
-
-        result.append(_serialize_direction_payload(d, groups_count=groups_count))
-
-    return jsonify(result)
+    entry = catalog_cache.get_or_build(
+        f"directions:{direction_type or '*'}",
+        lambda: [
+            item
+            for item in _public_catalog(db)["directions"]
+            if not direction_type or item["direction_type"] == direction_type
+        ],
+    )
+    return catalog_response(entry)
 
 
 @bp.route("/api/directions/manage", methods=["GET"])
@@ -4455,48 +4410,14 @@ def get_direction(direction_id):
 def get_direction_groups(direction_id):
     """Возвращает список групп для направления"""
     db = g.db
-    direction = db.query(Direction).filter_by(direction_id=direction_id).first()
-    if not direction:
+    if int(direction_id) not in _public_catalog(db)["groups_by_direction"]:
         return {"error": "Направление не найдено"}, 404
 
-    groups = db.query(Group).filter_by(direction_id=direction_id).order_by(Group.created_at.desc()).all()
-    occupancy_map = get_group_occupancy_map(db, [group.id for group in groups if group and group.id])
-    schedule_map = _build_group_schedule_map(db, [group.id for group in groups if group and group.id])
-    result = []
-    for gr in groups:
-        teacher_name = gr.teacher.name if gr.teacher else None
-        teacher_photo = None
-        if gr.teacher and gr.teacher.photo_path:
-            teacher_photo = "/" + gr.teacher.photo_path.replace("\\", "/")
-        occupied_students = int(occupancy_map.get(int(gr.id), 0))
-        schedule_info = schedule_map.get(int(gr.id), {})
-        try:
-            max_students = int(gr.max_students or 0)
-        except (TypeError, ValueError):
-            max_students = 0
-        free_seats = max(0, max_students - occupied_students) if max_students > 0 else None
-        result.append({
-            "id": gr.id,
-            "direction_id": gr.direction_id,
-            "direction_type": direction.direction_type,
-            "direction_title": _sanitize_direction_title(direction.title),
-            "teacher_id": gr.teacher_id,
-            "teacher_name": teacher_name,
-            "teacher_photo": teacher_photo,
-            "name": gr.name,
-            "description": gr.description,
-            "age_group": gr.age_group,
-            "max_students": gr.max_students,
-            "occupied_students": occupied_students,
-            "free_seats": free_seats,
-            "duration_minutes": gr.duration_minutes,
-            "lessons_per_week": gr.lessons_per_week,
-            "schedule_summary": schedule_info.get("schedule_summary"),
-            "schedule_slots": schedule_info.get("schedule_slots", []),
-            "created_at": gr.created_at.isoformat()
-        })
-
-    return jsonify(result)
+    entry = catalog_cache.get_or_build(
+        f"direction_groups:{int(direction_id)}",
+        lambda: _public_catalog(db)["groups_by_direction"].get(int(direction_id), []),
+    )
+    return catalog_response(entry)
 
 
 @bp.route("/api/directions/<int:direction_id>/groups", methods=["POST"])
@@ -4838,6 +4759,7 @@ def upload_direction_photo_for_direction(direction_id: int):
     filename = secure_filename(f"photo_{direction_id}{detected_ext}")
     filepath = direction_media_dir / filename
     filepath.write_bytes(file_data)
+    schedule_image_variants(filepath)
     direction.image_path = os.path.relpath(filepath, PROJECT_ROOT)
     db.commit()
     return {"ok": True, "image_path": _build_image_url(direction.image_path)}
@@ -4882,6 +4804,7 @@ def upload_direction_photo(token):
         filename = secure_filename(f"photo_{session.session_id}{detected_ext}")
         filepath = directions_dir / filename
         filepath.write_bytes(file_data)
+        schedule_image_variants(filepath)
 
         # Сохраняем путь в БД относительно корня проекта
         relative_path = os.path.relpath(filepath, PROJECT_ROOT)
@@ -4917,6 +4840,46 @@ def get_public_system_settings():
     return jsonify({"items": items, "specs": list_setting_specs(public_only=True)})
 
 
+@bp.route("/api/admin/runtime-stats", methods=["GET"])
+def admin_get_runtime_stats():
+    perm_error = require_permission("system_settings")
+    if perm_error:
+        return perm_error
+
+    return jsonify(
+        {
+            "compression": compression_stats.snapshot(),
+            "catalog_cache": catalog_cache.stats(),
+            "profiling": profile_stats.snapshot(),
+        }
+    )
+
+
+_LOOPBACK_ADDRESSES = {"127.0.0.1", "::1"}
+_PROXY_HEADERS = ("X-Forwarded-For", "X-Real-IP")
+
+
+def _is_local_scrape() -> bool:
+    # nginx connects from loopback too, so a proxied request is recognised by its forwarding headers.
+    if request.remote_addr not in _LOOPBACK_ADDRESSES:
+        return False
+    return not any(request.headers.get(header) for header in _PROXY_HEADERS)
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Метрики процесса в текстовом формате Prometheus."""
+    if not (METRICS_ALLOW_LOCAL and _is_local_scrape()):
+        perm_error = require_permission("system_settings")
+        if perm_error:
+            return perm_error
+
+    response = make_response(metrics.render())
+    response.headers["Content-Type"] = TEXT_CONTENT_TYPE
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @bp.route("/api/admin/system-settings", methods=["GET"])
 def admin_get_system_settings():
     perm_error = require_permission("system_settings")
@@ -6222,6 +6185,70 @@ def admin_extend_group_abonement(abonement_id: int):
     )
 
 
+@bp.route("/api/admin/group-abonements/bulk-extend", methods=["POST"])
+def admin_bulk_extend_group_abonements():
+    """
+    Закрытие студии: продлевает активные абонементы выбранных групп (или всей студии) на N дней
+    и отменяет групповые занятия в указанные даты с возвратом списанных занятий.
+    План считается фиксированным числом запросов и пишется одной транзакцией; dry_run возвращает только план.
+    """
+    perm_error = require_permission("verify_certificate")
+    if perm_error:
+        return perm_error
+
+    db = g.db
+    try:
+        closure = parse_closure_request(request.json or {})
+    except BulkAbonementError as exc:
+        return {"error": str(exc)}, exc.status_code
+    if closure.cancel_dates:
+        perm_error = require_permission("manage_schedule")
+        if perm_error:
+            return perm_error
+    try:
+        plan = plan_studio_closure(db, closure, lock=not closure.dry_run)
+    except BulkAbonementError as exc:
+        return {"error": str(exc)}, exc.status_code
+
+    messages = build_closure_messages(closure, plan) if closure.notify else []
+    payload = {
+        "dry_run": closure.dry_run,
+        "whole_studio": closure.whole_studio,
+        "group_ids": list(closure.group_ids),
+        "extend_days": closure.extend_days,
+        "cancel_dates": [value.isoformat() for value in closure.cancel_dates],
+        "extended_abonements": len(plan.extended),
+        "already_extended_abonement_ids": plan.already_extended_ids,
+        "cancelled_schedules": len(plan.schedules),
+        "refunded_credits": sum(item.credits for item in plan.refunds),
+        "notification_recipients": len(messages),
+        "abonements": [item.serialize() for item in plan.changes],
+        "schedules": plan.serialize_schedules(),
+    }
+    if closure.dry_run:
+        return jsonify(payload), 200
+
+    staff = _get_current_staff(db)
+    try:
+        apply_studio_closure(db, closure, plan, staff_id=staff.id if staff else None)
+        batch = queue_notification_batch(
+            db,
+            event_type=CLOSURE_EVENT_TYPE,
+            title=CLOSURE_NOTIFY_TITLE,
+            body=CLOSURE_NOTIFY_TITLE,
+            recipients=[(message.user_id, message.body) for message in messages],
+            staff_id=staff.id if staff else None,
+        )
+        db.commit()
+    except Exception:
+        return internal_server_error_response(
+            context="Failed to apply studio closure",
+            db=db,
+        )
+    payload["notification_batch_id"] = batch.id if batch else None
+    return jsonify(payload), 200
+
+
 @bp.route("/api/admin/group-abonements/<int:abonement_id>/cancel", methods=["POST"])
 def admin_cancel_group_abonement(abonement_id: int):
     perm_error = require_permission("verify_certificate")
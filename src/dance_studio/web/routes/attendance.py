@@ -4,6 +4,7 @@ from dance_studio.core.time import utcnow
 
 from flask import Blueprint, g, request
 
+from dance_studio.core.admin_feed import current_feed_cursor
 from dance_studio.db.models import Attendance, AttendanceIntention, BookingRequest, Group, IndividualLesson, Schedule, User
 from dance_studio.web.constants import (
     ATTENDANCE_ALLOWED_STATUSES,
@@ -13,14 +14,15 @@ from dance_studio.web.constants import (
     INACTIVE_SCHEDULE_STATUSES,
 )
 from dance_studio.core.system_settings_service import get_setting_value
+from dance_studio.web.middleware.replica import read_replica
 from dance_studio.web.services.access import _get_current_staff, get_current_user_from_request, require_permission
 from dance_studio.web.services.attendance import (
-    _attendance_already_debited,
     _attendance_intention_lock_info,
     _attendance_marking_window_info,
     _can_user_set_absence_for_schedule,
-    _debit_abonement_for_attendance,
+    _debited_attendance_ids,
     _load_group_roster,
+    _mark_attendance_sheet,
     _resolve_group_active_abonement,
     _serialize_attendance_intention_with_lock,
 )
@@ -99,11 +101,14 @@ def get_attendance(schedule_id):
         except (TypeError, ValueError):
             return None
 
+    # Admins follow marks made elsewhere over the admin stream, replaying from before this read.
+    feed_cursor = current_feed_cursor(db).token() if require_permission("manage_schedule") is None else None
     existing = {a.user_id: a for a in db.query(Attendance).filter_by(schedule_id=schedule_id).all()}
     intentions = {
         row.user_id: row
         for row in db.query(AttendanceIntention).filter_by(schedule_id=schedule_id).all()
     }
+    debited_ids = _debited_attendance_ids(db, [att.id for att in existing.values()])
     items = []
     roster_source = None
     roster_user_ids = set()
@@ -126,7 +131,7 @@ def get_attendance(schedule_id):
                 "status": att.status if att else None,
                 "comment": att.comment if att else None,
                 "abonement_id": att.abonement_id if att else (abon.id if abon else None),
-                "debited": _attendance_already_debited(db, att.id) if att else False,
+                "debited": att.id in debited_ids if att else False,
                 "planned_absence": bool(planned and planned.status == ATTENDANCE_INTENTION_STATUS_WILL_MISS),
                 "planned_absence_reason": planned.reason if planned else None,
                 "planned_status": planned_status,
@@ -201,7 +206,7 @@ def get_attendance(schedule_id):
                     "status": att.status if att else None,
                     "comment": att.comment if att else None,
                     "abonement_id": att.abonement_id if att else None,
-                    "debited": _attendance_already_debited(db, att.id) if att else False,
+                    "debited": att.id in debited_ids if att else False,
                     "planned_absence": bool(planned and planned.status == ATTENDANCE_INTENTION_STATUS_WILL_MISS),
                     "planned_absence_reason": planned.reason if planned else None,
                     "planned_status": planned_status,
@@ -243,8 +248,14 @@ def get_attendance(schedule_id):
                 items.append(entry)
 
     # add remaining manual/legacy attendance
+    extra_user_ids = {att.user_id for att in existing.values()} | {planned.user_id for planned in intentions.values()}
+    extra_users = (
+        {user.id: user for user in db.query(User).filter(User.id.in_(extra_user_ids)).all()}
+        if extra_user_ids
+        else {}
+    )
     for att in existing.values():
-        user = db.query(User).filter_by(id=att.user_id).first()
+        user = extra_users.get(att.user_id)
         planned = intentions.pop(att.user_id, None)
         planned_status = "will_miss" if (planned and planned.status == ATTENDANCE_INTENTION_STATUS_WILL_MISS) else "will_come"
         entry = {
@@ -255,7 +266,7 @@ def get_attendance(schedule_id):
             "status": att.status,
             "comment": att.comment,
             "abonement_id": att.abonement_id,
-            "debited": _attendance_already_debited(db, att.id),
+            "debited": att.id in debited_ids,
             "planned_absence": bool(planned and planned.status == ATTENDANCE_INTENTION_STATUS_WILL_MISS),
             "planned_absence_reason": planned.reason if planned else None,
             "planned_status": planned_status,
@@ -306,7 +317,7 @@ def get_attendance(schedule_id):
         items.append(entry)
 
     for planned in intentions.values():
-        user = db.query(User).filter_by(id=planned.user_id).first()
+        user = extra_users.get(planned.user_id)
         entry = {
             "user_id": planned.user_id,
             "name": user.name if user else None,
@@ -340,6 +351,7 @@ def get_attendance(schedule_id):
 
     return {
         "items": items,
+        "feed_cursor": feed_cursor,
         "financial_allowed": financial_allowed,
         "source": roster_source or "manual",
         "status_labels": status_labels,
@@ -416,14 +428,10 @@ def set_attendance(schedule_id):
     if not isinstance(items, list):
         return {"error": "items должен быть списком"}, 400
 
-    staff = _get_current_staff(db)
-    results = []
-    now = utcnow()
-
+    marks = {}
     for item in items:
         user_id = item.get("user_id")
         status = (item.get("status") or "").lower()
-        comment = item.get("comment")
         if status not in ATTENDANCE_ALLOWED_STATUSES:
             return {"error": f"Недопустимый статус: {status}"}, 400
         if not user_id:
@@ -432,44 +440,30 @@ def set_attendance(schedule_id):
             user_id_int = int(user_id)
         except (TypeError, ValueError):
             return {"error": "user_id должен быть числом"}, 400
+        # A user listed twice keeps the last mark, as if the items were applied in order.
+        marks.pop(user_id_int, None)
+        marks[user_id_int] = (status, item.get("comment"))
 
-        att = db.query(Attendance).filter_by(schedule_id=schedule_id, user_id=user_id_int).first()
-        if not att:
-            att = Attendance(schedule_id=schedule_id, user_id=user_id_int)
-            db.add(att)
-        att.status = status
-        att.comment = comment
-        att.marked_at = now
-        att.marked_by_staff_id = staff.id if staff else None
-
-        if schedule.object_type == "group":
-            if not att.abonement_id:
-                group_id = schedule.group_id or schedule.object_id
-                abon = _resolve_group_active_abonement(db, user_id_int, group_id, schedule.date) if group_id else None
-                if abon:
-                    att.abonement_id = abon.id
-
-        db.flush()
-        debited = _debit_abonement_for_attendance(db, att, staff)
+    staff = _get_current_staff(db)
+    results = []
+    rows = _mark_attendance_sheet(db, schedule, marks, staff, utcnow()) if marks else []
+
+    for row in rows:
         payload = {
-            "user_id": user_id_int,
-            "status": att.status,
-            "comment": att.comment,
-            "abonement_id": att.abonement_id,
-            "debited": debited or _attendance_already_debited(db, att.id),
+            "user_id": row["user_id"],
+            "status": row["status"],
+            "comment": row["comment"],
+            "abonement_id": row["abonement_id"],
+            "debited": row["debited"],
         }
 
         if financial_allowed:
-            status_norm = str(att.status or "").strip().lower()
+            status_norm = str(row["status"] or "").strip().lower()
             counted = status_norm in ATTENDANCE_DEBIT_STATUSES
             if counted:
-                lesson_price = _safe_int(getattr(att, "lesson_price_rub", None))
+                lesson_price = _safe_int(row["lesson_price_rub"])
                 if lesson_price is None and schedule.object_type == "group":
-                    lesson_price = _safe_int(getattr(getattr(att, "abonement", None), "price_per_lesson_rub", None))
-                    if lesson_price is None:
-                        group_id = schedule.group_id or schedule.object_id
-                        abon = _resolve_group_active_abonement(db, user_id_int, group_id, schedule.date) if group_id else None
-                        lesson_price = _safe_int(getattr(abon, "price_per_lesson_rub", None)) if abon else None
+                    lesson_price = _safe_int(row["abonement_price"])
                 if lesson_price is None and schedule.object_type == "individual":
                     lesson_price = booking_price or 0
 
@@ -477,7 +471,7 @@ def set_attendance(schedule_id):
                 if lesson_price < 0:
                     lesson_price = 0
 
-                percent = _safe_int(getattr(att, "teacher_percent", None))
+                percent = _safe_int(row["teacher_percent"])
                 if percent is None:
                     percent = payout_percent
                 if percent is None or percent < 0:
@@ -485,7 +479,7 @@ def set_attendance(schedule_id):
                 if percent > 100:
                     percent = 100
 
-                payout = _safe_int(getattr(att, "teacher_payout_rub", None))
+                payout = _safe_int(row["teacher_payout_rub"])
                 if payout is None:
                     payout = (lesson_price * percent) // 100 if lesson_price and percent else 0
             else:
@@ -554,6 +548,7 @@ def add_attendance_user(schedule_id):
 
 
 @bp.route("/api/teacher-payout/day", methods=["GET"])
+@read_replica
 def get_teacher_day_payout():
     db = g.db
     date_str = (request.args.get("date") or "").strip()
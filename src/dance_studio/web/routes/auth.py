@@ -33,7 +33,6 @@ from dance_studio.web.services.auth_session import (
     _clear_csrf_cookie,
     _clear_sid_cookie,
     _create_session,
-    _delete_expired_sessions_for_user,
     _enforce_session_limit,
     _extract_init_data_from_request,
     _extract_ip_prefix,
@@ -155,7 +154,6 @@ def _login_user(db, *, user_id: int, telegram_id: int | None, extra_payload: dic
     user_agent_hash = _hash_user_agent(request.headers.get("User-Agent"))
     ip_prefix = _extract_ip_prefix()
 
-    _delete_expired_sessions_for_user(db, user_id=user_id)
     _create_session(db, telegram_id, sid, now, expires_at, user_agent_hash, ip_prefix, user_id=user_id)
     db.flush()
     _enforce_session_limit(db, user_id=user_id)
@@ -1,7 +1,7 @@
 import json
 from datetime import date, datetime
 
-from flask import Blueprint, current_app, g, jsonify, request
+from flask import Blueprint, Response, current_app, g, jsonify, request
 from sqlalchemy import and_, or_
 
 from dance_studio.core.abonement_pricing import (
@@ -12,6 +12,7 @@ from dance_studio.core.abonement_pricing import (
     quote_group_booking,
     serialize_group_booking_quote,
 )
+from dance_studio.core.admin_feed import current_feed_cursor
 from dance_studio.core.booking_utils import BOOKING_STATUS_LABELS, BOOKING_TYPE_LABELS
 from dance_studio.core.booking_amounts import compute_non_group_booking_base_amount
 from dance_studio.core.config import OWNER_IDS, TECH_ADMIN_ID
@@ -39,6 +40,12 @@ from dance_studio.db.models import (
 from dance_studio.auth.services.verification import VerifiedPhoneRequiredError, require_verified_phone, verified_phone_required_payload
 from dance_studio.web.constants import ALLOWED_DIRECTION_TYPES, INACTIVE_SCHEDULE_STATUSES
 from dance_studio.web.services.access import _get_current_staff, get_current_user_from_request, require_permission
+from dance_studio.web.services.admin_stream import (
+    acquire_stream_slot,
+    parse_stream_cursor,
+    release_stream_slot,
+    stream_admin_changes,
+)
 from dance_studio.web.services.api_errors import safe_client_error_message
 from dance_studio.web.services.bookings import (
     BookingAlreadyExistsError,
@@ -581,19 +588,8 @@ def _serialize_admin_booking_request(
     }
 
 
-@bp.route("/api/admin/booking-requests", methods=["GET"])
-def admin_list_booking_requests():
-    perm_error = require_permission("manage_schedule")
-    if perm_error:
-        return perm_error
-
-    db = g.db
-    rows = (
-        db.query(BookingRequest)
-        .order_by(BookingRequest.created_at.desc(), BookingRequest.id.desc())
-        .all()
-    )
-
+def _serialize_admin_booking_requests(db, rows) -> list[dict]:
+    """Admin payloads for a batch of bookings; users, groups and teachers are loaded in one query each."""
     user_ids = sorted({int(row.user_id) for row in rows if row and row.user_id})
     users_by_id: dict[int, User] = {}
     if user_ids:
@@ -624,7 +620,7 @@ def admin_list_booking_requests():
         teachers = db.query(Staff).filter(Staff.id.in_(sorted(teacher_ids))).all()
         teachers_by_id = {int(teacher.id): teacher for teacher in teachers if teacher and teacher.id}
 
-    items = [
+    return [
         _serialize_admin_booking_request(
             row,
             users_by_id=users_by_id,
@@ -633,7 +629,48 @@ def admin_list_booking_requests():
         )
         for row in rows
     ]
-    return jsonify({"items": items})
+
+
+@bp.route("/api/admin/booking-requests", methods=["GET"])
+def admin_list_booking_requests():
+    perm_error = require_permission("manage_schedule")
+    if perm_error:
+        return perm_error
+
+    db = g.db
+    # Taken before the list: the stream replays from here, so nothing committed in between is missed.
+    feed_cursor = current_feed_cursor(db).token()
+    rows = (
+        db.query(BookingRequest)
+        .order_by(BookingRequest.created_at.desc(), BookingRequest.id.desc())
+        .all()
+    )
+    return jsonify({"items": _serialize_admin_booking_requests(db, rows), "feed_cursor": feed_cursor})
+
+
+@bp.route("/api/admin/stream", methods=["GET"])
+def admin_change_stream():
+    """SSE: booking requests, payments and attendance marks as they change (see core.admin_feed)."""
+    perm_error = require_permission("manage_schedule")
+    if perm_error:
+        return perm_error
+
+    cursor = parse_stream_cursor(request.headers.get("Last-Event-ID"), request.args.get("after"))
+    if not acquire_stream_slot():
+        response = jsonify({"error": "Слишком много открытых потоков обновлений, попробуйте позже"})
+        response.status_code = 503
+        response.headers["Retry-After"] = "30"
+        return response
+
+    response = Response(
+        stream_admin_changes(cursor, serialize_bookings=_serialize_admin_booking_requests),
+        mimetype="text/event-stream",
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    # nginx would otherwise buffer the stream and deliver events in bursts.
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(release_stream_slot)
+    return response
 
 
 @bp.route("/api/admin/booking-requests/<int:booking_id>/approve", methods=["POST"])
@@ -1,12 +1,19 @@
+import mimetypes
 import re
 from pathlib import Path
 
-from flask import Blueprint, g, request, send_from_directory
+from flask import Blueprint, g, request, send_file, send_from_directory
 from werkzeug.utils import safe_join
 
+from dance_studio.core.frontend_assets import (
+    built_service_worker_path,
+    has_precompressed_variants,
+    select_precompressed,
+)
 from dance_studio.core.media_manager import delete_user_photo, save_user_photo
 from dance_studio.db.models import Staff, User
 from dance_studio.web.constants import FRONTEND_DIR, MEDIA_ROOT, PROJECT_ROOT
+from dance_studio.web.middleware.compression import skip_compression
 from dance_studio.web.services.access import get_current_user_from_request, require_permission
 from dance_studio.web.services.api_errors import internal_server_error_response, safe_client_error_message
 from dance_studio.web.services.upload_validation import validate_image_upload
@@ -46,10 +53,23 @@ def _is_hashed_asset(filename: str) -> bool:
 
 
 @bp.route("/assets/<path:filename>")
+@skip_compression
 def serve_frontend_asset(filename):
-    asset_path = Path(FRONTEND_DIR) / filename
-    if asset_path.exists() and asset_path.is_file():
-        response = send_from_directory(FRONTEND_DIR, filename)
+    safe_path = safe_join(FRONTEND_DIR, filename)
+    asset_path = Path(safe_path) if safe_path else None
+    if asset_path is not None and asset_path.is_file():
+        if has_precompressed_variants(asset_path):
+            served_path, encoding = select_precompressed(asset_path, request.accept_encodings)
+            response = send_file(
+                served_path,
+                mimetype=mimetypes.guess_type(asset_path.name)[0] or "application/octet-stream",
+                conditional=True,
+            )
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            response.vary.add("Accept-Encoding")
+        else:
+            response = send_from_directory(FRONTEND_DIR, filename)
         response.headers["Cache-Control"] = (
             _ASSET_CACHE_LONG if _is_hashed_asset(filename) else _ASSET_CACHE_SHORT
         )
@@ -57,6 +77,15 @@ def serve_frontend_asset(filename):
     return {"error": "file not found"}, 404
 
 
+@bp.route("/sw.js")
+def serve_service_worker():
+    # Served from the site root so its scope covers the app shell, not only /assets/.
+    sw_path = built_service_worker_path(FRONTEND_DIR) or Path(FRONTEND_DIR) / "sw.js"
+    response = send_file(sw_path, mimetype="text/javascript", conditional=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 @bp.route("/users/<int:user_id>/photo", methods=["POST"])
 def upload_user_photo(user_id):
     db = g.db
@@ -140,6 +169,7 @@ def delete_user_photo_endpoint(user_id):
 
 
 @bp.route("/media/<path:filename>")
+@skip_compression
 def serve_media(filename):
     legacy_dir = PROJECT_ROOT / "database" / "media"
 
@@ -155,6 +185,7 @@ def serve_media(filename):
 
 
 @bp.route("/database/media/<path:filename>")
+@skip_compression
 def serve_media_full(filename):
     legacy_dir = PROJECT_ROOT / "database" / "media"
 
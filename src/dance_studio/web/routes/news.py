@@ -4,6 +4,7 @@ import os
 
 from flask import Blueprint, g, jsonify, make_response, request
 
+from dance_studio.core.image_variants import schedule_image_variants
 from dance_studio.core.media_manager import delete_user_photo
 from dance_studio.db.models import News
 from dance_studio.web.constants import PROJECT_ROOT
@@ -16,12 +17,12 @@ from dance_studio.web.services.upload_validation import validate_image_upload
 bp = Blueprint("news_routes", __name__)
 
 
-def _serialize_news_item(news):
+def _serialize_news_item(news, image_variant=None):
     return {
         "id": news.id,
         "title": sanitize_plain_text(news.title, multiline=False) or "",
         "content": sanitize_plain_text(news.content) or "",
-        "photo_path": _build_image_url(news.photo_path),
+        "photo_path": _build_image_url(news.photo_path, image_variant),
         "created_at": news.created_at.isoformat(),
         "status": news.status,
     }
@@ -74,14 +75,14 @@ def get_news():
 
     result = []
     for item in data:
-        payload = _serialize_news_item(item)
+        payload = _serialize_news_item(item, image_variant="medium")
         payload.pop("status", None)
         result.append(payload)
 
     payload_json = json.dumps(result, ensure_ascii=False, sort_keys=True)
     etag = f"\"{hashlib.sha256(payload_json.encode('utf-8')).hexdigest()}\""
-    client_etag = request.headers.get("If-None-Match")
-    if client_etag == etag:
+    # Compressed responses carry the weak form of this tag; weak comparison matches both.
+    if request.if_none_match.contains_weak(etag.strip('"')):
         resp = make_response("", 304)
         resp.headers["ETag"] = etag
         resp.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
@@ -132,6 +133,7 @@ def upload_news_photo(news_id):
         file_path = os.path.join(news_dir, filename)
         with open(file_path, "wb") as file_handle:
             file_handle.write(file_data)
+        schedule_image_variants(file_path)
 
         photo_path = os.path.relpath(file_path, PROJECT_ROOT)
         news.photo_path = photo_path
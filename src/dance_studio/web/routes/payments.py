@@ -4,6 +4,7 @@ from dance_studio.core.time import utcnow
 from flask import Blueprint, g, jsonify, request
 from sqlalchemy import func
 
+from dance_studio.core.admin_feed import current_feed_cursor
 from dance_studio.core.statuses import (
     ABONEMENT_STATUS_ACTIVE,
     BOOKING_STATUS_CANCELLED,
@@ -352,8 +353,10 @@ def admin_list_payments():
         dt_to = datetime.combine(date_to, datetime.min.time()) + timedelta(days=1)
         query = query.filter(effective_ts < dt_to)
 
+    # Taken before the list, like the booking list: the admin stream replays from here.
+    feed_cursor = current_feed_cursor(db).token()
     rows = query.order_by(PaymentTransaction.confirmed_at.desc(), PaymentTransaction.created_at.desc()).all()
-    return jsonify({"items": [_serialize_payment_transaction(db, row) for row in rows]})
+    return jsonify({"items": [_serialize_payment_transaction(db, row) for row in rows], "feed_cursor": feed_cursor})
 
 
 @bp.route("/api/admin/booking-requests/<int:booking_id>/confirm-payment", methods=["POST"])
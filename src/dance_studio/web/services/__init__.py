@@ -42,7 +42,6 @@ from .auth_session import (
     _clear_csrf_cookie,
     _clear_sid_cookie,
     _create_session,
-    _delete_expired_sessions_for_user,
     _enforce_session_limit,
     _extract_init_data_from_request,
     _extract_ip_prefix,
@@ -89,7 +88,6 @@ __all__ = [
     "_compute_duration_minutes",
     "_create_session",
     "_debit_abonement_for_attendance",
-    "_delete_expired_sessions_for_user",
     "_enforce_session_limit",
     "_ensure_payment_profiles",
     "_extract_init_data_from_request",
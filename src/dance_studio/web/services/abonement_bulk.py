@@ -0,0 +1,586 @@
+from __future__ import annotations
+
+import html
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
+
+from sqlalchemy import and_, func, insert, or_, update
+
+from dance_studio.core.group_slot_summaries import mark_group_schedules_changed
+from dance_studio.core.statuses import ABONEMENT_STATUS_ACTIVE
+from dance_studio.core.time import utcnow
+from dance_studio.db.models import Attendance, Group, GroupAbonement, GroupAbonementActionLog, Schedule, Staff
+from dance_studio.web.constants import INACTIVE_SCHEDULE_STATUSES
+from dance_studio.web.services.admin import _schedule_group_id
+
+CLOSURE_MAX_EXTEND_DAYS = 90
+CLOSURE_MAX_CANCEL_DATES = 31
+CLOSURE_EXTEND_ACTION = "studio_closure_extend"
+CLOSURE_REFUND_ACTION = "studio_closure_refund"
+CLOSURE_EVENT_TYPE = "studio_closure"
+CLOSURE_NOTIFY_TITLE = "Изменения в расписании студии"
+LESSON_COMPENSATION_EXTENSION = timedelta(days=7)
+
+
+class BulkAbonementError(ValueError):
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass(frozen=True, slots=True)
+class ClosureRequest:
+    group_ids: tuple[int, ...]
+    extend_days: int
+    cancel_dates: tuple[date, ...]
+    note: str
+    notify: bool
+    dry_run: bool
+
+    @property
+    def whole_studio(self) -> bool:
+        return not self.group_ids
+
+    @property
+    def reason(self) -> str:
+        """Idempotency key of the action logs: repeating the same closure changes nothing."""
+        scope = ",".join(map(str, self.group_ids)) or "all"
+        dates = ",".join(item.isoformat() for item in self.cancel_dates) or "-"
+        return f"closure:{scope}:{dates}:+{self.extend_days}d"
+
+
+@dataclass(slots=True)
+class AbonementChange:
+    abonement_id: int
+    user_id: int
+    group_id: int
+    valid_to: datetime | None
+    balance_credits: int
+    extend_days: int = 0
+    refund_credits: int = 0
+
+    @property
+    def new_valid_to(self) -> datetime | None:
+        if self.valid_to is None or not self.extend_days:
+            return self.valid_to
+        return self.valid_to + timedelta(days=self.extend_days)
+
+    def serialize(self) -> dict:
+        return {
+            "abonement_id": self.abonement_id,
+            "user_id": self.user_id,
+            "group_id": self.group_id,
+            "valid_to": self.valid_to.isoformat() if self.valid_to else None,
+            "new_valid_to": self.new_valid_to.isoformat() if self.new_valid_to else None,
+            "extend_days": self.extend_days,
+            "refund_credits": self.refund_credits,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class CreditRefund:
+    attendance_id: int
+    abonement_id: int
+    user_id: int
+    schedule_id: int
+    credits: int
+
+
+@dataclass(slots=True)
+class ClosurePlan:
+    changes: list[AbonementChange] = field(default_factory=list)
+    schedules: list[Schedule] = field(default_factory=list)
+    refunds: list[CreditRefund] = field(default_factory=list)
+    already_extended_ids: list[int] = field(default_factory=list)
+    group_names: dict[int, str] = field(default_factory=dict)
+    teacher_user_ids: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def extended(self) -> list[AbonementChange]:
+        return [item for item in self.changes if item.extend_days]
+
+    @property
+    def cancelled_group_ids(self) -> set[int]:
+        return {group_id for group_id in (_schedule_group_id(row) for row in self.schedules) if group_id}
+
+    def serialize_schedules(self) -> list[dict]:
+        items = []
+        for row in self.schedules:
+            time_from = row.time_from or row.start_time
+            time_to = row.time_to or row.end_time
+            items.append(
+                {
+                    "id": row.id,
+                    "group_id": _schedule_group_id(row),
+                    "title": row.title,
+                    "date": row.date.isoformat() if row.date else None,
+                    "time_from": time_from.strftime("%H:%M") if time_from else None,
+                    "time_to": time_to.strftime("%H:%M") if time_to else None,
+                }
+            )
+        return items
+
+
+@dataclass(frozen=True, slots=True)
+class ClosureMessage:
+    user_id: int
+    title: str
+    body: str
+
+
+@dataclass(frozen=True, slots=True)
+class LessonCompensation:
+    """How one cancelled or moved group lesson is made up for; `reason` is the idempotency key of its logs."""
+
+    reason: str
+    extend_action: str
+    refund_action: str
+    extend_note: str
+    refund_note: str
+    payload: dict = field(default_factory=dict)
+
+
+def _parse_date(raw, field_name: str) -> date:
+    try:
+        return datetime.strptime(str(raw or ""), "%Y-%m-%d").date()
+    except ValueError:
+        raise BulkAbonementError(f"{field_name} должен быть в формате YYYY-MM-DD") from None
+
+
+def _parse_flag(raw) -> bool:
+    return str(raw).strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+def parse_closure_request(data: dict) -> ClosureRequest:
+    raw_group_ids = data.get("group_ids")
+    whole_studio = _parse_flag(data.get("whole_studio", False))
+    if raw_group_ids in (None, "", []):
+        if not whole_studio:
+            raise BulkAbonementError("Укажите group_ids или whole_studio=true")
+        group_ids: tuple[int, ...] = ()
+    else:
+        if whole_studio:
+            raise BulkAbonementError("group_ids и whole_studio взаимоисключающие")
+        if not isinstance(raw_group_ids, list):
+            raise BulkAbonementError("group_ids должен быть списком")
+        try:
+            group_ids = tuple(sorted({int(raw) for raw in raw_group_ids}))
+        except (TypeError, ValueError):
+            raise BulkAbonementError("group_ids должен содержать id групп") from None
+
+    try:
+        extend_days = int(data.get("extend_days") or 0)
+    except (TypeError, ValueError):
+        raise BulkAbonementError("extend_days должен быть целым числом") from None
+    if not 0 <= extend_days <= CLOSURE_MAX_EXTEND_DAYS:
+        raise BulkAbonementError(f"extend_days должен быть от 0 до {CLOSURE_MAX_EXTEND_DAYS}")
+
+    raw_dates = data.get("cancel_dates") or []
+    if not isinstance(raw_dates, list):
+        raise BulkAbonementError("cancel_dates должен быть списком дат")
+    cancel_dates = tuple(sorted({_parse_date(raw, "cancel_dates") for raw in raw_dates}))
+    if len(cancel_dates) > CLOSURE_MAX_CANCEL_DATES:
+        raise BulkAbonementError(f"Не больше {CLOSURE_MAX_CANCEL_DATES} дат за один запрос")
+    if not extend_days and not cancel_dates:
+        raise BulkAbonementError("Укажите extend_days или cancel_dates")
+
+    return ClosureRequest(
+        group_ids=group_ids,
+        extend_days=extend_days,
+        cancel_dates=cancel_dates,
+        note=str(data.get("note") or "").strip(),
+        notify=_parse_flag(data.get("notify", True)),
+        dry_run=_parse_flag(data.get("dry_run", False)),
+    )
+
+
+def _load_group_names(db, closure: ClosureRequest) -> dict[int, str]:
+    query = db.query(Group.id, Group.name)
+    if closure.group_ids:
+        query = query.filter(Group.id.in_(closure.group_ids))
+    names = {int(group_id): str(name or "") for group_id, name in query.all()}
+    missing = [group_id for group_id in closure.group_ids if group_id not in names]
+    if missing:
+        raise BulkAbonementError(f"Группы не найдены: {', '.join(map(str, missing))}", status_code=404)
+    return names
+
+
+def _load_schedules(db, closure: ClosureRequest, group_names: dict[int, str]) -> list[Schedule]:
+    if not closure.cancel_dates:
+        return []
+    rows = (
+        db.query(Schedule)
+        .filter(
+            Schedule.date.in_(closure.cancel_dates),
+            Schedule.status.notin_(list(INACTIVE_SCHEDULE_STATUSES)),
+            or_(Schedule.group_id.isnot(None), Schedule.object_type == "group"),
+        )
+        .order_by(Schedule.date.asc(), Schedule.time_from.asc(), Schedule.id.asc())
+        .all()
+    )
+    return [row for row in rows if _schedule_group_id(row) in group_names]
+
+
+def _load_refunds(db, schedules: list[Schedule]) -> list[CreditRefund]:
+    """Attendance of the cancelled lessons whose debits are not refunded yet, by whatever earlier action."""
+    if not schedules:
+        return []
+    schedule_ids = [row.id for row in schedules]
+    net_delta = func.sum(GroupAbonementActionLog.credits_delta)
+    rows = (
+        db.query(
+            Attendance.id,
+            GroupAbonementActionLog.abonement_id,
+            Attendance.user_id,
+            Attendance.schedule_id,
+            net_delta,
+        )
+        .join(GroupAbonementActionLog, GroupAbonementActionLog.attendance_id == Attendance.id)
+        .filter(Attendance.schedule_id.in_(schedule_ids))
+        .group_by(Attendance.id, GroupAbonementActionLog.abonement_id, Attendance.user_id, Attendance.schedule_id)
+        .having(net_delta < 0)
+        .all()
+    )
+    return [
+        CreditRefund(
+            attendance_id=int(attendance_id),
+            abonement_id=int(abonement_id),
+            user_id=int(user_id),
+            schedule_id=int(schedule_id),
+            credits=-int(delta),
+        )
+        for attendance_id, abonement_id, user_id, schedule_id, delta in rows
+    ]
+
+
+def plan_studio_closure(db, closure: ClosureRequest, *, now: datetime | None = None, lock: bool = False) -> ClosurePlan:
+    """
+    Computes every change up front with a fixed number of queries. With lock=True the affected
+    abonements are locked (FOR UPDATE) until the caller commits.
+    """
+    now = now or utcnow()
+    plan = ClosurePlan(group_names=_load_group_names(db, closure))
+
+    if closure.cancel_dates:
+        window_start = datetime.combine(closure.cancel_dates[0], time.min)
+        window_end = datetime.combine(closure.cancel_dates[-1], time.max)
+    else:
+        window_start = window_end = now
+    query = db.query(GroupAbonement).filter(
+        GroupAbonement.status == ABONEMENT_STATUS_ACTIVE,
+        GroupAbonement.valid_to.isnot(None),
+        GroupAbonement.valid_to >= window_start,
+        or_(GroupAbonement.valid_from.is_(None), GroupAbonement.valid_from <= window_end),
+    )
+    if closure.group_ids:
+        query = query.filter(GroupAbonement.group_id.in_(closure.group_ids))
+    if lock:
+        query = query.with_for_update()
+    abonements = {int(row.id): row for row in query.order_by(GroupAbonement.id.asc()).all()}
+
+    already_extended = set()
+    if closure.extend_days:
+        already_extended = {
+            int(abonement_id)
+            for (abonement_id,) in db.query(GroupAbonementActionLog.abonement_id).filter(
+                GroupAbonementActionLog.action_type == CLOSURE_EXTEND_ACTION,
+                GroupAbonementActionLog.reason == closure.reason,
+            )
+        }
+        plan.already_extended_ids = sorted(already_extended & set(abonements))
+
+    plan.schedules = _load_schedules(db, closure, plan.group_names)
+    plan.refunds = _load_refunds(db, plan.schedules)
+    # A credit goes back to the abonement it was debited from, even if that one has ended since.
+    missing_ids = sorted({item.abonement_id for item in plan.refunds} - set(abonements))
+    if missing_ids:
+        extra = db.query(GroupAbonement).filter(GroupAbonement.id.in_(missing_ids))
+        if lock:
+            extra = extra.with_for_update()
+        abonements.update({int(row.id): row for row in extra.all()})
+
+    changes: dict[int, AbonementChange] = {}
+
+    def _change(abonement: GroupAbonement) -> AbonementChange:
+        change = changes.get(int(abonement.id))
+        if change is None:
+            change = changes[int(abonement.id)] = AbonementChange(
+                abonement_id=int(abonement.id),
+                user_id=int(abonement.user_id),
+                group_id=int(abonement.group_id),
+                valid_to=abonement.valid_to,
+                balance_credits=int(abonement.balance_credits or 0),
+            )
+        return change
+
+    if closure.extend_days:
+        for abonement_id, abonement in abonements.items():
+            if (
+                abonement.status == ABONEMENT_STATUS_ACTIVE
+                and abonement.valid_to is not None
+                and abonement_id not in already_extended
+            ):
+                _change(abonement).extend_days = closure.extend_days
+    for refund in plan.refunds:
+        abonement = abonements.get(refund.abonement_id)
+        if abonement is not None:
+            _change(abonement).refund_credits += refund.credits
+    plan.changes = sorted(changes.values(), key=lambda item: item.abonement_id)
+
+    cancelled_group_ids = plan.cancelled_group_ids
+    if cancelled_group_ids:
+        plan.teacher_user_ids = {
+            int(group_id): int(user_id)
+            for group_id, user_id in db.query(Group.id, Staff.user_id)
+            .join(Staff, Staff.id == Group.teacher_id)
+            .filter(Group.id.in_(sorted(cancelled_group_ids)), Staff.user_id.isnot(None))
+            .all()
+        }
+    return plan
+
+
+def apply_studio_closure(db, closure: ClosureRequest, plan: ClosurePlan, *, staff_id: int | None) -> None:
+    """Writes the plan with one statement per table (bulk UPDATE by primary key, multi-row INSERT); the caller commits."""
+    if plan.changes:
+        db.execute(
+            update(GroupAbonement),
+            [
+                {
+                    "id": item.abonement_id,
+                    "valid_to": item.new_valid_to,
+                    "balance_credits": item.balance_credits + item.refund_credits,
+                }
+                for item in plan.changes
+            ],
+        )
+
+    if plan.schedules:
+        status_comment = f"Отменено: {closure.note}" if closure.note else "Отменено: студия закрыта"
+        db.execute(
+            update(Schedule)
+            .where(Schedule.id.in_([row.id for row in plan.schedules]))
+            .values(status="cancelled", status_comment=status_comment, updated_by=staff_id)
+            .execution_options(synchronize_session=False)
+        )
+        mark_group_schedules_changed(db, plan.cancelled_group_ids)
+
+    logs = [
+        {
+            "abonement_id": item.abonement_id,
+            "action_type": CLOSURE_EXTEND_ACTION,
+            "credits_delta": 0,
+            "reason": closure.reason,
+            "note": closure.note or f"Продление абонемента на {item.extend_days} дн. (студия закрыта)",
+            "attendance_id": None,
+            "actor_type": "staff",
+            "actor_id": staff_id,
+            "payload": json.dumps(
+                {
+                    "extend_days": item.extend_days,
+                    "cancel_dates": [value.isoformat() for value in closure.cancel_dates],
+                    "group_ids": list(closure.group_ids) or None,
+                    "user_id": item.user_id,
+                },
+                ensure_ascii=False,
+            ),
+        }
+        for item in plan.extended
+    ]
+    logs.extend(
+        {
+            "abonement_id": refund.abonement_id,
+            "action_type": CLOSURE_REFUND_ACTION,
+            "credits_delta": refund.credits,
+            "reason": closure.reason,
+            "note": "Возврат списания: занятие отменено (студия закрыта)",
+            "attendance_id": refund.attendance_id,
+            "actor_type": "staff",
+            "actor_id": staff_id,
+            "payload": json.dumps(
+                {"schedule_id": refund.schedule_id, "user_id": refund.user_id},
+                ensure_ascii=False,
+            ),
+        }
+        for refund in plan.refunds
+    )
+    if logs:
+        # Through the table: the ORM bulk insert would split rows with and without attendance_id into two statements.
+        db.execute(insert(GroupAbonementActionLog.__table__), logs)
+
+
+def build_closure_messages(closure: ClosureRequest, plan: ClosurePlan) -> list[ClosureMessage]:
+    """One message per person: abonement holders, attendees of cancelled lessons and their teachers."""
+    extended_by_user: dict[int, list[AbonementChange]] = defaultdict(list)
+    refunds_by_user: dict[int, int] = defaultdict(int)
+    for item in plan.extended:
+        extended_by_user[item.user_id].append(item)
+    for refund in plan.refunds:
+        refunds_by_user[refund.user_id] += refund.credits
+    recipients = set(extended_by_user) | set(refunds_by_user)
+    recipients.update(plan.teacher_user_ids.values())
+
+    dates_label = ", ".join(value.strftime("%d.%m.%Y") for value in closure.cancel_dates)
+    messages = []
+    for user_id in sorted(recipients):
+        lines = []
+        if dates_label:
+            lines.append(f"Студия не работает: {dates_label}. Занятия в эти дни отменены.")
+        for item in extended_by_user.get(user_id, ()):
+            group_name = html.escape(plan.group_names.get(item.group_id) or f"#{item.group_id}")
+            until = item.new_valid_to.strftime("%d.%m.%Y") if item.new_valid_to else "—"
+            lines.append(f"Абонемент «{group_name}» продлён на {item.extend_days} дн., до {until}.")
+        if refunds_by_user.get(user_id):
+            lines.append(f"Возвращено занятий на абонемент: {refunds_by_user[user_id]}.")
+        if closure.note:
+            lines.append(html.escape(closure.note))
+        messages.append(ClosureMessage(user_id=user_id, title=CLOSURE_NOTIFY_TITLE, body="\n".join(lines)))
+    return messages
+
+
+def _extended_valid_to(abonement: GroupAbonement, now: datetime) -> datetime:
+    if abonement.valid_to:
+        base = max(abonement.valid_to, now)
+    elif abonement.valid_from:
+        base = max(abonement.valid_from, now)
+    else:
+        base = now
+    return base + LESSON_COMPENSATION_EXTENSION
+
+
+def compensate_group_lesson(
+    db,
+    compensation: LessonCompensation,
+    *,
+    extend_abonement_ids: Iterable[int],
+    refund_attendance: Iterable[Attendance],
+    staff_id: int | None,
+    now: datetime | None = None,
+) -> tuple[int, int]:
+    """
+    Extends the given abonements by a week and returns the debited credit of each given attendance
+    row, skipping whatever this `reason` already did. The affected abonements are locked first, so
+    a repeated click waits and then finds its own logs. Returns (extended, refunded); the caller commits.
+    """
+    now = now or utcnow()
+    extend_ids = {int(abonement_id) for abonement_id in extend_abonement_ids}
+    attendance_by_id = {int(row.id): row for row in refund_attendance if row.abonement_id}
+    candidate_ids = extend_ids | {int(row.abonement_id) for row in attendance_by_id.values()}
+    if not candidate_ids:
+        return 0, 0
+
+    abonements = {
+        int(row.id): row
+        for row in db.query(GroupAbonement)
+        .filter(GroupAbonement.id.in_(sorted(candidate_ids)))
+        .order_by(GroupAbonement.id.asc())
+        .with_for_update()
+        .populate_existing()
+        .all()
+    }
+
+    extend_ids &= set(abonements)
+    if extend_ids:
+        extend_ids -= {
+            int(abonement_id)
+            for (abonement_id,) in db.query(GroupAbonementActionLog.abonement_id).filter(
+                GroupAbonementActionLog.abonement_id.in_(sorted(extend_ids)),
+                GroupAbonementActionLog.action_type == compensation.extend_action,
+                GroupAbonementActionLog.reason == compensation.reason,
+            )
+        }
+
+    refunds: list[Attendance] = []
+    if attendance_by_id:
+        debited: set[int] = set()
+        refunded: set[int] = set()
+        for attendance_id, action_type in db.query(
+            GroupAbonementActionLog.attendance_id,
+            GroupAbonementActionLog.action_type,
+        ).filter(
+            GroupAbonementActionLog.attendance_id.in_(sorted(attendance_by_id)),
+            or_(
+                GroupAbonementActionLog.action_type == "debit_attendance",
+                and_(
+                    GroupAbonementActionLog.action_type == compensation.refund_action,
+                    GroupAbonementActionLog.reason == compensation.reason,
+                ),
+            ),
+        ):
+            (debited if action_type == "debit_attendance" else refunded).add(int(attendance_id))
+        refunds = [
+            attendance_by_id[attendance_id]
+            for attendance_id in sorted(debited - refunded)
+            if int(attendance_by_id[attendance_id].abonement_id) in abonements
+        ]
+
+    values = {
+        abonement_id: {"id": abonement_id, "valid_to": row.valid_to, "balance_credits": int(row.balance_credits or 0)}
+        for abonement_id, row in abonements.items()
+    }
+    for abonement_id in extend_ids:
+        values[abonement_id]["valid_to"] = _extended_valid_to(abonements[abonement_id], now)
+    for attendance in refunds:
+        values[int(attendance.abonement_id)]["balance_credits"] += 1
+    changed_ids = extend_ids | {int(attendance.abonement_id) for attendance in refunds}
+    if not changed_ids:
+        return 0, 0
+    db.execute(update(GroupAbonement), [values[abonement_id] for abonement_id in sorted(changed_ids)])
+
+    logs = [
+        {
+            "abonement_id": abonement_id,
+            "action_type": compensation.extend_action,
+            "credits_delta": 0,
+            "reason": compensation.reason,
+            "note": compensation.extend_note,
+            "attendance_id": None,
+            "actor_type": "staff",
+            "actor_id": staff_id,
+            "payload": json.dumps(
+                {**compensation.payload, "user_id": int(abonements[abonement_id].user_id)},
+                ensure_ascii=False,
+            ),
+        }
+        for abonement_id in sorted(extend_ids)
+    ]
+    logs.extend(
+        {
+            "abonement_id": int(attendance.abonement_id),
+            "action_type": compensation.refund_action,
+            "credits_delta": 1,
+            "reason": compensation.reason,
+            "note": compensation.refund_note,
+            "attendance_id": int(attendance.id),
+            "actor_type": "staff",
+            "actor_id": staff_id,
+            "payload": json.dumps({**compensation.payload, "user_id": attendance.user_id}, ensure_ascii=False),
+        }
+        for attendance in refunds
+    )
+    db.execute(insert(GroupAbonementActionLog.__table__), logs)
+    return len(extend_ids), len(refunds)
+
+
+__all__ = [
+    "CLOSURE_EVENT_TYPE",
+    "CLOSURE_EXTEND_ACTION",
+    "CLOSURE_MAX_CANCEL_DATES",
+    "CLOSURE_MAX_EXTEND_DAYS",
+    "CLOSURE_NOTIFY_TITLE",
+    "CLOSURE_REFUND_ACTION",
+    "AbonementChange",
+    "BulkAbonementError",
+    "ClosureMessage",
+    "ClosurePlan",
+    "ClosureRequest",
+    "CreditRefund",
+    "apply_studio_closure",
+    "LessonCompensation",
+    "build_closure_messages",
+    "compensate_group_lesson",
+    "parse_closure_request",
+    "plan_studio_closure",
+]
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Callable, Iterator
+
+from dance_studio.core.admin_feed import FEED_ATTENDANCE, FEED_BOOKING, FEED_PAYMENT, current_feed_cursor, read_feed
+from dance_studio.core.event_cursor import EventCursor
+from dance_studio.db.models import Attendance, BookingRequest, PaymentTransaction
+
+ADMIN_STREAM_POLL_SECONDS = 1.0
+ADMIN_STREAM_HEARTBEAT_SECONDS = 15.0
+# A stream holds a gunicorn worker thread; it ends after this long and EventSource reconnects
+# with Last-Event-ID, so threads are handed back regularly and nothing is lost.
+ADMIN_STREAM_MAX_SECONDS = 55.0
+ADMIN_STREAM_MAX_PER_PROCESS = 2
+ADMIN_STREAM_RETRY_MS = 3000
+# More pending changes than this and a full reload is cheaper than replaying them one by one.
+ADMIN_STREAM_REPLAY_LIMIT = 500
+
+_stream_slots = threading.BoundedSemaphore(ADMIN_STREAM_MAX_PER_PROCESS)
+
+
+def acquire_stream_slot() -> bool:
+    return _stream_slots.acquire(blocking=False)
+
+
+def release_stream_slot() -> None:
+    _stream_slots.release()
+
+
+def parse_stream_cursor(last_event_id: str | None, after: str | None) -> EventCursor | None:
+    """Last-Event-ID (set by the browser on reconnect) wins over ?after= from the initial list load."""
+    for raw in (last_event_id, after):
+        cursor = EventCursor.from_token(raw)
+        if cursor is not None:
+            return cursor
+    return None
+
+
+def format_sse(data, *, event: str | None = None, event_id: int | str | None = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+def _serialize_payment(payment: PaymentTransaction) -> dict:
+    return {
+        "id": payment.id,
+        "payment_type": payment.payment_type,
+        "object_id": payment.object_id,
+        "status": payment.status,
+        "amount": payment.amount,
+        "confirmed_at": payment.confirmed_at.isoformat() if payment.confirmed_at else None,
+    }
+
+
+def _serialize_attendance(attendance: Attendance) -> dict:
+    return {
+        "id": attendance.id,
+        "schedule_id": attendance.schedule_id,
+        "user_id": attendance.user_id,
+        "status": attendance.status,
+        "marked_at": attendance.marked_at.isoformat() if attendance.marked_at else None,
+    }
+
+
+def render_feed_events(db, rows, serialize_bookings: Callable, *, event_id: str | None = None) -> list[str]:
+    """
+    One SSE message per changed entity, in feed order. Only the last message carries `event_id` (the
+    cursor token): a stream cut in the middle resumes before the batch and simply sends it again.
+    """
+    latest: dict[tuple[str, int | None], int] = {}
+    for row in rows:
+        latest[(row.kind, row.entity_id)] = row.id
+
+    ids_by_kind: dict[str, list[int]] = {}
+    for kind, entity_id in latest:
+        if entity_id is not None:
+            ids_by_kind.setdefault(kind, []).append(entity_id)
+
+    payloads: dict[tuple[str, int], dict] = {}
+    booking_ids = ids_by_kind.get(FEED_BOOKING)
+    if booking_ids:
+        bookings = db.query(BookingRequest).filter(BookingRequest.id.in_(booking_ids)).all()
+        for item in serialize_bookings(db, bookings):
+            payloads[(FEED_BOOKING, item["id"])] = item
+    payment_ids = ids_by_kind.get(FEED_PAYMENT)
+    if payment_ids:
+        for payment in db.query(PaymentTransaction).filter(PaymentTransaction.id.in_(payment_ids)):
+            payloads[(FEED_PAYMENT, payment.id)] = _serialize_payment(payment)
+    attendance_ids = ids_by_kind.get(FEED_ATTENDANCE)
+    if attendance_ids:
+        for attendance in db.query(Attendance).filter(Attendance.id.in_(attendance_ids)):
+            payloads[(FEED_ATTENDANCE, attendance.id)] = _serialize_attendance(attendance)
+
+    messages = []
+    for kind, entity_id in sorted(latest, key=latest.get):
+        if entity_id is None:
+            messages.append(({"kind": kind}, "reload"))
+            continue
+        messages.append((payloads.get((kind, entity_id)) or {"id": entity_id, "deleted": True}, kind))
+    return [
+        format_sse(data, event=event, event_id=event_id if index == len(messages) - 1 else None)
+        for index, (data, event) in enumerate(messages)
+    ]
+
+
+def stream_admin_changes(
+    cursor: EventCursor | None,
+    *,
+    serialize_bookings: Callable,
+    session_factory=None,
+    max_seconds: float = ADMIN_STREAM_MAX_SECONDS,
+    poll_seconds: float = ADMIN_STREAM_POLL_SECONDS,
+    heartbeat_seconds: float = ADMIN_STREAM_HEARTBEAT_SECONDS,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Iterator[str]:
+    """
+    Yields SSE messages for feed events the cursor has not read (None: from now on). Each poll uses
+    a short session of its own, so an open stream does not keep a pooled connection checked out.
+    """
+    if session_factory is None:
+        import dance_studio.db as db_module
+
+        session_factory = db_module.get_session
+
+    started = last_sent = clock()
+    yield f"retry: {ADMIN_STREAM_RETRY_MS}\n\n"
+    while True:
+        db = session_factory()
+        try:
+            if cursor is None:
+                cursor = current_feed_cursor(db)
+                messages = []
+            else:
+                rows = read_feed(db, cursor, limit=ADMIN_STREAM_REPLAY_LIMIT)
+                if rows is None:
+                    cursor = current_feed_cursor(db)
+                    messages = [format_sse({}, event="resync", event_id=cursor.token())]
+                else:
+                    messages = render_feed_events(db, rows, serialize_bookings, event_id=cursor.token())
+        finally:
+            db.close()
+
+        for message in messages:
+            yield message
+            last_sent = clock()
+        if clock() - last_sent >= heartbeat_seconds:
+            yield ": ping\n\n"
+            last_sent = clock()
+        if clock() - started >= max_seconds:
+            return
+        sleep(poll_seconds)
+
+
+__all__ = [
+    "ADMIN_STREAM_MAX_PER_PROCESS",
+    "ADMIN_STREAM_MAX_SECONDS",
+    "acquire_stream_slot",
+    "format_sse",
+    "parse_stream_cursor",
+    "release_stream_slot",
+    "render_feed_events",
+    "stream_admin_changes",
+]
@@ -4,8 +4,9 @@ from datetime import datetime
 
 from dance_studio.core.time import utcnow
 
-from sqlalchemy import or_
+from sqlalchemy import insert, or_, update
 
+from dance_studio.core.admin_feed import FEED_ATTENDANCE, record_admin_feed
 from dance_studio.core.statuses import ABONEMENT_STATUS_ACTIVE
 from dance_studio.core.system_settings_service import get_setting_value
 from dance_studio.db.models import (
@@ -31,6 +32,36 @@ def _attendance_already_debited(db, attendance_id: int) -> bool:
     exists = db.query(GroupAbonementActionLog.id).filter_by(attendance_id=attendance_id).first()
     return bool(exists)
 
+def _debited_attendance_ids(db, attendance_ids) -> set[int]:
+    """Bulk form of _attendance_already_debited for a whole attendance sheet."""
+    attendance_ids = [int(attendance_id) for attendance_id in attendance_ids if attendance_id]
+    if not attendance_ids:
+        return set()
+    rows = (
+        db.query(GroupAbonementActionLog.attendance_id)
+        .filter(GroupAbonementActionLog.attendance_id.in_(attendance_ids))
+        .distinct()
+        .all()
+    )
+    return {int(attendance_id) for (attendance_id,) in rows}
+
+def _teacher_payout_fields(lesson_price, percent: int) -> dict:
+    try:
+        lesson_price = int(lesson_price)
+    except (TypeError, ValueError):
+        lesson_price = 0
+    if lesson_price < 0:
+        lesson_price = 0
+    payout = (lesson_price * percent) // 100 if lesson_price and percent else 0
+    return {"lesson_price_rub": lesson_price, "teacher_percent": percent, "teacher_payout_rub": payout}
+
+def _setting_payout_percent(db) -> int:
+    try:
+        percent = int(get_setting_value(db, "teachers.payout_percent"))
+    except Exception:
+        percent = 40
+    return min(max(percent, 0), 100)
+
 def _debit_abonement_for_attendance(db, attendance: Attendance, staff: Staff | None):
     if attendance.status not in ATTENDANCE_DEBIT_STATUSES:
         return False
@@ -43,27 +74,10 @@ def _debit_abonement_for_attendance(db, attendance: Attendance, staff: Staff | N
         return False
 
     if getattr(attendance, "teacher_payout_rub", None) is None:
-        raw_price = getattr(abon, "price_per_lesson_rub", None)
-        try:
-            lesson_price = int(raw_price)
-        except (TypeError, ValueError):
-            lesson_price = 0
-        if lesson_price < 0:
-            lesson_price = 0
-
-        try:
-            percent = int(get_setting_value(db, "teachers.payout_percent"))
-        except Exception:
-            percent = 40
-        if percent < 0:
-            percent = 0
-        if percent > 100:
-            percent = 100
-
-        payout = (lesson_price * percent) // 100 if lesson_price and percent else 0
-        attendance.lesson_price_rub = lesson_price
-        attendance.teacher_percent = percent
-        attendance.teacher_payout_rub = payout
+        fields = _teacher_payout_fields(getattr(abon, "price_per_lesson_rub", None), _setting_payout_percent(db))
+        attendance.lesson_price_rub = fields["lesson_price_rub"]
+        attendance.teacher_percent = fields["teacher_percent"]
+        attendance.teacher_payout_rub = fields["teacher_payout_rub"]
 
     abon.balance_credits -= 1
     log = GroupAbonementActionLog(
@@ -77,6 +91,144 @@ def _debit_abonement_for_attendance(db, attendance: Attendance, staff: Staff | N
     db.add(log)
     return True
 
+_MARK_COLUMNS = (
+    "status",
+    "comment",
+    "marked_at",
+    "marked_by_staff_id",
+    "abonement_id",
+    "lesson_price_rub",
+    "teacher_percent",
+    "teacher_payout_rub",
+)
+
+def _mark_attendance_sheet(db, schedule: Schedule, marks: dict, staff: Staff | None, now: datetime) -> list[dict]:
+    """
+    Set-based write path of POST /api/attendance/<id>; `marks` maps user_id -> (status, comment).
+    The sheet, roster and abonements are read once and the diff is written with one statement per
+    table, so the cost does not grow with the class. The schedule row is locked first: two people
+    marking the same lesson are applied one after the other and nobody is debited twice.
+    Returns one row per user with the written values plus `debited` and `abonement_price`.
+    """
+    db.query(Schedule.id).filter(Schedule.id == schedule.id).with_for_update().first()
+    staff_id = staff.id if staff else None
+    user_ids = list(marks)
+
+    existing: dict[int, Attendance] = {}
+    for att in (
+        db.query(Attendance)
+        .filter(Attendance.schedule_id == schedule.id, Attendance.user_id.in_(user_ids))
+        .order_by(Attendance.id.asc())
+    ):
+        existing.setdefault(att.user_id, att)
+    roster_abonements = {}
+    if schedule.object_type == "group":
+        roster_abonements = {row["user"].id: row["abonement"] for row in _load_group_roster(db, schedule)}
+
+    rows = []
+    for user_id, (status, comment) in marks.items():
+        att = existing.get(user_id)
+        abonement_id = att.abonement_id if att else None
+        if schedule.object_type == "group" and not abonement_id and user_id in roster_abonements:
+            abonement_id = roster_abonements[user_id].id
+        rows.append(
+            {
+                "id": att.id if att else None,
+                "user_id": user_id,
+                "status": status,
+                "comment": comment,
+                "marked_at": now,
+                "marked_by_staff_id": staff_id,
+                "abonement_id": abonement_id,
+                "lesson_price_rub": att.lesson_price_rub if att else None,
+                "teacher_percent": att.teacher_percent if att else None,
+                "teacher_payout_rub": att.teacher_payout_rub if att else None,
+            }
+        )
+
+    already_debited = _debited_attendance_ids(db, [row["id"] for row in rows])
+    abonement_ids = sorted({row["abonement_id"] for row in rows if row["abonement_id"]})
+    abonements = {
+        abon.id: abon
+        for abon in db.query(GroupAbonement)
+        .filter(GroupAbonement.id.in_(abonement_ids))
+        .order_by(GroupAbonement.id.asc())
+        .with_for_update()
+        .populate_existing()
+    } if abonement_ids else {}
+
+    balances = {abon_id: abon.balance_credits for abon_id, abon in abonements.items()}
+    debits = []
+    percent = None
+    for row in rows:
+        row["abonement_price"] = getattr(abonements.get(row["abonement_id"]), "price_per_lesson_rub", None)
+        if row["abonement_price"] is None:
+            row["abonement_price"] = getattr(roster_abonements.get(row["user_id"]), "price_per_lesson_rub", None)
+        row["debited"] = row["id"] in already_debited
+        if row["debited"] or row["status"] not in ATTENDANCE_DEBIT_STATUSES or not row["abonement_id"]:
+            continue
+        balance = balances.get(row["abonement_id"])
+        if balance is None or balance <= 0:
+            continue
+        balances[row["abonement_id"]] = balance - 1
+        row["debited"] = True
+        debits.append(row)
+        if row["teacher_payout_rub"] is None:
+            if percent is None:
+                percent = _setting_payout_percent(db)
+            row.update(_teacher_payout_fields(abonements[row["abonement_id"]].price_per_lesson_rub, percent))
+
+    # The feed entries are named below, so the bulk update is not logged again as an anonymous write.
+    updates = [row for row in rows if row["id"]]
+    if updates:
+        db.execute(
+            update(Attendance).execution_options(admin_feed_recorded=True),
+            [{"id": row["id"], **{key: row[key] for key in _MARK_COLUMNS}} for row in updates],
+        )
+    inserts = [row for row in rows if not row["id"]]
+    if inserts:
+        # Through the table: the ORM bulk insert would split rows with and without payout fields into several statements.
+        db.execute(
+            insert(Attendance.__table__),
+            [
+                {"schedule_id": schedule.id, "user_id": row["user_id"], **{key: row[key] for key in _MARK_COLUMNS}}
+                for row in inserts
+            ],
+        )
+        # Read back instead of RETURNING: not every backend keeps executemany results in parameter
+        # order. The schedule lock guarantees these users had no row before this insert.
+        new_ids = dict(
+            db.query(Attendance.user_id, Attendance.id).filter(
+                Attendance.schedule_id == schedule.id,
+                Attendance.user_id.in_([row["user_id"] for row in inserts]),
+            )
+        )
+        for row in inserts:
+            row["id"] = new_ids[row["user_id"]]
+    record_admin_feed(db, FEED_ATTENDANCE, [row["id"] for row in rows])
+
+    if debits:
+        debited_abonement_ids = sorted({row["abonement_id"] for row in debits})
+        db.execute(
+            update(GroupAbonement),
+            [{"id": abon_id, "balance_credits": balances[abon_id]} for abon_id in debited_abonement_ids],
+        )
+        db.execute(
+            insert(GroupAbonementActionLog.__table__),
+            [
+                {
+                    "abonement_id": row["abonement_id"],
+                    "action_type": "debit_attendance",
+                    "credits_delta": -1,
+                    "attendance_id": row["id"],
+                    "actor_type": "staff",
+                    "actor_id": staff_id,
+                }
+                for row in debits
+            ],
+        )
+    return rows
+
 def _can_edit_schedule_attendance(db, schedule: Schedule) -> bool:
     window = _attendance_marking_window_info(schedule)
     return bool(window["is_open"])
@@ -96,13 +248,15 @@ def _load_group_roster(db, schedule: Schedule):
             or_(GroupAbonement.valid_to == None, GroupAbonement.valid_to >= date_val),
         )
     abonements = abonements.order_by(GroupAbonement.valid_to.is_(None), GroupAbonement.valid_to).all()
+    user_ids = {abon.user_id for abon in abonements if abon.user_id}
+    users_by_id = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids)).all()} if user_ids else {}
     roster = []
     seen = set()
     for abon in abonements:
         if abon.user_id in seen:
             continue
         seen.add(abon.user_id)
-        user = db.query(User).filter_by(id=abon.user_id).first()
+        user = users_by_id.get(abon.user_id)
         if not user:
             continue
         roster.append({"user": user, "abonement": abon})
@@ -150,6 +304,49 @@ def _can_user_set_absence_for_schedule(db, user: User, schedule: Schedule) -> bo
 
     return False
 
+def _absence_allowed_schedule_ids(db, user: User, schedules) -> set[int]:
+    """Bulk form of _can_user_set_absence_for_schedule: at most two queries for the whole list."""
+    candidates = [s for s in schedules if s and s.id and s.status not in {"cancelled", "deleted"}]
+    group_ids = {_schedule_group_id(s) for s in candidates if s.object_type == "group"} - {None}
+    lesson_ids = {s.object_id for s in candidates if s.object_type == "individual" and s.object_id}
+
+    abonements_by_group: dict[int, list[GroupAbonement]] = {}
+    if group_ids:
+        for abon in db.query(GroupAbonement).filter(
+            GroupAbonement.user_id == user.id,
+            GroupAbonement.group_id.in_(group_ids),
+            GroupAbonement.status == ABONEMENT_STATUS_ACTIVE,
+        ):
+            abonements_by_group.setdefault(abon.group_id, []).append(abon)
+    own_lesson_ids = set()
+    if lesson_ids:
+        own_lesson_ids = {
+            lesson_id
+            for (lesson_id,) in db.query(IndividualLesson.id).filter(
+                IndividualLesson.id.in_(lesson_ids),
+                IndividualLesson.student_id == user.id,
+            )
+        }
+
+    def _covers(abon: GroupAbonement, date_val) -> bool:
+        if not date_val:
+            return True
+        # Same comparison the database does for timestamp vs date: the date at midnight.
+        day_start = datetime.combine(date_val, datetime.min.time())
+        return (abon.valid_from is None or abon.valid_from <= day_start) and (
+            abon.valid_to is None or abon.valid_to >= day_start
+        )
+
+    allowed = set()
+    for s in candidates:
+        if s.object_type == "group":
+            abonements = abonements_by_group.get(_schedule_group_id(s), ())
+            if any(_covers(abon, s.date) for abon in abonements):
+                allowed.add(int(s.id))
+        elif s.object_type == "individual" and s.object_id in own_lesson_ids:
+            allowed.add(int(s.id))
+    return allowed
+
 def _schedule_start_datetime(schedule: Schedule) -> datetime | None:
     if not schedule.date:
         return None
@@ -323,6 +520,7 @@ def _serialize_attendance_intention_with_lock(row: AttendanceIntention | None, l
     return payload
 
 __all__ = [
+    "_absence_allowed_schedule_ids",
     "_attendance_already_debited",
     "_auto_finalize_attendance_from_intentions",
     "_attendance_intention_lock_info",
@@ -330,6 +528,7 @@ __all__ = [
     "_can_edit_schedule_attendance",
     "_can_user_set_absence_for_schedule",
     "_debit_abonement_for_attendance",
+    "_debited_attendance_ids",
     "_load_group_roster",
     "_serialize_attendance_intention_with_lock",
 ]
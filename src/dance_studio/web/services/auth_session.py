@@ -3,7 +3,6 @@
 import hashlib
 import secrets
 from datetime import datetime
-from dance_studio.core.time import utcnow
 from urllib.parse import urlparse
 
 from flask import request
@@ -184,19 +183,6 @@ def _is_csrf_valid() -> bool:
 
     return _is_double_submit_token_valid()
 
-def _delete_expired_sessions_for_user(db, telegram_id: int | None = None, user_id: int | None = None) -> None:
-    q = db.query(SessionRecord)
-    if user_id is not None:
-        q = q.filter(SessionRecord.user_id == user_id)
-    elif telegram_id is not None:
-        q = q.filter(SessionRecord.telegram_id == telegram_id)
-    else:
-        return
-    q.filter(
-        SessionRecord.expires_at < utcnow(),
-    ).delete(synchronize_session=False)
-
-
 def _enforce_session_limit(db, telegram_id: int | None = None, user_id: int | None = None) -> None:
     q = db.query(SessionRecord)
     if user_id is not None:
@@ -277,7 +263,6 @@ __all__ = [
     "_clear_csrf_cookie",
     "_clear_sid_cookie",
     "_create_session",
-    "_delete_expired_sessions_for_user",
     "_enforce_session_limit",
     "_extract_init_data_from_request",
     "_extract_ip_prefix",
@@ -40,7 +40,6 @@ from dance_studio.core.statuses import (
     set_booking_status,
 )
 from dance_studio.core.notification_service import send_user_notification_sync
-from dance_studio.bot.telegram_userbot import send_private_message_sync
 from dance_studio.core.config import PROJECT_NAME_FULL, VK_MINI_APP_APP_ID
 from dance_studio.core.system_settings_service import get_setting_value
 from dance_studio.core.telegram_http import telegram_api_post
@@ -865,6 +864,9 @@ def _send_booking_payment_details_via_userbot(db, booking: BookingRequest, user:
         "name": user.name if user else booking.user_name,
     }
 
+    # Telethon is only needed here; importing it lazily keeps it out of every web worker.
+    from dance_studio.bot.telegram_userbot import send_private_message_sync
+
     try:
         delivery_result = send_private_message_sync(user_target, payment_text) or {}
         sent_ok = bool(delivery_result.get("ok"))
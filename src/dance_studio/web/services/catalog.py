@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable
+
+from flask import Response, request
+
+from dance_studio.core.invalidation import ENROLLMENT_CHANGED, SCHEDULE_CHANGED, STAFF_CHANGED, invalidation_bus
+
+# Safety net for state that changes with time rather than writes (expiring reservations, abonements).
+CATALOG_CACHE_TTL_SECONDS = 300
+CATALOG_TOPICS = (SCHEDULE_CHANGED, STAFF_CHANGED, ENROLLMENT_CHANGED)
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogEntry:
+    payload: Any
+    body: bytes | None
+    etag: str | None
+    generation: int
+    built_at: float
+    built_on: date
+
+
+class CatalogCache:
+    """In-process read model for public catalog endpoints; any catalog write drops every entry."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = CATALOG_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._today = today
+        self._lock = threading.Lock()
+        self._entries: dict[str, CatalogEntry] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _is_fresh(self, entry: CatalogEntry) -> bool:
+        return (
+            entry.generation == self._generation
+            and entry.built_on == self._today()
+            and self._clock() - entry.built_at < self._ttl_seconds
+        )
+
+    def get_or_build(self, key: str, builder: Callable[[], Any], *, serialize: bool = True) -> CatalogEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry):
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generation
+
+        payload = builder()
+        body = etag = None
+        if serialize:
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            etag = hashlib.sha256(body).hexdigest()[:32]
+        entry = CatalogEntry(
+            payload=payload,
+            body=body,
+            etag=etag,
+            generation=generation,
+            built_at=self._clock(),
+            built_on=self._today(),
+        )
+        with self._lock:
+            # A write committed while we were building: serve this result once, but do not keep it.
+            if generation == self._generation:
+                self._entries[key] = entry
+        return entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+catalog_cache = CatalogCache()
+
+
+def invalidate_catalog() -> None:
+    catalog_cache.invalidate()
+
+
+def catalog_response(entry: CatalogEntry) -> Response:
+    if entry.etag and request.if_none_match.contains_weak(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype="application/json")
+    response.set_etag(entry.etag)
+    response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return response
+
+
+def _on_catalog_source_changed(topic: str) -> None:
+    catalog_cache.invalidate()
+
+
+# Commits in this process evict right away; the bus delivers the bot's and other workers' writes.
+invalidation_bus.subscribe(CATALOG_TOPICS, _on_catalog_source_changed)
+
+
+__all__ = [
+    "CATALOG_CACHE_TTL_SECONDS",
+    "CATALOG_TOPICS",
+    "CatalogCache",
+    "CatalogEntry",
+    "catalog_cache",
+    "catalog_response",
+    "invalidate_catalog",
+]
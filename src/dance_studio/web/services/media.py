@@ -1,25 +1,37 @@
 from __future__ import annotations
 
+from dance_studio.core.image_variants import resolve_media_file, variant_path
 from dance_studio.core.media_manager import save_user_photo
 from dance_studio.core.telegram_http import telegram_api_download_file, telegram_api_get
 
 
-def _build_image_url(path: str | None) -> str | None:
+def _build_image_url(path: str | None, variant: str | None = None) -> str | None:
     """
     Normalizes stored relative paths (var/media/..., database/media/...)
     into HTTP URL served by /media/<path:...>.
+    With ``variant`` ("thumb"/"medium") points at the WebP derivative when it
+    has already been generated, otherwise at the original.
     """
     if not path:
         return None
 
     norm = path.replace("\\", "/").lstrip("/")
     if norm.startswith("var/media/"):
-        return "/media/" + norm[len("var/media/"):]
-    if norm.startswith("database/media/"):
-        return "/media/" + norm[len("database/media/"):]
-    if norm.startswith("media/"):
-        return "/media/" + norm[len("media/"):]
-    return "/" + norm
+        url = "/media/" + norm[len("var/media/"):]
+    elif norm.startswith("database/media/"):
+        url = "/media/" + norm[len("database/media/"):]
+    elif norm.startswith("media/"):
+        url = "/media/" + norm[len("media/"):]
+    else:
+        return "/" + norm
+
+    if variant:
+        original = resolve_media_file(norm)
+        if original is not None:
+            derivative = variant_path(original, variant)
+            if derivative.exists():
+                return url.rsplit("/", 1)[0] + "/" + derivative.name
+    return url
 
 
 def normalize_teaches(value):
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import insert
+
+from dance_studio.db.models import Group, IndividualLesson, Schedule
+from dance_studio.web.constants import INACTIVE_SCHEDULE_STATUSES
+from dance_studio.web.services.studio_rules import interval_overlaps_service_break
+
+BULK_SCHEDULE_MAX_DAYS = 200
+BULK_SCHEDULE_MAX_OCCURRENCES = 3000
+BULK_SCHEDULE_CONFLICT_MODES = {"abort", "skip"}
+_INACTIVE_LESSON_STATUSES = {"cancelled", "canceled"}
+
+
+class BulkScheduleError(ValueError):
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass(frozen=True, slots=True)
+class WeeklyPattern:
+    index: int
+    group_id: int
+    weekday: int
+    time_from: time
+    time_to: time
+
+
+@dataclass(frozen=True, slots=True)
+class TermRequest:
+    date_from: date
+    date_to: date
+    patterns: list[WeeklyPattern]
+    exclude_dates: frozenset[date]
+    status: str
+    on_conflict: str
+    dry_run: bool
+
+
+@dataclass(slots=True)
+class Occurrence:
+    pattern_index: int
+    group_id: int
+    teacher_id: int | None
+    title: str
+    date: date
+    time_from: time
+    time_to: time
+    conflicts: list[dict] = field(default_factory=list)
+
+    @property
+    def minutes(self) -> tuple[int, int]:
+        return _minutes(self.time_from), _minutes(self.time_to)
+
+    def serialize(self, schedule_id: int | None = None) -> dict:
+        payload = {
+            "pattern_index": self.pattern_index,
+            "group_id": self.group_id,
+            "teacher_id": self.teacher_id,
+            "date": self.date.isoformat(),
+            "time_from": self.time_from.strftime("%H:%M"),
+            "time_to": self.time_to.strftime("%H:%M"),
+        }
+        if schedule_id is not None:
+            payload["id"] = schedule_id
+        if self.conflicts:
+            payload["conflicts"] = self.conflicts
+        return payload
+
+
+@dataclass(slots=True)
+class TermPlan:
+    occurrences: list[Occurrence]
+
+    @property
+    def accepted(self) -> list[Occurrence]:
+        return [item for item in self.occurrences if not item.conflicts]
+
+    @property
+    def conflicting(self) -> list[Occurrence]:
+        return [item for item in self.occurrences if item.conflicts]
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _parse_date(raw, field_name: str) -> date:
+    try:
+        return datetime.strptime(str(raw or ""), "%Y-%m-%d").date()
+    except ValueError:
+        raise BulkScheduleError(f"{field_name} должен быть в формате YYYY-MM-DD") from None
+
+
+def _parse_time(raw, field_name: str) -> time:
+    try:
+        return datetime.strptime(str(raw or ""), "%H:%M").time()
+    except ValueError:
+        raise BulkScheduleError(f"{field_name} должен быть в формате HH:MM") from None
+
+
+def _parse_flag(raw) -> bool:
+    return str(raw).strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+def parse_term_request(data: dict) -> TermRequest:
+    date_from = _parse_date(data.get("date_from"), "date_from")
+    date_to = _parse_date(data.get("date_to"), "date_to")
+    if date_to < date_from:
+        raise BulkScheduleError("date_to должен быть не раньше date_from")
+    if (date_to - date_from).days + 1 > BULK_SCHEDULE_MAX_DAYS:
+        raise BulkScheduleError(f"Период не может быть длиннее {BULK_SCHEDULE_MAX_DAYS} дней")
+
+    raw_patterns = data.get("patterns")
+    if not isinstance(raw_patterns, list) or not raw_patterns:
+        raise BulkScheduleError("patterns должен быть непустым списком")
+    patterns: list[WeeklyPattern] = []
+    for index, raw in enumerate(raw_patterns):
+        if not isinstance(raw, dict):
+            raise BulkScheduleError(f"patterns[{index}] должен быть объектом")
+        try:
+            group_id = int(raw.get("group_id"))
+            weekday = int(raw.get("weekday"))
+        except (TypeError, ValueError):
+            raise BulkScheduleError(f"patterns[{index}]: group_id и weekday обязательны") from None
+        if not 0 <= weekday <= 6:
+            raise BulkScheduleError(f"patterns[{index}]: weekday должен быть от 0 (пн) до 6 (вс)")
+        time_from = _parse_time(raw.get("time_from"), f"patterns[{index}].time_from")
+        time_to = _parse_time(raw.get("time_to"), f"patterns[{index}].time_to")
+        if time_from >= time_to:
+            raise BulkScheduleError(f"patterns[{index}]: time_from должен быть меньше time_to")
+        if interval_overlaps_service_break(time_from, time_to):
+            raise BulkScheduleError(f"patterns[{index}]: Selected interval overlaps service break 14:30-15:00")
+        patterns.append(WeeklyPattern(index, group_id, weekday, time_from, time_to))
+
+    raw_excluded = data.get("exclude_dates") or []
+    if not isinstance(raw_excluded, list):
+        raise BulkScheduleError("exclude_dates должен быть списком дат")
+    exclude_dates = frozenset(_parse_date(raw, "exclude_dates") for raw in raw_excluded)
+
+    on_conflict = str(data.get("on_conflict") or "abort").strip().lower()
+    if on_conflict not in BULK_SCHEDULE_CONFLICT_MODES:
+        raise BulkScheduleError("on_conflict должен быть abort или skip")
+
+    return TermRequest(
+        date_from=date_from,
+        date_to=date_to,
+        patterns=patterns,
+        exclude_dates=exclude_dates,
+        status=str(data.get("status") or "scheduled"),
+        on_conflict=on_conflict,
+        dry_run=_parse_flag(data.get("dry_run", False)),
+    )
+
+
+def _overlaps(left: tuple[int, int], right: tuple[int, int]) -> bool:
+    return left[0] < right[1] and right[0] < left[1]
+
+
+class ScheduleSnapshot:
+    """Active schedule rows and individual lessons of a date range, indexed by date."""
+
+    def __init__(self, schedules: list[Schedule], lessons: list[IndividualLesson]) -> None:
+        self._schedules: dict[date, list[tuple[tuple[int, int], Schedule]]] = defaultdict(list)
+        for row in schedules:
+            time_from = row.time_from or row.start_time
+            time_to = row.time_to or row.end_time
+            if row.date and time_from and time_to:
+                self._schedules[row.date].append(((_minutes(time_from), _minutes(time_to)), row))
+        self._lessons: dict[date, list[tuple[tuple[int, int], IndividualLesson]]] = defaultdict(list)
+        for lesson in lessons:
+            if lesson.date and lesson.time_from and lesson.time_to:
+                self._lessons[lesson.date].append(((_minutes(lesson.time_from), _minutes(lesson.time_to)), lesson))
+        self._planned: dict[date, list[Occurrence]] = defaultdict(list)
+
+    @classmethod
+    def load(cls, db, date_from: date, date_to: date) -> "ScheduleSnapshot":
+        schedules = (
+            db.query(Schedule)
+            .filter(
+                Schedule.date >= date_from,
+                Schedule.date <= date_to,
+                Schedule.status.notin_(list(INACTIVE_SCHEDULE_STATUSES)),
+            )
+            .all()
+        )
+        lessons = (
+            db.query(IndividualLesson)
+            .filter(IndividualLesson.date >= date_from, IndividualLesson.date <= date_to)
+            .all()
+        )
+        lessons = [lesson for lesson in lessons if str(lesson.status or "").strip().lower() not in _INACTIVE_LESSON_STATUSES]
+        return cls(schedules, lessons)
+
+    def conflicts_for(self, occurrence: Occurrence) -> list[dict]:
+        # The studio has a single hall, so any overlapping lesson is a hall conflict; teacher and group
+        # are reported on top so the admin sees why the slot is taken.
+        conflicts: list[dict] = []
+        span = occurrence.minutes
+        for row_span, row in self._schedules.get(occurrence.date, ()):
+            if not _overlaps(span, row_span):
+                continue
+            types = ["hall"]
+            if occurrence.teacher_id and row.teacher_id == occurrence.teacher_id:
+                types.append("teacher")
+            if occurrence.group_id in (row.group_id, row.object_id if row.object_type == "group" else None):
+                types.append("group")
+            conflicts.append(
+                {
+                    "source": "schedule",
+                    "schedule_id": row.id,
+                    "title": row.title,
+                    "time_from": f"{row_span[0] // 60:02d}:{row_span[0] % 60:02d}",
+                    "time_to": f"{row_span[1] // 60:02d}:{row_span[1] % 60:02d}",
+                    "types": types,
+                }
+            )
+        for lesson_span, lesson in self._lessons.get(occurrence.date, ()):
+            if occurrence.teacher_id and lesson.teacher_id == occurrence.teacher_id and _overlaps(span, lesson_span):
+                conflicts.append(
+                    {
+                        "source": "individual_lesson",
+                        "individual_lesson_id": lesson.id,
+                        "time_from": lesson.time_from.strftime("%H:%M"),
+                        "time_to": lesson.time_to.strftime("%H:%M"),
+                        "types": ["teacher"],
+                    }
+                )
+        for planned in self._planned.get(occurrence.date, ()):
+            if not _overlaps(span, planned.minutes):
+                continue
+            types = ["hall"]
+            if occurrence.teacher_id and planned.teacher_id == occurrence.teacher_id:
+                types.append("teacher")
+            if planned.group_id == occurrence.group_id:
+                types.append("group")
+            conflicts.append(
+                {
+                    "source": "pattern",
+                    "pattern_index": planned.pattern_index,
+                    "time_from": planned.time_from.strftime("%H:%M"),
+                    "time_to": planned.time_to.strftime("%H:%M"),
+                    "types": types,
+                }
+            )
+        return conflicts
+
+    def reserve(self, occurrence: Occurrence) -> None:
+        self._planned[occurrence.date].append(occurrence)
+
+
+def plan_term_schedule(db, term: TermRequest) -> TermPlan:
+    group_ids = sorted({pattern.group_id for pattern in term.patterns})
+    groups = {int(group.id): group for group in db.query(Group).filter(Group.id.in_(group_ids)).all()}
+    missing = [group_id for group_id in group_ids if group_id not in groups]
+    if missing:
+        raise BulkScheduleError(f"Группы не найдены: {', '.join(map(str, missing))}", status_code=404)
+
+    occurrences: list[Occurrence] = []
+    for pattern in term.patterns:
+        group = groups[pattern.group_id]
+        current = term.date_from + timedelta(days=(pattern.weekday - term.date_from.weekday()) % 7)
+        while current <= term.date_to:
+            if current not in term.exclude_dates:
+                occurrences.append(
+                    Occurrence(
+                        pattern_index=pattern.index,
+                        group_id=int(group.id),
+                        teacher_id=group.teacher_id,
+                        title=group.name,
+                        date=current,
+                        time_from=pattern.time_from,
+                        time_to=pattern.time_to,
+                    )
+                )
+            current += timedelta(days=7)
+    if len(occurrences) > BULK_SCHEDULE_MAX_OCCURRENCES:
+        raise BulkScheduleError(f"Слишком много занятий за один запрос (максимум {BULK_SCHEDULE_MAX_OCCURRENCES})")
+    occurrences.sort(key=lambda item: (item.date, item.time_from, item.pattern_index))
+
+    snapshot = ScheduleSnapshot.load(db, term.date_from, term.date_to)
+    for occurrence in occurrences:
+        occurrence.conflicts = snapshot.conflicts_for(occurrence)
+        if not occurrence.conflicts:
+            snapshot.reserve(occurrence)
+    return TermPlan(occurrences)
+
+
+def insert_occurrences(db, occurrences: list[Occurrence], *, status: str, updated_by: int | None) -> list[int]:
+    """Inserts the occurrences with one multi-row INSERT ... RETURNING; the caller commits."""
+    if not occurrences:
+        return []
+    now = datetime.now()
+    rows = [
+        {
+            "object_type": "group",
+            "object_id": item.group_id,
+            "group_id": item.group_id,
+            "teacher_id": item.teacher_id,
+            "title": item.title,
+            "date": item.date,
+            "time_from": item.time_from,
+            "time_to": item.time_to,
+            "start_time": item.time_from,
+            "end_time": item.time_to,
+            "status": status,
+            "updated_by": updated_by,
+            "updated_at": now,
+        }
+        for item in occurrences
+    ]
+    # Ordered RETURNING needs a sentinel column that SQLite does not offer, and SQLAlchemy would fall
+    # back to one statement per row; accepted occurrences never share a group slot, so match on that.
+    returned = db.execute(
+        insert(Schedule).returning(Schedule.id, Schedule.group_id, Schedule.date, Schedule.time_from),
+        rows,
+    )
+    ids = {(row.group_id, row.date, row.time_from): row.id for row in returned}
+    return [ids[(item.group_id, item.date, item.time_from)] for item in occurrences]
+
+
+__all__ = [
+    "BULK_SCHEDULE_MAX_DAYS",
+    "BULK_SCHEDULE_MAX_OCCURRENCES",
+    "BulkScheduleError",
+    "Occurrence",
+    "ScheduleSnapshot",
+    "TermPlan",
+    "TermRequest",
+    "WeeklyPattern",
+    "insert_occurrences",
+    "parse_term_request",
+    "plan_term_schedule",
+]
@@ -1,5 +1,8 @@
+from dance_studio.core.invalidation import invalidation_bus
 from dance_studio.web.app import create_app
 
 app = create_app()
+# Imported once per gunicorn worker, after the fork, so every worker gets its own listener.
+invalidation_bus.start()
 
 __all__ = ["app"]
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import shutil
 import tempfile
+from contextlib import contextmanager
 from pathlib import Path
 
 import pytest
@@ -16,3 +17,27 @@ def tmp_path() -> Path:
         yield path
     finally:
         shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Usage: `with query_budget(engine, 6): client.get(...)`. Fails with the heaviest statements
+    when the block runs more SQL than budgeted, which is how N+1 regressions show up.
+    """
+    from dance_studio.core.profiling import count_queries
+
+    @contextmanager
+    def _budget(engine, max_queries: int, label: str = ""):
+        with count_queries(engine, name=label or "query budget") as profile:
+            yield profile
+        if profile.queries > max_queries:
+            statements = "\n".join(
+                f"  {item['count']}x {item['statement']}" for item in profile.top_statements(limit=10)
+            )
+            pytest.fail(
+                f"{profile.name}: {profile.queries} queries, budget {max_queries}\n{statements}",
+                pytrace=False,
+            )
+
+    return _budget
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import date, datetime, time
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.core.notification_batches as notification_batches
+import dance_studio.web.routes.admin as admin_routes
+from dance_studio.db.models import (
+    Attendance,
+    Base,
+    Direction,
+    Group,
+    GroupAbonement,
+    GroupAbonementActionLog,
+    GroupSlotSummary,
+    NotificationBatch,
+    Schedule,
+    Staff,
+    User,
+)
+from dance_studio.web.services.abonement_bulk import CLOSURE_EXTEND_ACTION, CLOSURE_REFUND_ACTION
+
+CLOSED_DAY = date(2026, 5, 4)
+VALID_TO = datetime(2026, 5, 31, 23, 59)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    batch_ids = []
+    monkeypatch.setattr(notification_batches, "_start_delivery", batch_ids.extend)
+    return batch_ids
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch, queued):
+    monkeypatch.setattr(admin_routes, "require_permission", lambda permission: None)
+    app = Flask(__name__)
+
+    class _Client:
+        def post(self, json):
+            db = session_factory()
+            try:
+                with app.test_request_context("/api/admin/group-abonements/bulk-extend", method="POST", json=json):
+                    g.db = db
+                    return app.make_response(admin_routes.admin_bulk_extend_group_abonements())
+            finally:
+                db.close()
+
+    return _Client()
+
+
+@pytest.fixture
+def seeded(session_factory):
+    """Groups A and B are closed, C keeps working; one lesson of A was already marked and debited."""
+    db = session_factory()
+    teacher_user = User(name="Teacher", telegram_id=740001)
+    db.add(teacher_user)
+    db.flush()
+    teacher = Staff(name="Teacher", position="учитель", teaches=1, status="active", user_id=teacher_user.id)
+    direction = Direction(title="Jazz", direction_type="dance", status="active", base_price=1000)
+    db.add_all([teacher, direction])
+    db.flush()
+    groups = [
+        Group(
+            direction_id=direction.direction_id,
+            teacher_id=teacher.id,
+            name=name,
+            age_group="18+",
+            max_students=10,
+            duration_minutes=60,
+            lessons_per_week=1,
+        )
+        for name in ("A", "B", "C")
+    ]
+    students = [User(name=f"Student {index}", telegram_id=740010 + index) for index in range(3)]
+    db.add_all(groups + students)
+    db.flush()
+
+    def _abonement(user, group, **kwargs):
+        kwargs.setdefault("status", "active")
+        kwargs.setdefault("valid_to", VALID_TO)
+        return GroupAbonement(
+            user_id=user.id,
+            group_id=group.id,
+            balance_credits=4,
+            valid_from=datetime(2026, 5, 1),
+            **kwargs,
+        )
+
+    abonements = [
+        _abonement(students[0], groups[0]),
+        _abonement(students[1], groups[1]),
+        _abonement(students[2], groups[2]),
+        _abonement(students[1], groups[0], status="expired"),
+    ]
+    schedules = [
+        Schedule(object_type="group", object_id=group.id, group_id=group.id, title=group.name, date=CLOSED_DAY,
+                 time_from=time(19, 0), time_to=time(20, 0), status="scheduled")
+        for group in groups
+    ]
+    db.add_all(abonements + schedules)
+    db.flush()
+    attendance = Attendance(schedule_id=schedules[0].id, user_id=students[0].id, abonement_id=abonements[0].id, status="present")
+    db.add(attendance)
+    db.flush()
+    abonements[0].balance_credits = 3
+    db.add(
+        GroupAbonementActionLog(
+            abonement_id=abonements[0].id,
+            action_type="debit_attendance",
+            credits_delta=-1,
+            attendance_id=attendance.id,
+            actor_type="staff",
+        )
+    )
+    db.commit()
+    ids = {
+        "teacher_user": teacher_user.id,
+        "groups": [group.id for group in groups],
+        "students": [user.id for user in students],
+        "abonements": [row.id for row in abonements],
+        "schedules": [row.id for row in schedules],
+    }
+    db.close()
+    return ids
+
+
+def _closure(seeded, **overrides):
+    payload = {
+        "group_ids": seeded["groups"][:2],
+        "extend_days": 7,
+        "cancel_dates": [CLOSED_DAY.isoformat()],
+        "note": "Ремонт зала",
+    }
+    payload.update(overrides)
+    return payload
+
+
+def _abonement_state(session_factory, seeded):
+    db = session_factory()
+    rows = {row.id: (row.valid_to, row.balance_credits) for row in db.query(GroupAbonement)}
+    db.close()
+    return [rows[abonement_id] for abonement_id in seeded["abonements"]]
+
+
+def test_dry_run_previews_without_writing(client, seeded, session_factory, queued):
+    before = _abonement_state(session_factory, seeded)
+
+    response = client.post(_closure(seeded, dry_run=True))
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["extended_abonements"] == 2
+    assert body["cancelled_schedules"] == 2
+    assert body["refunded_credits"] == 1
+    assert body["notification_recipients"] == 3
+    assert {item["abonement_id"] for item in body["abonements"]} == set(seeded["abonements"][:2])
+    assert _abonement_state(session_factory, seeded) == before
+    assert queued == []
+
+
+def test_closure_is_applied_set_wise_and_only_once(client, seeded, session_factory, engine, queued):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    response = client.post(_closure(seeded))
+
+    assert response.status_code == 200
+    a, b, c, expired = _abonement_state(session_factory, seeded)
+    assert a == (datetime(2026, 6, 7, 23, 59), 4)
+    assert b == (datetime(2026, 6, 7, 23, 59), 4)
+    assert c == (VALID_TO, 4)
+    assert expired == (VALID_TO, 4)
+    assert sum(statement.startswith("UPDATE group_abonements") for statement in statements) == 1
+    assert sum(statement.startswith("INSERT INTO group_abonement_action_logs") for statement in statements) == 1
+
+    db = session_factory()
+    statuses = {row.id: row.status for row in db.query(Schedule)}
+    assert [statuses[schedule_id] for schedule_id in seeded["schedules"]] == ["cancelled", "cancelled", "scheduled"]
+    assert sorted((row.action_type, row.abonement_id) for row in db.query(GroupAbonementActionLog).filter(
+        GroupAbonementActionLog.action_type != "debit_attendance"
+    )) == sorted(
+        [
+            (CLOSURE_EXTEND_ACTION, seeded["abonements"][0]),
+            (CLOSURE_EXTEND_ACTION, seeded["abonements"][1]),
+            (CLOSURE_REFUND_ACTION, seeded["abonements"][0]),
+        ]
+    )
+    # The cancelled lessons disappear from the stored slot summaries of their groups.
+    summaries = {row.group_id: row.next_session_date for row in db.query(GroupSlotSummary)}
+    assert summaries.get(seeded["groups"][0]) is None
+    db.close()
+
+    # Messages are queued in the same transaction and handed to delivery once it commits.
+    assert queued == [response.get_json()["notification_batch_id"]]
+    db = session_factory()
+    recipients = {item["user_id"]: item["body"] for item in json.loads(db.get(NotificationBatch, queued[0]).recipients_json)}
+    db.close()
+    first, second = seeded["students"][:2]
+    assert sorted(recipients) == sorted([seeded["teacher_user"], first, second])
+    assert "продлён на 7 дн., до 07.06.2026" in recipients[first]
+    assert "Возвращено занятий на абонемент: 1." in recipients[first]
+
+    repeated = client.post(_closure(seeded)).get_json()
+    assert repeated["extended_abonements"] == 0
+    assert repeated["refunded_credits"] == 0
+    assert repeated["already_extended_abonement_ids"] == seeded["abonements"][:2]
+    assert _abonement_state(session_factory, seeded)[:2] == [a, b]
+
+
+def test_whole_studio_extends_every_active_abonement(client, seeded, session_factory):
+    response = client.post({"whole_studio": True, "extend_days": 3, "cancel_dates": [CLOSED_DAY.isoformat()]})
+
+    assert response.status_code == 200
+    assert response.get_json()["cancelled_schedules"] == 3
+    valid_to = [state[0] for state in _abonement_state(session_factory, seeded)]
+    assert valid_to == [datetime(2026, 6, 3, 23, 59)] * 3 + [VALID_TO]
+
+
+@pytest.mark.parametrize(
+    ("payload", "status_code"),
+    [
+        ({"extend_days": 7}, 400),
+        ({"whole_studio": True, "group_ids": [1], "extend_days": 7}, 400),
+        ({"whole_studio": True}, 400),
+        ({"whole_studio": True, "extend_days": 365}, 400),
+        ({"group_ids": [999], "extend_days": 7}, 404),
+    ],
+)
+def test_closure_validates_input(client, seeded, payload, status_code):
+    response = client.post(payload)
+    assert response.status_code == status_code
+    assert response.get_json()["error"]
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import functools
+import os
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.db as db_module
+import dance_studio.web.middleware.auth as auth_middleware
+import dance_studio.web.services.admin_stream as admin_stream
+from dance_studio.core.admin_feed import FEED_ATTENDANCE, FEED_BOOKING, FEED_PAYMENT, read_feed
+from dance_studio.core.event_cursor import EventCursor
+from dance_studio.db.models import AdminFeedEvent, Attendance, Base, BookingRequest, PaymentTransaction, User
+from dance_studio.web.app import create_app
+from dance_studio.web.routes import bookings as bookings_routes
+from dance_studio.web.routes import payments as payments_routes
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    monkeypatch.setattr(auth_middleware, "get_session", session_factory)
+    monkeypatch.setattr(db_module, "get_session", session_factory)
+    monkeypatch.setattr(bookings_routes, "require_permission", lambda permission, **kwargs: None)
+    monkeypatch.setattr(payments_routes, "require_permission", lambda permission, **kwargs: None)
+    # One poll per request instead of holding the connection for the full stream lifetime.
+    monkeypatch.setattr(
+        bookings_routes,
+        "stream_admin_changes",
+        functools.partial(admin_stream.stream_admin_changes, max_seconds=0),
+    )
+    return create_app().test_client()
+
+
+def _add_user(db) -> User:
+    user = User(name="Client", telegram_id=730001)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _add_booking(db, user: User, status: str = "created") -> BookingRequest:
+    booking = BookingRequest(user_id=user.id, user_name=user.name, object_type="individual", status=status)
+    db.add(booking)
+    db.commit()
+    return booking
+
+
+def _feed(db) -> list[tuple[str, int | None]]:
+    return [(row.kind, row.entity_id) for row in db.query(AdminFeedEvent).order_by(AdminFeedEvent.id)]
+
+
+def test_commits_log_changed_entities(session_factory):
+    db = session_factory()
+    user = _add_user(db)
+    booking = _add_booking(db, user)
+    db.add_all(
+        [
+            PaymentTransaction(user_id=user.id, amount=1000, status="confirmed", payment_type="booking", object_id=booking.id),
+            Attendance(schedule_id=1, user_id=user.id, status="present"),
+        ]
+    )
+    db.commit()
+    payment = db.query(PaymentTransaction).one()
+    attendance = db.query(Attendance).one()
+
+    booking.status = "waiting_payment"
+    db.commit()
+    # Loading and re-committing without changes logs nothing.
+    db.query(BookingRequest).all()
+    db.commit()
+
+    assert _feed(db) == [
+        (FEED_BOOKING, booking.id),
+        (FEED_ATTENDANCE, attendance.id),
+        (FEED_PAYMENT, payment.id),
+        (FEED_BOOKING, booking.id),
+    ]
+    db.close()
+
+
+def test_bulk_update_logs_kind_and_rollback_logs_nothing(session_factory):
+    db = session_factory()
+    user = _add_user(db)
+    _add_booking(db, user)
+    db.query(AdminFeedEvent).delete()
+    db.commit()
+
+    db.execute(update(BookingRequest).values(status="cancelled"))
+    db.commit()
+    db.add(BookingRequest(user_id=user.id, object_type="individual", status="created"))
+    db.flush()
+    db.rollback()
+    db.commit()
+
+    assert _feed(db) == [(FEED_BOOKING, None)]
+    db.close()
+
+
+def test_read_feed_asks_for_resync_when_cursor_is_gone_or_backlog_is_large(session_factory):
+    db = session_factory()
+    db.add_all(AdminFeedEvent(kind=FEED_BOOKING, entity_id=index) for index in range(1, 6))
+    db.commit()
+
+    assert [row.entity_id for row in read_feed(db, EventCursor(3), limit=10)] == [4, 5]
+    assert read_feed(db, EventCursor(0), limit=3) is None
+    db.query(AdminFeedEvent).filter(AdminFeedEvent.id <= 3).delete()
+    db.commit()
+    # Event 3 was the last one the client saw: nothing is missing yet.
+    assert [row.entity_id for row in read_feed(db, EventCursor(3), limit=10)] == [4, 5]
+    assert read_feed(db, EventCursor(1), limit=10) is None
+    db.close()
+
+
+def test_read_feed_returns_events_committed_below_the_cursor_once(session_factory):
+    db = session_factory()
+    db.add_all(AdminFeedEvent(id=event_id, kind=FEED_BOOKING, entity_id=event_id) for event_id in (1, 3))
+    db.commit()
+    cursor = EventCursor(1)
+    assert [row.id for row in read_feed(db, cursor, limit=10)] == [3]
+
+    # Id 2 belonged to a transaction that committed after id 3 was streamed.
+    db.add(AdminFeedEvent(id=2, kind=FEED_PAYMENT, entity_id=2))
+    db.commit()
+    # A reconnecting client carries the missing id in its Last-Event-ID.
+    resumed = EventCursor.from_token(cursor.token())
+    assert [row.id for row in read_feed(db, cursor, limit=10)] == [2]
+    assert read_feed(db, cursor, limit=10) == []
+    assert [row.id for row in read_feed(db, resumed, limit=10)] == [2]
+    db.close()
+
+
+def test_stream_sends_latest_state_once_per_entity(session_factory):
+    db = session_factory()
+    user = _add_user(db)
+    booking = _add_booking(db, user)
+    booking.status = "waiting_payment"
+    db.commit()
+    booking_id = booking.id
+    last_id = db.query(AdminFeedEvent.id).order_by(AdminFeedEvent.id.desc()).limit(1).scalar()
+    db.close()
+
+    def serialize(db, rows):
+        return [{"id": row.id, "status": row.status} for row in rows]
+
+    now = [0.0]
+    messages = list(
+        admin_stream.stream_admin_changes(
+            EventCursor(0),
+            serialize_bookings=serialize,
+            session_factory=session_factory,
+            max_seconds=2,
+            poll_seconds=1,
+            heartbeat_seconds=1,
+            clock=lambda: now[0],
+            sleep=lambda seconds: now.__setitem__(0, now[0] + seconds),
+        )
+    )
+
+    assert messages[0] == f"retry: {admin_stream.ADMIN_STREAM_RETRY_MS}\n\n"
+    assert messages[1] == admin_stream.format_sse(
+        {"id": booking_id, "status": "waiting_payment"}, event=FEED_BOOKING, event_id=last_id
+    )
+    assert messages[2:] == [": ping\n\n", ": ping\n\n"]
+
+
+def test_route_replays_after_last_event_id(client, session_factory):
+    db = session_factory()
+    user = _add_user(db)
+    first_id = _add_booking(db, user).id
+    listed = client.get("/api/admin/booking-requests").get_json()
+    second_id = _add_booking(db, user, status="waiting_payment").id
+    db.close()
+
+    assert [item["id"] for item in listed["items"]] == [first_id]
+    with client.get("/api/admin/stream", headers={"Last-Event-ID": str(listed["feed_cursor"])}) as response:
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        assert response.headers["Cache-Control"] == "no-cache"
+        body = response.get_data(as_text=True)
+    assert f"event: {FEED_BOOKING}" in body
+    assert f'"id":{second_id}' in body
+    assert f'"id":{first_id},' not in body
+
+
+def test_payments_list_hands_out_a_stream_cursor(client, session_factory):
+    db = session_factory()
+    user = _add_user(db)
+    booking = _add_booking(db, user)
+    listed = client.get("/api/admin/payments").get_json()
+    db.add(PaymentTransaction(user_id=user.id, amount=1000, status="confirmed", payment_type="booking", object_id=booking.id))
+    db.commit()
+    db.close()
+
+    assert listed["items"] == []
+    with client.get(f"/api/admin/stream?after={listed['feed_cursor']}") as response:
+        body = response.get_data(as_text=True)
+    assert f"event: {FEED_PAYMENT}" in body
+    assert f"event: {FEED_BOOKING}" not in body
+
+
+def test_route_refuses_streams_beyond_the_per_process_limit(client):
+    held = 0
+    try:
+        while admin_stream.acquire_stream_slot():
+            held += 1
+        assert held == admin_stream.ADMIN_STREAM_MAX_PER_PROCESS
+        response = client.get("/api/admin/stream")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"]
+    finally:
+        for _ in range(held):
+            admin_stream.release_stream_slot()
+
+    # A finished stream hands its slot back once the server closes the response.
+    with client.get("/api/admin/stream") as response:
+        response.get_data()
+    assert admin_stream.acquire_stream_slot()
+    admin_stream.release_stream_slot()
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, time
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.web.routes.attendance as attendance_routes
+from dance_studio.core.admin_feed import FEED_ATTENDANCE
+from dance_studio.core.system_settings_service import ensure_default_settings
+from dance_studio.db.models import (
+    AdminFeedEvent,
+    Attendance,
+    Base,
+    Direction,
+    Group,
+    GroupAbonement,
+    GroupAbonementActionLog,
+    Schedule,
+    Staff,
+    User,
+)
+
+LESSON_DAY = date(2027, 2, 1)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@pytest.fixture
+def mark(session_factory, monkeypatch):
+    monkeypatch.setattr(attendance_routes, "require_permission", lambda permission, **kwargs: None)
+    monkeypatch.setattr(attendance_routes, "_get_current_staff", lambda db: None)
+    monkeypatch.setattr(attendance_routes, "_attendance_marking_window_info", lambda schedule: {"is_open": True})
+    app = Flask(__name__)
+
+    def _mark(schedule_id, items):
+        db = session_factory()
+        try:
+            with app.test_request_context(f"/api/attendance/{schedule_id}", method="POST", json={"items": items}):
+                g.db = db
+                return app.make_response(attendance_routes.set_attendance(schedule_id))
+        finally:
+            db.close()
+
+    return _mark
+
+
+def _seed(session_factory, size: int) -> dict:
+    """A group lesson for `size` students; the first one is already marked and debited, the last has no credits left."""
+    db = session_factory()
+    # First-run settings rows are a one-time cost, not part of the marking.
+    ensure_default_settings(db)
+    teacher = Staff(name="Teacher", position="учитель", teaches=1, status="active")
+    direction = Direction(title="Jazz", direction_type="dance", status="active", base_price=1000)
+    db.add_all([teacher, direction])
+    db.flush()
+    group = Group(
+        direction_id=direction.direction_id,
+        teacher_id=teacher.id,
+        name="A",
+        age_group="18+",
+        max_students=40,
+        duration_minutes=60,
+        lessons_per_week=1,
+    )
+    students = [User(name=f"Student {index}", telegram_id=760000 + index) for index in range(size)]
+    db.add_all([group, *students])
+    db.flush()
+    schedule = Schedule(
+        object_type="group",
+        object_id=group.id,
+        group_id=group.id,
+        title=group.name,
+        date=LESSON_DAY,
+        time_from=time(19, 0),
+        time_to=time(20, 0),
+        status="scheduled",
+    )
+    abonements = [
+        GroupAbonement(
+            user_id=student.id,
+            group_id=group.id,
+            balance_credits=0 if index == size - 1 else 4,
+            price_per_lesson_rub=500,
+            status="active",
+            valid_from=datetime(2027, 1, 1),
+            valid_to=datetime(2027, 3, 1),
+        )
+        for index, student in enumerate(students)
+    ]
+    db.add_all([schedule, *abonements])
+    db.flush()
+    marked = Attendance(schedule_id=schedule.id, user_id=students[0].id, abonement_id=abonements[0].id, status="present")
+    db.add(marked)
+    db.flush()
+    abonements[0].balance_credits = 3
+    db.add(
+        GroupAbonementActionLog(
+            abonement_id=abonements[0].id,
+            action_type="debit_attendance",
+            credits_delta=-1,
+            attendance_id=marked.id,
+            actor_type="staff",
+        )
+    )
+    db.commit()
+    ids = {
+        "schedule": schedule.id,
+        "students": [student.id for student in students],
+        "abonements": [row.id for row in abonements],
+    }
+    db.close()
+    return ids
+
+
+def _balances(session_factory, seeded) -> list[int]:
+    db = session_factory()
+    rows = {row.id: row.balance_credits for row in db.query(GroupAbonement)}
+    db.close()
+    return [rows[abonement_id] for abonement_id in seeded["abonements"]]
+
+
+def test_marking_a_class_is_written_set_wise_and_debits_once(mark, session_factory, engine):
+    seeded = _seed(session_factory, 5)
+    db = session_factory()
+    db.query(AdminFeedEvent).delete()
+    db.commit()
+    db.close()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    items = [{"user_id": user_id, "status": "present"} for user_id in seeded["students"]]
+    items[1]["status"] = "absent"
+
+    response = mark(seeded["schedule"], items)
+
+    assert response.status_code == 200
+    body = {item["user_id"]: item for item in response.get_json()["items"]}
+    first, absent, second, third, broke = seeded["students"]
+    assert [body[user_id]["debited"] for user_id in seeded["students"]] == [True, False, True, True, False]
+    assert body[second]["payout_rub"] == body[second]["price_rub"] * body[second]["percent"] // 100
+    assert body[second]["price_rub"] == 500
+    assert _balances(session_factory, seeded) == [3, 4, 3, 3, 0]
+    for prefix in (
+        "UPDATE attendance",
+        "INSERT INTO attendance",
+        "UPDATE group_abonements",
+        "INSERT INTO group_abonement_action_logs",
+    ):
+        assert sum(statement.startswith(prefix) for statement in statements) == 1, prefix
+
+    db = session_factory()
+    rows = {row.user_id: row for row in db.query(Attendance)}
+    assert len(rows) == 5
+    assert rows[absent].abonement_id == seeded["abonements"][1]
+    assert rows[second].teacher_payout_rub == body[second]["payout_rub"]
+    # Every marked row reaches the admin stream by id, none as an anonymous bulk write.
+    feed = [(row.kind, row.entity_id) for row in db.query(AdminFeedEvent)]
+    assert sorted(feed) == sorted((FEED_ATTENDANCE, row.id) for row in rows.values())
+    db.close()
+
+    # Repeating the sheet (a double click, a retry) changes statuses only.
+    items[1]["status"] = "present"
+    repeated = {item["user_id"]: item for item in mark(seeded["schedule"], items).get_json()["items"]}
+    assert repeated[second]["debited"] is True
+    assert repeated[absent]["debited"] is True
+    assert _balances(session_factory, seeded) == [3, 3, 3, 3, 0]
+
+
+def test_duplicate_users_keep_the_last_mark(mark, session_factory):
+    seeded = _seed(session_factory, 2)
+    user_id = seeded["students"][1]
+
+    response = mark(
+        seeded["schedule"],
+        [{"user_id": user_id, "status": "present"}, {"user_id": user_id, "status": "absent", "comment": "late cancel"}],
+    )
+
+    assert [(item["status"], item["comment"]) for item in response.get_json()["items"]] == [("absent", "late cancel")]
+    db = session_factory()
+    assert db.query(Attendance).filter_by(user_id=user_id).count() == 1
+    db.close()
+
+
+def test_invalid_items_write_nothing(mark, session_factory):
+    seeded = _seed(session_factory, 2)
+
+    response = mark(seeded["schedule"], [{"user_id": seeded["students"][1], "status": "present"}, {"status": "present"}])
+
+    assert response.status_code == 400
+    db = session_factory()
+    assert db.query(Attendance).count() == 1
+    db.close()
+
+
+@pytest.mark.parametrize("size", [3, 30])
+def test_statement_count_does_not_grow_with_the_class(mark, session_factory, engine, size):
+    seeded = _seed(session_factory, size)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    mark(seeded["schedule"], [{"user_id": user_id, "status": "present"} for user_id in seeded["students"]])
+
+    # Reads: schedule, settings, lock, sheet, roster (2), debit logs, abonements, payout setting.
+    # Writes: one per table, the id read-back, the feed and the invalidation event on commit.
+    assert len(statements) <= 16
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+from datetime import UTC, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from dance_studio.db.models import (
+    AuthRateLimitBucket,
+    Base,
+    CacheInvalidationEvent,
+    PasskeyChallenge,
+    PhoneVerificationCode,
+    SessionRecord,
+    UsedInitData,
+)
+from dance_studio.auth.services.janitor import JANITOR_DELETED_ROWS, purge_expired_auth_rows
+from dance_studio.core.profiling import count_queries
+from dance_studio.core.time import utcnow
+
+
+def test_janitor_purges_every_ttl_table_in_batches():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    now = utcnow()
+    now_ts = now.replace(tzinfo=UTC).timestamp()
+    past, future = now - timedelta(minutes=1), now + timedelta(days=1)
+
+    db = session_factory()
+    db.add_all(
+        SessionRecord(id=f"s{index}", sid_hash=f"h{index}", expires_at=past if index < 7 else future)
+        for index in range(9)
+    )
+    db.add_all([UsedInitData(key_hash="old", expires_at=past), UsedInitData(key_hash="new", expires_at=future)])
+    db.add(PasskeyChallenge(challenge="c", flow_type="login", origin="https://x", rp_id="x", expires_at=past))
+    db.add(PhoneVerificationCode(phone="+79000000000", code_hash="h", purpose="login", expires_at=past))
+    db.add_all([
+        AuthRateLimitBucket(key="otp_request:idle", tokens=0, refilled_at=now_ts - 86400),
+        AuthRateLimitBucket(key="otp_request:busy", tokens=0, refilled_at=now_ts),
+    ])
+    db.add_all([
+        CacheInvalidationEvent(topic="settings_changed", origin="w1", created_at=now - timedelta(hours=2)),
+        CacheInvalidationEvent(topic="settings_changed", origin="w1", created_at=now),
+    ])
+    db.commit()
+    before = JANITOR_DELETED_ROWS.value(table="sessions")
+
+    with count_queries(engine) as profile:
+        counts = purge_expired_auth_rows(session_factory, now=now, batch_size=3)
+
+    assert counts == {
+        "sessions": 7,
+        "used_init_data": 1,
+        "passkey_challenges": 1,
+        "phone_verification_codes": 1,
+        "auth_rate_limit_buckets": 1,
+        "cache_invalidation_events": 1,
+        "admin_feed_events": 0,
+        "notification_batches": 0,
+    }
+    # 7 expired sessions in batches of 3: 3 + 3 + 1, the short batch ends the loop.
+    assert profile.top_statements(limit=10)[0]["count"] == 3
+    assert JANITOR_DELETED_ROWS.value(table="sessions") == before + 7
+    assert sorted(row.id for row in db.query(SessionRecord)) == ["s7", "s8"]
+    assert [row.key_hash for row in db.query(UsedInitData)] == ["new"]
+    assert [row.key for row in db.query(AuthRateLimitBucket)] == ["otp_request:busy"]
+    assert [row.created_at for row in db.query(CacheInvalidationEvent)] == [now]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from dance_studio.db.models import AuthRateLimitBucket, Base
+from dance_studio.auth.services import rate_limit
+from dance_studio.auth.services.rate_limit import (
+    DatabaseRateLimitBackend,
+    MemoryRateLimitBackend,
+    RateLimitExceededError,
+    RateLimitRule,
+)
+
+
+class _Clock:
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_memory_backend_is_a_token_bucket_and_forgets_full_buckets():
+    clock = _Clock()
+    backend = MemoryRateLimitBackend(clock=clock)
+    rule = RateLimitRule(3, 300)
+
+    assert [backend.consume("otp:+7900", rule) for _ in range(4)] == [True, True, True, False]
+    clock.now += 100  # one token back
+    assert backend.consume("otp:+7900", rule) is True
+    assert backend.consume("otp:+7900", rule) is False
+
+    for index in range(50):
+        backend.consume(f"otp:{index}", rule)
+    assert len(backend) == 51
+    clock.now += 301
+    backend.consume("otp:fresh", rule)
+    assert len(backend) == 1
+
+
+def test_database_backend_shares_one_limit_across_workers(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'limits.db'}")
+    Base.metadata.create_all(engine)
+    clock = _Clock()
+    # Two backends with separate sessions stand in for two gunicorn workers.
+    workers = [DatabaseRateLimitBackend(sessionmaker(bind=engine), clock=clock) for _ in range(2)]
+    rule = RateLimitRule(3, 300)
+
+    results = [workers[index % 2].consume("otp_request:1.2.3.4", rule) for index in range(5)]
+    assert results == [True, True, True, False, False]
+
+    clock.now += 200
+    assert [workers[1].consume("otp_request:1.2.3.4", rule) for _ in range(3)] == [True, True, False]
+    db = sessionmaker(bind=engine)()
+    assert [row.key for row in db.query(AuthRateLimitBucket)] == ["otp_request:1.2.3.4"]
+    db.close()
+
+
+def test_database_backend_falls_back_to_process_limits_without_table():
+    engine = create_engine("sqlite://")
+    backend = DatabaseRateLimitBackend(sessionmaker(bind=engine))
+
+    assert [backend.consume("vk_login:ip", RateLimitRule(1, 60)) for _ in range(2)] == [True, False]
+
+
+def test_hit_rate_limit_uses_configured_backend():
+    previous = rate_limit.set_rate_limit_backend(MemoryRateLimitBackend())
+    try:
+        for _ in range(3):
+            rate_limit.hit_rate_limit("otp_request", "ip:+79000000000")
+        with pytest.raises(RateLimitExceededError):
+            rate_limit.hit_rate_limit("otp_request", "ip:+79000000000")
+        rate_limit.hit_rate_limit("otp_request", "ip:+79000000001")
+    finally:
+        rate_limit.set_rate_limit_backend(previous)
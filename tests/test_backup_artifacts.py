@@ -0,0 +1,192 @@
+import hashlib
+import importlib.util
+import io
+import sys
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from dance_studio.bot.backup_artifacts import (
+    BackupArtifactSink,
+    load_media_manifest,
+    plan_media_backup,
+    save_media_manifest,
+    write_incremental_media_archive,
+    write_media_archive,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _fake_age(tmp_path, *, exit_code: int = 0):
+    script = tmp_path / "fake_age.py"
+    script.write_text(
+        "import sys\n"
+        "data = sys.stdin.buffer.read()\n"
+        "sys.stdout.buffer.write(b'AGE:' + data[::-1])\n"
+        f"sys.exit({exit_code})\n",
+        encoding="utf-8",
+    )
+    wrapper = tmp_path / "age"
+    wrapper.write_text(f"#!/bin/sh\nexec {sys.executable} {script} \"$@\"\n", encoding="utf-8")
+    wrapper.chmod(0o755)
+    return str(wrapper)
+
+
+def _seed_media(media_dir):
+    (media_dir / "users").mkdir(parents=True)
+    (media_dir / "users" / "avatar.jpg").write_bytes(b"\xff\xd8jpeg-bytes" * 100)
+    (media_dir / "notes.txt").write_text("plain text " * 100, encoding="utf-8")
+
+
+def test_plain_sink_hashes_what_it_writes(tmp_path):
+    output = tmp_path / "db_backup.dump"
+    sink = BackupArtifactSink(output, [])
+    with sink as stream:
+        stream.write(b"hello ")
+        stream.write(b"world")
+
+    assert output.read_bytes() == b"hello world"
+    assert sink.size == 11
+    assert sink.sha256 == hashlib.sha256(b"hello world").hexdigest()
+
+
+def test_encrypted_sink_writes_only_encrypted_artifact(tmp_path):
+    output = tmp_path / "db_backup.dump.age"
+    sink = BackupArtifactSink(output, ["age1recipient"], age_binary=_fake_age(tmp_path))
+    with sink as stream:
+        stream.write(b"payload")
+
+    assert output.read_bytes() == b"AGE:daolyap"
+    assert sink.sha256 == hashlib.sha256(b"AGE:daolyap").hexdigest()
+    assert list(tmp_path.glob("db_backup.dump")) == []
+
+
+def test_encrypted_sink_removes_artifact_when_age_fails(tmp_path):
+    output = tmp_path / "db_backup.dump.age"
+    sink = BackupArtifactSink(output, ["age1recipient"], age_binary=_fake_age(tmp_path, exit_code=1))
+
+    with pytest.raises(RuntimeError, match="age encryption failed"):
+        with sink as stream:
+            stream.write(b"payload")
+
+    assert not output.exists()
+
+
+def test_sink_removes_partial_artifact_when_producer_fails(tmp_path):
+    output = tmp_path / "media_backup.zip"
+
+    with pytest.raises(ValueError):
+        with BackupArtifactSink(output, []) as stream:
+            stream.write(b"partial")
+            raise ValueError("producer failed")
+
+    assert not output.exists()
+
+
+def test_media_archive_streams_and_stores_precompressed_files(tmp_path):
+    media_dir = tmp_path / "media"
+    _seed_media(media_dir)
+    output = tmp_path / "media_backup.zip"
+
+    with BackupArtifactSink(output, []) as stream:
+        write_media_archive(stream, media_dir)
+
+    with zipfile.ZipFile(io.BytesIO(output.read_bytes())) as zf:
+        infos = {info.filename: info for info in zf.infolist()}
+        assert infos["users/avatar.jpg"].compress_type == zipfile.ZIP_STORED
+        assert infos["notes.txt"].compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read("users/avatar.jpg") == b"\xff\xd8jpeg-bytes" * 100
+
+
+def _load_restore_script():
+    spec = importlib.util.spec_from_file_location("restore_backup", ROOT / "scripts" / "restore_backup.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _write_plan_artifact(backup_dir, media_dir, plan, name):
+    artifact = backup_dir / name
+    with BackupArtifactSink(artifact, []) as stream:
+        write_incremental_media_archive(stream, media_dir, plan)
+    save_media_manifest(backup_dir / "media_manifest.json", plan, name)
+    return artifact
+
+
+def _plan(media_dir, backup_dir, now):
+    return plan_media_backup(
+        media_dir,
+        load_media_manifest(backup_dir / "media_manifest.json"),
+        now=now,
+        full_interval=timedelta(days=7),
+        base_exists=lambda name: (backup_dir / name).exists(),
+    )
+
+
+def test_media_plan_starts_full_then_ships_only_new_content(tmp_path):
+    media_dir = tmp_path / "media"
+    backup_dir = tmp_path / "backup"
+    backup_dir.mkdir()
+    _seed_media(media_dir)
+    now = datetime(2026, 1, 1, 0, 0)
+
+    full = _plan(media_dir, backup_dir, now)
+    assert full.is_full
+    assert full.included == ["notes.txt", "users/avatar.jpg"]
+    _write_plan_artifact(backup_dir, media_dir, full, "media_backup_20260101_000000_full.zip")
+
+    (media_dir / "users" / "avatar.jpg").rename(media_dir / "users" / "renamed.jpg")
+    (media_dir / "new.txt").write_text("fresh", encoding="utf-8")
+    delta = _plan(media_dir, backup_dir, now + timedelta(hours=12))
+
+    assert delta.mode == "delta"
+    assert delta.base_name == "media_backup_20260101_000000_full.zip"
+    assert delta.included == ["new.txt"]
+    assert delta.deleted == ["users/avatar.jpg"]
+
+
+def test_media_plan_forces_full_when_interval_elapsed_or_base_missing(tmp_path):
+    media_dir = tmp_path / "media"
+    backup_dir = tmp_path / "backup"
+    backup_dir.mkdir()
+    _seed_media(media_dir)
+    now = datetime(2026, 1, 1, 0, 0)
+    base = _write_plan_artifact(backup_dir, media_dir, _plan(media_dir, backup_dir, now), "media_backup_20260101_000000_full.zip")
+
+    assert _plan(media_dir, backup_dir, now + timedelta(days=7)).is_full
+    assert not _plan(media_dir, backup_dir, now + timedelta(days=1)).is_full
+    base.unlink()
+    assert _plan(media_dir, backup_dir, now + timedelta(days=1)).is_full
+
+
+def test_restore_script_rebuilds_tree_from_full_and_deltas(tmp_path):
+    media_dir = tmp_path / "media"
+    backup_dir = tmp_path / "backup"
+    backup_dir.mkdir()
+    _seed_media(media_dir)
+    now = datetime(2026, 1, 1, 0, 0)
+    full = _write_plan_artifact(backup_dir, media_dir, _plan(media_dir, backup_dir, now), "media_backup_20260101_000000_full.zip")
+
+    (media_dir / "notes.txt").unlink()
+    (media_dir / "users" / "copy.jpg").write_bytes((media_dir / "users" / "avatar.jpg").read_bytes())
+    first = _write_plan_artifact(
+        backup_dir, media_dir, _plan(media_dir, backup_dir, now + timedelta(hours=12)), "media_backup_20260101_120000_delta.zip"
+    )
+    (media_dir / "later.txt").write_text("later", encoding="utf-8")
+    latest = _write_plan_artifact(
+        backup_dir, media_dir, _plan(media_dir, backup_dir, now + timedelta(days=1)), "media_backup_20260102_000000_delta.zip"
+    )
+
+    restore = _load_restore_script()
+    chain = restore._resolve_media_chain(latest, restore._read_media_archive_manifest(latest))
+    assert chain == [full, first, latest]
+
+    target = tmp_path / "restored"
+    restore._restore_media_chain(chain, target)
+
+    restored = sorted(str(path.relative_to(target)).replace("\\", "/") for path in target.rglob("*") if path.is_file())
+    assert restored == ["later.txt", "users/avatar.jpg", "users/copy.jpg"]
+    assert (target / "users" / "copy.jpg").read_bytes() == (media_dir / "users" / "avatar.jpg").read_bytes()
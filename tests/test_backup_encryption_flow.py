@@ -16,9 +16,19 @@ def test_backup_flow_prepares_artifacts_before_sending():
     source = BOT_FILE.read_text(encoding="utf-8")
     window = _window(source, "async def create_and_send_backup(reason: str, notify_user_id: int | None = None) -> None:")
 
-    assert "_prepare_backup_artifacts_for_send" in window
+    assert "await _prepare_backup_artifacts_for_send()" in window
     assert "db_artifact_path" in window
     assert "media_artifact_path" in window
+    assert "_file_sha256" not in window
+
+
+def test_backup_dump_and_media_archive_are_streamed_concurrently():
+    source = BOT_FILE.read_text(encoding="utf-8")
+    window = _window(source, "async def _prepare_backup_artifacts_for_send()", size=700)
+
+    assert "asyncio.gather(" in window
+    assert "asyncio.to_thread(_stream_db_backup, recipients)" in window
+    assert "asyncio.to_thread(_stream_media_backup, recipients)" in window
 
 
 def test_backup_sends_encrypted_artifacts_variables():
@@ -51,10 +51,11 @@ def test_locked_attendance_reminders_edit_vk_messages_and_remove_keyboard():
 
 def test_reminder_background_loop_runs_teacher_summaries_and_abonement_notifications():
     source = BOT_FILE.read_text(encoding="utf-8")
-    window = _window(source, "async def process_attendance_reminders() -> None:", size=500)
+    window = _window(source, "def _register_background_jobs(scheduler: JobScheduler) -> None:", size=1600)
 
-    assert "await send_due_teacher_attendance_summaries()" in window
-    assert "await send_due_abonement_notifications()" in window
+    assert '("teacher_attendance_summaries", send_due_teacher_attendance_summaries)' in window
+    assert '("abonement_notifications", send_due_abonement_notifications)' in window
+    assert "next_run=_next_backup_run" in window
 
 
 def test_booking_callback_triggers_group_access_notification_after_activation():
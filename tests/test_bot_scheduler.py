@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+
+from dance_studio.bot.scheduler import JobScheduler, build_job_metrics_text
+
+
+def test_scheduler_runs_jobs_independently_of_slow_neighbours():
+    calls: list[str] = []
+
+    async def slow_job():
+        calls.append("slow")
+        await asyncio.sleep(10)
+
+    async def fast_job():
+        calls.append("fast")
+
+    async def scenario():
+        scheduler = JobScheduler()
+        scheduler.add_job("slow", slow_job, interval_seconds=60)
+        scheduler.add_job("fast", fast_job, interval_seconds=0.01)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        runner.cancel()
+        return scheduler.snapshot()
+
+    snapshot = asyncio.run(scenario())
+
+    assert calls.count("slow") == 1
+    assert calls.count("fast") >= 3
+    assert snapshot["fast"]["runs"] >= 3
+    assert snapshot["fast"]["last_lag_seconds"] is not None
+
+
+def test_scheduler_skips_runs_above_concurrency_limit():
+    async def long_job():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        scheduler = JobScheduler()
+        scheduler.add_job("long", long_job, interval_seconds=0.01, max_concurrency=1)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.1)
+        snapshot = scheduler.snapshot()
+        await scheduler.stop()
+        runner.cancel()
+        return snapshot
+
+    snapshot = asyncio.run(scenario())
+
+    assert snapshot["long"]["running"] == 1
+    assert snapshot["long"]["skipped"] >= 2
+
+
+def test_scheduler_records_timeouts_and_failures():
+    async def hanging_job():
+        await asyncio.sleep(10)
+
+    async def broken_job():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        scheduler = JobScheduler()
+        scheduler.add_job("hanging", hanging_job, interval_seconds=60, timeout_seconds=0.02)
+        scheduler.add_job("broken", broken_job, interval_seconds=60)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        runner.cancel()
+        return scheduler.snapshot()
+
+    snapshot = asyncio.run(scenario())
+
+    assert snapshot["hanging"]["timeouts"] == 1
+    assert snapshot["hanging"]["running"] == 0
+    assert snapshot["broken"]["failures"] == 1
+    assert "RuntimeError: boom" in snapshot["broken"]["last_error"]
+
+
+def test_scheduler_uses_wall_clock_resolver_for_aligned_jobs():
+    fixed_now = datetime(2026, 4, 5, 11, 59, 0)
+    scheduler = JobScheduler(clock=lambda: 100.0, wall_clock=lambda: fixed_now)
+
+    async def job():
+        return None
+
+    scheduler.add_job(
+        "backup",
+        job,
+        interval_seconds=0,
+        next_run=lambda now: now.replace(hour=12, minute=0),
+    )
+
+    due, _, name = scheduler._heap[0]
+    assert name == "backup"
+    assert due == 160.0
+
+
+def test_build_job_metrics_text_lists_jobs_with_problems():
+    text = build_job_metrics_text(
+        {
+            "attendance_reminders": {
+                "runs": 4,
+                "failures": 1,
+                "timeouts": 0,
+                "skipped": 2,
+                "avg_duration_seconds": 0.25,
+                "max_duration_seconds": 1.5,
+                "last_lag_seconds": 0.002,
+            }
+        }
+    )
+
+    assert text.startswith("⏱ ")
+    assert "attendance_reminders: runs=4" in text
+    assert "avg=250ms" in text
+    assert "fail=1" in text
+    assert "skip=2" in text
+    assert "timeout=" not in text
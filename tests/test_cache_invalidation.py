@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.core.invalidation as invalidation
+from dance_studio.core.invalidation import (
+    SCHEDULE_CHANGED,
+    SETTINGS_CHANGED,
+    STAFF_CHANGED,
+    InvalidationBus,
+    publish,
+)
+from dance_studio.db.models import AppSetting, Base, CacheInvalidationEvent, Direction
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file, not :memory:, so the listener thread sees the same database.
+    engine = create_engine(f"sqlite:///{tmp_path / 'bus.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@pytest.fixture
+def local_bus(session_factory, monkeypatch):
+    """This process's bus; other processes are separate InvalidationBus instances."""
+    bus = InvalidationBus(session_factory, poll_seconds=0.05)
+    monkeypatch.setattr(invalidation, "invalidation_bus", bus)
+    return bus
+
+
+def _recorder(bus, *topics):
+    received = []
+    bus.subscribe(topics, received.append)
+    return received
+
+
+def _change_setting(session_factory, value="1"):
+    db = session_factory()
+    db.add(AppSetting(key=f"contacts.test_{value}", value_json=value))
+    db.commit()
+    db.close()
+
+
+def test_commit_evicts_locally_and_reaches_other_processes_once(session_factory, local_bus):
+    other = InvalidationBus(session_factory)
+    local_received = _recorder(local_bus, SETTINGS_CHANGED)
+    other_received = _recorder(other, SETTINGS_CHANGED)
+    local_bus.poll()
+    other.poll()
+
+    _change_setting(session_factory)
+
+    assert local_received == [SETTINGS_CHANGED]
+    assert other.poll() == {SETTINGS_CHANGED}
+    assert other_received == [SETTINGS_CHANGED]
+    # The publisher already evicted after its commit, and nothing is delivered twice.
+    assert local_bus.poll() == set()
+    assert other.poll() == set()
+
+
+def test_bulk_updates_and_explicit_publish_are_published(session_factory, local_bus):
+    received = _recorder(local_bus, SCHEDULE_CHANGED, STAFF_CHANGED)
+    db = session_factory()
+    db.add(Direction(title="Jazz", direction_type="dance", status="active", base_price=1000))
+    db.commit()
+    db.execute(update(Direction).values(status="archived"))
+    publish(db, STAFF_CHANGED)
+    db.commit()
+
+    assert received == [SCHEDULE_CHANGED, SCHEDULE_CHANGED, STAFF_CHANGED]
+    assert [row.topic for row in db.query(CacheInvalidationEvent).order_by(CacheInvalidationEvent.id)] == [
+        SCHEDULE_CHANGED,
+        SCHEDULE_CHANGED,
+        STAFF_CHANGED,
+    ]
+    db.close()
+
+
+def _insert_event(session_factory, event_id, topic):
+    db = session_factory()
+    db.add(CacheInvalidationEvent(id=event_id, topic=topic, origin="other-process"))
+    db.commit()
+    db.close()
+
+
+def test_event_committed_below_an_already_read_id_is_delivered(session_factory):
+    bus = InvalidationBus(session_factory)
+    received = _recorder(bus, SETTINGS_CHANGED, SCHEDULE_CHANGED, STAFF_CHANGED)
+    _insert_event(session_factory, 1, STAFF_CHANGED)
+    bus.poll()
+
+    # Ids 2 and 3 were handed out to two transactions; 3 commits first.
+    _insert_event(session_factory, 3, SCHEDULE_CHANGED)
+    assert bus.poll() == {SCHEDULE_CHANGED}
+    _insert_event(session_factory, 2, SETTINGS_CHANGED)
+    assert bus.poll() == {SETTINGS_CHANGED}
+    assert bus.poll() == set()
+    assert received == [SCHEDULE_CHANGED, SETTINGS_CHANGED]
+
+
+def test_rolled_back_changes_publish_nothing(session_factory, local_bus):
+    received = _recorder(local_bus, SETTINGS_CHANGED)
+    db = session_factory()
+    db.add(AppSetting(key="contacts.rolled_back", value_json="1"))
+    db.flush()
+    db.rollback()
+    db.commit()
+
+    assert received == []
+    assert db.query(CacheInvalidationEvent).count() == 0
+    db.close()
+
+
+def test_listener_thread_polls_sqlite(session_factory, local_bus):
+    other = InvalidationBus(session_factory, poll_seconds=0.05)
+    delivered = threading.Event()
+    other.subscribe(SETTINGS_CHANGED, lambda topic: delivered.set())
+    other.start()
+    try:
+        # The first poll only records where the log ends; wait for it before writing.
+        while other._cursor is None:
+            time.sleep(0.01)
+        _change_setting(session_factory)
+        assert delivered.wait(5)
+    finally:
+        other.stop(timeout=5)
+
+
+def test_unknown_topic_is_rejected(local_bus):
+    with pytest.raises(ValueError):
+        local_bus.subscribe("everything_changed", lambda topic: None)
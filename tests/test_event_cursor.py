@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from dance_studio.core.event_cursor import EventCursor, cursor_at_end
+from dance_studio.db.models import AdminFeedEvent, Base
+
+
+def test_skipped_ids_are_read_again_until_they_commit_or_expire():
+    now = [0.0]
+    cursor = EventCursor(1, gap_seconds=10, clock=lambda: now[0])
+
+    assert cursor.advance([2, 5]) == [2, 5]
+    assert (cursor.last_id, cursor.gaps) == (5, [3, 4])
+    assert cursor.advance([4, 5, 6]) == [4, 6]
+    assert cursor.token() == "6:3"
+
+    now[0] = 11.0
+    cursor.unseen(AdminFeedEvent.id)
+    assert cursor.gaps == []
+    assert cursor.advance([3]) == []
+
+
+def test_token_round_trip_and_garbage():
+    cursor = EventCursor.from_token("42:39,40")
+
+    assert (cursor.last_id, cursor.gaps) == (42, [39, 40])
+    assert EventCursor.from_token(cursor.token()).gaps == [39, 40]
+    assert EventCursor.from_token("7").gaps == []
+    assert EventCursor.from_token("x") is None
+    assert EventCursor.from_token("-1") is None
+    assert EventCursor.from_token(None) is None
+
+
+def test_cursor_at_end_waits_for_ids_missing_below_the_newest():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    assert cursor_at_end(db, AdminFeedEvent.id).token() == "0"
+    db.add_all(AdminFeedEvent(id=event_id, kind="booking", entity_id=event_id) for event_id in (1, 2, 5))
+    db.commit()
+
+    cursor = cursor_at_end(db, AdminFeedEvent.id)
+    db.add(AdminFeedEvent(id=4, kind="booking", entity_id=4))
+    db.commit()
+
+    assert cursor.token() == "5:3,4"
+    assert db.execute(select(AdminFeedEvent.id).where(cursor.unseen(AdminFeedEvent.id))).scalars().all() == [4]
+    db.close()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import shutil
+from pathlib import Path
+
+import brotli
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.db as db_module
+import dance_studio.web.middleware.auth as auth_middleware
+import dance_studio.web.routes.admin as admin_routes
+import dance_studio.web.routes.media as media_routes
+from dance_studio.core.frontend_assets import build_frontend_assets, load_asset_manifest
+from dance_studio.db.models import Base
+from dance_studio.web.app import create_app
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SOURCE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8"/>
+<script src="/assets/auth_ui_state.js"></script>
+<style>
+body { color: red; }
+</style>
+</head>
+<body>
+<div id="home" onclick="go()">Главная</div>
+<script async="" src="https://example.com/map.js"></script>
+<script>
+function go() { return "</div>"; }
+</script>
+</body>
+</html>
+"""
+
+
+@pytest.fixture
+def frontend_dir(tmp_path):
+    (tmp_path / "index.html").write_text(SOURCE, encoding="utf-8")
+    return tmp_path
+
+
+@pytest.fixture
+def app(frontend_dir, monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+    monkeypatch.setattr(auth_middleware, "get_session", session_factory)
+    monkeypatch.setattr(db_module, "get_session", session_factory)
+    monkeypatch.setattr(admin_routes, "FRONTEND_DIR", str(frontend_dir))
+    monkeypatch.setattr(media_routes, "FRONTEND_DIR", str(frontend_dir))
+    return create_app()
+
+
+def test_build_splits_index_into_shell_and_hashed_precompressed_assets(frontend_dir):
+    built = build_frontend_assets(frontend_dir, brotli_quality=5)
+
+    assets = built.manifest["assets"]
+    assert set(assets) == {"app.css", "markup.js", "app.js"}
+    shell = built.shell_path.read_text(encoding="utf-8")
+    assert "color: red" not in shell and "Главная" not in shell
+    assert f'<link rel="stylesheet" href="/assets/dist/{assets["app.css"]}">' in shell
+    assert shell.index(assets["markup.js"]) < shell.index(assets["app.js"])
+    assert '<script src="/assets/auth_ui_state.js"></script>' in shell
+
+    dist = frontend_dir / "dist"
+    app_js = (dist / assets["app.js"]).read_bytes()
+    assert b'function go() { return "</div>"; }' in app_js
+    assert gzip.decompress((dist / f"{assets['app.js']}.gz").read_bytes()) == app_js
+    assert brotli.decompress((dist / f"{assets['app.js']}.br").read_bytes()) == app_js
+    markup_js = (dist / assets["markup.js"]).read_text(encoding="utf-8")
+    assert json.dumps('<div id="home" onclick="go()">Главная</div>', ensure_ascii=False)[1:-1] in markup_js
+    assert media_routes._is_hashed_asset(assets["app.js"])
+
+
+def test_rebuild_keeps_previous_generation_only(frontend_dir):
+    first = build_frontend_assets(frontend_dir, brotli_quality=1).manifest["assets"]
+    source = frontend_dir / "index.html"
+    source.write_text(SOURCE.replace("red", "blue"), encoding="utf-8")
+    second = build_frontend_assets(frontend_dir, brotli_quality=1).manifest["assets"]
+    source.write_text(SOURCE.replace("red", "green"), encoding="utf-8")
+    third = build_frontend_assets(frontend_dir, brotli_quality=1).manifest["assets"]
+
+    names = {path.name for path in (frontend_dir / "dist").iterdir()}
+    assert third["app.css"] in names and second["app.css"] in names
+    assert first["app.css"] not in names
+    assert first["app.js"] == third["app.js"]
+
+
+def test_assets_are_served_precompressed_by_accept_encoding(app, frontend_dir):
+    assets = build_frontend_assets(frontend_dir, brotli_quality=5).manifest["assets"]
+    client = app.test_client()
+    url = f"/assets/dist/{assets['app.js']}"
+    raw = (frontend_dir / "dist" / assets["app.js"]).read_bytes()
+
+    br = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    gz = client.get(url, headers={"Accept-Encoding": "gzip"})
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+
+    assert br.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(br.get_data()) == raw
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gz.get_data()) == raw
+    assert "Content-Encoding" not in plain.headers and plain.get_data() == raw
+    for response in (br, gz, plain):
+        assert response.mimetype in {"text/javascript", "application/javascript"}
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+
+
+def test_index_serves_shell_only_while_build_matches_source(app, frontend_dir):
+    client = app.test_client()
+    assert "Главная" in client.get("/").get_data(as_text=True)
+
+    build_frontend_assets(frontend_dir, brotli_quality=1)
+    shell = client.get("/")
+    assert shell.headers["Cache-Control"] == "no-cache"
+    assert "Главная" not in shell.get_data(as_text=True)
+
+    source = frontend_dir / "index.html"
+    source.write_text(SOURCE.replace("Главная", "Новая главная"), encoding="utf-8")
+    os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 1_000_000_000))
+    assert load_asset_manifest(frontend_dir) is None
+    assert "Новая главная" in client.get("/").get_data(as_text=True)
+
+
+def test_real_index_builds_into_a_small_shell(tmp_path):
+    shutil.copy(ROOT / "frontend" / "index.html", tmp_path / "index.html")
+
+    built = build_frontend_assets(tmp_path, brotli_quality=1)
+
+    assert built.shell_path.stat().st_size < 4096
+    assert set(built.manifest["assets"]) == {"app.css", "markup.js", "app.js"}
+
+
+def test_build_fills_service_worker_precache_and_version(app, frontend_dir):
+    (frontend_dir / "sw.js").write_text(
+        "const PRECACHE = { version: 'dev', urls: [] };\nself.addEventListener('fetch', () => {});\n",
+        encoding="utf-8",
+    )
+    client = app.test_client()
+    assert "version: 'dev'" in client.get("/sw.js").get_data(as_text=True)
+
+    manifest = build_frontend_assets(frontend_dir, brotli_quality=1).manifest
+    served = client.get("/sw.js")
+
+    assert served.headers["Cache-Control"] == "no-cache"
+    precache_line = served.get_data(as_text=True).splitlines()[0]
+    precache = json.loads(precache_line[len("const PRECACHE = "):-1])
+    assert precache["version"] == manifest["build_version"]
+    assert precache["urls"][0] == "/"
+    assert "/assets/auth_ui_state.js" in precache["urls"]
+    assert {f"/assets/dist/{name}" for name in manifest["assets"].values()} <= set(precache["urls"])
+
+    (frontend_dir / "index.html").write_text(SOURCE.replace("red", "blue"), encoding="utf-8")
+    rebuilt = build_frontend_assets(frontend_dir, brotli_quality=1).manifest
+    assert rebuilt["build_version"] != manifest["build_version"]
+
+
+def test_service_worker_caches_only_public_catalog_reads():
+    source = (ROOT / "frontend" / "sw.js").read_text(encoding="utf-8")
+    index_source = (ROOT / "frontend" / "index.html").read_text(encoding="utf-8")
+
+    assert "const PRECACHE = { version: 'dev', urls: [] };" in source
+    assert "if (request.method !== 'GET') return;" in source
+    assert "/^\\/api\\/directions$/" in source
+    assert "/^\\/news$/" in source
+    assert "schedule\\/public" not in source
+    assert "headers.set('If-None-Match', etag)" in source
+    assert "navigator.serviceWorker.register('/sw.js')" in index_source
@@ -5,7 +5,7 @@ def test_group_admin_ui_uses_neutral_notification_copy():
     source = Path("frontend/index.html").read_text(encoding="utf-8")
 
     assert "ошибка уведомления:" in source
-    assert "уведомлено: ${Number(data.group_notification_sent) || 0}/${Number(data.group_notification_total)}" in source
+    assert "уведомлено: ${Number(batch.sent_count) || 0}/${Number(batch.recipient_count)}" in source
     assert "через подключенные каналы" in source
     assert "часть уведомлений не отправлена" in source
     assert "ошибка TG:" not in source
@@ -27,6 +27,11 @@ def test_baseline_and_followup_migrations_exist():
     assert version_files == [
         "20260405_0001_baseline.py",
         "20260406_0002_vk_att_msg_ids.py",
+        "20260407_0003_group_slot_summary.py",
+        "20260408_0004_auth_rate_limits.py",
+        "20260409_0005_cache_invalidation.py",
+        "20260410_0006_admin_feed_events.py",
+        "20260411_0007_notify_batches.py",
     ]
     assert 'revision = "20260405_0001_baseline"' in source
     assert "down_revision = None" in source
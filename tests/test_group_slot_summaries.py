@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from dance_studio.core.abonement_pricing import get_next_group_date
+from dance_studio.core.group_slot_summaries import (
+    get_group_slot_infos,
+    refresh_stale_group_slot_summaries,
+)
+from dance_studio.db.models import Base, Direction, Group, GroupSlotSummary, Schedule, Staff
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+def _seed_groups(db, count=2):
+    teacher = Staff(name="Anna", position="учитель", teaches=1, status="active")
+    direction = Direction(title="Contemporary", direction_type="dance", status="active", base_price=1000)
+    db.add_all([teacher, direction])
+    db.flush()
+    groups = [
+        Group(
+            direction_id=direction.direction_id,
+            teacher_id=teacher.id,
+            name=f"Group {index}",
+            age_group="18+",
+            max_students=10,
+            duration_minutes=60,
+            lessons_per_week=1,
+        )
+        for index in range(count)
+    ]
+    db.add_all(groups)
+    db.commit()
+    return [group.id for group in groups]
+
+
+def _lesson(group_id, lesson_date, start=time(19, 0), end=time(20, 0), status="scheduled"):
+    return Schedule(
+        object_type="group",
+        object_id=group_id,
+        group_id=group_id,
+        title="Lesson",
+        date=lesson_date,
+        time_from=start,
+        time_to=end,
+        status=status,
+    )
+
+
+def _next_weekday(weekday):
+    today = date.today()
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+
+
+def _stored_slots(db, group_id):
+    row = db.get(GroupSlotSummary, group_id)
+    return None if row is None else json.loads(row.slots_json)
+
+
+def test_commit_writes_summary_for_new_lessons(session_factory):
+    db = session_factory()
+    group_id, _ = _seed_groups(db)
+    monday = _next_weekday(0)
+    db.add_all([_lesson(group_id, monday), _lesson(group_id, monday + timedelta(days=7))])
+    db.commit()
+
+    assert _stored_slots(db, group_id) == ["Понедельник • 19:00-20:00"]
+    assert db.get(GroupSlotSummary, group_id).next_session_date == monday
+    assert get_next_group_date(db, group_id) == monday
+    db.close()
+
+
+def test_moving_and_cancelling_lessons_refreshes_both_groups(session_factory):
+    db = session_factory()
+    first_id, second_id = _seed_groups(db)
+    lesson = _lesson(first_id, _next_weekday(2), start=time(18, 30), end=None)
+    db.add(lesson)
+    db.commit()
+    assert _stored_slots(db, first_id) == ["Среда • 18:30"]
+
+    lesson.group_id = second_id
+    lesson.object_id = second_id
+    db.commit()
+    assert _stored_slots(db, first_id) == []
+    assert _stored_slots(db, second_id) == ["Среда • 18:30"]
+
+    lesson.status = "cancelled"
+    db.commit()
+    assert _stored_slots(db, second_id) == []
+    assert db.get(GroupSlotSummary, second_id).next_session_date is None
+    db.close()
+
+
+def test_summaries_from_an_earlier_day_are_recomputed_on_read(session_factory):
+    db = session_factory()
+    group_id, other_id = _seed_groups(db)
+    yesterday = date.today() - timedelta(days=1)
+    db.add(_lesson(group_id, yesterday))
+    db.commit()
+    db.get(GroupSlotSummary, group_id).computed_on = yesterday - timedelta(days=1)
+    db.get(GroupSlotSummary, group_id).slots_json = json.dumps(["stale"])
+    db.commit()
+
+    info = get_group_slot_infos(db, [group_id])[group_id]
+    assert info.schedule_slots and info.schedule_slots != ["stale"]
+    assert info.next_session_date is None
+    assert _stored_slots(db, group_id) == ["stale"]
+
+    assert refresh_stale_group_slot_summaries(db) == 2
+    db.commit()
+    assert _stored_slots(db, group_id) == info.schedule_slots
+    assert _stored_slots(db, other_id) == []
+    assert refresh_stale_group_slot_summaries(db) == 0
+    db.close()
+
+
+def test_groups_without_summaries_are_computed_together(session_factory, query_budget):
+    db = session_factory()
+    group_ids = _seed_groups(db, count=12)
+    yesterday = date.today() - timedelta(days=1)
+    for index, group_id in enumerate(group_ids):
+        db.add(_lesson(group_id, yesterday if index % 2 else _next_weekday(index % 7)))
+    db.commit()
+    expected = get_group_slot_infos(db, group_ids)
+    # Groups created before the summary table existed have no row yet.
+    db.query(GroupSlotSummary).delete()
+    db.commit()
+
+    with query_budget(session_factory.kw["bind"], 3, label="missing group slot summaries"):
+        infos = get_group_slot_infos(db, group_ids)
+    assert infos == expected
+    assert all(info.schedule_slots for info in infos.values())
+    assert [infos[group_id].next_session_date is None for group_id in group_ids] == [bool(index % 2) for index in range(12)]
+    db.close()
@@ -0,0 +1,103 @@
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+from PIL import Image
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.core.image_variants as image_variants
+from dance_studio.core.image_variants import (
+    backfill_image_variants,
+    generate_image_variants,
+    schedule_image_variants,
+    variant_path,
+)
+from dance_studio.web.routes import news as news_routes
+
+
+def _write_jpeg(path, size=(2400, 1200), *, orientation=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    image = Image.new("RGB", size, (200, 40, 40))
+    exif = Image.Exif()
+    exif[0x010F] = "CameraMaker"
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(path, format="JPEG", exif=exif.tobytes())
+    return path
+
+
+def test_variants_are_resized_webp_without_exif(tmp_path):
+    original = _write_jpeg(tmp_path / "users" / "1" / "profile.jpg")
+
+    variants = generate_image_variants(original)
+
+    assert set(variants) == {"thumb", "medium"}
+    with Image.open(variants["thumb"]) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (320, 160)
+        assert not thumb.getexif()
+    with Image.open(variants["medium"]) as medium:
+        assert medium.size == (960, 480)
+
+
+def test_variants_apply_exif_orientation_and_never_upscale(tmp_path):
+    original = _write_jpeg(tmp_path / "news" / "photo.jpg", size=(200, 100), orientation=6)
+
+    variants = generate_image_variants(original)
+
+    with Image.open(variants["medium"]) as medium:
+        assert medium.size == (100, 200)
+
+
+def test_schedule_replaces_stale_variants(tmp_path):
+    original = _write_jpeg(tmp_path / "directions" / "photo_1.jpg")
+    stale = variant_path(original, "thumb")
+    stale.write_bytes(b"stale")
+
+    schedule_image_variants(original).result(timeout=30)
+
+    with Image.open(stale) as thumb:
+        assert thumb.format == "WEBP"
+
+
+def test_backfill_skips_up_to_date_images_and_counts_failures(tmp_path):
+    _write_jpeg(tmp_path / "teachers" / "1" / "photo.jpg")
+    (tmp_path / "teachers" / "2").mkdir(parents=True)
+    (tmp_path / "teachers" / "2" / "photo.png").write_bytes(b"not an image")
+
+    first = backfill_image_variants(tmp_path, workers=2)
+    second = backfill_image_variants(tmp_path)
+
+    assert (first.generated, first.skipped, first.failed) == (1, 0, 1)
+    assert (second.generated, second.skipped, second.failed) == (0, 1, 1)
+
+
+def test_build_image_url_prefers_existing_variant(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_variants, "MEDIA_DIR", tmp_path)
+    original = _write_jpeg(tmp_path / "news" / "5" / "photo.jpg")
+
+    assert news_routes._build_image_url("var/media/news/5/photo.jpg", "thumb") == "/media/news/5/photo.jpg"
+
+    generate_image_variants(original)
+
+    assert news_routes._build_image_url("var/media/news/5/photo.jpg", "thumb") == "/media/news/5/photo.thumb.webp"
+    assert news_routes._build_image_url("var\\media\\news\\5\\photo.jpg", "medium") == "/media/news/5/photo.medium.webp"
+    assert news_routes._build_image_url("var/media/news/5/photo.jpg") == "/media/news/5/photo.jpg"
+
+
+def test_news_serializer_uses_requested_variant(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_variants, "MEDIA_DIR", tmp_path)
+    generate_image_variants(_write_jpeg(tmp_path / "news" / "7" / "photo.jpg"))
+    news = SimpleNamespace(
+        id=7,
+        title="Title",
+        content="Body",
+        photo_path="var/media/news/7/photo.jpg",
+        created_at=datetime(2026, 1, 1),
+        status="active",
+    )
+
+    assert news_routes._serialize_news_item(news, image_variant="medium")["photo_path"] == "/media/news/7/photo.medium.webp"
+    assert news_routes._serialize_news_item(news)["photo_path"] == "/media/news/7/photo.jpg"
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Generous ceilings for a cold `import dance_studio.web.wsgi`; today it takes about 1s and 80MB.
+# They catch a heavy dependency creeping back into the web import path, not small regressions.
+IMPORT_TIME_BUDGET_SECONDS = 5.0
+RSS_BUDGET_MB = 150
+
+# Only the bot process and the payment-details sender need these.
+BOT_ONLY_MODULES = ("aiogram", "telethon", "dance_studio.bot.bot", "dance_studio.bot.telegram_userbot", "PIL")
+
+# ru_maxrss would carry over the pytest parent's peak through fork/exec; VmHWM belongs to the new image.
+_PROBE = """
+import json, re, sys
+import dance_studio.web.wsgi
+with open("/proc/self/status") as status:
+    peak_kb = int(re.search(r"VmHWM:\\s+(\\d+)", status.read()).group(1))
+print(json.dumps({
+    "rss_mb": peak_kb / 1024,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def _cold_import():
+    env = {
+        **os.environ,
+        "APP_SECRET_KEY": "test-secret",
+        "DATABASE_URL": "sqlite://",
+        "PYTHONPATH": str(ROOT / "src"),
+    }
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE % (BOT_ONLY_MODULES,)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def _cumulative_seconds(importtime_log: str, module: str) -> float:
+    # "import time: self [us] | cumulative | imported package"
+    pattern = re.compile(rf"^import time:\s+\d+ \|\s+(\d+) \|\s*{re.escape(module)}$", re.MULTILINE)
+    match = pattern.search(importtime_log)
+    assert match, f"{module} missing from -X importtime output"
+    return int(match.group(1)) / 1_000_000
+
+
+@pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="needs Linux procfs")
+def test_web_worker_import_stays_within_budget():
+    probe, importtime_log = _cold_import()
+
+    assert probe["loaded"] == [], f"web import pulled in {probe['loaded']}"
+    assert probe["rss_mb"] < RSS_BUDGET_MB
+    assert _cumulative_seconds(importtime_log, "dance_studio.web.wsgi") < IMPORT_TIME_BUDGET_SECONDS
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.db as db_module
+import dance_studio.web.middleware.auth as auth_middleware
+from dance_studio.bot.scheduler import JobScheduler
+from dance_studio.core.metrics import MetricFamily, MetricsRegistry
+from dance_studio.db.session import POOL_CHECKOUT_SECONDS, TimedQueuePool
+from dance_studio.web.app import create_app
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = MetricsRegistry(prefix="test_")
+    sends = registry.counter("sends", "Sends by provider.", ("provider",))
+    depth = registry.gauge("queue_depth", "Items waiting.")
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    sends.inc(provider='vk "main"')
+    sends.inc(2, provider="telegram")
+    depth.set(3)
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    registry.register_collector("pool", lambda: [MetricFamily("pool_size", "gauge", "Pool size.").add(5)])
+    registry.register_collector("broken", lambda: 1 / 0)
+
+    rendered = registry.render()
+
+    assert "# TYPE test_sends counter" in rendered
+    assert 'test_sends_total{provider="vk \\"main\\""} 1' in rendered
+    assert 'test_sends_total{provider="telegram"} 2' in rendered
+    assert "test_queue_depth 3" in rendered
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in rendered
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 2' in rendered
+    assert 'test_latency_seconds_count{route="/a"} 2' in rendered
+    assert "test_pool_size 5" in rendered
+    with pytest.raises(ValueError):
+        registry.gauge("sends", "Same name, other type.")
+
+
+def test_metrics_endpoint_is_local_only_or_staff(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(auth_middleware, "get_session", session_factory)
+    monkeypatch.setattr(db_module, "get_session", session_factory)
+    client = create_app().test_client()
+
+    client.get("/metrics")
+    local = client.get("/metrics")
+    proxied = client.get("/metrics", headers={"X-Forwarded-For": "203.0.113.7"})
+
+    assert local.status_code == 200
+    assert local.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = local.get_data(as_text=True)
+    assert 'dance_studio_http_request_duration_seconds_count{method="GET",route="/metrics",status="2xx"}' in body
+    assert "dance_studio_http_requests_in_flight" in body
+    assert proxied.status_code == 401
+
+
+def test_pool_checkout_waits_and_job_metrics_are_collected(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1)
+    before = POOL_CHECKOUT_SECONDS.count()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert POOL_CHECKOUT_SECONDS.count() == before + 1
+
+    async def job():
+        return None
+
+    async def scenario():
+        scheduler = JobScheduler()
+        scheduler.add_job("reminders", job, interval_seconds=60)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        runner.cancel()
+        return scheduler.metric_families()
+
+    families = {family.name: family for family in asyncio.run(scenario())}
+    assert families["background_job_runs"].samples == [("_total", {"job": "reminders"}, 1.0)]
+    assert families["background_job_last_lag_seconds"].samples[0][1] == {"job": "reminders"}
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.core.notification_batches as notification_batches
+import dance_studio.web.routes.admin as admin_routes
+from dance_studio.core.notification_batches import (
+    BATCH_STATUS_DONE,
+    BATCH_STATUS_RUNNING,
+    deliver_notification_batch,
+    deliver_pending_notification_batches,
+    queue_notification_batch,
+)
+from dance_studio.core.time import utcnow
+from dance_studio.db.models import (
+    Attendance,
+    Base,
+    Direction,
+    Group,
+    GroupAbonement,
+    GroupAbonementActionLog,
+    Notification,
+    NotificationBatch,
+    Schedule,
+    Staff,
+    User,
+)
+
+LESSON_DAY = date(2027, 1, 11)
+VALID_TO = datetime(2027, 1, 31, 23, 59)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@pytest.fixture
+def started(monkeypatch):
+    batch_ids = []
+    monkeypatch.setattr(notification_batches, "_start_delivery", batch_ids.extend)
+    return batch_ids
+
+
+class _Service:
+    """Stands in for NotificationService: records calls and fails for the given users."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def send(self, db, *, user_id, event_type, title, body, payload=None):
+        self.calls.append((user_id, body))
+        return SimpleNamespace(status="failed" if user_id in self.failing else "sent")
+
+
+def _users(db, count: int) -> list[int]:
+    users = [User(name=f"User {index}", telegram_id=750000 + index) for index in range(count)]
+    db.add_all(users)
+    db.commit()
+    return [user.id for user in users]
+
+
+def test_batch_is_delivered_only_after_its_transaction_commits(session_factory, started):
+    db = session_factory()
+    user_ids = _users(db, 2)
+
+    queue_notification_batch(db, event_type="test", title="t", body="b", recipients=user_ids)
+    db.rollback()
+    assert started == []
+    assert db.query(NotificationBatch).count() == 0
+
+    batch = queue_notification_batch(db, event_type="test", title="t", body="b", recipients=user_ids + [user_ids[0], None])
+    assert started == []
+    db.commit()
+    assert started == [batch.id]
+    assert batch.recipient_count == 2
+    assert queue_notification_batch(db, event_type="test", title="t", body="b", recipients=[]) is None
+    db.close()
+
+
+def test_delivery_saves_progress_per_recipient_and_runs_once(session_factory, started):
+    db = session_factory()
+    user_ids = _users(db, 5)
+    batch = queue_notification_batch(
+        db,
+        event_type="test",
+        title="t",
+        body="default",
+        recipients=[(user_ids[0], "personal")] + user_ids[1:],
+    )
+    db.commit()
+    batch_id = batch.id
+    db.close()
+
+    service = _Service(failing={user_ids[3]})
+    commits = []
+    db = session_factory()
+    event.listen(db, "after_commit", lambda session: commits.append(1))
+    delivered = deliver_notification_batch(db, batch_id, service=service)
+
+    assert delivered.status == BATCH_STATUS_DONE
+    assert (delivered.sent_count, delivered.processed_count) == (4, 5)
+    assert json.loads(delivered.failed_user_ids_json) == [user_ids[3]]
+    assert delivered.error == "group_notification_delivery_partial"
+    assert service.calls[0] == (user_ids[0], "personal")
+    assert service.calls[1] == (user_ids[1], "default")
+    # Claim, one per recipient, final status.
+    assert len(commits) == 7
+    assert deliver_notification_batch(db, batch_id, service=service) is None
+    assert len(service.calls) == 5
+    db.close()
+
+
+class _DyingService(_Service):
+    """Sends to the first `alive` users, then the worker process dies."""
+
+    def __init__(self, alive, raising=()):
+        super().__init__()
+        self.alive = alive
+        self.raising = set(raising)
+
+    def send(self, db, *, user_id, event_type, title, body, payload=None):
+        if len(self.calls) == self.alive:
+            raise SystemExit
+        if user_id in self.raising:
+            self.calls.append((user_id, body))
+            raise RuntimeError("provider down")
+        return super().send(db, user_id=user_id, event_type=event_type, title=title, body=body, payload=payload)
+
+
+def test_a_dead_worker_loses_no_progress_and_resends_nobody(session_factory, started):
+    db = session_factory()
+    user_ids = _users(db, 4)
+    batch_id = queue_notification_batch(db, event_type="test", title="t", body="b", recipients=user_ids).id
+    db.commit()
+    db.close()
+
+    db = session_factory()
+    with pytest.raises(SystemExit):
+        deliver_notification_batch(db, batch_id, service=_DyingService(alive=3, raising={user_ids[1]}))
+    db.close()
+
+    db = session_factory()
+    batch = db.get(NotificationBatch, batch_id)
+    assert (batch.status, batch.processed_count, batch.sent_count) == (BATCH_STATUS_RUNNING, 3, 2)
+    assert json.loads(batch.failed_user_ids_json) == [user_ids[1]]
+    # Still fresh: the sweep leaves a batch that made progress a moment ago alone.
+    assert deliver_notification_batch(db, batch_id, service=_Service()) is None
+    batch.updated_at = utcnow() - timedelta(hours=1)
+    db.commit()
+
+    service = _Service()
+    resumed = deliver_notification_batch(db, batch_id, service=service)
+    assert service.calls == [(user_ids[3], "b")]
+    assert (resumed.status, resumed.processed_count, resumed.sent_count) == (BATCH_STATUS_DONE, 4, 3)
+    db.close()
+
+
+def test_sweep_resumes_an_abandoned_batch_where_it_stopped(session_factory, started):
+    db = session_factory()
+    user_ids = _users(db, 3)
+    batch = queue_notification_batch(db, event_type="test", title="t", body="b", recipients=user_ids)
+    db.commit()
+    # The worker sent to the first user and died.
+    batch.status = BATCH_STATUS_RUNNING
+    batch.processed_count = 1
+    batch.sent_count = 1
+    batch.updated_at = utcnow() - timedelta(hours=1)
+    fresh = queue_notification_batch(db, event_type="test", title="t", body="b", recipients=user_ids)
+    db.commit()
+    batch_id, fresh_id = batch.id, fresh.id
+    db.close()
+
+    assert deliver_pending_notification_batches(session_factory) == 1
+
+    db = session_factory()
+    resumed = db.get(NotificationBatch, batch_id)
+    assert resumed.status == BATCH_STATUS_DONE
+    assert resumed.processed_count == 3
+    # Users without channels are counted as failed, the first user is not messaged again.
+    assert sorted(row.user_id for row in db.query(Notification)) == user_ids[1:]
+    assert db.get(NotificationBatch, fresh_id).status == "queued"
+    db.close()
+
+
+@pytest.fixture
+def lesson(session_factory):
+    """A group lesson with three abonement holders; two of them were marked present and debited."""
+    db = session_factory()
+    teacher_user = User(name="Teacher", telegram_id=751000)
+    db.add(teacher_user)
+    db.flush()
+    teacher = Staff(name="Teacher", position="учитель", teaches=1, status="active", user_id=teacher_user.id)
+    direction = Direction(title="Jazz", direction_type="dance", status="active", base_price=1000)
+    db.add_all([teacher, direction])
+    db.flush()
+    group = Group(
+        direction_id=direction.direction_id,
+        teacher_id=teacher.id,
+        name="A",
+        age_group="18+",
+        max_students=10,
+        duration_minutes=60,
+        lessons_per_week=1,
+    )
+    students = [User(name=f"Student {index}", telegram_id=751010 + index) for index in range(3)]
+    db.add_all([group, *students])
+    db.flush()
+    abonements = [
+        GroupAbonement(
+            user_id=student.id,
+            group_id=group.id,
+            balance_credits=4,
+            status="active",
+            valid_from=datetime(2027, 1, 1),
+            valid_to=VALID_TO,
+        )
+        for student in students
+    ]
+    schedule = Schedule(
+        object_type="group",
+        object_id=group.id,
+        group_id=group.id,
+        title=group.name,
+        date=LESSON_DAY,
+        time_from=time(19, 0),
+        time_to=time(20, 0),
+        status="scheduled",
+    )
+    db.add_all([*abonements, schedule])
+    db.flush()
+    for student, abonement in zip(students[:2], abonements[:2]):
+        attendance = Attendance(schedule_id=schedule.id, user_id=student.id, abonement_id=abonement.id, status="present")
+        db.add(attendance)
+        db.flush()
+        abonement.balance_credits = 3
+        db.add(
+            GroupAbonementActionLog(
+                abonement_id=abonement.id,
+                action_type="debit_attendance",
+                credits_delta=-1,
+                attendance_id=attendance.id,
+                actor_type="staff",
+            )
+        )
+    db.commit()
+    ids = {
+        "schedule": schedule.id,
+        "teacher_user": teacher_user.id,
+        "students": [student.id for student in students],
+        "abonements": [row.id for row in abonements],
+    }
+    db.close()
+    return ids
+
+
+@pytest.fixture
+def call(session_factory, monkeypatch, started):
+    monkeypatch.setattr(admin_routes, "require_permission", lambda permission, **kwargs: None)
+    monkeypatch.setattr(admin_routes, "_get_current_staff", lambda db: None)
+    app = Flask(__name__)
+
+    def _call(view, path, *, method="POST", json=None, **kwargs):
+        db = session_factory()
+        try:
+            with app.test_request_context(path, method=method, json=json):
+                g.db = db
+                return app.make_response(view(**kwargs))
+        finally:
+            db.close()
+
+    return _call
+
+
+def _abonements(session_factory, lesson):
+    db = session_factory()
+    rows = {row.id: (row.valid_to, row.balance_credits) for row in db.query(GroupAbonement)}
+    db.close()
+    return [rows[abonement_id] for abonement_id in lesson["abonements"]]
+
+
+def test_group_cancel_is_set_based_and_notifies_after_commit(call, lesson, session_factory, engine, started):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    schedule_id = lesson["schedule"]
+
+    response = call(admin_routes.cancel_schedule_v2, f"/schedule/v2/{schedule_id}/cancel", json={}, schedule_id=schedule_id)
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body["extended_abonements"], body["refunded_credits"]) == (3, 2)
+    assert body["group_notification_total"] == 4
+    assert started == [body["notification_batch_id"]]
+    extended = VALID_TO + timedelta(days=7)
+    assert _abonements(session_factory, lesson) == [(extended, 4), (extended, 4), (extended, 4)]
+    assert sum(statement.startswith("UPDATE group_abonements") for statement in statements) == 1
+    assert sum(statement.startswith("INSERT INTO group_abonement_action_logs") for statement in statements) == 1
+
+    db = session_factory()
+    assert db.get(Schedule, schedule_id).status == "cancelled"
+    batch = db.get(NotificationBatch, body["notification_batch_id"])
+    assert batch.event_type == "group_schedule_cancelled"
+    assert sorted(item["user_id"] for item in json.loads(batch.recipients_json)) == sorted(
+        [lesson["teacher_user"], *lesson["students"]]
+    )
+    db.close()
+
+    repeated = call(admin_routes.cancel_schedule_v2, f"/schedule/v2/{schedule_id}/cancel", json={"notify_group": False}, schedule_id=schedule_id)
+    assert (repeated.get_json()["extended_abonements"], repeated.get_json()["refunded_credits"]) == (0, 0)
+    assert repeated.get_json()["notification_batch_id"] is None
+    assert _abonements(session_factory, lesson) == [(extended, 4), (extended, 4), (extended, 4)]
+
+
+def test_low_attendance_move_compensates_present_students_only(call, lesson, session_factory, started):
+    schedule_id = lesson["schedule"]
+    payload = {
+        "move_type": "low_attendance",
+        "target_date": "2027-01-13",
+        "target_time_from": "19:00",
+        "target_time_to": "20:00",
+    }
+
+    response = call(admin_routes.move_schedule_v2, f"/schedule/v2/{schedule_id}/move", json=payload, schedule_id=schedule_id)
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body["extended_abonements"], body["refunded_credits"], body["present_count"]) == (2, 2, 2)
+    extended = VALID_TO + timedelta(days=7)
+    assert _abonements(session_factory, lesson) == [(extended, 4), (extended, 4), (VALID_TO, 4)]
+
+    status = call(
+        admin_routes.admin_notification_batch_status,
+        f"/api/admin/notification-batches/{body['notification_batch_id']}",
+        method="GET",
+        batch_id=body["notification_batch_id"],
+    ).get_json()
+    assert status["status"] == "queued"
+    assert status["finished"] is False
+    assert status["recipient_count"] == 4
+
+    missing = call(admin_routes.admin_notification_batch_status, "/api/admin/notification-batches/999", method="GET", batch_id=999)
+    assert missing.status_code == 404
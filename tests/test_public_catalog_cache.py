@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.db as db_module
+import dance_studio.web.middleware.auth as auth_middleware
+from dance_studio.db.models import Base, Direction, Group, Schedule, Staff
+from dance_studio.web.app import create_app
+from dance_studio.web.services.catalog import CatalogCache, catalog_cache
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@pytest.fixture
+def app(session_factory, monkeypatch):
+    def _get_session():
+        return session_factory()
+
+    monkeypatch.setattr(auth_middleware, "get_session", _get_session)
+    monkeypatch.setattr(db_module, "get_session", _get_session)
+    monkeypatch.setattr(auth_middleware, "_is_csrf_valid", lambda: True)
+    catalog_cache.invalidate()
+    return create_app()
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+    event.listen(engine, "before_cursor_execute", lambda *args: executed.append(args[2]))
+    return executed
+
+
+def _seed_catalog(session_factory):
+    db = session_factory()
+    try:
+        teacher = Staff(name="Anna", position="учитель", teaches=1, status="active")
+        direction = Direction(title="Contemporary", direction_type="dance", status="active", base_price=1000)
+        db.add_all([teacher, direction])
+        db.flush()
+        group = Group(
+            direction_id=direction.direction_id,
+            teacher_id=teacher.id,
+            name="Beginners",
+            age_group="18+",
+            max_students=10,
+            duration_minutes=60,
+            lessons_per_week=2,
+        )
+        db.add(group)
+        db.flush()
+        db.add(
+            Schedule(
+                object_type="group",
+                object_id=group.id,
+                group_id=group.id,
+                teacher_id=teacher.id,
+                title=group.name,
+                date=date.today() + timedelta(days=1),
+                time_from=time(19, 0),
+                time_to=time(20, 0),
+                status="scheduled",
+            )
+        )
+        db.commit()
+        return teacher.id, direction.direction_id
+    finally:
+        db.close()
+
+
+def test_repeat_catalog_requests_hit_cache_and_honour_etag(app, session_factory, statements):
+    teacher_id, direction_id = _seed_catalog(session_factory)
+    client = app.test_client()
+
+    first = client.get("/api/directions")
+    assert first.status_code == 200
+    assert [item["groups_count"] for item in first.get_json()] == [1]
+    etag = first.headers["ETag"]
+
+    statements.clear()
+    repeat = client.get("/api/directions")
+    not_modified = client.get("/api/directions", headers={"If-None-Match": etag})
+
+    assert repeat.get_data() == first.get_data()
+    assert not_modified.status_code == 304
+    assert statements == []
+
+    groups = client.get(f"/api/directions/{direction_id}/groups").get_json()
+    card = client.get(f"/api/teachers/{teacher_id}").get_json()
+    assert groups[0]["teacher_name"] == "Anna"
+    assert groups[0]["free_seats"] == 10
+    assert groups[0]["schedule_slots"]
+    assert card["groups"][0]["direction_title"] == "Contemporary"
+
+
+def test_catalog_is_rebuilt_after_write(app, session_factory):
+    teacher_id, direction_id = _seed_catalog(session_factory)
+    client = app.test_client()
+    before = client.get(f"/api/directions/{direction_id}/groups")
+
+    db = session_factory()
+    try:
+        db.add(
+            Group(
+                direction_id=direction_id,
+                teacher_id=teacher_id,
+                name="Advanced",
+                age_group="18+",
+                max_students=8,
+                duration_minutes=90,
+                lessons_per_week=1,
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    after = client.get(f"/api/directions/{direction_id}/groups", headers={"If-None-Match": before.headers["ETag"]})
+
+    assert after.status_code == 200
+    assert sorted(item["name"] for item in after.get_json()) == ["Advanced", "Beginners"]
+    assert client.get("/api/directions").get_json()[0]["groups_count"] == 2
+
+
+def test_catalog_unknown_ids_return_404(app, session_factory):
+    _seed_catalog(session_factory)
+    client = app.test_client()
+
+    assert client.get("/api/teachers/999").status_code == 404
+    assert client.get("/api/directions/999/groups").status_code == 404
+
+
+def test_catalog_cache_expires_by_ttl_and_discards_results_built_during_a_write():
+    now = [0.0]
+    cache = CatalogCache(ttl_seconds=10, clock=lambda: now[0])
+    builds = []
+
+    def _builder():
+        builds.append(1)
+        return {"value": len(builds)}
+
+    cache.get_or_build("key", _builder)
+    cache.get_or_build("key", _builder)
+    now[0] = 11
+    cache.get_or_build("key", _builder)
+    assert len(builds) == 2
+
+    def _racing_builder():
+        cache.invalidate()
+        return {"value": "stale"}
+
+    cache.get_or_build("other", _racing_builder)
+    assert cache.get_or_build("other", lambda: {"value": "fresh"}).payload == {"value": "fresh"}
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from flask import g
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.db as db_module
+import dance_studio.web.middleware.auth as auth_middleware
+import dance_studio.web.routes.admin as admin_routes
+import dance_studio.web.routes.attendance as attendance_routes
+import dance_studio.web.routes.bookings as bookings_routes
+from dance_studio.core.statuses import ABONEMENT_STATUS_ACTIVE
+from dance_studio.core.system_settings_service import ensure_default_settings
+from dance_studio.db.models import (
+    Attendance,
+    Base,
+    BookingRequest,
+    Direction,
+    Group,
+    GroupAbonement,
+    Schedule,
+    Staff,
+    User,
+)
+from dance_studio.web.app import create_app
+from dance_studio.web.services.catalog import catalog_cache
+
+# Each endpoint gets a fixed budget that must hold for every dataset size below:
+# a query count that grows with the number of rows (N+1) blows it at the larger sizes.
+DATASET_SIZES = [1, 5, 25]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    monkeypatch.setattr(auth_middleware, "get_session", session_factory)
+    monkeypatch.setattr(db_module, "get_session", session_factory)
+    for module in (admin_routes, attendance_routes, bookings_routes):
+        monkeypatch.setattr(module, "require_permission", lambda permission, **kwargs: None)
+    app = create_app()
+
+    @app.before_request
+    def _as_staff():
+        g.telegram_id = 1000
+
+    catalog_cache.invalidate()
+    return app.test_client()
+
+
+def _seed(session_factory, size: int) -> dict:
+    db = session_factory()
+    # First-run settings rows are a one-time cost, not part of any endpoint's budget.
+    ensure_default_settings(db)
+    today = date.today()
+    teacher_user = User(name="Teacher", telegram_id=1000)
+    direction = Direction(title="Contemporary", direction_type="dance", status="active", base_price=1000)
+    db.add_all([teacher_user, direction])
+    db.flush()
+    teacher = Staff(name="Anna", position="учитель", teaches=1, status="active", user_id=teacher_user.id, telegram_id=1000)
+    db.add(teacher)
+    db.flush()
+
+    groups = [
+        Group(
+            direction_id=direction.direction_id,
+            teacher_id=teacher.id,
+            name=f"Group {index}",
+            age_group="18+",
+            max_students=30,
+            duration_minutes=60,
+            lessons_per_week=2,
+        )
+        for index in range(size)
+    ]
+    students = [User(name=f"Student {index}", telegram_id=2000 + index) for index in range(size)]
+    db.add_all(groups + students)
+    db.flush()
+
+    schedules = [
+        Schedule(
+            object_type="group",
+            object_id=group.id,
+            group_id=group.id,
+            teacher_id=teacher.id,
+            title=group.name,
+            date=today,
+            time_from=time(18, 0),
+            time_to=time(19, 0),
+            status="scheduled",
+        )
+        for group in groups
+    ]
+    abonements = [
+        GroupAbonement(
+            user_id=student.id,
+            group_id=groups[0].id,
+            abonement_type="multi",
+            balance_credits=8,
+            lessons_total=8,
+            price_per_lesson_rub=500,
+            status=ABONEMENT_STATUS_ACTIVE,
+            valid_from=datetime.combine(today - timedelta(days=7), time.min),
+            valid_to=datetime.combine(today + timedelta(days=30), time.min),
+        )
+        for student in students
+    ]
+    bookings = [
+        BookingRequest(
+            user_id=student.id,
+            object_type="group",
+            group_id=groups[index].id,
+            abonement_type="multi",
+            lessons_count=8,
+            requested_amount=4000,
+            status="created",
+        )
+        for index, student in enumerate(students)
+    ]
+    db.add_all(schedules + abonements + bookings)
+    db.flush()
+    db.add_all(
+        Attendance(schedule_id=schedules[0].id, user_id=abonement.user_id, abonement_id=abonement.id, status="present")
+        for abonement in abonements
+    )
+    db.commit()
+    ids = {
+        "direction_id": direction.direction_id,
+        "teacher_id": teacher.id,
+        "schedule_id": schedules[0].id,
+        "student_telegram_id": students[0].telegram_id,
+    }
+    db.close()
+    return ids
+
+
+ENDPOINTS = {
+    "public_schedule": (lambda ids: "/schedule/public?mine=0", 8),
+    "attendance_sheet": (lambda ids: f"/api/attendance/{ids['schedule_id']}", 8),
+    "direction_groups": (lambda ids: f"/api/directions/{ids['direction_id']}/groups", 7),
+    "teacher_profile": (lambda ids: f"/api/teachers/{ids['teacher_id']}", 7),
+    "admin_booking_list": (lambda ids: "/api/admin/booking-requests", 6),
+    "studio_stats": (lambda ids: "/api/stats/studio", 9),
+    "teacher_stats": (lambda ids: f"/api/stats/teacher?teacher_id={ids['teacher_id']}", 3),
+}
+
+
+@pytest.mark.parametrize("size", DATASET_SIZES)
+@pytest.mark.parametrize("endpoint", sorted(ENDPOINTS))
+def test_endpoint_query_count_does_not_scale_with_rows(client, session_factory, engine, query_budget, endpoint, size):
+    ids = _seed(session_factory, size)
+    build_path, budget = ENDPOINTS[endpoint]
+
+    with query_budget(engine, budget, label=f"{endpoint}[{size}]"):
+        response = client.get(build_path(ids))
+
+    assert response.status_code == 200, response.get_data(as_text=True)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.web.middleware.auth as auth_middleware
+import dance_studio.web.middleware.replica as replica_middleware
+import dance_studio.web.routes.admin as admin_routes
+from dance_studio.db.models import Base, User
+from dance_studio.db.replica import ReadReplica, ReplicaReadOnlyError, set_read_replica
+from dance_studio.web.app import create_app
+
+
+def _database(path, user_name):
+    # Two SQLite files stand in for a primary and its replica; the user name tells them apart.
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    db = factory()
+    db.add(User(name=user_name, telegram_id=1))
+    db.commit()
+    db.close()
+    return factory
+
+
+@pytest.fixture
+def primary_factory(tmp_path):
+    return _database(tmp_path / "primary.db", "from primary")
+
+
+@pytest.fixture
+def replica_factory(tmp_path):
+    return _database(tmp_path / "replica.db", "from replica")
+
+
+@pytest.fixture
+def use_replica(replica_factory):
+    previous = None
+
+    def _install(**kwargs):
+        nonlocal previous
+        kwargs.setdefault("lag_probe", lambda: 0.0)
+        replica = ReadReplica(replica_factory, max_lag_seconds=5, **kwargs)
+        previous = set_read_replica(replica)
+        return replica
+
+    yield _install
+    set_read_replica(previous)
+
+
+@pytest.fixture
+def client(primary_factory, monkeypatch):
+    monkeypatch.setattr(auth_middleware, "get_session", primary_factory)
+    monkeypatch.setattr(admin_routes, "require_permission", lambda permission, **kwargs: None)
+    return create_app().test_client()
+
+
+def _listed_names(client, **kwargs):
+    response = client.get("/users/list/all", **kwargs)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return [user["name"] for user in response.get_json()]
+
+
+def test_marked_view_reads_from_replica(client, use_replica):
+    use_replica()
+    assert _listed_names(client) == ["from replica"]
+
+
+def test_without_replica_reads_stay_on_primary(client):
+    assert _listed_names(client) == ["from primary"]
+
+
+def _unreachable():
+    raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+
+@pytest.mark.parametrize("lag_probe", [lambda: 30.0, _unreachable], ids=["lagging", "unreachable"])
+def test_lagging_or_unreachable_replica_falls_back_to_primary(client, use_replica, lag_probe):
+    use_replica(lag_probe=lag_probe)
+    assert _listed_names(client) == ["from primary"]
+
+
+def test_recent_write_pins_browser_to_primary(client, use_replica):
+    use_replica()
+    app = client.application
+    with app.test_request_context("/api/bookings", method="POST"):
+        response = replica_middleware._pin_after_write(app.make_response(({"ok": True}, 201)))
+    cookie = response.headers["Set-Cookie"]
+    assert cookie.startswith(f"{replica_middleware.PRIMARY_PIN_COOKIE}=")
+
+    client.set_cookie(replica_middleware.PRIMARY_PIN_COOKIE, str(int(time.time()) + 5))
+    assert _listed_names(client) == ["from primary"]
+    client.set_cookie(replica_middleware.PRIMARY_PIN_COOKIE, str(int(time.time()) - 1))
+    assert _listed_names(client) == ["from replica"]
+
+
+def test_lag_is_measured_at_most_once_per_interval(replica_factory):
+    calls = []
+    now = [100.0]
+    replica = ReadReplica(replica_factory, max_lag_seconds=5, lag_probe=lambda: calls.append(1) or 1.0, clock=lambda: now[0])
+
+    assert replica.is_usable() and replica.is_usable()
+    now[0] += 10
+    assert replica.is_usable()
+    assert len(calls) == 2
+
+
+def test_replica_session_refuses_writes(replica_factory):
+    db = ReadReplica(replica_factory, lag_probe=lambda: 0.0).session()
+    try:
+        db.add(User(name="oops", telegram_id=2))
+        with pytest.raises(ReplicaReadOnlyError):
+            db.flush()
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+
+import pytest
+from flask import Flask, g, jsonify
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.web.middleware.profiling as profiling_middleware
+from dance_studio.bot.scheduler import JobScheduler
+from dance_studio.core.profiling import install_query_profiler, profile_scope, profile_stats
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    install_query_profiler(engine)
+    install_query_profiler(engine)
+    return engine
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    monkeypatch.setattr(profiling_middleware, "OWNER_IDS", [42])
+    app = Flask(__name__)
+    profiling_middleware.register_profiling_middleware(app)
+
+    @app.before_request
+    def _identify():
+        g.user_id = app.config.get("TEST_USER_ID")
+
+    @app.route("/items/<int:count>")
+    def items(count):
+        with engine.connect() as conn:
+            rows = [conn.execute(text("SELECT :value"), {"value": index}).scalar() for index in range(count)]
+        time.sleep(0.01)
+        return jsonify(rows)
+
+    profile_stats.reset()
+    return app.test_client()
+
+
+def test_queries_are_counted_per_request_and_reported_to_staff(client):
+    anonymous = client.get("/items/2", headers={"X-Server-Timing": "1"})
+    client.application.config["TEST_USER_ID"] = 42
+    staff = client.get("/items/3", headers={"X-Server-Timing": "1"})
+
+    assert "Server-Timing" not in anonymous.headers
+    assert 'desc="3 queries"' in staff.headers["Server-Timing"]
+    assert "app;dur=" in staff.headers["Server-Timing"]
+    stats = profile_stats.snapshot()["GET /items/<int:count>"]
+    assert stats["count"] == 2
+    assert (stats["total_queries"], stats["max_queries"]) == (5, 3)
+    assert stats["query_count_buckets"]["2"] == 1 and stats["query_count_buckets"]["5"] == 1
+    assert stats["p50_ms"] >= 10
+    assert sum(stats["latency_ms_buckets"].values()) == 2
+
+
+def test_staff_lookup_runs_only_for_requests_asking_for_server_timing(client):
+    lookups = []
+
+    class _RecordingSession:
+        def query(self, *entities):
+            lookups.append(entities)
+            raise RuntimeError("no staff table here")
+
+        def rollback(self):
+            pass
+
+    client.application.before_request(lambda: setattr(g, "db", _RecordingSession()))
+    client.application.config["TEST_USER_ID"] = 7
+
+    plain = client.get("/items/1")
+    assert lookups == []
+    asked = client.get("/items/1", headers={"X-Server-Timing": "1"})
+    assert len(lookups) == 1
+    assert "Server-Timing" not in plain.headers and "Server-Timing" not in asked.headers
+
+
+def test_slow_request_is_logged_with_grouped_statements(client, monkeypatch, caplog):
+    monkeypatch.setattr(profiling_middleware, "SLOW_REQUEST_LOG_MS", 5)
+
+    with caplog.at_level(logging.WARNING, logger=profiling_middleware.__name__):
+        client.get("/items/4")
+
+    (record,) = caplog.records
+    assert "slow GET /items/<int:count> /items/4 -> 200" in record.getMessage()
+    assert "'statement': 'SELECT ?', 'count': 4" in record.getMessage()
+
+
+def test_background_job_queries_are_profiled_through_worker_threads(engine):
+    def _sync_work():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+    async def job():
+        await asyncio.to_thread(_sync_work)
+
+    async def scenario():
+        scheduler = JobScheduler()
+        scheduler.add_job("sync", job, interval_seconds=60)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        runner.cancel()
+
+    profile_stats.reset()
+    with profile_scope("outer") as outer:
+        asyncio.run(scenario())
+
+    assert profile_stats.snapshot()["job:sync"]["total_queries"] == 2
+    assert outer.queries == 0
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import gzip
+import os
+import zlib
+
+import brotli
+import pytest
+from flask import Flask, Response, jsonify, stream_with_context
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.db as db_module
+import dance_studio.web.middleware.auth as auth_middleware
+from dance_studio.db.models import Base, News
+from dance_studio.web.app import create_app
+from dance_studio.web.middleware.compression import (
+    compression_stats,
+    register_compression_middleware,
+    skip_compression,
+)
+from dance_studio.web.services.catalog import CatalogCache, catalog_response
+
+ROWS = [{"id": index, "title": "Contemporary", "status": "scheduled"} for index in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    catalog = CatalogCache()
+
+    @app.route("/large")
+    def large():
+        return jsonify(ROWS)
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/stream")
+    def stream():
+        def _chunks():
+            yield "["
+            for index, row in enumerate(ROWS):
+                yield ("," if index else "") + str(row["id"])
+            yield "]"
+
+        return Response(stream_with_context(_chunks()), mimetype="application/json")
+
+    @app.route("/raw")
+    @skip_compression
+    def raw():
+        return jsonify(ROWS)
+
+    @app.route("/catalog")
+    def catalog_view():
+        return catalog_response(catalog.get_or_build("rows", lambda: ROWS))
+
+    register_compression_middleware(app)
+    compression_stats.reset()
+    return app.test_client()
+
+
+def test_large_json_is_compressed_with_the_preferred_encoding(client):
+    identity = client.get("/large", headers={"Accept-Encoding": "identity"})
+    br = client.get("/large", headers={"Accept-Encoding": "gzip, deflate, br"})
+    gz = client.get("/large", headers={"Accept-Encoding": "gzip;q=1.0, br;q=0.5"})
+
+    assert "Content-Encoding" not in identity.headers
+    assert "Accept-Encoding" in identity.headers["Vary"]
+    assert br.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(br.get_data()) == identity.get_data()
+    assert int(br.headers["Content-Length"]) == len(br.get_data())
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gz.get_data()) == identity.get_data()
+
+    stats = compression_stats.snapshot()
+    assert stats["responses"] == 2
+    assert stats["bytes_saved"] == stats["bytes_in"] - stats["bytes_out"] > 0
+    assert set(stats["by_encoding"]) == {"br", "gzip"}
+
+
+def test_small_and_opted_out_responses_are_left_alone(client):
+    small = client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+    raw = client.get("/raw", headers={"Accept-Encoding": "gzip, br"})
+
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in raw.headers
+    assert raw.get_json() == ROWS
+    assert compression_stats.snapshot()["responses"] == 0
+
+
+def test_streamed_response_is_compressed_incrementally(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    body = zlib.decompress(response.get_data(), 16 + zlib.MAX_WBITS)
+    assert body == ("[" + ",".join(str(row["id"]) for row in ROWS) + "]").encode()
+
+
+def test_compressed_etag_is_weak_and_still_revalidates(client):
+    first = client.get("/catalog", headers={"Accept-Encoding": "br"})
+    etag = first.headers["ETag"]
+
+    assert etag.startswith('W/"')
+    revalidated = client.get("/catalog", headers={"Accept-Encoding": "br", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert client.get("/catalog").headers["ETag"] == etag[2:]
+
+
+def test_compressed_news_feed_still_answers_304(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    monkeypatch.setattr(auth_middleware, "get_session", session_factory)
+    monkeypatch.setattr(db_module, "get_session", session_factory)
+    db = session_factory()
+    db.add_all(News(title=f"News {index}", content="Contemporary class schedule update " * 10) for index in range(20))
+    db.commit()
+    db.close()
+    client = create_app().test_client()
+
+    first = client.get("/news", headers={"Accept-Encoding": "br"})
+    assert first.headers["Content-Encoding"] == "br"
+    assert first.headers["ETag"].startswith('W/"')
+    revalidated = client.get("/news", headers={"Accept-Encoding": "br", "If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
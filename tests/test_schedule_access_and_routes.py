@@ -67,9 +67,8 @@ def test_schedule_v2_cancel_route_exists_with_compensation_flow():
     assert "_load_individual_lesson_for_schedule(db, schedule)" in route_window
     assert "_sync_individual_lesson_with_schedule(" in route_window
     assert "_notify_individual_student(" in route_window
-    assert "_extend_abonement_by_week(" in route_window
-    assert "_refund_schedule_attendance_credit(" in route_window
-    assert "notify_group_participants(" in route_window
+    assert "compensate_group_lesson(" in route_window
+    assert "_queue_group_lesson_notification(" in route_window
 
 
 def test_schedule_v2_move_route_exists_with_transfer_modes():
@@ -90,4 +89,5 @@ def test_schedule_v2_move_route_exists_with_transfer_modes():
     assert "move_type not in SCHEDULE_MOVE_TYPE_LABELS" in route_window
     assert "if move_type in {\"studio_fault\", \"absence_people\"}" in route_window
     assert "if low_attendance_present_count >= 3" in route_window
-    assert "notify_group_participants(" in route_window
+    assert "compensate_group_lesson(" in route_window
+    assert "_queue_group_lesson_notification(" in route_window
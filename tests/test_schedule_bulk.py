@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import os
+from datetime import date, time
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import dance_studio.web.routes.admin as admin_routes
+from dance_studio.db.models import Base, Direction, Group, GroupSlotSummary, IndividualLesson, Schedule, Staff, User
+
+# 2026-09-07 is a Monday.
+TERM = {"date_from": "2026-09-07", "date_to": "2026-10-04"}
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    monkeypatch.setattr(admin_routes, "require_permission", lambda permission: None)
+    app = Flask(__name__)
+
+    class _Client:
+        def post(self, path, json):
+            db = session_factory()
+            try:
+                with app.test_request_context(path, method="POST", json=json):
+                    g.db = db
+                    result = admin_routes.create_schedule_v2_bulk()
+                    return app.make_response(result)
+            finally:
+                db.close()
+
+    return _Client()
+
+
+@pytest.fixture
+def seeded(session_factory):
+    db = session_factory()
+    anna = Staff(name="Anna", position="учитель", teaches=1, status="active")
+    boris = Staff(name="Boris", position="учитель", teaches=1, status="active")
+    direction = Direction(title="Contemporary", direction_type="dance", status="active", base_price=1000)
+    db.add_all([anna, boris, direction])
+    db.flush()
+    groups = [
+        Group(
+            direction_id=direction.direction_id,
+            teacher_id=teacher.id,
+            name=name,
+            age_group="18+",
+            max_students=10,
+            duration_minutes=60,
+            lessons_per_week=1,
+        )
+        for name, teacher in (("Beginners", anna), ("Advanced", anna), ("Kids", boris))
+    ]
+    db.add_all(groups)
+    db.commit()
+    ids = {"anna": anna.id, "boris": boris.id, "groups": [group.id for group in groups]}
+    db.close()
+    return ids
+
+
+def _pattern(group_id, weekday, time_from, time_to):
+    return {"group_id": group_id, "weekday": weekday, "time_from": time_from, "time_to": time_to}
+
+
+def test_bulk_creates_term_in_one_insert_and_refreshes_summaries(client, seeded, session_factory, engine):
+    beginners, advanced, _ = seeded["groups"]
+    inserts = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT INTO schedule") else None,
+    )
+
+    response = client.post(
+        "/schedule/v2/bulk",
+        json={
+            **TERM,
+            "patterns": [_pattern(beginners, 0, "18:00", "19:00"), _pattern(advanced, 2, "19:00", "20:30")],
+            "exclude_dates": ["2026-09-14"],
+        },
+    )
+
+    body = response.get_json()
+    assert response.status_code == 201
+    assert (body["occurrences_total"], body["created"], body["conflicts"]) == (7, 7, [])
+    assert len(inserts) == 1
+    db = session_factory()
+    rows = db.query(Schedule).order_by(Schedule.date).all()
+    assert [row.id for row in rows] == sorted(item["id"] for item in body["items"])
+    assert date(2026, 9, 14) not in {row.date for row in rows}
+    assert {row.group_id for row in rows if row.time_from == time(19, 0)} == {advanced}
+    assert db.get(GroupSlotSummary, beginners) is not None
+    db.close()
+
+
+def test_bulk_reports_conflicts_and_aborts_without_writing(client, seeded, session_factory):
+    beginners, advanced, kids = seeded["groups"]
+    db = session_factory()
+    db.add(
+        Schedule(
+            object_type="group",
+            object_id=kids,
+            group_id=kids,
+            teacher_id=seeded["boris"],
+            title="Kids",
+            date=date(2026, 9, 9),
+            time_from=time(18, 30),
+            time_to=time(19, 30),
+            status="scheduled",
+        )
+    )
+    student = User(name="Student")
+    db.add(student)
+    db.flush()
+    db.add(
+        IndividualLesson(
+            teacher_id=seeded["anna"],
+            student_id=student.id,
+            date=date(2026, 9, 21),
+            time_from=time(17, 30),
+            time_to=time(18, 15),
+            status="confirmed",
+        )
+    )
+    db.commit()
+    db.close()
+    request_body = {
+        **TERM,
+        "patterns": [
+            _pattern(beginners, 0, "18:00", "19:00"),
+            _pattern(advanced, 0, "18:30", "19:30"),
+            _pattern(kids, 2, "19:00", "20:00"),
+        ],
+    }
+
+    aborted = client.post("/schedule/v2/bulk", json=request_body)
+    preview = client.post("/schedule/v2/bulk", json={**request_body, "dry_run": True})
+
+    assert aborted.status_code == 409
+    assert aborted.get_json()["created"] == 0
+    assert preview.status_code == 200
+    conflicts = preview.get_json()["conflicts"]
+    by_slot = {(item["pattern_index"], item["date"]): item["conflicts"] for item in conflicts}
+    assert by_slot[(2, "2026-09-09")] == [
+        {
+            "source": "schedule",
+            "schedule_id": 1,
+            "title": "Kids",
+            "time_from": "18:30",
+            "time_to": "19:30",
+            "types": ["hall", "teacher", "group"],
+        }
+    ]
+    assert by_slot[(1, "2026-09-07")][0]["source"] == "pattern"
+    assert by_slot[(1, "2026-09-07")][0]["types"] == ["hall", "teacher"]
+    assert by_slot[(0, "2026-09-21")][0]["source"] == "individual_lesson"
+    assert len(preview.get_json()["items"]) == 12 - len(conflicts)
+
+    db = session_factory()
+    assert db.query(Schedule).count() == 1
+    db.close()
+
+    skipped = client.post("/schedule/v2/bulk", json={**request_body, "on_conflict": "skip"})
+    assert skipped.status_code == 201
+    assert skipped.get_json()["created"] == 12 - len(conflicts)
+
+
+def test_bulk_validates_input(client, seeded):
+    beginners = seeded["groups"][0]
+
+    assert client.post("/schedule/v2/bulk", json={**TERM, "patterns": []}).status_code == 400
+    assert client.post(
+        "/schedule/v2/bulk", json={**TERM, "patterns": [_pattern(beginners, 7, "18:00", "19:00")]}
+    ).status_code == 400
+    assert client.post(
+        "/schedule/v2/bulk", json={**TERM, "patterns": [_pattern(beginners, 0, "14:00", "15:00")]}
+    ).status_code == 400
+    assert client.post(
+        "/schedule/v2/bulk", json={"date_from": "2026-01-01", "date_to": "2026-12-31", "patterns": [_pattern(beginners, 0, "18:00", "19:00")]}
+    ).status_code == 400
+    assert client.post(
+        "/schedule/v2/bulk", json={**TERM, "patterns": [_pattern(999, 0, "18:00", "19:00")]}
+    ).status_code == 404
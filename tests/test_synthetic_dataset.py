@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("APP_SECRET_KEY", "test-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from dance_studio.db.models import Attendance, Base, Schedule
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_generator():
+    spec = importlib.util.spec_from_file_location(
+        "generate_synthetic_data", ROOT / "scripts" / "generate_synthetic_data.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    # dataclasses look their module up in sys.modules while the class body runs.
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _generate(generator, users: int, anchor: date):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    summary = generator.generate_dataset(db, generator.DatasetSpec(users=users, anchor=anchor))
+    statuses = [
+        row.status
+        for row in db.query(Attendance.status).order_by(Attendance.schedule_id, Attendance.user_id, Attendance.id)
+    ]
+    return db, summary, statuses
+
+
+def test_synthetic_dataset_is_deterministic_and_scales():
+    generator = _load_generator()
+    anchor = date(2026, 3, 11)
+
+    db, small, small_statuses = _generate(generator, 40, anchor)
+    _, again, again_statuses = _generate(generator, 40, anchor)
+    _, large, _ = _generate(generator, 160, anchor)
+
+    assert small.counts == again.counts
+    assert small_statuses == again_statuses
+    assert large.counts["attendance"] > 3 * small.counts["attendance"]
+    assert large.counts["schedule"] > 3 * small.counts["schedule"]
+    today = db.get(Schedule, small.today_schedule_id)
+    assert (today.date, today.group_id) == (anchor, small.group_id)
+    assert db.query(func.count(Attendance.id)).filter(Attendance.schedule_id == today.id).scalar() == 0
+    with pytest.raises(RuntimeError):
+        generator.generate_dataset(db, generator.DatasetSpec(users=5, anchor=anchor))
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+import dance_studio.bot.telegram_userbot as userbot
+
+
+class _FakeFloodWaitError(Exception):
+    def __init__(self, seconds):
+        super().__init__(f"flood wait {seconds}")
+        self.seconds = seconds
+
+
+class _FakeTelegramClient:
+    instances = []
+    flood_waits = []
+
+    def __init__(self, *args, **kwargs):
+        self.connected = False
+        self.resolved = []
+        self.sent = []
+        type(self).instances.append(self)
+
+    async def connect(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def is_user_authorized(self):
+        return True
+
+    async def get_input_entity(self, peer):
+        self.resolved.append(peer)
+        return SimpleNamespace(peer=peer)
+
+    async def send_message(self, *, entity, message):
+        if type(self).flood_waits:
+            raise _FakeFloodWaitError(type(self).flood_waits.pop(0))
+        self.sent.append((entity.peer, message))
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    _FakeTelegramClient.instances = []
+    _FakeTelegramClient.flood_waits = []
+    monkeypatch.setattr(userbot, "API_ID", "12345")
+    monkeypatch.setattr(userbot, "API_HASH", "hash")
+    monkeypatch.setattr(userbot, "USERBOT_PROXY", "")
+    monkeypatch.setattr(userbot, "TelegramClient", _FakeTelegramClient)
+    monkeypatch.setattr(userbot, "FloodWaitError", _FakeFloodWaitError)
+    monkeypatch.setattr(userbot, "USERBOT_MIN_SEND_INTERVAL_SECONDS", 0)
+    worker = userbot.UserbotWorker()
+    monkeypatch.setattr(userbot, "_worker", worker)
+    yield worker
+    worker.release_client()
+
+
+def test_sync_sends_reuse_one_connected_client_and_cached_entity(worker):
+    first = userbot.send_private_message_sync({"id": 42, "username": "client"}, "one")
+    second = userbot.send_private_message_sync({"id": 42, "username": "client"}, "two")
+
+    assert first == {"ok": True}
+    assert second == {"ok": True}
+    assert len(_FakeTelegramClient.instances) == 1
+    client = _FakeTelegramClient.instances[0]
+    assert client.resolved == ["@client"]
+    assert client.sent == [("@client", "one"), ("@client", "two")]
+
+
+def test_worker_reconnects_after_client_drops(worker):
+    userbot.send_private_message_sync({"username": "client"}, "one")
+    _FakeTelegramClient.instances[0].connected = False
+
+    result = userbot.send_private_message_sync({"username": "client"}, "two")
+
+    assert result == {"ok": True}
+    assert len(_FakeTelegramClient.instances) == 2
+    assert _FakeTelegramClient.instances[1].sent == [("@client", "two")]
+
+
+def test_worker_waits_out_short_flood_wait(worker):
+    _FakeTelegramClient.flood_waits = [0]
+
+    result = userbot.send_private_message_sync({"username": "client"}, "hello")
+
+    assert result == {"ok": True}
+    assert _FakeTelegramClient.instances[0].sent == [("@client", "hello")]
+
+
+def test_worker_reports_long_flood_wait_without_dropping_client(worker):
+    _FakeTelegramClient.flood_waits = [userbot.USERBOT_MAX_FLOOD_WAIT_SECONDS + 60]
+
+    result = userbot.send_private_message_sync({"username": "client"}, "hello")
+
+    assert result["ok"] is False
+    assert "flood wait" in result["error"]
+    assert _FakeTelegramClient.instances[0].connected is True
+    assert _FakeTelegramClient.instances[0].sent == []